@@ -1,32 +1,23 @@
-from .core.database import Database
-from .core.auth import AuthManager
-from .core.notifications import NotificationService
-from .ui.views.auth.login import LoginView
-from .ui.views.auth.register import RegisterView
-from .ui.views.dashboard.client import ClientDashboardView
-from .ui.views.dashboard.admin import AdminDashboardView
-from .ui.views.dashboard.master import MasterDashboardView
-from .ui.views.tickets.create import TicketCreateView
-from .ui.views.tickets.edit import TicketEditView
-from .ui.views.tickets.view import TicketCommentsView
-from .ui.views.shared.notifications import NotificationsView
-from .ui.views.shared.stats import StatsView
-from .ui.themes.colors import AppColors
+# Публичные имена импортируются при первом обращении (см. app/_lazy.py)
+from app._lazy import lazy_exports
 
-__all__ = [
-    'Database',
-    'AuthManager', 
-    'NotificationManager',
-    'NotificationService',
-    'LoginView',
-    'RegisterView',
-    'ClientDashboardView',
-    'AdminDashboardView', 
-    'MasterDashboardView',
-    'TicketCreateView',
-    'TicketEditView',
-    'TicketCommentsView',
-    'NotificationsView',
-    'StatsView',
-    'AppColors'
-]
\ No newline at end of file
+_EXPORTS = {
+    'Database': '.core.database',
+    'AuthManager': '.core.auth',
+    'NotificationManager': '.core:NotificationManager',
+    'NotificationService': '.core.notifications',
+    'LoginView': '.ui.views.auth.login',
+    'RegisterView': '.ui.views.auth.register',
+    'ClientDashboardView': '.ui.views.dashboard.client',
+    'AdminDashboardView': '.ui.views.dashboard.admin',
+    'MasterDashboardView': '.ui.views.dashboard.master',
+    'TicketCreateView': '.ui.views.tickets.create',
+    'TicketEditView': '.ui.views.tickets.edit',
+    'TicketCommentsView': '.ui.views.tickets.view',
+    'NotificationsView': '.ui.views.shared.notifications',
+    'StatsView': '.ui.views.shared.stats',
+    'AppColors': '.ui.themes.colors'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
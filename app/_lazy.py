@@ -0,0 +1,37 @@
+"""
+Отложенный импорт экспортов пакета (PEP 562)
+
+Пакеты app.* перечисляют свои публичные имена в словаре, а модуль с
+реализацией импортируется только при первом обращении к имени. Так
+`import app.main` не тянет за собой все представления и драйверы баз.
+"""
+
+import importlib
+import sys
+from typing import Callable, Dict, Tuple
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    Создает __getattr__ и __dir__ для пакета
+
+    Args:
+        package: Имя пакета (__name__)
+        exports: Имя -> относительный модуль ('.database') или
+            'модуль:атрибут', если экспортируемое имя отличается
+
+    Returns:
+        tuple: Функции __getattr__ и __dir__ для модуля пакета
+    """
+    def __getattr__(name):
+        target = exports.get(name)
+        if target is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module_name, _, attr = target.partition(':')
+        value = getattr(importlib.import_module(module_name, package), attr or name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
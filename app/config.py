@@ -6,6 +6,17 @@
 DATABASE_TYPE = "mysql"
 DATABASE_PATH = "repair_system.db"
 
+# SQLite (app/core/sqlite_writer.py): все изменения выполняет один поток,
+# накопившиеся задания фиксируются одной транзакцией
+SQLITE_WRITER_ENABLED = True
+SQLITE_WRITER_MAX_BATCH = 64  # заданий в одной транзакции
+SQLITE_WAL = True  # журнал WAL: чтение не ждет записи
+SQLITE_BUSY_TIMEOUT = 30  # секунд ожидания блокировки другими процессами
+SQLITE_FOREIGN_KEYS = True  # проверка внешних ключей и ON DELETE CASCADE
+
+# Загружать демо-данные при создании новой базы (иначе: python manage.py seed)
+SEED_DEMO_DATA = True
+
 # Настройки MySQL
 MYSQL_HOST = "localhost"
 MYSQL_PORT = 3306
@@ -13,6 +24,83 @@ MYSQL_USER = "root"
 MYSQL_PASSWORD = "root123"
 MYSQL_DATABASE = "repair_system"
 
+# Сеансы (app/core/sessions.py): предел на процесс и закрытие простаивающих
+SESSION_MAX = 500
+SESSION_IDLE_TIMEOUT = 1800  # секунд; 0 - не закрывать
+SESSION_REAP_INTERVAL = 60  # секунд между проверками
+
+# Хранение уведомлений (app/core/retention.py, python manage.py retention)
+NOTIFICATION_READ_TTL_DAYS = 90  # прочитанные старше переносятся в архив; 0 - хранить
+NOTIFICATION_ARCHIVE_MODE = "table"  # table, file или delete
+NOTIFICATION_ARCHIVE_PATH = "archive/notifications-{month}.jsonl"  # для режима file
+NOTIFICATION_ARCHIVE_TTL_DAYS = 730  # срок хранения архива; 0 - бессрочно
+RETENTION_BATCH_SIZE = 1000
+NOTIFICATIONS_PAGE_SIZE = 20  # уведомлений на страницу во всплывающем окне
+COMMENTS_PAGE_SIZE = 30  # комментариев на страницу в обсуждении заявки
+
+# Сколько номеров заявок процесс резервирует в базе за один запрос
+TICKET_NUMBER_BLOCK_SIZE = 50
+
+# Сколько секунд заявка из очереди закреплена за мастером до подтверждения
+TICKET_CLAIM_LEASE_SECONDS = 300
+# Сколько самых срочных свободных заявок показывать мастеру; 0 - все
+MASTER_QUEUE_SIZE = 50
+
+# Удаленные заявки (app/core/purge.py): пометка deleted_at сразу, строки - фоновой очисткой
+TICKET_PURGE_GRACE_SECONDS = 3600  # сколько помеченная заявка хранится до удаления
+TICKET_PURGE_BATCH_SIZE = 200  # заявок в одной транзакции очистки
+TICKET_PURGE_INTERVAL = 300  # секунд между фоновыми очистками; 0 - только python manage.py purge
+
+# Сроки выполнения заявок (app/core/sla.py); после изменения: python manage.py sla --recompute
+SLA_WORKING_HOURS = {  # день недели (0 - понедельник): рабочие интервалы
+    0: ["09:00-18:00"],
+    1: ["09:00-18:00"],
+    2: ["09:00-18:00"],
+    3: ["09:00-18:00"],
+    4: ["09:00-18:00"],
+}
+SLA_HOLIDAYS = []  # нерабочие дни, например "2026-01-01"
+SLA_RESOLUTION_HOURS = 16  # рабочих часов от создания заявки до срока
+SLA_AT_RISK_HOURS = 4  # осталось меньше рабочих часов - заявка под угрозой просрочки
+SLA_ESCALATION_INTERVAL = 300  # секунд между повышениями приоритета по сроку; 0 - только python manage.py sla
+
+# Автоматическое распределение заявок (app/core/dispatch.py)
+DISPATCH_BATCH_SIZE = 50  # заявок за одну раздачу
+DISPATCH_MAX_OPEN_PER_MASTER = 10  # мастеру с таким числом открытых заявок новые не назначаются
+DISPATCH_REFRESH_SECONDS = 300  # как часто перечитывать загрузку мастеров целиком
+DISPATCH_INTERVAL = 0  # секунд между фоновыми раздачами; 0 - только из панели администратора
+
+# Хеширование паролей (app/core/credentials.py): "scrypt" или "pbkdf2-sha256".
+# Хеши со старыми параметрами пересчитываются при следующем входе
+PASSWORD_HASH_ALGORITHM = "scrypt"
+PASSWORD_SCRYPT_N = 16384
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_PBKDF2_ITERATIONS = 600000
+PASSWORD_CACHE_SIZE = 256  # успешных проверок в памяти процесса
+PASSWORD_HASH_WORKERS = 2  # потоков для входа и регистрации
+
+# Замер SQL-запросов (сводка: python manage.py query-stats)
+QUERY_INSTRUMENTATION = False
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG_PATH = "slow_queries.log"
+QUERY_STATS_PATH = "query_stats.json"
+
+# Метрики и трассировка (app/core/telemetry.py)
+TELEMETRY_ENABLED = False
+TELEMETRY_SERVICE_NAME = "repair-system"
+TELEMETRY_EXPORT_INTERVAL = 60  # секунд; 0 - выгрузка только при выходе
+TELEMETRY_PROMETHEUS_PATH = "telemetry/metrics.prom"
+TELEMETRY_TRACES_PATH = "telemetry/traces.jsonl"
+TELEMETRY_METRICS_PATH = "telemetry/metrics.jsonl"
+TELEMETRY_OTLP_ENDPOINT = None  # например "http://localhost:4318"
+TELEMETRY_MAX_SPANS = 10000
+SLOW_SPAN_MS = 500
+
+# Журнал
+LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
+LOG_FILE = None  # None - вывод в консоль
+
 # Настройки приложения
 APP_TITLE = "Система учета заявок на ремонт оборудования"
 APP_WIDTH = 1200
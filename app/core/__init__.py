@@ -1,16 +1,21 @@
-from .database import Database
-from .auth import AuthManager
-from .notifications import NotificationService
-from app.core.mysql_notifications import MySQLNotificationManager as NotificationManager
-from .models import User, Ticket, Comment, Notification
+from app._lazy import lazy_exports
 
-__all__ = [
-    'Database',
-    'AuthManager',
-    'NotificationManager', 
-    'NotificationService',
-    'User',
-    'Ticket',
-    'Comment',
-    'Notification'
-]
\ No newline at end of file
+_EXPORTS = {
+    'Database': '.database',
+    'AuthManager': '.auth',
+    'NotificationManager': '.mysql_notifications:MySQLNotificationManager',
+    'SQLiteNotificationManager': '.sqlite_notifications',
+    'NotificationService': '.notifications',
+    'create_database': '.database_factory',
+    'create_notification_manager': '.database_factory',
+    'SessionManager': '.sessions',
+    'get_session_manager': '.sessions',
+    'Dispatcher': '.dispatch',
+    'User': '.models',
+    'Ticket': '.models',
+    'Comment': '.models',
+    'Notification': '.models'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
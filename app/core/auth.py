@@ -1,4 +1,9 @@
-from typing import Optional
+import logging
+from typing import Callable, Optional
+
+from app.core import credentials
+
+logger = logging.getLogger(__name__)
 
 class AuthManager:
     def __init__(self, db):
@@ -6,6 +11,8 @@ class AuthManager:
         self.current_user: Optional[dict] = None
     
     def login(self, username: str, password: str) -> bool:
+        # Схема могла еще готовиться в фоне после показа экрана входа
+        self.db.initialize()
         user = self.db.get_user_by_credentials(username, password)
         if user:
             self.current_user = user
@@ -13,8 +20,27 @@ class AuthManager:
         return False
     
     def register(self, username: str, password: str, full_name: str, email: str, phone: str) -> bool:
+        self.db.initialize()
         return self.db.create_user(username, password, full_name, email, phone)
     
+    def login_async(self, username: str, password: str, on_done: Callable[[bool], None]):
+        """login в пуле потоков credentials: хеширование не блокирует интерфейс"""
+        self._run_async(self.login, on_done, username, password)
+    
+    def register_async(self, username: str, password: str, full_name: str, email: str, phone: str,
+                       on_done: Callable[[bool], None]):
+        self._run_async(self.register, on_done, username, password, full_name, email, phone)
+    
+    def _run_async(self, fn, on_done, *args):
+        def done(future):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("Error in %s: %s", fn.__name__, e)
+                result = False
+            on_done(result)
+        credentials.submit(fn, *args).add_done_callback(done)
+    
     def logout(self):
         self.current_user = None
     
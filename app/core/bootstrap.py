@@ -0,0 +1,381 @@
+"""
+Подготовка схемы базы данных
+
+Версия схемы и отметка о загрузке демо-данных хранятся в таблице
+schema_meta. При обычном запуске выполняется один запрос к ней: DDL и
+миграции запускаются, только если сохраненная версия меньше
+SCHEMA_VERSION. Демо-данные загружаются командой `python manage.py seed`
+или при создании новой базы, если включен config.SEED_DEMO_DATA.
+
+DDL в MySQL фиксируется сразу и не откатывается, поэтому шаги для MySQL
+проверяют information_schema (mysql_add_column и др.): шаг, прерванный
+на середине, при следующем запуске продолжается с того же места.
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import app.config as config
+from app.core.ticket_numbers import SEQUENCE_NAME
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'schema_version'
+SEED_KEY = 'demo_data_seeded_at'
+
+def _base_schema(db):
+    db.init_db()
+
+def _widen_password_column(db):
+    """Хеш пароля (credentials) длиннее прежних 100 символов"""
+    if db.dialect != 'mysql':
+        return
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("ALTER TABLE users MODIFY password VARCHAR(255) NOT NULL")
+    conn.commit()
+
+def _notification_retention(db):
+    """Индексы уведомлений и архив (app/core/retention.py)"""
+    from app.core import retention
+    retention.init_schema(db)
+
+def _comment_threads(db):
+    """Роль автора в comments, счетчик комментариев в tickets, индекс для страниц"""
+    from app.core.bulk_io import refresh_comment_stats
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_add_column(cursor, 'comments', 'user_role', 'VARCHAR(20)')
+        mysql_add_column(cursor, 'tickets', 'comment_count', 'INT NOT NULL DEFAULT 0')
+        mysql_create_index(cursor, 'comments', 'idx_comments_ticket', 'ticket_id, id')
+    else:
+        cursor.execute("ALTER TABLE comments ADD COLUMN user_role TEXT")
+        cursor.execute("ALTER TABLE tickets ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_ticket ON comments (ticket_id, id)")
+    refresh_comment_stats(cursor)
+    conn.commit()
+    _release(db, conn)
+
+def _ticket_versions(db):
+    """Версия строки заявки для изменений с проверкой (UpdateResult)"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_add_column(cursor, 'tickets', 'version', 'INT NOT NULL DEFAULT 1')
+    else:
+        cursor.execute("ALTER TABLE tickets ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    conn.commit()
+    _release(db, conn)
+
+def _ticket_claims(db):
+    """Аренда заявки мастером (claim_next_ticket) и индекс очереди свободных заявок"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_add_column(cursor, 'tickets', 'claimed_by', 'INT NULL')
+        mysql_add_column(cursor, 'tickets', 'claim_expires', 'DATETIME NULL')
+        mysql_create_index(cursor, 'tickets', 'idx_tickets_queue', 'status, assigned_master_id, created_date')
+    else:
+        cursor.execute("ALTER TABLE tickets ADD COLUMN claimed_by INTEGER")
+        cursor.execute("ALTER TABLE tickets ADD COLUMN claim_expires TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_queue ON tickets (status, assigned_master_id, created_date)")
+    conn.commit()
+    _release(db, conn)
+
+def _ticket_soft_delete(db):
+    """
+    Пометка удаления заявок (deleted_at) и ON DELETE CASCADE у ссылок на заявки
+
+    Строки помеченных заявок удаляет app/core/purge.py; комментарии и
+    уведомления удаляются вместе с ними средствами базы.
+    """
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_add_column(cursor, 'tickets', 'deleted_at', 'DATETIME NULL')
+        mysql_create_index(cursor, 'tickets', 'idx_tickets_deleted', 'deleted_at')
+        _mysql_cascade_to_tickets(cursor, 'comments', 'ticket_id')
+        _mysql_cascade_to_tickets(cursor, 'notifications', 'related_ticket_id')
+    else:
+        # Таблицы пересоздаются при выключенной проверке ключей (PRAGMA - до начала транзакции)
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("ALTER TABLE tickets ADD COLUMN deleted_at TEXT")
+        # Частичный: иначе без статистики ANALYZE планировщик берет его для deleted_at IS NULL
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_deleted ON tickets (deleted_at) "
+                       "WHERE deleted_at IS NOT NULL")
+        # Строки заявок, удаленных раньше без проверки ключей
+        cursor.execute("DELETE FROM comments WHERE ticket_id NOT IN (SELECT id FROM tickets)")
+        cursor.execute('''
+            DELETE FROM notifications
+            WHERE related_ticket_id IS NOT NULL AND related_ticket_id NOT IN (SELECT id FROM tickets)
+        ''')
+        _sqlite_cascade_to_tickets(cursor, 'comments')
+        _sqlite_cascade_to_tickets(cursor, 'notifications')
+        # Каскадное удаление уведомлений заявки без просмотра всей таблицы
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_ticket ON notifications (related_ticket_id)")
+    conn.commit()
+    _release(db, conn)
+
+def _mysql_cascade_to_tickets(cursor, table: str, column: str):
+    """Заменяет внешний ключ column -> tickets (id) на ключ с ON DELETE CASCADE, если он еще без него"""
+    cursor.execute('''
+        SELECT k.CONSTRAINT_NAME, r.DELETE_RULE
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+            ON r.CONSTRAINT_SCHEMA = k.TABLE_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+        WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s AND k.COLUMN_NAME = %s
+            AND k.REFERENCED_TABLE_NAME = 'tickets'
+    ''', (table, column))
+    constraints = cursor.fetchall()
+    if any(rule == 'CASCADE' for _, rule in constraints):
+        return
+    for constraint, _ in constraints:
+        cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {constraint}")
+    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT fk_{table}_{column} "
+                   f"FOREIGN KEY ({column}) REFERENCES tickets (id) ON DELETE CASCADE")
+
+def _sqlite_cascade_to_tickets(cursor, table: str):
+    """Пересоздает таблицу SQLite с ON DELETE CASCADE у ссылок на tickets (ALTER TABLE их не меняет)"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    ddl = cursor.fetchone()[0]
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                   (table,))
+    indexes = [row[0] for row in cursor.fetchall()]
+
+    ddl = re.sub(r'REFERENCES\s+tickets\s*\(\s*id\s*\)', 'REFERENCES tickets (id) ON DELETE CASCADE', ddl)
+    ddl = re.sub(rf'CREATE TABLE\s+(IF NOT EXISTS\s+)?"?{table}"?', f'CREATE TABLE {table}_new', ddl, count=1)
+    cursor.execute(ddl)
+    cursor.execute(f"INSERT INTO {table}_new SELECT * FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for index in indexes:
+        cursor.execute(index)
+
+def _ticket_timestamps(db):
+    """
+    Индекс по времени создания заявок для выборок за период
+
+    В MySQL created_date уже DATETIME. В SQLite она хранится текстом ISO,
+    поэтому добавляется created_ts - секунды эпохи. Вставки приложения
+    заполняют ее сами, триггер - вставки в обход (загрузка, демо-данные).
+    """
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_create_index(cursor, 'tickets', 'idx_tickets_created', 'created_date')
+    else:
+        # Модификатор 'utc' переводит местное время created_date в UTC, как datetime.timestamp()
+        cursor.execute("ALTER TABLE tickets ADD COLUMN created_ts INTEGER")
+        cursor.execute("UPDATE tickets SET created_ts = CAST(strftime('%s', created_date, 'utc') AS INTEGER)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (created_ts)")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_created_ts AFTER INSERT ON tickets
+            WHEN NEW.created_ts IS NULL
+            BEGIN
+                UPDATE tickets SET created_ts = CAST(strftime('%s', NEW.created_date, 'utc') AS INTEGER)
+                WHERE id = NEW.id;
+            END
+        ''')
+    conn.commit()
+    _release(db, conn)
+
+def _ticket_sla(db):
+    """
+    Срок выполнения заявки (app/core/sla.py) и индекс для выборки просроченных
+
+    Сроки открытых заявок заполняются по текущему календарю; закрытым
+    заявкам срок не нужен.
+    """
+    from app.core import sla
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_add_column(cursor, 'tickets', 'sla_due', 'DATETIME NULL')
+        mysql_create_index(cursor, 'tickets', 'idx_tickets_sla', 'status, sla_due')
+    else:
+        cursor.execute("ALTER TABLE tickets ADD COLUMN sla_due TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_sla ON tickets (status, sla_due)")
+
+    placeholders = ', '.join(_placeholder(db) for _ in sla.OPEN_STATUSES)
+    cursor.execute(f"SELECT id, created_date FROM tickets WHERE status IN ({placeholders})", sla.OPEN_STATUSES)
+    calendar = sla.get_calendar()
+    dues = []
+    for ticket_id, created in cursor.fetchall():
+        due = sla.due_date(created, calendar)
+        dues.append((due if db.dialect == 'mysql' else due.isoformat(), ticket_id))
+    if dues:
+        cursor.executemany(f"UPDATE tickets SET sla_due = {_placeholder(db)} WHERE id = {_placeholder(db)}", dues)
+    conn.commit()
+    _release(db, conn)
+
+def _ticket_priority(db):
+    """
+    Приоритет заявки и индекс очередей по приоритету
+
+    idx_tickets_priority отдает заявки статуса в порядке "срочные, затем
+    старые" без сортировки, поэтому выборки с LIMIT читают только первые
+    строки индекса. Он заменяет idx_tickets_queue (порядок только по дате).
+    idx_tickets_master_priority - то же для заявок мастера (get_tickets_by_master).
+    """
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_add_column(cursor, 'tickets', 'priority', 'TINYINT NOT NULL DEFAULT 2')
+        mysql_create_index(cursor, 'tickets', 'idx_tickets_priority', 'status, priority DESC, created_date')
+        mysql_create_index(cursor, 'tickets', 'idx_tickets_master_priority',
+                           'assigned_master_id, priority DESC, created_date')
+        mysql_drop_index(cursor, 'tickets', 'idx_tickets_queue')
+    else:
+        cursor.execute("ALTER TABLE tickets ADD COLUMN priority INTEGER NOT NULL DEFAULT 2")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets (status, priority DESC, created_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_master_priority ON tickets "
+                       "(assigned_master_id, priority DESC, created_date)")
+        cursor.execute("DROP INDEX IF EXISTS idx_tickets_queue")
+    conn.commit()
+    _release(db, conn)
+
+# Шаг N переводит схему с версии N-1 на N. Новые шаги добавляются в конец
+MIGRATIONS: Dict[int, Callable] = {
+    1: _base_schema,
+    2: _widen_password_column,
+    3: _notification_retention,
+    4: _comment_threads,
+    5: _ticket_versions,
+    6: _ticket_claims,
+    7: _ticket_soft_delete,
+    8: _ticket_timestamps,
+    9: _ticket_sla,
+    10: _ticket_priority,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+_META_DDL = {
+    'sqlite': '''
+        CREATE TABLE IF NOT EXISTS schema_meta (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''',
+    'mysql': '''
+        CREATE TABLE IF NOT EXISTS schema_meta (
+            name VARCHAR(50) PRIMARY KEY,
+            value VARCHAR(100) NOT NULL
+        )
+    '''
+}
+
+def _placeholder(db) -> str:
+    return '%s' if db.dialect == 'mysql' else '?'
+
+def _release(db, conn):
+    if db.dialect == 'sqlite':
+        conn.close()
+
+def _mysql_exists(cursor, view: str, table: str, column: str, name: str) -> bool:
+    cursor.execute(f"SELECT COUNT(*) FROM information_schema.{view} "
+                   f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND {column} = %s", (table, name))
+    return cursor.fetchone()[0] > 0
+
+def mysql_add_column(cursor, table: str, column: str, definition: str):
+    """ALTER TABLE ... ADD COLUMN в MySQL, если столбца еще нет"""
+    if not _mysql_exists(cursor, 'COLUMNS', table, 'COLUMN_NAME', column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def mysql_create_index(cursor, table: str, index: str, columns: str):
+    """CREATE INDEX в MySQL, если индекса еще нет (IF NOT EXISTS там не поддерживается)"""
+    if not _mysql_exists(cursor, 'STATISTICS', table, 'INDEX_NAME', index):
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+def mysql_drop_index(cursor, table: str, index: str):
+    """DROP INDEX в MySQL, если индекс есть"""
+    if _mysql_exists(cursor, 'STATISTICS', table, 'INDEX_NAME', index):
+        cursor.execute(f"DROP INDEX {index} ON {table}")
+
+def get_meta(db, name: str) -> Optional[str]:
+    """Значение из schema_meta или None, если таблицы или записи еще нет"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT value FROM schema_meta WHERE name = {_placeholder(db)}", (name,))
+        row = cursor.fetchone()
+    except Exception:
+        # Таблицы нет: база создана до появления schema_meta или пустая
+        row = None
+    finally:
+        _release(db, conn)
+    return row[0] if row else None
+
+def set_meta(db, name: str, value: str):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(_META_DDL[db.dialect])
+    ph = _placeholder(db)
+    cursor.execute(f"REPLACE INTO schema_meta (name, value) VALUES ({ph}, {ph})", (name, value))
+    conn.commit()
+    _release(db, conn)
+
+def get_schema_version(db) -> int:
+    value = get_meta(db, VERSION_KEY)
+    return int(value) if value else 0
+
+def ensure_schema(db, seed: Optional[bool] = None) -> Tuple[int, int]:
+    """
+    Доводит схему до SCHEMA_VERSION
+
+    Args:
+        db: Database или MySQLDatabase
+        seed: Загрузить демо-данные, если база создается с нуля
+            (по умолчанию config.SEED_DEMO_DATA)
+
+    Returns:
+        tuple: Версия до и после
+    """
+    current = get_schema_version(db)
+    if current >= SCHEMA_VERSION:
+        return current, current
+
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        logger.info("Миграция схемы базы данных: версия %s -> %s", version - 1, version)
+        MIGRATIONS[version](db)
+        set_meta(db, VERSION_KEY, str(version))
+
+    if seed is None:
+        seed = getattr(config, 'SEED_DEMO_DATA', False)
+    if current == 0 and seed:
+        seed_demo_data(db)
+    return current, SCHEMA_VERSION
+
+def seed_demo_data(db, force: bool = False) -> bool:
+    """
+    Загружает тестовых пользователей и заявки в пустые таблицы
+
+    Args:
+        db: Database или MySQLDatabase с актуальной схемой
+        force: Повторить, даже если отметка о загрузке уже есть
+
+    Returns:
+        bool: False, если данные уже загружались
+    """
+    if not force and get_meta(db, SEED_KEY):
+        return False
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    db._create_test_data(cursor)
+    # Номера новых заявок продолжаются после демо-заявок
+    greatest = 'GREATEST' if db.dialect == 'mysql' else 'MAX'
+    cursor.execute(f'''
+        UPDATE ticket_sequence
+        SET next_value = {greatest}(next_value, (SELECT COALESCE(MAX(id), 0) + 1 FROM tickets))
+        WHERE name = {_placeholder(db)}
+    ''', (SEQUENCE_NAME,))
+    conn.commit()
+    _release(db, conn)
+
+    set_meta(db, SEED_KEY, datetime.now().isoformat(timespec='seconds'))
+    logger.info("Демо-данные загружены")
+    return True
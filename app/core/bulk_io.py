@@ -0,0 +1,245 @@
+"""
+Массовая выгрузка и загрузка заявок, комментариев и уведомлений
+
+Выгрузка читает таблицу порциями по первичному ключу и отдает строки
+генератором, поэтому расход памяти не зависит от размера таблицы.
+Загрузка вставляет строки пакетами через executemany и фиксирует
+транзакцию раз в несколько пакетов. Работает с Database и MySQLDatabase.
+"""
+
+import csv
+import json
+from datetime import datetime
+from typing import IO, Iterable, Iterator, Optional
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_COMMIT_EVERY = 50000
+
+# Описание выгружаемых таблиц
+TABLES = {
+    'tickets': {
+        'columns': ['id', 'ticket_number', 'title', 'description', 'status', 'created_date',
+                    'client_id', 'assigned_master_id', 'priority', 'sla_due', 'deleted_at'],
+        'int_columns': {'id', 'client_id', 'assigned_master_id', 'priority'},
+        'bool_columns': set(),
+        'date_columns': {'created_date', 'sla_due', 'deleted_at'},
+        # sla_due переносится как есть (срок не пересчитывается по текущему календарю;
+        # пустой заполняет sla.fill_due_dates). deleted_at - тоже: помеченные заявки
+        # остаются скрытыми до purge, а их комментарии и уведомления загружаются
+        # без ошибок ключей
+        'nullable_columns': {'assigned_master_id', 'sla_due', 'deleted_at'},
+        # Для файлов, выгруженных до появления столбца
+        'defaults': {'priority': 2}
+    },
+    'comments': {
+        'columns': ['id', 'ticket_id', 'user_id', 'user_name', 'user_role', 'comment_text', 'created_date'],
+        'int_columns': {'id', 'ticket_id', 'user_id'},
+        'bool_columns': set(),
+        'date_columns': {'created_date'},
+        'nullable_columns': {'user_role'}
+    },
+    'notifications': {
+        'columns': ['id', 'user_id', 'title', 'message', 'notification_type', 'is_read',
+                    'created_date', 'related_ticket_id'],
+        'int_columns': {'id', 'user_id', 'related_ticket_id'},
+        'bool_columns': {'is_read'},
+        'date_columns': {'created_date'},
+        'nullable_columns': {'related_ticket_id'}
+    }
+}
+
+FORMATS = ('jsonl', 'csv')
+
+def _table_spec(table: str) -> dict:
+    if table not in TABLES:
+        raise ValueError(f"Неизвестная таблица: {table}. Доступны: {', '.join(TABLES)}")
+    return TABLES[table]
+
+def _placeholder(db) -> str:
+    return '%s' if db.dialect == 'mysql' else '?'
+
+def _to_export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    return value
+
+def iter_rows(db, table: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Построчно читает таблицу порциями по id
+
+    Args:
+        db: Database или MySQLDatabase
+        table: Название таблицы из TABLES
+        batch_size: Количество строк в одном запросе
+
+    Yields:
+        dict: Строка таблицы
+    """
+    spec = _table_spec(table)
+    columns = spec['columns']
+    ph = _placeholder(db)
+    query = (
+        f"SELECT {', '.join(columns)} FROM {table} "
+        f"WHERE id > {ph} ORDER BY id LIMIT {ph}"
+    )
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    last_id = 0
+    try:
+        while True:
+            cursor.execute(query, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for row in rows:
+                yield {column: _to_export_value(value) for column, value in zip(columns, row)}
+            last_id = rows[-1][0]
+            if len(rows) < batch_size:
+                break
+    finally:
+        cursor.close()
+        if db.dialect == 'sqlite':
+            conn.close()
+
+def export_jsonl(db, table: str, fp: IO[str], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Выгружает таблицу в JSON Lines, возвращает количество строк"""
+    count = 0
+    for row in iter_rows(db, table, batch_size):
+        fp.write(json.dumps(row, ensure_ascii=False))
+        fp.write('\n')
+        count += 1
+    return count
+
+def export_csv(db, table: str, fp: IO[str], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Выгружает таблицу в CSV с заголовком, возвращает количество строк"""
+    writer = csv.DictWriter(fp, fieldnames=_table_spec(table)['columns'])
+    writer.writeheader()
+    count = 0
+    for row in iter_rows(db, table, batch_size):
+        writer.writerow(row)
+        count += 1
+    return count
+
+def read_jsonl(fp: IO[str]) -> Iterator[dict]:
+    """Построчно читает JSON Lines"""
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def read_csv(fp: IO[str]) -> Iterator[dict]:
+    """Построчно читает CSV с заголовком"""
+    yield from csv.DictReader(fp)
+
+def _to_import_value(column: str, value, spec: dict, dialect: str):
+    """Приводит значение из файла к типу столбца"""
+    if value == '' and column in spec['nullable_columns']:
+        return None
+    defaults = spec.get('defaults', {})
+    if value is None or (value == '' and column in defaults):
+        return defaults.get(column)
+    if column in spec['bool_columns']:
+        if isinstance(value, str):
+            return 1 if value.strip().lower() in ('1', 'true', 'yes') else 0
+        return 1 if value else 0
+    if column in spec['int_columns']:
+        return int(value)
+    if column in spec['date_columns'] and dialect == 'mysql' and isinstance(value, str) and value.endswith('Z'):
+        return value[:-1]
+    return value
+
+def import_rows(db, table: str, rows: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                commit_every: int = DEFAULT_COMMIT_EVERY, keep_ids: bool = True) -> int:
+    """
+    Загружает строки в таблицу пакетами
+
+    Строки с уже существующим id (или номером заявки) пропускаются.
+    Заявкам без номера номер выделяет db.ticket_numbers. Каждые
+    commit_every строк записываются одной транзакцией: в SQLite - через
+    поток записи приложения (Database._write), поэтому загрузка в работающую
+    базу не спорит с ним за блокировку файла.
+
+    Args:
+        db: Database или MySQLDatabase
+        table: Название таблицы из TABLES
+        rows: Итерируемый набор словарей (например, read_jsonl(fp))
+        batch_size: Строк в одном executemany
+        commit_every: Строк в одной транзакции (столько строк держится в памяти)
+        keep_ids: Сохранять id из файла (иначе id назначает база)
+
+    Returns:
+        int: Количество обработанных строк
+    """
+    spec = _table_spec(table)
+    columns = [c for c in spec['columns'] if keep_ids or c != 'id']
+    ph = _placeholder(db)
+    insert_verb = 'INSERT IGNORE' if db.dialect == 'mysql' else 'INSERT OR IGNORE'
+    query = (
+        f"{insert_verb} INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join([ph] * len(columns))})"
+    )
+
+    number_index = columns.index('ticket_number') if table == 'tickets' else None
+    # fn(cursor) в транзакции с фиксацией и откатом при ошибке
+    write = db._write if db.dialect == 'sqlite' else db._transaction
+
+    def insert_chunk(cursor, chunk):
+        for start in range(0, len(chunk), batch_size):
+            batch = chunk[start:start + batch_size]
+            if number_index is not None:
+                missing = [values for values in batch if not values[number_index]]
+                numbers = db.ticket_numbers.allocate(len(missing), cursor)
+                for values, number in zip(missing, numbers):
+                    values[number_index] = number
+            cursor.executemany(query, batch)
+
+    chunk = []
+    processed = 0
+    for row in rows:
+        chunk.append([
+            _to_import_value(column, row.get(column), spec, db.dialect) for column in columns
+        ])
+        processed += 1
+        if len(chunk) >= commit_every:
+            write(lambda cursor, chunk=chunk: insert_chunk(cursor, chunk))
+            chunk = []
+    if chunk:
+        write(lambda cursor: insert_chunk(cursor, chunk))
+    if table == 'comments':
+        write(refresh_comment_stats)
+
+    return processed
+
+def refresh_comment_stats(cursor):
+    """Пересчитывает tickets.comment_count и заполняет comments.user_role после загрузки"""
+    cursor.execute('''
+        UPDATE comments SET user_role = (SELECT role FROM users WHERE users.id = comments.user_id)
+        WHERE user_role IS NULL
+    ''')
+    cursor.execute('''
+        UPDATE tickets SET comment_count = (SELECT COUNT(*) FROM comments WHERE comments.ticket_id = tickets.id)
+    ''')
+
+def export_table(db, table: str, fp: IO[str], fmt: str = 'jsonl',
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Выгружает таблицу в указанном формате"""
+    if fmt == 'csv':
+        return export_csv(db, table, fp, batch_size)
+    return export_jsonl(db, table, fp, batch_size)
+
+def import_table(db, table: str, fp: IO[str], fmt: str = 'jsonl',
+                 batch_size: int = DEFAULT_BATCH_SIZE, keep_ids: bool = True) -> int:
+    """Загружает таблицу из файла в указанном формате"""
+    rows = read_csv(fp) if fmt == 'csv' else read_jsonl(fp)
+    return import_rows(db, table, rows, batch_size=batch_size, keep_ids=keep_ids)
+
+def detect_format(path: str, default: Optional[str] = None) -> str:
+    """Определяет формат по расширению файла"""
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.jsonl') or path.endswith('.ndjson'):
+        return 'jsonl'
+    return default or 'jsonl'
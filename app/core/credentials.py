@@ -0,0 +1,180 @@
+"""
+Хранение и проверка паролей
+
+Пароли хранятся в виде строки `$<алгоритм>$<параметры>$<соль>$<хеш>`:
+
+    $scrypt$n=16384,r=8,p=1$<base64>$<base64>
+    $pbkdf2-sha256$i=600000$<base64>$<base64>
+
+Алгоритм и стоимость задаются в config (PASSWORD_HASH_ALGORITHM,
+PASSWORD_SCRYPT_*, PASSWORD_PBKDF2_ITERATIONS). Значение без префикса `$`
+считается паролем открытым текстом из старых баз: он принимается при входе
+и сразу заменяется хешем. Хеш с устаревшими параметрами тоже пересчитывается
+при успешном входе (needs_rehash).
+
+Хеширование занимает десятки миллисекунд, поэтому вход и регистрация из
+интерфейса выполняются в пуле рабочих потоков (submit). Успешные проверки
+запоминаются в небольшом LRU-кеше процесса: ключом служит HMAC от хеша и
+пароля со случайным ключом процесса, сам пароль в памяти не хранится.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import app.config as config
+
+SCRYPT = 'scrypt'
+PBKDF2 = 'pbkdf2-sha256'
+SALT_BYTES = 16
+DIGEST_BYTES = 32
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+def _current_params(algorithm: str) -> dict:
+    if algorithm == SCRYPT:
+        return {
+            'n': getattr(config, 'PASSWORD_SCRYPT_N', 2 ** 14),
+            'r': getattr(config, 'PASSWORD_SCRYPT_R', 8),
+            'p': getattr(config, 'PASSWORD_SCRYPT_P', 1),
+        }
+    if algorithm == PBKDF2:
+        return {'i': getattr(config, 'PASSWORD_PBKDF2_ITERATIONS', 600000)}
+    raise ValueError(f"Неизвестный алгоритм хеширования паролей: {algorithm}")
+
+def _derive(algorithm: str, params: dict, password: str, salt: bytes) -> bytes:
+    secret = password.encode('utf-8')
+    if algorithm == SCRYPT:
+        n, r, p = params['n'], params['r'], params['p']
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * r * n * 2, dklen=DIGEST_BYTES)
+    if algorithm == PBKDF2:
+        return hashlib.pbkdf2_hmac('sha256', secret, salt, params['i'], dklen=DIGEST_BYTES)
+    raise ValueError(f"Неизвестный алгоритм хеширования паролей: {algorithm}")
+
+def _parse(stored: str) -> Optional[Tuple[str, dict, bytes, bytes]]:
+    """Разбирает строку хеша; None - открытый текст или поврежденное значение"""
+    if not stored or not stored.startswith('$'):
+        return None
+    try:
+        _, algorithm, params_text, salt, digest = stored.split('$')
+        params = {key: int(value) for key, value in
+                  (item.split('=', 1) for item in params_text.split(','))}
+        return algorithm, params, _b64decode(salt), _b64decode(digest)
+    except ValueError:
+        return None
+
+def hash_password(password: str, algorithm: Optional[str] = None) -> str:
+    """Хеширует пароль текущим алгоритмом и стоимостью из config"""
+    algorithm = algorithm or getattr(config, 'PASSWORD_HASH_ALGORITHM', SCRYPT)
+    params = _current_params(algorithm)
+    salt = os.urandom(SALT_BYTES)
+    digest = _derive(algorithm, params, password, salt)
+    params_text = ','.join(f"{key}={value}" for key, value in params.items())
+    return f"${algorithm}${params_text}${_b64encode(salt)}${_b64encode(digest)}"
+
+def is_hashed(stored: str) -> bool:
+    return _parse(stored) is not None
+
+def needs_rehash(stored: str) -> bool:
+    """True для открытого текста и хешей с другим алгоритмом или стоимостью"""
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    algorithm, params, _, _ = parsed
+    wanted = getattr(config, 'PASSWORD_HASH_ALGORITHM', SCRYPT)
+    return algorithm != wanted or params != _current_params(algorithm)
+
+class VerificationCache:
+    """LRU-кеш успешных проверок пароля"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, stored: str, password: str) -> bytes:
+        message = stored.encode('utf-8') + b'\0' + password.encode('utf-8')
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def hit(self, stored: str, password: str) -> bool:
+        fingerprint = self._fingerprint(stored, password)
+        with self._lock:
+            if fingerprint in self._entries:
+                self._entries.move_to_end(fingerprint)
+                return True
+        return False
+
+    def add(self, stored: str, password: str):
+        if self.size <= 0:
+            return
+        fingerprint = self._fingerprint(stored, password)
+        with self._lock:
+            self._entries[fingerprint] = True
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+verification_cache = VerificationCache(getattr(config, 'PASSWORD_CACHE_SIZE', 256))
+
+def verify_password(password: str, stored: str) -> bool:
+    """Сравнивает пароль с сохраненным хешем (или открытым текстом старых баз)"""
+    if not stored or password is None:
+        return False
+    if verification_cache.hit(stored, password):
+        return True
+
+    parsed = _parse(stored)
+    if parsed is None:
+        ok = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+    else:
+        algorithm, params, salt, digest = parsed
+        try:
+            ok = hmac.compare_digest(_derive(algorithm, params, password, salt), digest)
+        except (ValueError, KeyError):
+            return False
+
+    if ok:
+        verification_cache.add(stored, password)
+    return ok
+
+def check_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверяет пароль и при необходимости готовит новый хеш
+
+    Returns:
+        tuple: (пароль верный, новый хеш для сохранения или None)
+    """
+    if not verify_password(password, stored):
+        return False, None
+    if needs_rehash(stored):
+        return True, hash_password(password)
+    return True, None
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def submit(fn, *args, **kwargs) -> Future:
+    """Выполняет fn в пуле потоков для хеширования паролей"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(config, 'PASSWORD_HASH_WORKERS', 2),
+                thread_name_prefix='password-hash'
+            )
+    return _executor.submit(fn, *args, **kwargs)
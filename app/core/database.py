@@ -1,14 +1,87 @@
+import logging
 import sqlite3
-from datetime import datetime
-from typing import List, Optional
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 import app.config as config
+from app.core import bootstrap, credentials, sla
+from app.core.models import UpdateResult
+from app.core.sqlite_writer import connect, get_writer
+from app.core.ticket_numbers import TicketNumberGenerator, SEQUENCE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Выборка заявки с именами и контактами клиента и мастером; порядок полей - как в _ticket_row_to_dict
+TICKET_SELECT = '''
+    SELECT t.id, t.ticket_number, t.title, t.description, t.status, t.created_date,
+           t.client_id, t.assigned_master_id, u.full_name AS client_name, m.full_name AS master_name,
+           t.comment_count, t.version, t.claimed_by, t.claim_expires, t.sla_due, t.priority,
+           u.phone AS client_phone, u.email AS client_email
+    FROM tickets t
+    LEFT JOIN users u ON t.client_id = u.id
+    LEFT JOIN users m ON t.assigned_master_id = m.id
+'''
+
+# Поля заявок, которые возвращают массовые операции (для уведомлений и событий)
+BULK_COLUMNS = ('id', 'old_status', 'client_id', 'assigned_master_id', 'ticket_number', 'title', 'client_name')
+BULK_SELECT = '''
+    SELECT t.id, t.status, t.client_id, t.assigned_master_id, t.ticket_number, t.title, u.full_name
+    FROM tickets t
+    LEFT JOIN users u ON t.client_id = u.id
+'''
+# Размер списка IN (...) в одном запросе
+BULK_CHUNK_SIZE = 500
+
+def _chunks(ids: List[int], size: int = BULK_CHUNK_SIZE):
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def _ticket_row_to_dict(t) -> dict:
+    return {
+        'id': t[0],
+        'ticket_number': t[1],
+        'title': t[2],
+        'description': t[3],
+        'status': t[4],
+        'created_date': t[5],
+        'client_id': t[6],
+        'assigned_master_id': t[7],
+        'client_name': t[8],
+        'master_name': t[9],
+        'comment_count': t[10],
+        'version': t[11],
+        'claimed_by': t[12],
+        'claim_expires': t[13],
+        'sla_due': t[14],
+        'priority': t[15],
+        'client_phone': t[16],
+        'client_email': t[17]
+    }
 
 class Database:
-    def __init__(self):
-        self.init_db()
+    dialect = 'sqlite'
+
+    def __init__(self, initialize: bool = True):
+        self.ticket_numbers = TicketNumberGenerator(self)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        if initialize:
+            self.initialize()
+
+    def initialize(self):
+        """Проверяет версию схемы при первом вызове; параллельные вызовы ждут его завершения"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                bootstrap.ensure_schema(self)
+                self._initialized = True
     
     def init_db(self):
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        """Базовая схема (версия 1); вызывается из bootstrap только при миграции"""
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Пользователи
@@ -69,25 +142,37 @@ class Database:
             )
         ''')
         
+        # Последовательность номеров заявок
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_sequence (
+                name TEXT PRIMARY KEY,
+                next_value INTEGER NOT NULL
+            )
+        ''')
+        
         # Проверяем и добавляем поле assigned_master_id если его нет
         try:
             cursor.execute("SELECT assigned_master_id FROM tickets LIMIT 1")
         except sqlite3.OperationalError:
             # Поле не существует, добавляем его
-            print("Adding assigned_master_id column to tickets table...")
+            logger.info("Adding assigned_master_id column to tickets table...")
             cursor.execute('''
                 ALTER TABLE tickets 
                 ADD COLUMN assigned_master_id INTEGER
                 REFERENCES users(id)
             ''')
         
-        # Тестовые данные
-        self._create_test_data(cursor)
+        # Начинаем последовательность после уже существующих заявок
+        cursor.execute('''
+            INSERT OR IGNORE INTO ticket_sequence (name, next_value)
+            SELECT ?, COALESCE(MAX(id), 0) + 1 FROM tickets
+        ''', (SEQUENCE_NAME,))
         
         conn.commit()
         conn.close()
     
     def _create_test_data(self, cursor):
+        """Демо-данные для пустой базы (bootstrap.seed_demo_data)"""
         cursor.execute("SELECT COUNT(*) FROM users")
         if cursor.fetchone()[0] == 0:
             users = [
@@ -99,302 +184,217 @@ class Database:
             ]
             cursor.executemany(
                 "INSERT INTO users (username, password, full_name, role, email, phone) VALUES (?, ?, ?, ?, ?, ?)",
-                users
+                [(username, credentials.hash_password(password), *rest) for username, password, *rest in users]
             )
         
         cursor.execute("SELECT COUNT(*) FROM tickets")
         if cursor.fetchone()[0] == 0:
+            created = datetime.now()
+            due = sla.due_date(created).isoformat()
             tickets = [
-                ('T001', 'Ремонт принтера', 'Не печатает черным цветом', 'pending', datetime.now().isoformat(), 5, None),
-                ('T002', 'Неисправность станка', 'Станок издает странные звуки', 'in_progress', datetime.now().isoformat(), 5, 3),
-                ('T003', 'Настройка компьютера', 'Медленно работает', 'completed', datetime.now().isoformat(), 5, 3),
-                ('T004', 'Замена картриджа', 'Требуется замена картриджа', 'pending', datetime.now().isoformat(), 5, None)
+                ('T001', 'Ремонт принтера', 'Не печатает черным цветом', 'pending', created.isoformat(), 5, None, due),
+                ('T002', 'Неисправность станка', 'Станок издает странные звуки', 'in_progress', created.isoformat(), 5, 3, due),
+                ('T003', 'Настройка компьютера', 'Медленно работает', 'completed', created.isoformat(), 5, 3, None),
+                ('T004', 'Замена картриджа', 'Требуется замена картриджа', 'pending', created.isoformat(), 5, None, due)
             ]
             cursor.executemany(
-                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id, assigned_master_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id, assigned_master_id, sla_due) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
                 tickets
             )
     
-    def get_all_tickets(self) -> List[dict]:
-        conn = sqlite3.connect(config.DATABASE_PATH)
+    def get_all_tickets(self, created_since: Optional[datetime] = None) -> List[dict]:
+        """
+        Получает все заявки, новые первыми
+
+        Args:
+            created_since: Только созданные не раньше (диапазон по индексу created_ts)
+        """
+        conn = self._connect()
         cursor = conn.cursor()
         
-        # Проверяем существование поля assigned_master_id
-        try:
-            cursor.execute("PRAGMA table_info(tickets)")
-            columns = [column[1] for column in cursor.fetchall()]
-            has_assigned_master = 'assigned_master_id' in columns
-        except:
-            has_assigned_master = False
-        
-        if has_assigned_master:
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, m.full_name as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                LEFT JOIN users m ON t.assigned_master_id = m.id
-                ORDER BY t.created_date DESC
-            ''')
-        else:
-            # Если поля нет, используем упрощенный запрос
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, NULL as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                ORDER BY t.created_date DESC
-            ''')
+        query = TICKET_SELECT + ' WHERE t.deleted_at IS NULL'
+        params = []
+        if created_since is not None:
+            query += ' AND t.created_ts >= ?'
+            params.append(int(created_since.timestamp()))
+        cursor.execute(query + ' ORDER BY t.created_ts DESC', params)
         
         tickets = cursor.fetchall()
         conn.close()
         
-        return [{
-            'id': t[0],
-            'ticket_number': t[1],
-            'title': t[2],
-            'description': t[3],
-            'status': t[4],
-            'created_date': t[5],
-            'client_id': t[6],
-            'assigned_master_id': t[7] if has_assigned_master else None,
-            'client_name': t[8],
-            'master_name': t[9] if has_assigned_master else None
-        } for t in tickets]
+        return [_ticket_row_to_dict(t) for t in tickets]
     
     def get_tickets_by_master(self, master_id: int) -> List[dict]:
         """Получает заявки назначенные мастеру"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        # Проверяем существование поля assigned_master_id
-        try:
-            cursor.execute("PRAGMA table_info(tickets)")
-            columns = [column[1] for column in cursor.fetchall()]
-            has_assigned_master = 'assigned_master_id' in columns
-        except:
-            has_assigned_master = False
-        
-        if has_assigned_master:
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, m.full_name as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                LEFT JOIN users m ON t.assigned_master_id = m.id
-                WHERE t.assigned_master_id = ?
-                ORDER BY t.created_date DESC
-            ''', (master_id,))
-        else:
-            # Если поля нет, возвращаем пустой список
-            cursor.execute('SELECT 1')  # Простой запрос чтобы не было ошибки
-            tickets = []
-            conn.close()
-            return []
+        cursor.execute(TICKET_SELECT + '''
+            WHERE t.assigned_master_id = ? AND t.deleted_at IS NULL
+            ORDER BY t.priority DESC, t.created_date
+        ''', (master_id,))
         
         tickets = cursor.fetchall()
         conn.close()
         
-        return [{
-            'id': t[0],
-            'ticket_number': t[1],
-            'title': t[2],
-            'description': t[3],
-            'status': t[4],
-            'created_date': t[5],
-            'client_id': t[6],
-            'assigned_master_id': t[7],
-            'client_name': t[8],
-            'master_name': t[9]
-        } for t in tickets]
+        return [_ticket_row_to_dict(t) for t in tickets]
     
-    def get_pending_tickets(self) -> List[dict]:
-        """Получает заявки со статусом pending и без назначенного мастера"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+    def get_pending_tickets(self, master_id: Optional[int] = None, limit: Optional[int] = None,
+                            unclaimed: bool = False) -> List[dict]:
+        """
+        Получает заявки со статусом pending и без назначенного мастера,
+        срочные первыми, при равном приоритете - старые (индекс idx_tickets_priority)
+
+        Args:
+            master_id: Скрыть заявки, закрепленные за другими мастерами (claim_next_ticket)
+            limit: Только первые limit заявок очереди
+            unclaimed: Скрыть все заявки с действующей арендой (раздача распределителем)
+        """
+        conn = self._connect()
         cursor = conn.cursor()
         
-        # Проверяем существование поля assigned_master_id
-        try:
-            cursor.execute("PRAGMA table_info(tickets)")
-            columns = [column[1] for column in cursor.fetchall()]
-            has_assigned_master = 'assigned_master_id' in columns
-        except:
-            has_assigned_master = False
+        query = TICKET_SELECT + " WHERE t.status = 'pending' AND t.assigned_master_id IS NULL AND t.deleted_at IS NULL"
+        params = []
+        if master_id is not None:
+            query += " AND (t.claimed_by IS NULL OR t.claimed_by = ? OR t.claim_expires <= ?)"
+            params += [master_id, datetime.now().isoformat()]
+        elif unclaimed:
+            query += " AND (t.claimed_by IS NULL OR t.claim_expires <= ?)"
+            params.append(datetime.now().isoformat())
         
-        if has_assigned_master:
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, m.full_name as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                LEFT JOIN users m ON t.assigned_master_id = m.id
-                WHERE t.status = 'pending' AND t.assigned_master_id IS NULL
-                ORDER BY t.created_date DESC
-            ''')
-        else:
-            # Если поля нет, возвращаем все pending заявки
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, NULL as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                WHERE t.status = 'pending'
-                ORDER BY t.created_date DESC
-            ''')
+        query += " ORDER BY t.priority DESC, t.created_date, t.id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        cursor.execute(query, params)
         
         tickets = cursor.fetchall()
         conn.close()
         
-        return [{
-            'id': t[0],
-            'ticket_number': t[1],
-            'title': t[2],
-            'description': t[3],
-            'status': t[4],
-            'created_date': t[5],
-            'client_id': t[6],
-            'assigned_master_id': t[7] if has_assigned_master else None,
-            'client_name': t[8],
-            'master_name': t[9] if has_assigned_master else None
-        } for t in tickets]
+        return [_ticket_row_to_dict(t) for t in tickets]
     
-    def assign_ticket_to_master(self, ticket_id: int, master_id: int, user_role: str = None) -> bool:
+    def assign_ticket_to_master(self, ticket_id: int, master_id: int, user_role: str = None,
+                                expected_version: Optional[int] = None) -> UpdateResult:
         """Назначает заявку мастеру и меняет статус на in_progress с проверкой прав"""
         # Проверка прав доступа - только администраторы и менеджеры могут назначать мастеров
         if user_role and user_role not in ['admin', 'manager']:
-            return False
+            return UpdateResult(UpdateResult.REJECTED)
             
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Проверяем существование поля assigned_master_id
-            try:
-                cursor.execute("PRAGMA table_info(tickets)")
-                columns = [column[1] for column in cursor.fetchall()]
-                has_assigned_master = 'assigned_master_id' in columns
-            except:
-                has_assigned_master = False
-            
-            if has_assigned_master:
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET assigned_master_id = ?, status = 'in_progress' 
-                    WHERE id = ? AND status = 'pending'
-                ''', (master_id, ticket_id))
-            else:
-                # Если поля нет, просто меняем статус
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET status = 'in_progress' 
-                    WHERE id = ? AND status = 'pending'
-                ''', (ticket_id,))
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            return affected_rows > 0
-            
+            # Назначение снимает аренду заявки, если она была
+            return self._update_ticket_row(
+                ticket_id, "assigned_master_id = ?, status = 'in_progress', claimed_by = NULL, claim_expires = NULL",
+                (master_id,), " AND status = 'pending'", (), expected_version
+            )
         except Exception as e:
-            print(f"Error assigning ticket to master: {e}")
-            return False
+            logger.error("Error assigning ticket to master: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+
+    def get_master_workloads(self) -> List[dict]:
+        """Мастера и число их открытых заявок (in_progress, waiting_parts) одним запросом"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT u.id, u.full_name, COUNT(t.id)
+            FROM users u
+            LEFT JOIN tickets t ON t.assigned_master_id = u.id
+                AND t.status IN ('in_progress', 'waiting_parts') AND t.deleted_at IS NULL
+            WHERE u.role = 'master'
+            GROUP BY u.id, u.full_name
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [{'id': r[0], 'full_name': r[1], 'open_tickets': r[2]} for r in rows]
 
     def get_user_by_credentials(self, username: str, password: str) -> Optional[dict]:
-        """Проверяет учетные данные пользователя"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        """Проверяет учетные данные пользователя; устаревший хеш или открытый текст заменяется новым хешем"""
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT id, username, full_name, role, email, phone FROM users WHERE username = ? AND password = ?",
-            (username, password)
+            "SELECT id, username, full_name, role, email, phone, password FROM users WHERE username = ?",
+            (username,)
         )
         user = cursor.fetchone()
         conn.close()
         
-        if user:
-            return {
-                'id': user[0],
-                'username': user[1],
-                'full_name': user[2],
-                'role': user[3],
-                'email': user[4],
-                'phone': user[5]
-            }
-        return None
+        if not user:
+            return None
+        
+        ok, new_hash = credentials.check_password(password, user[6])
+        if not ok:
+            return None
+        if new_hash:
+            self._update_password_hash(user[0], user[6], new_hash)
+        
+        return {
+            'id': user[0],
+            'username': user[1],
+            'full_name': user[2],
+            'role': user[3],
+            'email': user[4],
+            'phone': user[5]
+        }
+    
+    def _update_password_hash(self, user_id: int, old_value: str, new_hash: str):
+        """Сохраняет новый хеш, если пароль не успели сменить параллельно"""
+        try:
+            self._write(lambda cursor: cursor.execute(
+                "UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                (new_hash, user_id, old_value)
+            ))
+        except Exception as e:
+            logger.error("Error updating password hash: %s", e)
     
     def create_user(self, username: str, password: str, full_name: str, email: str, phone: str) -> bool:
         """Создает нового пользователя (клиента)"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO users (username, password, full_name, role, email, phone) VALUES (?, ?, ?, 'client', ?, ?)",
-                (username, password, full_name, email, phone)
-            )
-            
-            # Получаем ID нового пользователя
-            user_id = cursor.lastrowid
+            ticket_number = self.ticket_numbers.next_number()
+            password_hash = credentials.hash_password(password)
+            created = datetime.now()
             
-            # Создаем тестовую заявку для нового пользователя
-            ticket_number = f"T{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            cursor.execute(
-                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id) VALUES (?, ?, ?, ?, ?, ?)",
-                (ticket_number, 'Первая заявка', 'Это ваша первая тестовая заявка', 'pending', datetime.now().isoformat(), user_id)
-            )
+            def write(cursor):
+                cursor.execute(
+                    "INSERT INTO users (username, password, full_name, role, email, phone) VALUES (?, ?, ?, 'client', ?, ?)",
+                    (username, password_hash, full_name, email, phone)
+                )
+                
+                # Получаем ID нового пользователя
+                user_id = cursor.lastrowid
+                
+                # Создаем тестовую заявку для нового пользователя
+                cursor.execute(
+                    "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id, sla_due) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (ticket_number, 'Первая заявка', 'Это ваша первая тестовая заявка', 'pending', created.isoformat(), user_id,
+                     sla.due_date(created).isoformat())
+                )
             
-            conn.commit()
-            conn.close()
+            self._write(write)
             return True
         except sqlite3.IntegrityError:
             return False
         except Exception as e:
-            print(f"Error creating user: {e}")
+            logger.error("Error creating user: %s", e)
             return False
     
+    
     def get_tickets_by_client(self, client_id: int) -> List[dict]:
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        # Проверяем существование поля assigned_master_id
-        try:
-            cursor.execute("PRAGMA table_info(tickets)")
-            columns = [column[1] for column in cursor.fetchall()]
-            has_assigned_master = 'assigned_master_id' in columns
-        except:
-            has_assigned_master = False
-        
-        if has_assigned_master:
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, m.full_name as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                LEFT JOIN users m ON t.assigned_master_id = m.id
-                WHERE t.client_id = ?
-                ORDER BY t.created_date DESC
-            ''', (client_id,))
-        else:
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, NULL as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                WHERE t.client_id = ?
-                ORDER BY t.created_date DESC
-            ''', (client_id,))
+        cursor.execute(TICKET_SELECT + '''
+            WHERE t.client_id = ? AND t.deleted_at IS NULL
+            ORDER BY t.created_date DESC
+        ''', (client_id,))
         
         tickets = cursor.fetchall()
         conn.close()
         
-        return [{
-            'id': t[0],
-            'ticket_number': t[1],
-            'title': t[2],
-            'description': t[3],
-            'status': t[4],
-            'created_date': t[5],
-            'client_id': t[6],
-            'assigned_master_id': t[7] if has_assigned_master else None,
-            'client_name': t[8],
-            'master_name': t[9] if has_assigned_master else None
-        } for t in tickets]
+        return [_ticket_row_to_dict(t) for t in tickets]
     
     def get_masters(self) -> List[dict]:
         """Получает список мастеров"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute("SELECT id, username, full_name, role FROM users WHERE role = 'master'")
         masters = cursor.fetchall()
@@ -407,193 +407,359 @@ class Database:
             'role': m[3]
         } for m in masters]
     
-    def update_ticket_status(self, ticket_id: int, status: str) -> bool:
+    def get_users_by_ids(self, user_ids: List[int]) -> Dict[int, dict]:
+        """Пользователи (без пароля) по списку id одним запросом на BULK_CHUNK_SIZE id"""
+        users = {}
+        conn = self._connect()
+        cursor = conn.cursor()
+        for chunk in _chunks(user_ids):
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(f"SELECT id, username, full_name, role, email, phone FROM users WHERE id IN ({placeholders})",
+                           chunk)
+            for row in cursor.fetchall():
+                users[row[0]] = {
+                    'id': row[0],
+                    'username': row[1],
+                    'full_name': row[2],
+                    'role': row[3],
+                    'email': row[4],
+                    'phone': row[5]
+                }
+        conn.close()
+        
+        return users
+    
+    def update_ticket_status(self, ticket_id: int, status: str,
+                             expected_version: Optional[int] = None) -> UpdateResult:
         """Обновляет статус заявки"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "UPDATE tickets SET status = ? WHERE id = ?",
-                (status, ticket_id)
-            )
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            # Возвращаем True только если действительно обновили запись
-            return affected_rows > 0
-            
+            return self._update_ticket_row(ticket_id, "status = ?", (status,),
+                                           expected_version=expected_version)
         except Exception as e:
-            print(f"Error updating ticket status: {e}")
-            return False
+            logger.error("Error updating ticket status: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+    
+    def update_ticket_priority(self, ticket_id: int, priority: int,
+                               expected_version: Optional[int] = None) -> UpdateResult:
+        """Задает приоритет заявки вручную"""
+        try:
+            return self._update_ticket_row(ticket_id, "priority = ?", (priority,),
+                                           expected_version=expected_version)
+        except Exception as e:
+            logger.error("Error updating ticket priority: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+    
+    def raise_priority(self, priority: int, due_before: datetime) -> int:
+        """
+        Повышает до priority приоритет открытых заявок со сроком раньше due_before
+
+        Версия строки не меняется: повышение по сроку не должно вызывать
+        конфликт у пользователя, который в это время редактирует заявку.
+
+        Returns:
+            int: Сколько заявок изменено
+        """
+        placeholders = ', '.join('?' for _ in sla.OPEN_STATUSES)
+        def write(cursor):
+            cursor.execute(f'''
+                UPDATE tickets SET priority = ?
+                WHERE status IN ({placeholders}) AND sla_due < ? AND priority < ? AND deleted_at IS NULL
+            ''', (priority, *sla.OPEN_STATUSES, due_before.isoformat(), priority))
+            return cursor.rowcount
+        
+        return self._write(write)
     
     def delete_ticket(self, ticket_id: int, user_id: int, user_role: str) -> bool:
-        """Удаляет заявку с проверкой прав и каскадным удалением"""
+        """
+        Удаляет заявку с проверкой прав
+
+        Заявка только помечается удаленной (deleted_at) и сразу пропадает
+        из выборок; строку вместе с комментариями и уведомлениями позже
+        удаляет фоновая очистка (app/core/purge.py).
+        """
+        # Проверяем права на удаление
+        if user_role == 'admin':
+            # Админ может удалить любую заявку
+            conditions, condition_values = '', ()
+        elif user_role == 'client':
+            # Клиент может удалить только свои заявки
+            conditions, condition_values = " AND client_id = ?", (user_id,)
+        else:
+            return False
+        
+        query = f"UPDATE tickets SET deleted_at = ?, version = version + 1 WHERE id = ? AND deleted_at IS NULL{conditions}"
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Проверяем права на удаление
-            if user_role == 'admin':
-                # Админ может удалить любую заявку - сначала удаляем связанные данные
-                cursor.execute("DELETE FROM notifications WHERE related_ticket_id = ?", (ticket_id,))
-                cursor.execute("DELETE FROM comments WHERE ticket_id = ?", (ticket_id,))
-                cursor.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
-                
-            elif user_role == 'client':
-                # Клиент может удалить только свои заявки - проверяем владельца
-                cursor.execute("SELECT client_id FROM tickets WHERE id = ?", (ticket_id,))
-                result = cursor.fetchone()
-                
-                if result and result[0] == user_id:
-                    # Удаляем связанные данные и заявку
-                    cursor.execute("DELETE FROM notifications WHERE related_ticket_id = ?", (ticket_id,))
-                    cursor.execute("DELETE FROM comments WHERE ticket_id = ?", (ticket_id,))
-                    cursor.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
-                else:
-                    conn.close()
-                    return False
-            else:
-                conn.close()
-                return False
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            return affected_rows > 0
-            
+            return self._write(lambda cursor: cursor.execute(
+                query, (datetime.now().isoformat(), ticket_id, *condition_values)
+            ).rowcount) > 0
         except Exception as e:
-            print(f"Error deleting ticket: {e}")
+            logger.error("Error deleting ticket: %s", e)
             return False
     
+    # МАССОВЫЕ ОПЕРАЦИИ (панель администратора)
+    def bulk_update_status(self, ticket_ids: List[int], status: str) -> List[dict]:
+        """
+        Меняет статус группы заявок одной транзакцией
+
+        Заявки, у которых статус уже такой, и заявки без мастера для
+        статусов in_progress/completed пропускаются.
+
+        Returns:
+            list: Измененные заявки (BULK_COLUMNS, old_status - прежний статус)
+        """
+        condition = " AND t.assigned_master_id IS NOT NULL" if status in ['in_progress', 'completed'] else ""
+        
+        def write(cursor):
+            changed = []
+            for chunk in _chunks(ticket_ids):
+                marks = ', '.join('?' * len(chunk))
+                cursor.execute(f"{BULK_SELECT} WHERE t.id IN ({marks}) AND t.status <> ? AND t.deleted_at IS NULL{condition}",
+                               [*chunk, status])
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                ids = [row[0] for row in rows]
+                cursor.execute(
+                    f"UPDATE tickets SET status = ?, version = version + 1 WHERE id IN ({', '.join('?' * len(ids))})",
+                    [status, *ids]
+                )
+                changed += [dict(zip(BULK_COLUMNS, row)) for row in rows]
+            return changed
+        
+        try:
+            return self._write(write)
+        except Exception as e:
+            logger.error("Error updating ticket statuses: %s", e)
+            return []
+
+    def bulk_update_status_with_notification(self, ticket_ids: List[int], status: str, notification_service) -> List[dict]:
+        """Меняет статус группы заявок; уведомления клиентам - одной вставкой"""
+        changed = self.bulk_update_status(ticket_ids, status)
+        if changed:
+            notification_service.notify_status_changes(changed, status)
+        return changed
+
+    def bulk_assign(self, ticket_ids: List[int], master_id: int) -> List[dict]:
+        """
+        Назначает мастеру группу заявок в статусе pending одной транзакцией
+
+        Returns:
+            list: Назначенные заявки (BULK_COLUMNS и master_name)
+        """
+        def write(cursor):
+            cursor.execute("SELECT full_name FROM users WHERE id = ? AND role = 'master'", (master_id,))
+            master = cursor.fetchone()
+            if not master:
+                return []
+            changed = []
+            for chunk in _chunks(ticket_ids):
+                marks = ', '.join('?' * len(chunk))
+                cursor.execute(f"{BULK_SELECT} WHERE t.id IN ({marks}) AND t.status = 'pending' AND t.deleted_at IS NULL", chunk)
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                ids = [row[0] for row in rows]
+                cursor.execute(f'''
+                    UPDATE tickets
+                    SET assigned_master_id = ?, status = 'in_progress', claimed_by = NULL, claim_expires = NULL,
+                        version = version + 1
+                    WHERE id IN ({', '.join('?' * len(ids))})
+                ''', [master_id, *ids])
+                changed += [dict(zip(BULK_COLUMNS, row), master_name=master[0]) for row in rows]
+            return changed
+        
+        try:
+            return self._write(write)
+        except Exception as e:
+            logger.error("Error assigning tickets to master: %s", e)
+            return []
+
+    def bulk_assign_with_notification(self, ticket_ids: List[int], master_id: int, notification_service) -> List[dict]:
+        """Назначает группу заявок; уведомления мастеру и клиентам - одной вставкой"""
+        changed = self.bulk_assign(ticket_ids, master_id)
+        if changed:
+            notification_service.notify_assignments(changed, master_id)
+        return changed
+
+    def bulk_delete(self, ticket_ids: List[int], user_id: int, user_role: str) -> int:
+        """Помечает удаленными группу заявок (только администратор), как delete_ticket"""
+        if user_role != 'admin' or not ticket_ids:
+            return 0
+        
+        def write(cursor):
+            deleted = 0
+            deleted_at = datetime.now().isoformat()
+            for chunk in _chunks(ticket_ids):
+                marks = ', '.join('?' * len(chunk))
+                cursor.execute(
+                    f"UPDATE tickets SET deleted_at = ?, version = version + 1 "
+                    f"WHERE id IN ({marks}) AND deleted_at IS NULL",
+                    [deleted_at, *chunk]
+                )
+                deleted += cursor.rowcount
+            return deleted
+        
+        try:
+            return self._write(write)
+        except Exception as e:
+            logger.error("Error deleting tickets: %s", e)
+            return 0
+    
     def create_ticket(self, title: str, description: str, client_id: int) -> bool:
         """Создает новую заявку"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Генерируем уникальный номер заявки с случайным компонентом
-            import random
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            random_suffix = ''.join(random.choices('0123456789', k=4))
-            ticket_number = f"T{timestamp}{random_suffix}"
-            
-            # Проверяем уникальность (на всякий случай)
-            cursor.execute("SELECT id FROM tickets WHERE ticket_number = ?", (ticket_number,))
-            if cursor.fetchone():
-                # Если номер уже существует, генерируем новый
-                random_suffix = ''.join(random.choices('0123456789', k=6))
-                ticket_number = f"T{timestamp}{random_suffix}"
-            
-            cursor.execute('''
-                INSERT INTO tickets (ticket_number, title, description, created_date, client_id)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (ticket_number, title, description, datetime.now().isoformat(), client_id))
-            
-            conn.commit()
-            conn.close()
+            ticket_number = self.ticket_numbers.next_number()
+            created = datetime.now()
+            self._write(lambda cursor: cursor.execute('''
+                INSERT INTO tickets (ticket_number, title, description, created_date, created_ts, client_id, sla_due)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (ticket_number, title, description, created.isoformat(), int(created.timestamp()), client_id,
+                  sla.due_date(created).isoformat())))
             return True
         except Exception as e:
-            print(f"Error creating ticket: {e}")
+            logger.error("Error creating ticket: %s", e)
             return False
 
-    def update_ticket_status_with_notification(self, ticket_id: int, new_status: str, notification_service) -> bool:
+    def update_ticket_status_with_notification(self, ticket_id: int, new_status: str, notification_service,
+                                               expected_version: Optional[int] = None) -> UpdateResult:
         """Обновляет статус заявки с отправкой уведомления"""
-        # Получаем текущий статус
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        cursor = conn.cursor()
+        def write(cursor):
+            # Прежний статус читается в той же транзакции, что и запись
+            cursor.execute('SELECT status, version FROM tickets WHERE id = ? AND deleted_at IS NULL', (ticket_id,))
+            result = cursor.fetchone()
+            if not result:
+                return None, 0, None
+            old_status, version = result
+            if expected_version is not None and version != expected_version:
+                return old_status, 0, version
+            
+            cursor.execute(
+                "UPDATE tickets SET status = ?, version = version + 1 WHERE id = ?",
+                (new_status, ticket_id)
+            )
+            return old_status, cursor.rowcount, version + 1
         
-        cursor.execute('SELECT status FROM tickets WHERE id = ?', (ticket_id,))
-        result = cursor.fetchone()
+        old_status, updated, version = self._write(write)
+        result = UpdateResult.resolve(updated, version, expected_version,
+                                      lambda: self.get_ticket_by_id(ticket_id))
         
-        if not result:
-            conn.close()
-            return False
+        if result and old_status != new_status:
+            # Отправляем уведомление об изменении статуса
+            notification_service.notify_ticket_status_change(ticket_id, old_status, new_status)
         
-        old_status = result[0]
+        return result
+
+    def assign_ticket_to_master_with_notification(self, ticket_id: int, master_id: int, notification_service, user_role: str = None,
+                                                  expected_version: Optional[int] = None) -> UpdateResult:
+        """Назначает заявку мастеру с отправкой уведомлений"""
+        result = self.assign_ticket_to_master(ticket_id, master_id, user_role, expected_version)
         
-        # Обновляем статус
-        cursor.execute(
-            "UPDATE tickets SET status = ? WHERE id = ?",
-            (new_status, ticket_id)
-        )
+        if result:
+            try:
+                # Отправляем уведомления
+                notification_service.notify_master_assigned(ticket_id, master_id)
+                notification_service.notify_client_about_master(ticket_id, master_id)
+            except Exception as e:
+                logger.error("Error notifying about assignment: %s", e)
         
-        affected_rows = cursor.rowcount
-        conn.commit()
-        conn.close()
+        return result
+
+    def claim_next_ticket(self, master_id: int, lease_seconds: Optional[int] = None) -> Optional[dict]:
+        """
+        Закрепляет за мастером самую срочную свободную заявку (при равном приоритете - самую старую)
+
+        Заявка остается pending и скрыта от других мастеров, пока не
+        истечет аренда (TICKET_CLAIM_LEASE_SECONDS); взять ее в работу -
+        confirm_claim. За мастером закреплено не больше одной заявки:
+        повторный вызов продлевает и возвращает уже закрепленную.
+        Выбор и запись выполняются одним заданием потока записи, поэтому
+        два мастера не получат одну заявку.
+
+        Returns:
+            dict: Заявка (claim_expires - конец аренды) или None, если очередь пуста
+        """
+        lease = lease_seconds or getattr(config, 'TICKET_CLAIM_LEASE_SECONDS', 300)
         
-        if affected_rows > 0 and old_status != new_status:
-            # Отправляем уведомление об изменении статуса
-            notification_service.notify_ticket_status_change(ticket_id, old_status, new_status)
+        def write(cursor):
+            now = datetime.now()
+            cursor.execute('''
+                SELECT id FROM tickets
+                WHERE status = 'pending' AND assigned_master_id IS NULL AND claimed_by = ?
+                  AND deleted_at IS NULL
+                LIMIT 1
+            ''', (master_id,))
+            row = cursor.fetchone()
+            if not row:
+                # Порядок очереди дает индекс idx_tickets_priority
+                cursor.execute('''
+                    SELECT id FROM tickets
+                    WHERE status = 'pending' AND assigned_master_id IS NULL
+                      AND (claimed_by IS NULL OR claim_expires <= ?) AND deleted_at IS NULL
+                    ORDER BY priority DESC, created_date, id
+                    LIMIT 1
+                ''', (now.isoformat(),))
+                row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute(
+                "UPDATE tickets SET claimed_by = ?, claim_expires = ?, version = version + 1 WHERE id = ?",
+                (master_id, (now + timedelta(seconds=lease)).isoformat(), row[0])
+            )
+            return row[0]
         
-        return affected_rows > 0
+        try:
+            ticket_id = self._write(write)
+        except Exception as e:
+            logger.error("Error claiming ticket: %s", e)
+            return None
+        return self.get_ticket_by_id(ticket_id) if ticket_id else None
 
-    def assign_ticket_to_master_with_notification(self, ticket_id: int, master_id: int, notification_service, user_role: str = None) -> bool:
-        """Назначает заявку мастеру с отправкой уведомлений"""
-        # Проверка прав доступа
-        if user_role and user_role not in ['admin', 'manager']:
-            return False
-            
+    def confirm_claim(self, ticket_id: int, master_id: int, notification_service=None) -> UpdateResult:
+        """Берет в работу заявку, закрепленную за мастером; после конца аренды - rejected"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Проверяем существование поля assigned_master_id
+            result = self._update_ticket_row(
+                ticket_id, "assigned_master_id = ?, status = 'in_progress', claimed_by = NULL, claim_expires = NULL",
+                (master_id,),
+                " AND status = 'pending' AND assigned_master_id IS NULL AND claimed_by = ? AND claim_expires > ?",
+                (master_id, datetime.now().isoformat())
+            )
+        except Exception as e:
+            logger.error("Error confirming claim: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+        
+        if result and notification_service:
             try:
-                cursor.execute("PRAGMA table_info(tickets)")
-                columns = [column[1] for column in cursor.fetchall()]
-                has_assigned_master = 'assigned_master_id' in columns
-            except:
-                has_assigned_master = False
-            
-            if has_assigned_master:
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET assigned_master_id = ?, status = 'in_progress' 
-                    WHERE id = ? AND status = 'pending'
-                ''', (master_id, ticket_id))
-            else:
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET status = 'in_progress' 
-                    WHERE id = ? AND status = 'pending'
-                ''', (ticket_id,))
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            if affected_rows > 0:
-                # Отправляем уведомления
                 notification_service.notify_master_assigned(ticket_id, master_id)
                 notification_service.notify_client_about_master(ticket_id, master_id)
-            
-            return affected_rows > 0
-            
+            except Exception as e:
+                logger.error("Error notifying about assignment: %s", e)
+        return result
+
+    def release_claim(self, ticket_id: int, master_id: int) -> bool:
+        """Возвращает закрепленную заявку в очередь"""
+        try:
+            return bool(self._update_ticket_row(
+                ticket_id, "claimed_by = NULL, claim_expires = NULL", (),
+                " AND claimed_by = ?", (master_id,)
+            ))
         except Exception as e:
-            print(f"Error assigning ticket to master: {e}")
+            logger.error("Error releasing claim: %s", e)
             return False
 
     def create_ticket_with_notification(self, title: str, description: str, client_id: int, notification_service) -> bool:
         """Создает новую заявку с отправкой уведомлений"""
-        try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            ticket_number = f"T{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
+        def write(cursor):
+            created = datetime.now()
             cursor.execute('''
-                INSERT INTO tickets (ticket_number, title, description, created_date, client_id)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (ticket_number, title, description, datetime.now().isoformat(), client_id))
-            
-            ticket_id = cursor.lastrowid
-            
-            conn.commit()
-            conn.close()
+                INSERT INTO tickets (ticket_number, title, description, created_date, created_ts, client_id, sla_due)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (ticket_number, title, description, created.isoformat(), int(created.timestamp()), client_id,
+                  sla.due_date(created).isoformat()))
+            return cursor.lastrowid
+        
+        try:
+            ticket_number = self.ticket_numbers.next_number()
+            ticket_id = self._write(write)
             
             if ticket_id:
                 # Отправляем уведомление администраторам
@@ -601,91 +767,135 @@ class Database:
             
             return True
         except Exception as e:
-            print(f"Error creating ticket: {e}")
+            logger.error("Error creating ticket: %s", e)
             return False
 
     # НОВЫЕ МЕТОДЫ ДЛЯ РЕДАКТИРОВАНИЯ ЗАЯВОК
-    def update_ticket(self, ticket_id: int, title: str, description: str, user_id: int, user_role: str) -> bool:
-        """Обновляет заявку с проверкой прав"""
+    def update_ticket(self, ticket_id: int, title: str, description: str, user_id: int, user_role: str,
+                      expected_version: Optional[int] = None) -> UpdateResult:
+        """
+        Обновляет заявку с проверкой прав
+
+        Args:
+            expected_version: Версия, открытая в редакторе; если заявку
+                успели изменить, вернется UpdateResult со статусом conflict
+        """
+        # Проверяем права на редактирование
+        if user_role == 'admin':
+            # Админ может редактировать любую заявку
+            conditions, condition_values = '', ()
+        elif user_role == 'client':
+            # Клиент может редактировать только свои заявки в статусе pending
+            conditions, condition_values = " AND client_id = ? AND status = 'pending'", (user_id,)
+        elif user_role == 'master':
+            # Мастер может редактировать только назначенные ему заявки
+            conditions, condition_values = " AND assigned_master_id = ?", (user_id,)
+        else:
+            return UpdateResult(UpdateResult.REJECTED)
+        
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Проверяем права на редактирование
-            if user_role == 'admin':
-                # Админ может редактировать любую заявку
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET title = ?, description = ? 
-                    WHERE id = ?
-                ''', (title, description, ticket_id))
-            
-            elif user_role == 'client':
-                # Клиент может редактировать только свои заявки в статусе pending
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET title = ?, description = ? 
-                    WHERE id = ? AND client_id = ? AND status = 'pending'
-                ''', (title, description, ticket_id, user_id))
-            
-            elif user_role == 'master':
-                # Мастер может редактировать только назначенные ему заявки
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET title = ?, description = ? 
-                    WHERE id = ? AND assigned_master_id = ?
-                ''', (title, description, ticket_id, user_id))
-            else:
-                conn.close()
-                return False
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            return affected_rows > 0
-            
+            return self._update_ticket_row(ticket_id, "title = ?, description = ?", (title, description),
+                                           conditions, condition_values, expected_version)
         except Exception as e:
-            print(f"Error updating ticket: {e}")
-            return False
+            logger.error("Error updating ticket: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
 
-    def add_comment(self, ticket_id: int, user_id: int, user_name: str, comment_text: str) -> bool:
-        """Добавляет комментарий к заявке"""
-        try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
+    def _update_ticket_row(self, ticket_id: int, assignments: str, values: tuple,
+                           conditions: str = '', condition_values: tuple = (),
+                           expected_version: Optional[int] = None) -> UpdateResult:
+        """
+        UPDATE tickets с увеличением версии строки
+
+        При expected_version строка меняется, только если ее версия не
+        изменилась; версия после запроса читается в той же транзакции.
+        """
+        query = f"UPDATE tickets SET {assignments}, version = version + 1 WHERE id = ? AND deleted_at IS NULL{conditions}"
+        params = list(values) + [ticket_id] + list(condition_values)
+        if expected_version is not None:
+            query += " AND version = ?"
+            params.append(expected_version)
+        
+        def write(cursor):
+            cursor.execute(query, params)
+            updated = cursor.rowcount
+            cursor.execute("SELECT version FROM tickets WHERE id = ? AND deleted_at IS NULL", (ticket_id,))
+            row = cursor.fetchone()
+            return updated, row[0] if row else None
+        
+        updated, version = self._write(write)
+        return UpdateResult.resolve(updated, version, expected_version,
+                                    lambda: self.get_ticket_by_id(ticket_id))
+
+    def add_comment(self, ticket_id: int, user_id: int, user_name: str, comment_text: str,
+                    user_role: Optional[str] = None) -> Optional[dict]:
+        """
+        Добавляет комментарий к заявке
+
+        Returns:
+            dict: Созданный комментарий (как в get_comments_by_ticket) или None
+        """
+        def write(cursor):
+            # Счетчик растет в той же транзакции; 0 строк - заявки не существует
+            cursor.execute("UPDATE tickets SET comment_count = comment_count + 1 WHERE id = ? AND deleted_at IS NULL",
+                           (ticket_id,))
+            if cursor.rowcount == 0:
+                return None
             
-            # Проверяем существование заявки
-            cursor.execute("SELECT id FROM tickets WHERE id = ?", (ticket_id,))
-            if not cursor.fetchone():
-                conn.close()
-                return False
+            role = user_role
+            if role is None:
+                cursor.execute("SELECT role FROM users WHERE id = ?", (user_id,))
+                row = cursor.fetchone()
+                role = row[0] if row else None
             
+            created_date = datetime.now().isoformat()
             cursor.execute('''
-                INSERT INTO comments (ticket_id, user_id, user_name, comment_text, created_date)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (ticket_id, user_id, user_name, comment_text, datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
-            return True
+                INSERT INTO comments (ticket_id, user_id, user_name, user_role, comment_text, created_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (ticket_id, user_id, user_name, role, comment_text, created_date))
+            return {
+                'id': cursor.lastrowid,
+                'ticket_id': ticket_id,
+                'user_id': user_id,
+                'user_name': user_name,
+                'comment_text': comment_text,
+                'created_date': created_date,
+                'user_role': role
+            }
+        
+        try:
+            return self._write(write)
         except Exception as e:
-            print(f"Error adding comment: {e}")
-            return False
+            logger.error("Error adding comment: %s", e)
+            return None
 
-    def get_comments_by_ticket(self, ticket_id: int) -> List[dict]:
-        """Получает все комментарии для заявки"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+    def get_comments_by_ticket(self, ticket_id: int, limit: Optional[int] = None,
+                               before: Optional[int] = None) -> List[dict]:
+        """
+        Получает комментарии заявки в хронологическом порядке
+
+        Args:
+            limit: Сколько последних комментариев вернуть (None - все)
+            before: id самого раннего уже загруженного комментария
+        """
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT c.*, u.role as user_role
-            FROM comments c
-            LEFT JOIN users u ON c.user_id = u.id
-            WHERE c.ticket_id = ?
-            ORDER BY c.created_date ASC
-        ''', (ticket_id,))
+        query = '''
+            SELECT id, ticket_id, user_id, user_name, comment_text, created_date, user_role
+            FROM comments
+            WHERE ticket_id = ?
+        '''
+        params = [ticket_id]
+        if before is not None:
+            query += ' AND id < ?'
+            params.append(before)
+        # Страница берется с конца по индексу idx_comments_ticket и разворачивается
+        query += ' ORDER BY id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
         
+        cursor.execute(query, params)
         comments = cursor.fetchall()
         conn.close()
         
@@ -697,79 +907,132 @@ class Database:
             'comment_text': c[4],
             'created_date': c[5],
             'user_role': c[6]
-        } for c in comments]
+        } for c in reversed(comments)]
 
     def get_ticket_by_id(self, ticket_id: int) -> Optional[dict]:
         """Получает заявку по ID"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        try:
-            cursor.execute("PRAGMA table_info(tickets)")
-            columns = [column[1] for column in cursor.fetchall()]
-            has_assigned_master = 'assigned_master_id' in columns
-        except:
-            has_assigned_master = False
+        cursor.execute(TICKET_SELECT + ' WHERE t.id = ? AND t.deleted_at IS NULL', (ticket_id,))
         
-        if has_assigned_master:
-            cursor.execute('''
-                SELECT t.*, u.full_name as client_name, m.full_name as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                LEFT JOIN users m ON t.assigned_master_id = m.id
-                WHERE t.id = ?
-            ''', (ticket_id,))
-        else:
+        ticket = cursor.fetchone()
+        conn.close()
+        
+        return _ticket_row_to_dict(ticket) if ticket else None
+    
+    def purge_deleted_tickets(self, deleted_before: datetime, limit: int) -> int:
+        """
+        Удаляет до limit заявок, помеченных удаленными раньше deleted_before
+
+        Комментарии и уведомления заявок удаляет ON DELETE CASCADE.
+
+        Returns:
+            int: Сколько заявок удалено
+        """
+        def write(cursor):
             cursor.execute('''
-                SELECT t.*, u.full_name as client_name, NULL as master_name
-                FROM tickets t
-                LEFT JOIN users u ON t.client_id = u.id
-                WHERE t.id = ?
-            ''', (ticket_id,))
+                DELETE FROM tickets WHERE id IN (
+                    SELECT id FROM tickets
+                    WHERE deleted_at IS NOT NULL AND deleted_at < ?
+                    ORDER BY deleted_at
+                    LIMIT ?
+                )
+            ''', (deleted_before.isoformat(), limit))
+            return cursor.rowcount
+
+        return self._write(write)
+
+    def get_overdue_tickets(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[dict]:
+        """Открытые заявки с истекшим сроком (sla_due), самые просроченные первыми"""
+        conn = self._connect()
+        cursor = conn.cursor()
         
-        ticket = cursor.fetchone()
+        placeholders = ', '.join('?' for _ in sla.OPEN_STATUSES)
+        query = TICKET_SELECT + f'''
+            WHERE t.status IN ({placeholders}) AND t.sla_due < ? AND t.deleted_at IS NULL
+            ORDER BY t.sla_due
+        '''
+        params = [*sla.OPEN_STATUSES, (now or datetime.now()).isoformat()]
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        cursor.execute(query, params)
+        
+        tickets = cursor.fetchall()
         conn.close()
         
-        if ticket:
-            return {
-                'id': ticket[0],
-                'ticket_number': ticket[1],
-                'title': ticket[2],
-                'description': ticket[3],
-                'status': ticket[4],
-                'created_date': ticket[5],
-                'client_id': ticket[6],
-                'assigned_master_id': ticket[7] if has_assigned_master else None,
-                'client_name': ticket[8],
-                'master_name': ticket[9] if has_assigned_master else None
-            }
-        return None
+        return [_ticket_row_to_dict(t) for t in tickets]
+    
+    def get_sla_candidates(self, missing_only: bool = True) -> List[tuple]:
+        """(id, created_date) открытых заявок для расчета срока (sla.fill_due_dates)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        placeholders = ', '.join('?' for _ in sla.OPEN_STATUSES)
+        query = f'SELECT id, created_date FROM tickets WHERE status IN ({placeholders}) AND deleted_at IS NULL'
+        if missing_only:
+            query += ' AND sla_due IS NULL'
+        cursor.execute(query, sla.OPEN_STATUSES)
+        
+        tickets = cursor.fetchall()
+        conn.close()
+        
+        return tickets
+    
+    def set_sla_due(self, dues: List[tuple]) -> int:
+        """Записывает сроки: [(id заявки, datetime), ...]"""
+        if not dues:
+            return 0
+        def write(cursor):
+            cursor.executemany('UPDATE tickets SET sla_due = ? WHERE id = ?',
+                               [(due.isoformat(), ticket_id) for ticket_id, due in dues])
+            return len(dues)
+        
+        return self._write(write)
 
     # МЕТОДЫ ДЛЯ УВЕДОМЛЕНИЙ
     def create_notification(self, user_id: int, title: str, message: str, 
                           notification_type: str, related_ticket_id: Optional[int] = None) -> bool:
         """Создает новое уведомление"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self._write(lambda cursor: cursor.execute('''
                 INSERT INTO notifications (user_id, title, message, notification_type, 
                                          created_date, related_ticket_id)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (user_id, title, message, notification_type, 
-                  datetime.now().isoformat(), related_ticket_id))
-            
-            conn.commit()
-            conn.close()
+                  datetime.now().isoformat(), related_ticket_id)))
             return True
         except Exception as e:
-            print(f"Error creating notification: {e}")
+            logger.error("Error creating notification: %s", e)
             return False
 
-    def get_user_notifications(self, user_id: int, unread_only: bool = False) -> List[dict]:
-        """Получает уведомления пользователя"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+    def create_notifications(self, notifications: List[dict]) -> int:
+        """Создает группу уведомлений одной вставкой; возвращает их число (0 при ошибке)"""
+        created_date = datetime.now().isoformat()
+        rows = [(n['user_id'], n['title'], n['message'], n['notification_type'], created_date,
+                 n.get('related_ticket_id')) for n in notifications]
+        try:
+            self._write(lambda cursor: cursor.executemany('''
+                INSERT INTO notifications (user_id, title, message, notification_type, 
+                                         created_date, related_ticket_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows))
+            return len(rows)
+        except Exception as e:
+            logger.error("Error creating notifications: %s", e)
+            return 0
+
+    def get_user_notifications(self, user_id: int, unread_only: bool = False,
+                               limit: Optional[int] = None, before: Optional[int] = None) -> List[dict]:
+        """
+        Получает уведомления пользователя, новые первыми
+
+        Args:
+            limit: Размер страницы (None - все)
+            before: id последнего уведомления предыдущей страницы
+        """
+        conn = self._connect()
         cursor = conn.cursor()
         
         query = '''
@@ -778,13 +1041,21 @@ class Database:
             LEFT JOIN tickets t ON n.related_ticket_id = t.id
             WHERE n.user_id = ?
         '''
+        params = [user_id]
         
         if unread_only:
             query += ' AND n.is_read = FALSE'
+        if before is not None:
+            query += ' AND n.id < ?'
+            params.append(before)
         
-        query += ' ORDER BY n.created_date DESC'
+        # id растет вместе с created_date; порядок дают индексы idx_notifications_user/_unread
+        query += ' ORDER BY n.id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
         
-        cursor.execute(query, (user_id,))
+        cursor.execute(query, params)
         notifications = cursor.fetchall()
         conn.close()
         
@@ -803,40 +1074,28 @@ class Database:
     def mark_notification_as_read(self, notification_id: int) -> bool:
         """Помечает уведомление как прочитанное"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE notifications SET is_read = TRUE WHERE id = ?
-            ''', (notification_id,))
-            
-            conn.commit()
-            conn.close()
+            self._write(lambda cursor: cursor.execute(
+                "UPDATE notifications SET is_read = TRUE WHERE id = ?", (notification_id,)
+            ))
             return True
         except Exception as e:
-            print(f"Error marking notification as read: {e}")
+            logger.error("Error marking notification as read: %s", e)
             return False
 
     def mark_all_notifications_as_read(self, user_id: int) -> bool:
         """Помечает все уведомления пользователя как прочитанные"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE notifications SET is_read = TRUE WHERE user_id = ?
-            ''', (user_id,))
-            
-            conn.commit()
-            conn.close()
+            self._write(lambda cursor: cursor.execute(
+                "UPDATE notifications SET is_read = TRUE WHERE user_id = ?", (user_id,)
+            ))
             return True
         except Exception as e:
-            print(f"Error marking all notifications as read: {e}")
+            logger.error("Error marking all notifications as read: %s", e)
             return False
 
     def get_unread_notifications_count(self, user_id: int) -> int:
         """Получает количество непрочитанных уведомлений"""
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -848,6 +1107,44 @@ class Database:
         conn.close()
         return count
 
+    def _connect(self):
+        """Открывает соединение (с замером запросов, если он включен)"""
+        return connect(config.DATABASE_PATH)
+
+    def _write(self, fn: Callable[[Any], Any]):
+        """
+        Выполняет fn(cursor) в пишущей транзакции и возвращает ее результат
+
+        Через поток записи (sqlite_writer), если SQLITE_WRITER_ENABLED;
+        иначе - в собственном соединении с BEGIN IMMEDIATE. Исключение fn
+        откатывает только ее изменения и передается вызывающему коду.
+        """
+        return self.submit_write(fn).result()
+
+    def submit_write(self, fn: Callable[[Any], Any]) -> Future:
+        """Как _write, но не ждет фиксации: возвращает Future"""
+        if getattr(config, 'SQLITE_WRITER_ENABLED', True):
+            return get_writer(config.DATABASE_PATH).submit(fn)
+        
+        future = Future()
+        conn = connect(config.DATABASE_PATH, timeout=getattr(config, 'SQLITE_BUSY_TIMEOUT', 30),
+                              isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cursor)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            conn.close()
+        return future
+
     def get_connection(self):
         """Возвращает соединение с базой данных (для совместимости)"""
-        return sqlite3.connect(config.DATABASE_PATH)
\ No newline at end of file
+        return self._connect()
\ No newline at end of file
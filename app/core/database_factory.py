@@ -1,12 +1,29 @@
+import logging
 import app.config as config
-from app.core.database import Database
-from app.core.mysql_database import MySQLDatabase
 
-def create_database():
-    """Создает экземпляр базы данных в зависимости от конфигурации"""
+logger = logging.getLogger(__name__)
+
+def create_database(initialize: bool = True):
+    """
+    Создает экземпляр базы данных в зависимости от конфигурации
+
+    Драйвер выбранной базы импортируется только здесь, поэтому при SQLite
+    mysql.connector не загружается. При initialize=False схема не создается:
+    ее нужно подготовить вызовом db.initialize() (например, в фоне).
+    """
     if hasattr(config, 'DATABASE_TYPE') and config.DATABASE_TYPE == "mysql":
-        print("✅ Используется MySQL база данных")
-        return MySQLDatabase()
+        from app.core.mysql_database import MySQLDatabase
+        logger.info("Используется MySQL база данных")
+        return MySQLDatabase(initialize=initialize)
     else:
-        print("⚠️ Используется SQLite база данных")
-        return Database()
\ No newline at end of file
+        from app.core.database import Database
+        logger.info("Используется SQLite база данных")
+        return Database(initialize=initialize)
+
+def create_notification_manager(db):
+    """Создает менеджер уведомлений для базы db"""
+    if db.dialect == 'mysql':
+        from app.core.mysql_notifications import MySQLNotificationManager
+        return MySQLNotificationManager(db)
+    from app.core.sqlite_notifications import SQLiteNotificationManager
+    return SQLiteNotificationManager(db)
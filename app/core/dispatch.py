@@ -0,0 +1,197 @@
+"""
+Автоматическое распределение заявок
+
+Dispatcher держит в памяти кучу мастеров по числу открытых заявок
+(in_progress и waiting_parts). Куча заполняется одним сгруппированным
+запросом (get_master_workloads) и поправляется по событиям шины
+(ticket.assigned, ticket.status_changed); полностью она перечитывается не
+чаще раза в DISPATCH_REFRESH_SECONDS.
+
+Свободные заявки (pending, без мастера и без действующей аренды
+claim_next_ticket) раздаются пачками по DISPATCH_BATCH_SIZE, срочные
+первыми, при равном приоритете - самые старые: каждая - наименее загруженному мастеру, у которого меньше
+DISPATCH_MAX_OPEN_PER_MASTER открытых заявок. Назначение идет с проверкой
+версии строки, поэтому заявку, измененную во время раздачи, распределитель
+пропускает. plan() строит распределение без записи (предпросмотр в панели
+администратора), dispatch() его выполняет.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import app.config as config
+from app.core.telemetry import counter, traced
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('in_progress', 'waiting_parts')
+
+@dataclass
+class Assignment:
+    """Заявка и выбранный для нее мастер"""
+    ticket: dict
+    master_id: int
+    master_name: str
+    load_before: int
+    status: Optional[str] = None  # после dispatch(): статус UpdateResult
+
+class Dispatcher:
+    """Распределитель заявок процесса; общий для всех сеансов (SessionManager)"""
+
+    def __init__(self, db, notification_service=None, bus=None,
+                 max_open: Optional[int] = None, batch_size: Optional[int] = None):
+        self.db = db
+        self.notification_service = notification_service
+        self.max_open = max_open or getattr(config, 'DISPATCH_MAX_OPEN_PER_MASTER', 10)
+        self.batch_size = batch_size or getattr(config, 'DISPATCH_BATCH_SIZE', 50)
+        self._lock = threading.RLock()
+        self._dispatch_lock = threading.Lock()
+        self._loads: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+        # (загрузка, порядковый номер, id мастера); записи с устаревшей загрузкой пропускаются
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._refreshed_at = 0.0
+        # Заявки, которые назначает сам распределитель: их события уже учтены
+        self._own = set()
+        self._thread = None
+        if bus is not None:
+            bus.subscribe('ticket.assigned', self._on_assigned)
+            bus.subscribe('ticket.status_changed', self._on_status_changed)
+
+    def refresh(self):
+        """Перечитывает загрузку мастеров одним запросом"""
+        workloads = self.db.get_master_workloads()
+        with self._lock:
+            self._loads = {w['id']: w['open_tickets'] for w in workloads}
+            self._names = {w['id']: w['full_name'] for w in workloads}
+            self._rebuild()
+            self._refreshed_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        max_age = getattr(config, 'DISPATCH_REFRESH_SECONDS', 300)
+        if not self._refreshed_at or time.monotonic() - self._refreshed_at > max_age:
+            self.refresh()
+
+    def _rebuild(self):
+        self._heap = [(load, next(self._seq), master_id) for master_id, load in self._loads.items()]
+        heapq.heapify(self._heap)
+
+    def _adjust(self, master_id: int, delta: int):
+        with self._lock:
+            if master_id not in self._loads:
+                # Новый мастер появится в куче при следующем refresh
+                return
+            self._loads[master_id] = max(0, self._loads[master_id] + delta)
+            heapq.heappush(self._heap, (self._loads[master_id], next(self._seq), master_id))
+            if len(self._heap) > 4 * len(self._loads) + 16:
+                self._rebuild()
+
+    def _on_assigned(self, ticket_id: int, master_id: int, **_):
+        with self._lock:
+            if ticket_id in self._own:
+                return
+        self._adjust(master_id, 1)
+
+    def _on_status_changed(self, ticket_id: int, old_status: str, new_status: str,
+                           master_id: Optional[int] = None, **_):
+        if not master_id:
+            return
+        was_open, is_open = old_status in OPEN_STATUSES, new_status in OPEN_STATUSES
+        if was_open != is_open:
+            self._adjust(master_id, 1 if is_open else -1)
+
+    def workloads(self) -> List[dict]:
+        """Мастера по возрастанию загрузки"""
+        self._ensure_fresh()
+        with self._lock:
+            return [
+                {'id': master_id, 'full_name': self._names.get(master_id, ''), 'open_tickets': load}
+                for master_id, load in sorted(self._loads.items(), key=lambda item: (item[1], item[0]))
+            ]
+
+    def _queue(self, limit: int) -> List[dict]:
+        """Первые limit свободных заявок; порядок раздачи дает индекс idx_tickets_priority"""
+        return self.db.get_pending_tickets(limit=limit, unclaimed=True)
+
+    def plan(self, limit: Optional[int] = None) -> List[Assignment]:
+        """Распределение следующей пачки без записи в базу"""
+        self._ensure_fresh()
+        tickets = self._queue(limit or self.batch_size)
+        with self._lock:
+            heap = list(self._heap)
+            loads = dict(self._loads)
+            names = dict(self._names)
+
+        plan = []
+        for ticket in tickets:
+            while heap and loads.get(heap[0][2]) != heap[0][0]:
+                heapq.heappop(heap)
+            if not heap or heap[0][0] >= self.max_open:
+                # Все мастера загружены до предела
+                break
+            load, _, master_id = heap[0]
+            heapq.heapreplace(heap, (load + 1, next(self._seq), master_id))
+            loads[master_id] = load + 1
+            plan.append(Assignment(ticket, master_id, names.get(master_id, ''), load))
+        return plan
+
+    @traced('dispatch.run')
+    def dispatch(self, limit: Optional[int] = None) -> List[Assignment]:
+        """
+        Назначает следующую пачку заявок
+
+        Returns:
+            list: Assignment со статусом назначения (ok, conflict, rejected...)
+        """
+        with self._dispatch_lock:
+            plan = self.plan(limit)
+            for item in plan:
+                ticket_id = item.ticket['id']
+                with self._lock:
+                    self._own.add(ticket_id)
+                try:
+                    if self.notification_service:
+                        result = self.db.assign_ticket_to_master_with_notification(
+                            ticket_id, item.master_id, self.notification_service,
+                            expected_version=item.ticket.get('version')
+                        )
+                    else:
+                        result = self.db.assign_ticket_to_master(
+                            ticket_id, item.master_id, expected_version=item.ticket.get('version')
+                        )
+                finally:
+                    with self._lock:
+                        self._own.discard(ticket_id)
+                item.status = result.status
+                if result:
+                    self._adjust(item.master_id, 1)
+                counter('dispatch_assignments_total', result=result.status)
+
+        assigned = sum(1 for item in plan if item.status == 'ok')
+        if plan:
+            logger.info("Распределено заявок: %s из %s", assigned, len(plan))
+        return plan
+
+    def start(self, interval: Optional[float] = None):
+        """Фоновая раздача раз в interval секунд (по умолчанию DISPATCH_INTERVAL; 0 - выключена)"""
+        interval = interval if interval is not None else getattr(config, 'DISPATCH_INTERVAL', 0)
+        with self._lock:
+            if not interval or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                            name='dispatcher', daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.dispatch()
+            except Exception:
+                logger.exception("Ошибка автоматического распределения заявок")
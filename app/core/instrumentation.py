@@ -0,0 +1,372 @@
+"""
+Инструментирование SQL-запросов
+
+Когда config.QUERY_INSTRUMENTATION включен, соединения обеих баз
+возвращают курсоры, которые замеряют каждый execute/executemany и
+считают возвращенные строки. По каждому запросу (текст с плейсхолдерами)
+копится гистограмма задержек, число строк и места вызова. Запросы
+дольше config.SLOW_QUERY_MS пишутся в журнал медленных запросов
+(JSON Lines). При включенной телеметрии (config.TELEMETRY_ENABLED)
+каждый запрос дополнительно записывается спаном db.query. Если выключено
+и то и другое, соединения создаются как обычно и накладных расходов нет.
+"""
+
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import app.config as config
+from app.core.telemetry import telemetry
+
+# Верхние границы корзин гистограммы, мс
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+MAX_CALL_SITES = 10
+MAX_SQL_LENGTH = 500
+
+_WHITESPACE = re.compile(r'\s+')
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(_THIS_FILE)))
+
+def normalize_sql(sql: str) -> str:
+    """Схлопывает пробелы, чтобы одинаковые запросы попадали в одну запись"""
+    return _WHITESPACE.sub(' ', sql).strip()
+
+def _call_site() -> str:
+    """Первый кадр стека вне этого модуля и драйверов баз"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.normcase(os.path.abspath(frame.f_code.co_filename))
+        if filename != _THIS_FILE and 'mysql' + os.sep + 'connector' not in filename:
+            if filename.startswith(_PROJECT_ROOT + os.sep):
+                filename = filename[len(_PROJECT_ROOT) + 1:]
+            return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return '?'
+
+class StatementStats:
+    """Накопленная статистика одного запроса"""
+
+    __slots__ = ('sql', 'calls', 'total_ms', 'min_ms', 'max_ms', 'rows', 'buckets', 'call_sites')
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.min_ms = float('inf')
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.call_sites = Counter()
+
+    def add(self, elapsed_ms: float, call_site: str):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.min_ms = min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for index, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                break
+        if call_site in self.call_sites or len(self.call_sites) < MAX_CALL_SITES:
+            self.call_sites[call_site] += 1
+
+    def percentile(self, percent: float) -> float:
+        """Оценка перцентиля по гистограмме (верхняя граница корзины)"""
+        if not self.calls:
+            return 0.0
+        threshold = self.calls * percent / 100.0
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= threshold:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            'sql': self.sql[:MAX_SQL_LENGTH],
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'min_ms': round(self.min_ms, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'rows': self.rows,
+            'histogram': {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(BUCKETS_MS, self.buckets)
+            },
+            'call_sites': dict(self.call_sites.most_common())
+        }
+
+class QueryRecorder:
+    """Хранилище статистики запросов процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.started_at = datetime.now()
+
+    @property
+    def collecting(self) -> bool:
+        return getattr(config, 'QUERY_INSTRUMENTATION', False)
+
+    @property
+    def enabled(self) -> bool:
+        """Нужно ли оборачивать соединения: сбор статистики или телеметрия"""
+        return self.collecting or telemetry.enabled
+
+    def record(self, sql: str, params, elapsed_ms: float, rows: Optional[int] = None):
+        key = normalize_sql(sql)
+        if telemetry.enabled:
+            operation = key.split(' ', 1)[0].upper()
+            telemetry.record_span('db.query', elapsed_ms, **{
+                'db.operation': operation,
+                'db.statement': key[:MAX_SQL_LENGTH],
+                'db.rows': rows
+            })
+            telemetry.observe('db_query_duration_ms', elapsed_ms, operation=operation)
+        if not self.collecting:
+            return key
+        call_site = _call_site()
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(key)
+            stats.add(elapsed_ms, call_site)
+            if rows is not None and rows > 0:
+                stats.rows += rows
+        if elapsed_ms >= getattr(config, 'SLOW_QUERY_MS', 200):
+            self._log_slow(key, params, elapsed_ms, rows, call_site)
+        return key
+
+    def add_rows(self, key: str, rows: int):
+        if not key or not rows:
+            return
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is not None:
+                stats.rows += rows
+
+    def _log_slow(self, sql: str, params, elapsed_ms: float, rows, call_site: str):
+        path = getattr(config, 'SLOW_QUERY_LOG_PATH', None)
+        if not path:
+            return
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'ms': round(elapsed_ms, 3),
+            'sql': sql[:MAX_SQL_LENGTH],
+            'params': repr(params)[:MAX_SQL_LENGTH] if params is not None else None,
+            'rows': rows,
+            'call_site': call_site
+        }
+        try:
+            with self._lock, open(path, 'a', encoding='utf-8') as fp:
+                fp.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except OSError:
+            pass
+
+    def summary(self, limit: Optional[int] = 20, sort_by: str = 'total_ms') -> dict:
+        """
+        Сводка по запросам
+
+        Args:
+            limit: Сколько запросов вернуть (None - все)
+            sort_by: Поле сортировки (total_ms, calls, max_ms, p95_ms, rows)
+
+        Returns:
+            dict: Время начала сбора, общие итоги и самые тяжелые запросы
+        """
+        with self._lock:
+            statements = [stats.to_dict() for stats in self._stats.values()]
+        statements.sort(key=lambda item: item.get(sort_by, 0), reverse=True)
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'statements': len(statements),
+            'calls': sum(item['calls'] for item in statements),
+            'total_ms': round(sum(item['total_ms'] for item in statements), 3),
+            'top': statements[:limit] if limit else statements
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = datetime.now()
+
+    def dump(self, path: Optional[str] = None):
+        """Сохраняет полную сводку в JSON (для manage.py query-stats)"""
+        path = path or getattr(config, 'QUERY_STATS_PATH', None)
+        if not path or not self._stats:
+            return
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump(self.summary(limit=None), fp, ensure_ascii=False, indent=2)
+
+recorder = QueryRecorder()
+
+def summary(limit: Optional[int] = 20, sort_by: str = 'total_ms') -> dict:
+    return recorder.summary(limit, sort_by)
+
+def format_summary(data: dict, width: int = 80) -> str:
+    """Текстовая таблица для вывода в консоль"""
+    lines = [
+        f"Запросов: {data['statements']}, вызовов: {data['calls']}, "
+        f"всего {data['total_ms']:.1f} мс (с {data['started_at']})",
+        f"{'вызовов':>8} {'всего мс':>10} {'сред мс':>8} {'p95 мс':>8} {'макс мс':>8} {'строк':>8}  запрос"
+    ]
+    for item in data['top']:
+        sql = item['sql'] if len(item['sql']) <= width else item['sql'][:width - 3] + '...'
+        lines.append(
+            f"{item['calls']:>8} {item['total_ms']:>10.1f} {item['mean_ms']:>8.2f} "
+            f"{item['p95_ms']:>8.2f} {item['max_ms']:>8.2f} {item['rows']:>8}  {sql}"
+        )
+        for call_site, count in list(item['call_sites'].items())[:3]:
+            lines.append(f"{'':>46}  ↳ {call_site} ({count})")
+    return '\n'.join(lines)
+
+# SQLite
+
+class InstrumentedSQLiteCursor(sqlite3.Cursor):
+    _query_key = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self._query_key = recorder.record(sql, parameters, elapsed,
+                                              self.rowcount if self.rowcount >= 0 else None)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self._query_key = recorder.record(sql, None, elapsed,
+                                              self.rowcount if self.rowcount >= 0 else None)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            recorder.add_rows(self._query_key, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        recorder.add_rows(self._query_key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        recorder.add_rows(self._query_key, len(rows))
+        return rows
+
+class InstrumentedSQLiteConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedSQLiteCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connect_sqlite(path: str, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect с замером запросов, если инструментирование включено"""
+    if recorder.enabled:
+        kwargs.setdefault('factory', InstrumentedSQLiteConnection)
+    return sqlite3.connect(path, **kwargs)
+
+# MySQL
+
+class InstrumentedMySQLCursor:
+    """Обертка над курсором mysql.connector"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._query_key = None
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            rowcount = getattr(self._cursor, 'rowcount', -1)
+            self._query_key = recorder.record(operation, params, elapsed,
+                                              rowcount if rowcount is not None and rowcount >= 0 else None)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            rowcount = getattr(self._cursor, 'rowcount', -1)
+            self._query_key = recorder.record(operation, None, elapsed,
+                                              rowcount if rowcount is not None and rowcount >= 0 else None)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            recorder.add_rows(self._query_key, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        recorder.add_rows(self._query_key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        recorder.add_rows(self._query_key, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedMySQLConnection:
+    """Обертка над соединением mysql.connector, выдающая замеряемые курсоры"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedMySQLCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+def wrap_mysql(connection):
+    """Оборачивает соединение MySQL, если инструментирование включено"""
+    if recorder.enabled:
+        return InstrumentedMySQLConnection(connection)
+    return connection
+
+@atexit.register
+def _dump_on_exit():
+    if recorder.collecting:
+        try:
+            recorder.dump()
+        except OSError:
+            pass
@@ -4,7 +4,19 @@
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
+
+# Приоритет заявки (tickets.priority): больше - срочнее
+PRIORITY_LOW = 1
+PRIORITY_NORMAL = 2
+PRIORITY_HIGH = 3
+PRIORITY_CRITICAL = 4
+PRIORITY_NAMES = {
+    PRIORITY_LOW: 'Низкий',
+    PRIORITY_NORMAL: 'Обычный',
+    PRIORITY_HIGH: 'Высокий',
+    PRIORITY_CRITICAL: 'Критический'
+}
 
 @dataclass
 class User:
@@ -30,6 +42,8 @@ class Ticket:
     assigned_master_id: Optional[int] = None
     client_name: Optional[str] = None
     master_name: Optional[str] = None
+    version: int = 1
+    priority: int = PRIORITY_NORMAL
 
 @dataclass
 class Comment:
@@ -53,4 +67,51 @@ class Notification:
     is_read: bool
     created_date: datetime
     related_ticket_id: Optional[int] = None
-    ticket_number: Optional[str] = None
\ No newline at end of file
+    ticket_number: Optional[str] = None
+
+@dataclass
+class UpdateResult:
+    """
+    Результат изменения заявки с проверкой версии строки
+
+    status: ok; conflict - заявку уже изменили (ticket - ее актуальное
+    состояние); not_found; rejected - нет прав или заявка не в нужном
+    статусе; error. В условии истинен только ok, поэтому вызовы вида
+    `if db.update_ticket(...)` работают как раньше.
+    """
+    status: str
+    version: Optional[int] = None
+    ticket: Optional[dict] = None
+
+    OK = 'ok'
+    CONFLICT = 'conflict'
+    NOT_FOUND = 'not_found'
+    REJECTED = 'rejected'
+    ERROR = 'error'
+
+    def __bool__(self) -> bool:
+        return self.status == self.OK
+
+    @property
+    def conflict(self) -> bool:
+        return self.status == self.CONFLICT
+
+    @classmethod
+    def resolve(cls, updated: int, version: Optional[int], expected_version: Optional[int],
+                load_ticket: Callable[[], Optional[dict]]) -> 'UpdateResult':
+        """
+        Разбирает итог UPDATE ... AND version = expected_version
+
+        Args:
+            updated: Число измененных строк
+            version: Версия заявки после запроса (None - заявки нет)
+            expected_version: Версия, которую видел пользователь
+            load_ticket: Загружает актуальную заявку для конфликта
+        """
+        if updated:
+            return cls(cls.OK, version)
+        if version is None:
+            return cls(cls.NOT_FOUND)
+        if expected_version is not None and version != expected_version:
+            return cls(cls.CONFLICT, version, load_ticket())
+        return cls(cls.REJECTED, version)
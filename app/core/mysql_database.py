@@ -1,27 +1,108 @@
+import logging
 import mysql.connector
-from datetime import datetime
-from typing import List, Optional
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 import app.config as config
+from app.core import bootstrap, credentials, sla
+from app.core.models import UpdateResult
+from app.core.instrumentation import wrap_mysql
+from app.core.ticket_numbers import TicketNumberGenerator, SEQUENCE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Поля заявок, которые возвращают массовые операции (для уведомлений и событий)
+BULK_COLUMNS = ('id', 'old_status', 'client_id', 'assigned_master_id', 'ticket_number', 'title', 'client_name')
+BULK_SELECT = '''
+    SELECT t.id, t.status, t.client_id, t.assigned_master_id, t.ticket_number, t.title, u.full_name
+    FROM tickets t
+    LEFT JOIN users u ON t.client_id = u.id
+'''
+# Размер списка IN (...) в одном запросе
+BULK_CHUNK_SIZE = 500
+
+def _chunks(ids: List[int], size: int = BULK_CHUNK_SIZE):
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
 
 class MySQLDatabase:
-    def __init__(self):
-        self.connection = None
-        self.init_db()
+    dialect = 'mysql'
+
+    def __init__(self, initialize: bool = True):
+        # Соединение на поток: экземпляр общий для всех сеансов процесса (app/core/sessions.py)
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        self.ticket_numbers = TicketNumberGenerator(self)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        if initialize:
+            self.initialize()
+
+    def initialize(self):
+        """Проверяет версию схемы при первом вызове; параллельные вызовы ждут его завершения"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                bootstrap.ensure_schema(self)
+                self._initialized = True
     
     def get_connection(self):
-        """Создает соединение с MySQL"""
-        if self.connection is None or not self.connection.is_connected():
-            self.connection = mysql.connector.connect(
-                host=config.MYSQL_HOST,
-                user=config.MYSQL_USER,
-                password=config.MYSQL_PASSWORD,
-                database=config.MYSQL_DATABASE,
-                port=config.MYSQL_PORT
-            )
-        return self.connection
+        """Соединение с MySQL текущего потока; создается при первом обращении или после обрыва"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None and conn.is_connected():
+            return conn
+        if conn is not None:
+            self._forget(threading.current_thread())
+        
+        raw = mysql.connector.connect(
+            host=config.MYSQL_HOST,
+            user=config.MYSQL_USER,
+            password=config.MYSQL_PASSWORD,
+            database=config.MYSQL_DATABASE,
+            port=config.MYSQL_PORT
+        )
+        # Соединения долгоживущие и не закрывают транзакцию после чтения:
+        # при REPEATABLE READ они видели бы старый снимок данных других сеансов
+        cursor = raw.cursor()
+        cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        cursor.close()
+        
+        conn = wrap_mysql(raw)
+        self._local.connection = conn
+        with self._connections_lock:
+            self._connections[threading.current_thread()] = conn
+            # Соединения завершившихся потоков больше никто не использует
+            finished = [thread for thread in self._connections if not thread.is_alive()]
+        for thread in finished:
+            self._forget(thread)
+        return conn
+    
+    def _forget(self, thread):
+        with self._connections_lock:
+            conn = self._connections.pop(thread, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    @property
+    def open_connections(self) -> int:
+        with self._connections_lock:
+            return len(self._connections)
+    
+    def close(self):
+        """Закрывает соединения всех потоков"""
+        with self._connections_lock:
+            threads = list(self._connections)
+        for thread in threads:
+            self._forget(thread)
     
     def init_db(self):
-        """Инициализирует базу данных и создает таблицы"""
+        """Базовая схема (версия 1); вызывается из bootstrap только при миграции"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -30,7 +111,7 @@ class MySQLDatabase:
             CREATE TABLE IF NOT EXISTS users (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
+                password VARCHAR(255) NOT NULL,
                 full_name VARCHAR(100) NOT NULL,
                 role VARCHAR(20) NOT NULL,
                 email VARCHAR(100),
@@ -81,13 +162,24 @@ class MySQLDatabase:
             )
         ''')
         
-        # Тестовые данные
-        self._create_test_data(cursor)
+        # Последовательность номеров заявок
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_sequence (
+                name VARCHAR(50) PRIMARY KEY,
+                next_value BIGINT NOT NULL
+            )
+        ''')
+        
+        # Начинаем последовательность после уже существующих заявок
+        cursor.execute('''
+            INSERT IGNORE INTO ticket_sequence (name, next_value)
+            SELECT %s, COALESCE(MAX(id), 0) + 1 FROM tickets
+        ''', (SEQUENCE_NAME,))
         
         conn.commit()
     
     def _create_test_data(self, cursor):
-        """Создает тестовые данные"""
+        """Демо-данные для пустой базы (bootstrap.seed_demo_data)"""
         # Проверяем есть ли пользователи
         cursor.execute("SELECT COUNT(*) FROM users")
         if cursor.fetchone()[0] == 0:
@@ -100,34 +192,47 @@ class MySQLDatabase:
             ]
             cursor.executemany(
                 "INSERT INTO users (username, password, full_name, role, email, phone) VALUES (%s, %s, %s, %s, %s, %s)",
-                users
+                [(username, credentials.hash_password(password), *rest) for username, password, *rest in users]
             )
         
         cursor.execute("SELECT COUNT(*) FROM tickets")
         if cursor.fetchone()[0] == 0:
+            created = datetime.now()
+            due = sla.due_date(created)
             tickets = [
-                ('T001', 'Ремонт принтера', 'Не печатает черным цветом', 'pending', datetime.now(), 5, None),
-                ('T002', 'Неисправность станка', 'Станок издает странные звуки', 'in_progress', datetime.now(), 5, 3),
-                ('T003', 'Настройка компьютера', 'Медленно работает', 'completed', datetime.now(), 5, 3),
-                ('T004', 'Замена картриджа', 'Требуется замена картриджа', 'pending', datetime.now(), 5, None)
+                ('T001', 'Ремонт принтера', 'Не печатает черным цветом', 'pending', created, 5, None, due),
+                ('T002', 'Неисправность станка', 'Станок издает странные звуки', 'in_progress', created, 5, 3, due),
+                ('T003', 'Настройка компьютера', 'Медленно работает', 'completed', created, 5, 3, None),
+                ('T004', 'Замена картриджа', 'Требуется замена картриджа', 'pending', created, 5, None, due)
             ]
             cursor.executemany(
-                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id, assigned_master_id) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id, assigned_master_id, sla_due) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
                 tickets
             )
     
-    def get_all_tickets(self) -> List[dict]:
-        """Получает все заявки"""
+    def get_all_tickets(self, created_since: Optional[datetime] = None) -> List[dict]:
+        """
+        Получает все заявки, новые первыми
+
+        Args:
+            created_since: Только созданные не раньше (диапазон по индексу created_date)
+        """
         conn = self.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute('''
-            SELECT t.*, u.full_name as client_name, m.full_name as master_name
+        query = '''
+            SELECT t.*, u.full_name as client_name, u.phone as client_phone, u.email as client_email,
+                   m.full_name as master_name
             FROM tickets t
             LEFT JOIN users u ON t.client_id = u.id
             LEFT JOIN users m ON t.assigned_master_id = m.id
-            ORDER BY t.created_date DESC
-        ''')
+            WHERE t.deleted_at IS NULL
+        '''
+        params = []
+        if created_since is not None:
+            query += ' AND t.created_date >= %s'
+            params.append(created_since)
+        cursor.execute(query + ' ORDER BY t.created_date DESC', params)
         
         tickets = cursor.fetchall()
         
@@ -144,12 +249,13 @@ class MySQLDatabase:
         cursor = conn.cursor(dictionary=True)
         
         cursor.execute('''
-            SELECT t.*, u.full_name as client_name, m.full_name as master_name
+            SELECT t.*, u.full_name as client_name, u.phone as client_phone, u.email as client_email,
+                   m.full_name as master_name
             FROM tickets t
             LEFT JOIN users u ON t.client_id = u.id
             LEFT JOIN users m ON t.assigned_master_id = m.id
-            WHERE t.assigned_master_id = %s
-            ORDER BY t.created_date DESC
+            WHERE t.assigned_master_id = %s AND t.deleted_at IS NULL
+            ORDER BY t.priority DESC, t.created_date
         ''', (master_id,))
         
         tickets = cursor.fetchall()
@@ -160,19 +266,41 @@ class MySQLDatabase:
         
         return tickets
     
-    def get_pending_tickets(self) -> List[dict]:
-        """Получает заявки со статусом pending и без назначенного мастера"""
+    def get_pending_tickets(self, master_id: Optional[int] = None, limit: Optional[int] = None,
+                            unclaimed: bool = False) -> List[dict]:
+        """
+        Получает заявки со статусом pending и без назначенного мастера,
+        срочные первыми, при равном приоритете - старые (индекс idx_tickets_priority)
+
+        Args:
+            master_id: Скрыть заявки, закрепленные за другими мастерами (claim_next_ticket)
+            limit: Только первые limit заявок очереди
+            unclaimed: Скрыть все заявки с действующей арендой (раздача распределителем)
+        """
         conn = self.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute('''
-            SELECT t.*, u.full_name as client_name, m.full_name as master_name
+        query = '''
+            SELECT t.*, u.full_name as client_name, u.phone as client_phone, u.email as client_email,
+                   m.full_name as master_name
             FROM tickets t
             LEFT JOIN users u ON t.client_id = u.id
             LEFT JOIN users m ON t.assigned_master_id = m.id
-            WHERE t.status = 'pending' AND t.assigned_master_id IS NULL
-            ORDER BY t.created_date DESC
-        ''')
+            WHERE t.status = 'pending' AND t.assigned_master_id IS NULL AND t.deleted_at IS NULL
+        '''
+        params = []
+        if master_id is not None:
+            query += " AND (t.claimed_by IS NULL OR t.claimed_by = %s OR t.claim_expires <= %s)"
+            params += [master_id, datetime.now()]
+        elif unclaimed:
+            query += " AND (t.claimed_by IS NULL OR t.claim_expires <= %s)"
+            params.append(datetime.now())
+        
+        query += " ORDER BY t.priority DESC, t.created_date, t.id"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        cursor.execute(query, params)
         
         tickets = cursor.fetchall()
         
@@ -182,69 +310,100 @@ class MySQLDatabase:
         
         return tickets
     
-    def assign_ticket_to_master(self, ticket_id: int, master_id: int) -> bool:
+    def assign_ticket_to_master(self, ticket_id: int, master_id: int,
+                                expected_version: Optional[int] = None) -> UpdateResult:
         """Назначает заявку мастеру и меняет статус на in_progress"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE tickets 
-                SET assigned_master_id = %s, status = 'in_progress' 
-                WHERE id = %s AND status = 'pending'
-            ''', (master_id, ticket_id))
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            
-            print(f"🔧 DEBUG: Назначение заявки {ticket_id} мастеру {master_id}")
-            print(f"🔧 DEBUG: Затронуто строк: {affected_rows}")
-            
-            return affected_rows > 0
+            # Назначение снимает аренду заявки, если она была
+            result = self._update_ticket_row(
+                ticket_id, "assigned_master_id = %s, status = 'in_progress', claimed_by = NULL, claim_expires = NULL",
+                (master_id,), " AND status = 'pending'", (), expected_version
+            )
+            logger.debug("Назначение заявки %s мастеру %s: %s", ticket_id, master_id, result.status)
+            return result
             
         except Exception as e:
-            print(f"❌ Error assigning ticket to master: {e}")
-            return False
+            logger.error("Error assigning ticket to master: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+
+    def get_master_workloads(self) -> List[dict]:
+        """Мастера и число их открытых заявок (in_progress, waiting_parts) одним запросом"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT u.id, u.full_name, COUNT(t.id)
+            FROM users u
+            LEFT JOIN tickets t ON t.assigned_master_id = u.id
+                AND t.status IN ('in_progress', 'waiting_parts') AND t.deleted_at IS NULL
+            WHERE u.role = 'master'
+            GROUP BY u.id, u.full_name
+        ''')
+        rows = cursor.fetchall()
+        
+        return [{'id': r[0], 'full_name': r[1], 'open_tickets': r[2]} for r in rows]
 
     def get_user_by_credentials(self, username: str, password: str) -> Optional[dict]:
-        """Проверяет учетные данные пользователя"""
+        """Проверяет учетные данные пользователя; устаревший хеш или открытый текст заменяется новым хешем"""
         conn = self.get_connection()
         cursor = conn.cursor(dictionary=True)
         
         cursor.execute(
-            "SELECT id, username, full_name, role, email, phone FROM users WHERE username = %s AND password = %s",
-            (username, password)
+            "SELECT id, username, full_name, role, email, phone, password FROM users WHERE username = %s",
+            (username,)
         )
         user = cursor.fetchone()
         
+        if not user:
+            return None
+        
+        stored = user.pop('password')
+        ok, new_hash = credentials.check_password(password, stored)
+        if not ok:
+            return None
+        if new_hash:
+            self._update_password_hash(user['id'], stored, new_hash)
+        
         return user
     
+    def _update_password_hash(self, user_id: int, old_value: str, new_hash: str):
+        """Сохраняет новый хеш, если пароль не успели сменить параллельно"""
+        try:
+            self._transaction(lambda cursor: cursor.execute(
+                "UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                (new_hash, user_id, old_value)
+            ))
+        except Exception as e:
+            logger.error("Error updating password hash: %s", e)
+    
     def create_user(self, username: str, password: str, full_name: str, email: str, phone: str) -> bool:
         """Создает нового пользователя (клиента)"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
+        ticket_number = self.ticket_numbers.next_number()
+        password_hash = credentials.hash_password(password)
+        
+        def write(cursor):
             cursor.execute(
                 "INSERT INTO users (username, password, full_name, role, email, phone) VALUES (%s, %s, %s, 'client', %s, %s)",
-                (username, password, full_name, email, phone)
+                (username, password_hash, full_name, email, phone)
             )
             
             user_id = cursor.lastrowid
             
             # Создаем тестовую заявку для нового пользователя
-            ticket_number = f"T{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            created = datetime.now()
             cursor.execute(
-                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id) VALUES (%s, %s, %s, %s, %s, %s)",
-                (ticket_number, 'Первая заявка', 'Это ваша первая тестовая заявка', 'pending', datetime.now(), user_id)
+                "INSERT INTO tickets (ticket_number, title, description, status, created_date, client_id, sla_due) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                (ticket_number, 'Первая заявка', 'Это ваша первая тестовая заявка', 'pending', created, user_id,
+                 sla.due_date(created))
             )
-            
-            conn.commit()
+        
+        try:
+            # Пользователь и его заявка - одна транзакция: при ошибке не остается ни того, ни другого
+            self._transaction(write)
             return True
         except mysql.connector.IntegrityError:
             return False
         except Exception as e:
-            print(f"Error creating user: {e}")
+            logger.error("Error creating user: %s", e)
             return False
     
     def get_tickets_by_client(self, client_id: int) -> List[dict]:
@@ -252,11 +411,12 @@ class MySQLDatabase:
         cursor = conn.cursor(dictionary=True)
         
         cursor.execute('''
-            SELECT t.*, u.full_name as client_name, m.full_name as master_name
+            SELECT t.*, u.full_name as client_name, u.phone as client_phone, u.email as client_email,
+                   m.full_name as master_name
             FROM tickets t
             LEFT JOIN users u ON t.client_id = u.id
             LEFT JOIN users m ON t.assigned_master_id = m.id
-            WHERE t.client_id = %s
+            WHERE t.client_id = %s AND t.deleted_at IS NULL
             ORDER BY t.created_date DESC
         ''', (client_id,))
         
@@ -278,186 +438,386 @@ class MySQLDatabase:
         
         return masters
     
-    def update_ticket_status(self, ticket_id: int, status: str) -> bool:
+    def get_users_by_ids(self, user_ids: List[int]) -> Dict[int, dict]:
+        """Пользователи (без пароля) по списку id одним запросом на BULK_CHUNK_SIZE id"""
+        users = {}
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        for chunk in _chunks(user_ids):
+            placeholders = ', '.join('%s' for _ in chunk)
+            cursor.execute(f"SELECT id, username, full_name, role, email, phone FROM users WHERE id IN ({placeholders})",
+                           chunk)
+            for user in cursor.fetchall():
+                users[user['id']] = user
+        
+        return users
+    
+    def update_ticket_status(self, ticket_id: int, status: str,
+                             expected_version: Optional[int] = None) -> UpdateResult:
         """Обновляет статус заявки с проверкой назначения мастера"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Сначала проверим есть ли назначенный мастер
-            cursor.execute('''
-                SELECT assigned_master_id FROM tickets WHERE id = %s
-            ''', (ticket_id,))
-            result = cursor.fetchone()
+            conditions = ''
+            if status in ['in_progress', 'completed']:
+                # Статусы 'в работе' и 'выполнено' требуют назначенного мастера
+                conditions = " AND assigned_master_id IS NOT NULL"
             
-            if not result:
-                print("❌ Заявка не найдена")
-                return False
-                
-            assigned_master_id = result[0]
-            
-            # Проверяем: если пытаемся поставить in_progress или completed без мастера
-            if status in ['in_progress', 'completed'] and not assigned_master_id:
-                print("❌ Нельзя изменить статус без назначенного мастера")
-                return False
+            result = self._update_ticket_row(ticket_id, "status = %s", (status,),
+                                             conditions, (), expected_version)
+            if result.status == UpdateResult.REJECTED:
+                logger.warning("Нельзя изменить статус без назначенного мастера")
+            return result
             
-            # Если проверка пройдена - обновляем статус
+        except Exception as e:
+            logger.error("Error updating ticket status: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+    
+    def update_ticket_priority(self, ticket_id: int, priority: int,
+                               expected_version: Optional[int] = None) -> UpdateResult:
+        """Задает приоритет заявки вручную"""
+        try:
+            return self._update_ticket_row(ticket_id, "priority = %s", (priority,),
+                                           expected_version=expected_version)
+        except Exception as e:
+            logger.error("Error updating ticket priority: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+    
+    def raise_priority(self, priority: int, due_before: datetime) -> int:
+        """
+        Повышает до priority приоритет открытых заявок со сроком раньше due_before
+
+        Версия строки не меняется: повышение по сроку не должно вызывать
+        конфликт у пользователя, который в это время редактирует заявку.
+
+        Returns:
+            int: Сколько заявок изменено
+        """
+        placeholders = ', '.join('%s' for _ in sla.OPEN_STATUSES)
+        def write(cursor):
+            cursor.execute(f'''
+                UPDATE tickets SET priority = %s
+                WHERE status IN ({placeholders}) AND sla_due < %s AND priority < %s AND deleted_at IS NULL
+            ''', (priority, *sla.OPEN_STATUSES, due_before, priority))
+            return cursor.rowcount
+        
+        return self._transaction(write)
+    
+    def delete_ticket(self, ticket_id: int, user_id: int, user_role: str) -> bool:
+        """
+        Удаляет заявку с проверкой прав
+
+        Заявка только помечается удаленной (deleted_at) и сразу пропадает
+        из выборок; строку вместе с комментариями и уведомлениями позже
+        удаляет фоновая очистка (app/core/purge.py).
+        """
+        # Проверяем права на удаление
+        if user_role == 'admin':
+            # Админ может удалить любую заявку
+            conditions, condition_values = '', ()
+        elif user_role == 'client':
+            # Клиент может удалить только свои заявки
+            conditions, condition_values = " AND client_id = %s", (user_id,)
+        else:
+            return False
+        
+        def write(cursor):
             cursor.execute(
-                "UPDATE tickets SET status = %s WHERE id = %s",
-                (status, ticket_id)
+                f"UPDATE tickets SET deleted_at = %s, version = version + 1 "
+                f"WHERE id = %s AND deleted_at IS NULL{conditions}",
+                (datetime.now(), ticket_id, *condition_values)
             )
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            return affected_rows > 0
-            
+            return cursor.rowcount
+        
+        try:
+            return self._transaction(write) > 0
         except Exception as e:
-            print(f"Error updating ticket status: {e}")
+            logger.error("Error deleting ticket: %s", e)
             return False
     
-    def delete_ticket(self, ticket_id: int, user_id: int, user_role: str) -> bool:
-        """Удаляет заявку с проверкой прав и каскадным удалением"""
+    # МАССОВЫЕ ОПЕРАЦИИ (панель администратора)
+    def bulk_update_status(self, ticket_ids: List[int], status: str) -> List[dict]:
+        """
+        Меняет статус группы заявок одной транзакцией
+
+        Заявки, у которых статус уже такой, и заявки без мастера для
+        статусов in_progress/completed пропускаются.
+
+        Returns:
+            list: Измененные заявки (BULK_COLUMNS, old_status - прежний статус)
+        """
+        condition = " AND t.assigned_master_id IS NOT NULL" if status in ['in_progress', 'completed'] else ""
+        
+        def write(cursor):
+            changed = []
+            for chunk in _chunks(ticket_ids):
+                marks = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"{BULK_SELECT} WHERE t.id IN ({marks}) AND t.status <> %s AND t.deleted_at IS NULL"
+                               f"{condition} FOR UPDATE",
+                               [*chunk, status])
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                ids = [row[0] for row in rows]
+                cursor.execute(
+                    f"UPDATE tickets SET status = %s, version = version + 1 WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                    [status, *ids]
+                )
+                changed += [dict(zip(BULK_COLUMNS, row)) for row in rows]
+            return changed
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Проверяем права на удаление
-            if user_role == 'admin':
-                # Админ может удалить любую заявку - сначала удаляем связанные данные
-                cursor.execute("DELETE FROM notifications WHERE related_ticket_id = %s", (ticket_id,))
-                cursor.execute("DELETE FROM comments WHERE ticket_id = %s", (ticket_id,))
-                cursor.execute("DELETE FROM tickets WHERE id = %s", (ticket_id,))
-                
-            elif user_role == 'client':
-                # Клиент может удалить только свои заявки - проверяем владельца
-                cursor.execute("SELECT client_id FROM tickets WHERE id = %s", (ticket_id,))
-                result = cursor.fetchone()
-                
-                if result and result[0] == user_id:
-                    # Удаляем связанные данные и заявку
-                    cursor.execute("DELETE FROM notifications WHERE related_ticket_id = %s", (ticket_id,))
-                    cursor.execute("DELETE FROM comments WHERE ticket_id = %s", (ticket_id,))
-                    cursor.execute("DELETE FROM tickets WHERE id = %s", (ticket_id,))
-                else:
-                    conn.close()
-                    return False
-            else:
-                conn.close()
-                return False
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            return affected_rows > 0
-            
+            return self._transaction(write)
         except Exception as e:
-            print(f"Error deleting ticket: {e}")
-            return False
+            logger.error("Error updating ticket statuses: %s", e)
+            return []
+
+    def bulk_update_status_with_notification(self, ticket_ids: List[int], status: str, notification_service) -> List[dict]:
+        """Меняет статус группы заявок; уведомления клиентам - одной вставкой"""
+        changed = self.bulk_update_status(ticket_ids, status)
+        if changed:
+            notification_service.notify_status_changes(changed, status)
+        return changed
+
+    def bulk_assign(self, ticket_ids: List[int], master_id: int) -> List[dict]:
+        """
+        Назначает мастеру группу заявок в статусе pending одной транзакцией
+
+        Returns:
+            list: Назначенные заявки (BULK_COLUMNS и master_name)
+        """
+        def write(cursor):
+            cursor.execute("SELECT full_name FROM users WHERE id = %s AND role = 'master'", (master_id,))
+            master = cursor.fetchone()
+            if not master:
+                return []
+            changed = []
+            for chunk in _chunks(ticket_ids):
+                marks = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"{BULK_SELECT} WHERE t.id IN ({marks}) AND t.status = 'pending' AND t.deleted_at IS NULL "
+                               f"FOR UPDATE", chunk)
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                ids = [row[0] for row in rows]
+                cursor.execute(f'''
+                    UPDATE tickets
+                    SET assigned_master_id = %s, status = 'in_progress', claimed_by = NULL, claim_expires = NULL,
+                        version = version + 1
+                    WHERE id IN ({', '.join(['%s'] * len(ids))})
+                ''', [master_id, *ids])
+                changed += [dict(zip(BULK_COLUMNS, row), master_name=master[0]) for row in rows]
+            return changed
+        
+        try:
+            return self._transaction(write)
+        except Exception as e:
+            logger.error("Error assigning tickets to master: %s", e)
+            return []
+
+    def bulk_assign_with_notification(self, ticket_ids: List[int], master_id: int, notification_service) -> List[dict]:
+        """Назначает группу заявок; уведомления мастеру и клиентам - одной вставкой"""
+        changed = self.bulk_assign(ticket_ids, master_id)
+        if changed:
+            notification_service.notify_assignments(changed, master_id)
+        return changed
+
+    def bulk_delete(self, ticket_ids: List[int], user_id: int, user_role: str) -> int:
+        """Помечает удаленными группу заявок (только администратор), как delete_ticket"""
+        if user_role != 'admin' or not ticket_ids:
+            return 0
+        
+        def write(cursor):
+            deleted = 0
+            deleted_at = datetime.now()
+            for chunk in _chunks(ticket_ids):
+                marks = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"UPDATE tickets SET deleted_at = %s, version = version + 1 "
+                    f"WHERE id IN ({marks}) AND deleted_at IS NULL",
+                    [deleted_at, *chunk]
+                )
+                deleted += cursor.rowcount
+            return deleted
+        
+        try:
+            return self._transaction(write)
+        except Exception as e:
+            logger.error("Error deleting tickets: %s", e)
+            return 0
     
     def create_ticket(self, title: str, description: str, client_id: int) -> bool:
         """Создает новую заявку"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            ticket_number = f"T{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            cursor.execute('''
-                INSERT INTO tickets (ticket_number, title, description, created_date, client_id)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (ticket_number, title, description, datetime.now(), client_id))
-            
-            conn.commit()
+            self._insert_ticket(title, description, client_id)
             return True
         except Exception as e:
-            print(f"Error creating ticket: {e}")
+            logger.error("Error creating ticket: %s", e)
             return False
 
-    def update_ticket_status_with_notification(self, ticket_id: int, new_status: str, notification_service) -> bool:
+    def _insert_ticket(self, title: str, description: str, client_id: int) -> int:
+        """Вставляет заявку в отдельной транзакции и возвращает ее id"""
+        ticket_number = self.ticket_numbers.next_number()
+        created = datetime.now()
+        
+        def write(cursor):
+            cursor.execute('''
+                INSERT INTO tickets (ticket_number, title, description, created_date, client_id, sla_due)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', (ticket_number, title, description, created, client_id, sla.due_date(created)))
+            return cursor.lastrowid
+        
+        return self._transaction(write)
+
+    def update_ticket_status_with_notification(self, ticket_id: int, new_status: str, notification_service,
+                                               expected_version: Optional[int] = None) -> UpdateResult:
         """Обновляет статус заявки с отправкой уведомления и проверкой мастера"""
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Получаем текущий статус и назначенного мастера
-            cursor.execute('SELECT status, assigned_master_id FROM tickets WHERE id = %s', (ticket_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return False
-            
-            old_status, assigned_master_id = result
-            
-            # Проверяем назначение мастера для определенных статусов
-            if new_status in ['in_progress', 'completed'] and not assigned_master_id:
-                print("❌ Нельзя установить статус 'в работе' или 'выполнено' без назначенного мастера")
-                return False
-            
-            # Обновляем статус
-            cursor.execute(
-                "UPDATE tickets SET status = %s WHERE id = %s",
-                (new_status, ticket_id)
-            )
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
+            # Без expected_version запись опирается на прочитанную версию и
+            # при параллельном изменении повторяется с новым прежним статусом
+            for _ in range(3):
+                cursor.execute('SELECT status, assigned_master_id, version FROM tickets '
+                               'WHERE id = %s AND deleted_at IS NULL', (ticket_id,))
+                result = cursor.fetchone()
+                conn.commit()
+                
+                if not result:
+                    return UpdateResult(UpdateResult.NOT_FOUND)
+                
+                old_status, assigned_master_id, version = result
+                
+                # Проверяем назначение мастера для определенных статусов
+                if new_status in ['in_progress', 'completed'] and not assigned_master_id:
+                    logger.warning("Нельзя установить статус 'в работе' или 'выполнено' без назначенного мастера")
+                    return UpdateResult(UpdateResult.REJECTED, version)
+                
+                update = self._update_ticket_row(
+                    ticket_id, "status = %s", (new_status,),
+                    expected_version=version if expected_version is None else expected_version
+                )
+                if update or expected_version is not None or not update.conflict:
+                    break
             
-            if affected_rows > 0 and old_status != new_status:
+            if update and old_status != new_status:
                 # Отправляем уведомление об изменении статуса
                 notification_service.notify_ticket_status_change(ticket_id, old_status, new_status)
             
-            return affected_rows > 0
+            return update
             
         except Exception as e:
-            print(f"Error updating ticket status: {e}")
-            return False
+            conn.rollback()
+            logger.error("Error updating ticket status: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
 
-    def assign_ticket_to_master_with_notification(self, ticket_id: int, master_id: int, notification_service) -> bool:
+    def assign_ticket_to_master_with_notification(self, ticket_id: int, master_id: int, notification_service,
+                                                  expected_version: Optional[int] = None) -> UpdateResult:
         """Назначает заявку мастеру с отправкой уведомлений"""
+        result = self.assign_ticket_to_master(ticket_id, master_id, expected_version)
+        
+        if result:
+            try:
+                # Отправляем уведомления
+                notification_service.notify_master_assigned(ticket_id, master_id)
+                notification_service.notify_client_about_master(ticket_id, master_id)
+            except Exception as e:
+                logger.error("Error notifying about assignment: %s", e)
+        
+        return result
+
+    def claim_next_ticket(self, master_id: int, lease_seconds: Optional[int] = None) -> Optional[dict]:
+        """
+        Закрепляет за мастером самую срочную свободную заявку (при равном приоритете - самую старую)
+
+        Заявка остается pending и скрыта от других мастеров, пока не
+        истечет аренда (TICKET_CLAIM_LEASE_SECONDS); взять ее в работу -
+        confirm_claim. За мастером закреплено не больше одной заявки:
+        повторный вызов продлевает и возвращает уже закрепленную.
+        Строки, которые в этот момент забирают другие мастера, пропускаются
+        (FOR UPDATE SKIP LOCKED, MySQL 8.0+), поэтому параллельные вызовы
+        не ждут друг друга и не получают одну заявку.
+
+        Returns:
+            dict: Заявка (claim_expires - конец аренды) или None, если очередь пуста
+        """
+        lease = lease_seconds or getattr(config, 'TICKET_CLAIM_LEASE_SECONDS', 300)
+        conn = self.get_connection()
+        cursor = conn.cursor()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
+            now = datetime.now()
             cursor.execute('''
-                UPDATE tickets 
-                SET assigned_master_id = %s, status = 'in_progress' 
-                WHERE id = %s AND status = 'pending'
-            ''', (master_id, ticket_id))
-            
-            affected_rows = cursor.rowcount
+                SELECT id FROM tickets
+                WHERE status = 'pending' AND assigned_master_id IS NULL AND claimed_by = %s
+                  AND deleted_at IS NULL
+                LIMIT 1
+                FOR UPDATE
+            ''', (master_id,))
+            row = cursor.fetchone()
+            if not row:
+                # Порядок очереди дает индекс idx_tickets_priority
+                cursor.execute('''
+                    SELECT id FROM tickets
+                    WHERE status = 'pending' AND assigned_master_id IS NULL
+                      AND (claimed_by IS NULL OR claim_expires <= %s) AND deleted_at IS NULL
+                    ORDER BY priority DESC, created_date, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ''', (now,))
+                row = cursor.fetchone()
+            if row:
+                cursor.execute(
+                    "UPDATE tickets SET claimed_by = %s, claim_expires = %s, version = version + 1 WHERE id = %s",
+                    (master_id, now + timedelta(seconds=lease), row[0])
+                )
             conn.commit()
-            
-            if affected_rows > 0:
-                # Отправляем уведомления
+        except Exception as e:
+            conn.rollback()
+            logger.error("Error claiming ticket: %s", e)
+            return None
+        
+        if not row:
+            return None
+        ticket = self.get_ticket_by_id(row[0])
+        if ticket and ticket.get('claim_expires'):
+            ticket['claim_expires'] = ticket['claim_expires'].isoformat()
+        return ticket
+
+    def confirm_claim(self, ticket_id: int, master_id: int, notification_service=None) -> UpdateResult:
+        """Берет в работу заявку, закрепленную за мастером; после конца аренды - rejected"""
+        try:
+            result = self._update_ticket_row(
+                ticket_id, "assigned_master_id = %s, status = 'in_progress', claimed_by = NULL, claim_expires = NULL",
+                (master_id,),
+                " AND status = 'pending' AND assigned_master_id IS NULL AND claimed_by = %s AND claim_expires > %s",
+                (master_id, datetime.now())
+            )
+        except Exception as e:
+            logger.error("Error confirming claim: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
+        
+        if result and notification_service:
+            try:
                 notification_service.notify_master_assigned(ticket_id, master_id)
                 notification_service.notify_client_about_master(ticket_id, master_id)
-            
-            return affected_rows > 0
-            
+            except Exception as e:
+                logger.error("Error notifying about assignment: %s", e)
+        return result
+
+    def release_claim(self, ticket_id: int, master_id: int) -> bool:
+        """Возвращает закрепленную заявку в очередь"""
+        try:
+            return bool(self._update_ticket_row(
+                ticket_id, "claimed_by = NULL, claim_expires = NULL", (),
+                " AND claimed_by = %s", (master_id,)
+            ))
         except Exception as e:
-            print(f"Error assigning ticket to master: {e}")
+            logger.error("Error releasing claim: %s", e)
             return False
 
     def create_ticket_with_notification(self, title: str, description: str, client_id: int, notification_service) -> bool:
         """Создает новую заявку с отправкой уведомлений"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            ticket_number = f"T{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            cursor.execute('''
-                INSERT INTO tickets (ticket_number, title, description, created_date, client_id)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (ticket_number, title, description, datetime.now(), client_id))
-            
-            ticket_id = cursor.lastrowid
-            
-            conn.commit()
+            ticket_id = self._insert_ticket(title, description, client_id)
             
             if ticket_id:
                 # Отправляем уведомление администраторам
@@ -465,82 +825,157 @@ class MySQLDatabase:
             
             return True
         except Exception as e:
-            print(f"Error creating ticket: {e}")
+            logger.error("Error creating ticket: %s", e)
             return False
 
-    def update_ticket(self, ticket_id: int, title: str, description: str, user_id: int, user_role: str) -> bool:
-        """Обновляет заявку с проверкой прав"""
+    def update_ticket(self, ticket_id: int, title: str, description: str, user_id: int, user_role: str,
+                      expected_version: Optional[int] = None) -> UpdateResult:
+        """
+        Обновляет заявку с проверкой прав
+
+        Args:
+            expected_version: Версия, открытая в редакторе; если заявку
+                успели изменить, вернется UpdateResult со статусом conflict
+        """
+        # Проверяем права на редактирование
+        if user_role == 'admin':
+            # Админ может редактировать любую заявку
+            conditions, condition_values = '', ()
+        elif user_role == 'client':
+            # Клиент может редактировать только свои заявки в статусе pending
+            conditions, condition_values = " AND client_id = %s AND status = 'pending'", (user_id,)
+        elif user_role == 'master':
+            # Мастер может редактировать только назначенные ему заявки
+            conditions, condition_values = " AND assigned_master_id = %s", (user_id,)
+        else:
+            return UpdateResult(UpdateResult.REJECTED)
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Проверяем права на редактирование
-            if user_role == 'admin':
-                # Админ может редактировать любую заявку
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET title = %s, description = %s 
-                    WHERE id = %s
-                ''', (title, description, ticket_id))
-            
-            elif user_role == 'client':
-                # Клиент может редактировать только свои заявки в статусе pending
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET title = %s, description = %s 
-                    WHERE id = %s AND client_id = %s AND status = 'pending'
-                ''', (title, description, ticket_id, user_id))
-            
-            elif user_role == 'master':
-                # Мастер может редактировать только назначенные ему заявки
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET title = %s, description = %s 
-                    WHERE id = %s AND assigned_master_id = %s
-                ''', (title, description, ticket_id, user_id))
-            else:
-                return False
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            
-            return affected_rows > 0
-            
+            return self._update_ticket_row(ticket_id, "title = %s, description = %s", (title, description),
+                                           conditions, condition_values, expected_version)
         except Exception as e:
-            print(f"Error updating ticket: {e}")
-            return False
+            logger.error("Error updating ticket: %s", e)
+            return UpdateResult(UpdateResult.ERROR)
 
-    def add_comment(self, ticket_id: int, user_id: int, user_name: str, comment_text: str) -> bool:
-        """Добавляет комментарий к заявке"""
+    def _transaction(self, fn):
+        """Выполняет fn(cursor) в транзакции соединения потока и возвращает ее результат"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            result = fn(cursor)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _update_ticket_row(self, ticket_id: int, assignments: str, values: tuple,
+                           conditions: str = '', condition_values: tuple = (),
+                           expected_version: Optional[int] = None) -> UpdateResult:
+        """
+        UPDATE tickets с увеличением версии строки
+
+        При expected_version строка меняется, только если ее версия не
+        изменилась. Блокировка строки держится только на время UPDATE.
+        """
+        query = f"UPDATE tickets SET {assignments}, version = version + 1 WHERE id = %s AND deleted_at IS NULL{conditions}"
+        params = list(values) + [ticket_id] + list(condition_values)
+        if expected_version is not None:
+            query += " AND version = %s"
+            params.append(expected_version)
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            updated = cursor.rowcount
+            cursor.execute("SELECT version FROM tickets WHERE id = %s AND deleted_at IS NULL", (ticket_id,))
+            row = cursor.fetchone()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        return UpdateResult.resolve(updated, row[0] if row else None, expected_version,
+                                    lambda: self.get_ticket_by_id(ticket_id))
+
+    def add_comment(self, ticket_id: int, user_id: int, user_name: str, comment_text: str,
+                    user_role: Optional[str] = None) -> Optional[dict]:
+        """
+        Добавляет комментарий к заявке
+
+        Returns:
+            dict: Созданный комментарий (как в get_comments_by_ticket) или None
+        """
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
             
+            # Счетчик растет в той же транзакции; 0 строк - заявки не существует
+            cursor.execute("UPDATE tickets SET comment_count = comment_count + 1 WHERE id = %s AND deleted_at IS NULL",
+                           (ticket_id,))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            
+            if user_role is None:
+                cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
+                row = cursor.fetchone()
+                user_role = row[0] if row else None
+            
+            created_date = datetime.now()
             cursor.execute('''
-                INSERT INTO comments (ticket_id, user_id, user_name, comment_text, created_date)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (ticket_id, user_id, user_name, comment_text, datetime.now()))
+                INSERT INTO comments (ticket_id, user_id, user_name, user_role, comment_text, created_date)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', (ticket_id, user_id, user_name, user_role, comment_text, created_date))
+            comment_id = cursor.lastrowid
             
             conn.commit()
-            return True
+            return {
+                'id': comment_id,
+                'ticket_id': ticket_id,
+                'user_id': user_id,
+                'user_name': user_name,
+                'comment_text': comment_text,
+                'created_date': created_date.isoformat(),
+                'user_role': user_role
+            }
         except Exception as e:
-            print(f"Error adding comment: {e}")
-            return False
+            # Иначе увеличенный comment_count остался бы в открытой транзакции потока
+            conn.rollback()
+            logger.error("Error adding comment: %s", e)
+            return None
+
+    def get_comments_by_ticket(self, ticket_id: int, limit: Optional[int] = None,
+                               before: Optional[int] = None) -> List[dict]:
+        """
+        Получает комментарии заявки в хронологическом порядке
 
-    def get_comments_by_ticket(self, ticket_id: int) -> List[dict]:
-        """Получает все комментарии для заявки"""
+        Args:
+            limit: Сколько последних комментариев вернуть (None - все)
+            before: id самого раннего уже загруженного комментария
+        """
         conn = self.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute('''
-            SELECT c.*, u.role as user_role
-            FROM comments c
-            LEFT JOIN users u ON c.user_id = u.id
-            WHERE c.ticket_id = %s
-            ORDER BY c.created_date ASC
-        ''', (ticket_id,))
+        query = '''
+            SELECT id, ticket_id, user_id, user_name, comment_text, created_date, user_role
+            FROM comments
+            WHERE ticket_id = %s
+        '''
+        params = [ticket_id]
+        if before is not None:
+            query += ' AND id < %s'
+            params.append(before)
+        # Страница берется с конца по индексу idx_comments_ticket и разворачивается
+        query += ' ORDER BY id DESC'
+        if limit is not None:
+            query += ' LIMIT %s'
+            params.append(limit)
         
+        cursor.execute(query, params)
         comments = cursor.fetchall()
+        comments.reverse()
         
         for comment in comments:
             if comment['created_date']:
@@ -554,11 +989,12 @@ class MySQLDatabase:
         cursor = conn.cursor(dictionary=True)
         
         cursor.execute('''
-            SELECT t.*, u.full_name as client_name, m.full_name as master_name
+            SELECT t.*, u.full_name as client_name, u.phone as client_phone, u.email as client_email,
+                   m.full_name as master_name
             FROM tickets t
             LEFT JOIN users u ON t.client_id = u.id
             LEFT JOIN users m ON t.assigned_master_id = m.id
-            WHERE t.id = %s
+            WHERE t.id = %s AND t.deleted_at IS NULL
         ''', (ticket_id,))
         
         ticket = cursor.fetchone()
@@ -568,7 +1004,79 @@ class MySQLDatabase:
         
         return ticket
 
+    def get_overdue_tickets(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[dict]:
+        """Открытые заявки с истекшим сроком (sla_due), самые просроченные первыми"""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        placeholders = ', '.join('%s' for _ in sla.OPEN_STATUSES)
+        query = f'''
+            SELECT t.*, u.full_name as client_name, u.phone as client_phone, u.email as client_email,
+                   m.full_name as master_name
+            FROM tickets t
+            LEFT JOIN users u ON t.client_id = u.id
+            LEFT JOIN users m ON t.assigned_master_id = m.id
+            WHERE t.status IN ({placeholders}) AND t.sla_due < %s AND t.deleted_at IS NULL
+            ORDER BY t.sla_due
+        '''
+        params = [*sla.OPEN_STATUSES, now or datetime.now()]
+        if limit:
+            query += ' LIMIT %s'
+            params.append(limit)
+        cursor.execute(query, params)
+        
+        tickets = cursor.fetchall()
+        
+        for ticket in tickets:
+            if ticket['created_date']:
+                ticket['created_date'] = ticket['created_date'].isoformat()
+        
+        return tickets
+    
+    def get_sla_candidates(self, missing_only: bool = True) -> List[tuple]:
+        """(id, created_date) открытых заявок для расчета срока (sla.fill_due_dates)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        placeholders = ', '.join('%s' for _ in sla.OPEN_STATUSES)
+        query = f'SELECT id, created_date FROM tickets WHERE status IN ({placeholders}) AND deleted_at IS NULL'
+        if missing_only:
+            query += ' AND sla_due IS NULL'
+        cursor.execute(query, sla.OPEN_STATUSES)
+        
+        return cursor.fetchall()
+    
+    def set_sla_due(self, dues: List[tuple]) -> int:
+        """Записывает сроки: [(id заявки, datetime), ...]"""
+        if not dues:
+            return 0
+        def write(cursor):
+            cursor.executemany('UPDATE tickets SET sla_due = %s WHERE id = %s',
+                               [(due, ticket_id) for ticket_id, due in dues])
+            return len(dues)
+        
+        return self._transaction(write)
+
+    def purge_deleted_tickets(self, deleted_before: datetime, limit: int) -> int:
+        """
+        Удаляет до limit заявок, помеченных удаленными раньше deleted_before
+
+        Комментарии и уведомления заявок удаляет ON DELETE CASCADE.
+
+        Returns:
+            int: Сколько заявок удалено
+        """
+        def write(cursor):
+            cursor.execute('''
+                DELETE FROM tickets
+                WHERE deleted_at IS NOT NULL AND deleted_at < %s
+                ORDER BY deleted_at
+                LIMIT %s
+            ''', (deleted_before, limit))
+            return cursor.rowcount
+
+        return self._transaction(write)
+
     def __del__(self):
-        """Закрывает соединение при удалении объекта"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
\ No newline at end of file
+        """Закрывает соединения при удалении объекта"""
+        self.close()
@@ -1,8 +1,10 @@
-import mysql.connector
+import logging
 from datetime import datetime
 from typing import List, Optional
 import app.config as config
 
+logger = logging.getLogger(__name__)
+
 class MySQLNotificationManager:
     def __init__(self, database):
         self.database = database
@@ -16,8 +18,8 @@ class MySQLNotificationManager:
     def create_notification(self, user_id: int, title: str, message: str, 
                           notification_type: str, related_ticket_id: Optional[int] = None) -> bool:
         """Создает новое уведомление"""
+        conn = self.database.get_connection()
         try:
-            conn = self.database.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -30,11 +32,39 @@ class MySQLNotificationManager:
             conn.commit()
             return True
         except Exception as e:
-            print(f"Error creating notification: {e}")
+            conn.rollback()
+            logger.error("Error creating notification: %s", e)
             return False
     
-    def get_user_notifications(self, user_id: int, unread_only: bool = False) -> List[dict]:
-        """Получает уведомления пользователя"""
+    def create_notifications(self, notifications: List[dict]) -> int:
+        """Создает группу уведомлений одной вставкой; возвращает их число (0 при ошибке)"""
+        created_date = datetime.now()
+        rows = [(n['user_id'], n['title'], n['message'], n['notification_type'], created_date,
+                 n.get('related_ticket_id')) for n in notifications]
+        conn = self.database.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO notifications (user_id, title, message, notification_type, 
+                                         created_date, related_ticket_id)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', rows)
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            conn.rollback()
+            logger.error("Error creating notifications: %s", e)
+            return 0
+    
+    def get_user_notifications(self, user_id: int, unread_only: bool = False,
+                               limit: Optional[int] = None, before: Optional[int] = None) -> List[dict]:
+        """
+        Получает уведомления пользователя, новые первыми
+
+        Args:
+            limit: Размер страницы (None - все)
+            before: id последнего уведомления предыдущей страницы
+        """
         conn = self.database.get_connection()
         cursor = conn.cursor(dictionary=True)
         
@@ -44,13 +74,21 @@ class MySQLNotificationManager:
             LEFT JOIN tickets t ON n.related_ticket_id = t.id
             WHERE n.user_id = %s
         '''
+        params = [user_id]
         
         if unread_only:
             query += ' AND n.is_read = FALSE'
+        if before is not None:
+            query += ' AND n.id < %s'
+            params.append(before)
         
-        query += ' ORDER BY n.created_date DESC'
+        # id растет вместе с created_date; порядок дают индексы idx_notifications_user/_unread
+        query += ' ORDER BY n.id DESC'
+        if limit is not None:
+            query += ' LIMIT %s'
+            params.append(limit)
         
-        cursor.execute(query, (user_id,))
+        cursor.execute(query, params)
         notifications = cursor.fetchall()
         
         for notification in notifications:
@@ -61,8 +99,8 @@ class MySQLNotificationManager:
     
     def mark_as_read(self, notification_id: int) -> bool:
         """Помечает уведомление как прочитанное"""
+        conn = self.database.get_connection()
         try:
-            conn = self.database.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -72,13 +110,14 @@ class MySQLNotificationManager:
             conn.commit()
             return True
         except Exception as e:
-            print(f"Error marking notification as read: {e}")
+            conn.rollback()
+            logger.error("Error marking notification as read: %s", e)
             return False
     
     def mark_all_as_read(self, user_id: int) -> bool:
         """Помечает все уведомления пользователя как прочитанные"""
+        conn = self.database.get_connection()
         try:
-            conn = self.database.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -88,7 +127,8 @@ class MySQLNotificationManager:
             conn.commit()
             return True
         except Exception as e:
-            print(f"Error marking all notifications as read: {e}")
+            conn.rollback()
+            logger.error("Error marking all notifications as read: %s", e)
             return False
     
     def get_unread_count(self, user_id: int) -> int:
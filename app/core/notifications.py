@@ -1,11 +1,63 @@
+from collections import Counter
 from typing import List, Optional
 import app.config as config
+from app.core.telemetry import counter, traced
+
+STATUS_NAMES = {
+    'pending': 'ожидает',
+    'in_progress': 'в работе',
+    'waiting_parts': 'ожидает запчасти',
+    'completed': 'завершена',
+    'cancelled': 'отменена'
+}
 
 class NotificationService:
-    def __init__(self, db, notification_manager):
+    def __init__(self, db, notification_manager, bus=None):
         self.db = db
         self.notification_manager = notification_manager
+        # Шина событий процесса (sessions.EventBus): сеансы получателей узнают о новых уведомлениях
+        self.bus = bus
+    
+    def _send(self, user_id: int, title: str, message: str, notification_type: str,
+              related_ticket_id: Optional[int] = None):
+        """Создает уведомление и учитывает его в метриках"""
+        success = self.notification_manager.create_notification(
+            user_id=user_id,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            related_ticket_id=related_ticket_id
+        )
+        counter('notifications_sent_total', type=notification_type, result='ok' if success else 'failed')
+        if success:
+            self._publish('notification.created', user_id=user_id,
+                          notification_type=notification_type, related_ticket_id=related_ticket_id)
+        return success
+    
+    def _publish(self, topic: str, **payload):
+        if self.bus is not None:
+            self.bus.publish(topic, **payload)
+    
+    def _send_many(self, notifications: List[dict]) -> int:
+        """Создает группу уведомлений одной вставкой (массовые операции)"""
+        if not notifications:
+            return 0
+        created = self.notification_manager.create_notifications(notifications)
+        for notification_type, count in Counter(n['notification_type'] for n in notifications).items():
+            counter('notifications_sent_total', count, type=notification_type, result='ok' if created else 'failed')
+        if created:
+            for n in notifications:
+                self._publish('notification.created', user_id=n['user_id'],
+                              notification_type=n['notification_type'], related_ticket_id=n.get('related_ticket_id'))
+        return created
+    
+    @staticmethod
+    def _status_message(ticket_number: str, title: str, old_status: str, new_status: str) -> str:
+        old_status_name = STATUS_NAMES.get(old_status, old_status)
+        new_status_name = STATUS_NAMES.get(new_status, new_status)
+        return f"Статус вашей заявки #{ticket_number} '{title}' изменен с '{old_status_name}' на '{new_status_name}'"
     
+    @traced('notification.status_change')
     def notify_ticket_status_change(self, ticket_id: int, old_status: str, new_status: str):
         """Уведомляет клиента об изменении статуса заявки"""
         # Получаем информацию о заявке
@@ -14,25 +66,18 @@ class NotificationService:
         if not ticket:
             return False
         
+        # Загрузку мастеров по этому событию ведет распределитель (dispatch.py)
+        self._publish('ticket.status_changed', ticket_id=ticket_id, old_status=old_status,
+                      new_status=new_status, master_id=ticket['assigned_master_id'])
+        
         client_id = ticket['client_id']
         ticket_number = ticket['ticket_number']
         title = ticket['title']
         
-        status_names = {
-            'pending': 'ожидает',
-            'in_progress': 'в работе',
-            'waiting_parts': 'ожидает запчасти',
-            'completed': 'завершена',
-            'cancelled': 'отменена'
-        }
-        
-        old_status_name = status_names.get(old_status, old_status)
-        new_status_name = status_names.get(new_status, new_status)
-        
         title_msg = f"Статус заявки изменен"
-        message = f"Статус вашей заявки #{ticket_number} '{title}' изменен с '{old_status_name}' на '{new_status_name}'"
+        message = self._status_message(ticket_number, title, old_status, new_status)
         
-        return self.notification_manager.create_notification(
+        return self._send(
             user_id=client_id,
             title=title_msg,
             message=message,
@@ -41,8 +86,10 @@ class NotificationService:
         )
     
     # Остальные методы остаются без изменений...
+    @traced('notification.assignment')
     def notify_master_assigned(self, ticket_id: int, master_id: int):
         """Уведомляет мастера о назначении заявки"""
+        self._publish('ticket.assigned', ticket_id=ticket_id, master_id=master_id)
         ticket = self.db.get_ticket_by_id(ticket_id)
         
         if not ticket:
@@ -55,7 +102,7 @@ class NotificationService:
         title_msg = "Новая заявка назначена"
         message = f"Вам назначена заявка #{ticket_number} '{title}' от клиента {client_name}"
         
-        return self.notification_manager.create_notification(
+        return self._send(
             user_id=master_id,
             title=title_msg,
             message=message,
@@ -63,6 +110,7 @@ class NotificationService:
             related_ticket_id=ticket_id
         )
     
+    @traced('notification.master_assigned')
     def notify_client_about_master(self, ticket_id: int, master_id: int):
         """Уведомляет клиента о назначении мастера"""
         ticket = self.db.get_ticket_by_id(ticket_id)
@@ -78,7 +126,7 @@ class NotificationService:
         title_msg = "Мастер назначен"
         message = f"На вашу заявку #{ticket_number} '{title}' назначен мастер {master_name}"
         
-        return self.notification_manager.create_notification(
+        return self._send(
             user_id=client_id,
             title=title_msg,
             message=message,
@@ -86,6 +134,7 @@ class NotificationService:
             related_ticket_id=ticket_id
         )
     
+    @traced('notification.new_ticket')
     def notify_ticket_created(self, ticket_id: int):
         """Уведомляет администраторов о новой заявке"""
         ticket = self.db.get_ticket_by_id(ticket_id)
@@ -112,7 +161,7 @@ class NotificationService:
         success_count = 0
         for admin in admins:
             admin_id = admin[0]
-            if self.notification_manager.create_notification(
+            if self._send(
                 user_id=admin_id,
                 title=title_msg,
                 message=message,
@@ -121,4 +170,53 @@ class NotificationService:
             ):
                 success_count += 1
         
-        return success_count > 0
\ No newline at end of file
+        return success_count > 0
+
+    @traced('notification.bulk_status_change')
+    def notify_status_changes(self, tickets: List[dict], new_status: str) -> int:
+        """
+        Уведомляет клиентов о смене статуса группы заявок
+
+        Args:
+            tickets: Заявки из bulk_update_status (с old_status)
+        """
+        notifications = []
+        for ticket in tickets:
+            self._publish('ticket.status_changed', ticket_id=ticket['id'], old_status=ticket['old_status'],
+                          new_status=new_status, master_id=ticket['assigned_master_id'])
+            notifications.append({
+                'user_id': ticket['client_id'],
+                'title': "Статус заявки изменен",
+                'message': self._status_message(ticket['ticket_number'], ticket['title'],
+                                                ticket['old_status'], new_status),
+                'notification_type': 'status_change',
+                'related_ticket_id': ticket['id']
+            })
+        return self._send_many(notifications)
+
+    @traced('notification.bulk_assignment')
+    def notify_assignments(self, tickets: List[dict], master_id: int) -> int:
+        """
+        Уведомляет мастера и клиентов о назначении группы заявок
+
+        Args:
+            tickets: Заявки из bulk_assign (с master_name)
+        """
+        notifications = []
+        for ticket in tickets:
+            self._publish('ticket.assigned', ticket_id=ticket['id'], master_id=master_id)
+            notifications.append({
+                'user_id': master_id,
+                'title': "Новая заявка назначена",
+                'message': f"Вам назначена заявка #{ticket['ticket_number']} '{ticket['title']}' от клиента {ticket['client_name']}",
+                'notification_type': 'assignment',
+                'related_ticket_id': ticket['id']
+            })
+            notifications.append({
+                'user_id': ticket['client_id'],
+                'title': "Мастер назначен",
+                'message': f"На вашу заявку #{ticket['ticket_number']} '{ticket['title']}' назначен мастер {ticket['master_name']}",
+                'notification_type': 'master_assigned',
+                'related_ticket_id': ticket['id']
+            })
+        return self._send_many(notifications)
@@ -0,0 +1,75 @@
+"""
+Очистка удаленных заявок
+
+delete_ticket и bulk_delete только помечают заявку (tickets.deleted_at):
+одна короткая запись, после которой заявка пропадает из всех выборок.
+Строки удаляются здесь, не раньше чем через TICKET_PURGE_GRACE_SECONDS
+после пометки, пачками по TICKET_PURGE_BATCH_SIZE; комментарии и
+уведомления заявок удаляет ON DELETE CASCADE. Каждая пачка - отдельная
+транзакция (в SQLite - задание потока записи), поэтому очистка не держит
+блокировки долго и не задерживает запись из интерфейса.
+
+Запуск: фоновый поток процесса (TICKET_PURGE_INTERVAL, см. sessions.py)
+или `python manage.py purge`.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import app.config as config
+from app.core.telemetry import counter, traced
+
+logger = logging.getLogger(__name__)
+
+@traced('purge.deleted_tickets')
+def purge_deleted_tickets(db, grace_seconds: Optional[int] = None, batch_size: Optional[int] = None,
+                          now: Optional[datetime] = None) -> int:
+    """
+    Удаляет заявки, помеченные удаленными раньше grace_seconds назад
+
+    Returns:
+        int: Сколько заявок удалено
+    """
+    grace_seconds = getattr(config, 'TICKET_PURGE_GRACE_SECONDS', 3600) if grace_seconds is None else grace_seconds
+    batch_size = batch_size or getattr(config, 'TICKET_PURGE_BATCH_SIZE', 200)
+    cutoff = (now or datetime.now()) - timedelta(seconds=grace_seconds)
+
+    purged = 0
+    while True:
+        deleted = db.purge_deleted_tickets(cutoff, batch_size)
+        purged += deleted
+        if deleted < batch_size:
+            break
+    if purged:
+        counter('tickets_purged_total', purged)
+        logger.info("Удалено помеченных заявок: %s", purged)
+    return purged
+
+class TicketPurger:
+    """Фоновая очистка удаленных заявок; одна на процесс (SessionManager)"""
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, interval: Optional[float] = None):
+        """Очистка раз в interval секунд (по умолчанию TICKET_PURGE_INTERVAL; 0 - выключена)"""
+        interval = interval if interval is not None else getattr(config, 'TICKET_PURGE_INTERVAL', 300)
+        with self._lock:
+            if not interval or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                            name='ticket-purge', daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                purge_deleted_tickets(self.db)
+            except Exception:
+                logger.exception("Ошибка очистки удаленных заявок")
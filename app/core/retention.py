@@ -0,0 +1,285 @@
+"""
+Хранение уведомлений
+
+Прочитанные уведомления старше config.NOTIFICATION_READ_TTL_DAYS
+переносятся из notifications пачками (по config.RETENTION_BATCH_SIZE):
+
+    table  - в таблицу notifications_archive
+    file   - в файлы JSON Lines по месяцам (NOTIFICATION_ARCHIVE_PATH)
+    delete - удаляются без архива
+
+В MySQL архив секционирован по месяцам (RANGE по created_date), поэтому
+записи старше config.NOTIFICATION_ARCHIVE_TTL_DAYS удаляются целыми
+секциями через DROP PARTITION. Рабочая таблица notifications не
+секционируется: у нее есть внешние ключи, которые MySQL не допускает в
+секционированных таблицах, а после переноса в архив она остается
+небольшой.
+
+Запуск: `python manage.py retention` (например, раз в сутки из cron).
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import app.config as config
+from app.core.bootstrap import mysql_create_index
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MODES = ('table', 'file', 'delete')
+COLUMNS = ('id', 'user_id', 'title', 'message', 'notification_type', 'is_read',
+           'created_date', 'related_ticket_id')
+
+_SQLITE_ARCHIVE_DDL = '''
+    CREATE TABLE IF NOT EXISTS notifications_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        message TEXT NOT NULL,
+        notification_type TEXT NOT NULL,
+        is_read BOOLEAN DEFAULT FALSE,
+        created_date TEXT NOT NULL,
+        related_ticket_id INTEGER,
+        archived_date TEXT NOT NULL
+    )
+'''
+
+# Первичный ключ секционированной таблицы должен включать created_date
+_MYSQL_ARCHIVE_DDL = '''
+    CREATE TABLE IF NOT EXISTS notifications_archive (
+        id INT NOT NULL,
+        user_id INT NOT NULL,
+        title VARCHAR(200) NOT NULL,
+        message TEXT NOT NULL,
+        notification_type VARCHAR(50) NOT NULL,
+        is_read BOOLEAN DEFAULT FALSE,
+        created_date DATETIME NOT NULL,
+        related_ticket_id INT,
+        archived_date DATETIME NOT NULL,
+        PRIMARY KEY (id, created_date),
+        KEY idx_notifications_archive_user (user_id, id)
+    )
+    PARTITION BY RANGE (TO_DAYS(created_date)) (
+        PARTITION {first} VALUES LESS THAN (TO_DAYS('{first_bound}')),
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    )
+'''
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _next_month(moment: datetime) -> datetime:
+    return _month_start(_month_start(moment) + timedelta(days=32))
+
+def _partition_name(month: datetime) -> str:
+    return month.strftime('p%Y%m')
+
+def init_schema(db):
+    """Индексы для постраничного чтения и счетчика непрочитанных, таблица архива (миграция схемы 3)"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    if db.dialect == 'mysql':
+        mysql_create_index(cursor, 'notifications', 'idx_notifications_user', 'user_id, id')
+        mysql_create_index(cursor, 'notifications', 'idx_notifications_unread', 'user_id, is_read, id')
+        mysql_create_index(cursor, 'notifications', 'idx_notifications_read_date', 'is_read, created_date')
+        month = _month_start(datetime.now())
+        cursor.execute(_MYSQL_ARCHIVE_DDL.format(
+            first=_partition_name(month),
+            first_bound=_next_month(month).strftime('%Y-%m-%d')
+        ))
+    else:
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications (user_id, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications (user_id, is_read, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_read_date ON notifications (is_read, created_date)")
+        cursor.execute(_SQLITE_ARCHIVE_DDL)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_archive_user ON notifications_archive (user_id, id)")
+    conn.commit()
+    if db.dialect == 'sqlite':
+        conn.close()
+
+def _partitions(cursor) -> List[tuple]:
+    """Секции архива MySQL: (имя, верхняя граница в днях) по возрастанию"""
+    cursor.execute('''
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'notifications_archive'
+        ORDER BY PARTITION_ORDINAL_POSITION
+    ''')
+    return [(name, description) for name, description in cursor.fetchall()]
+
+def ensure_partitions(db, until: Optional[datetime] = None) -> List[str]:
+    """
+    Добавляет в архив MySQL месячные секции до месяца until включительно
+
+    Новые секции выделяются из p_future (REORGANIZE PARTITION). Пока
+    архив пишется раньше, чем наступает месяц, p_future пуста и
+    операция не переносит данных.
+
+    Returns:
+        list: Имена добавленных секций
+    """
+    if db.dialect != 'mysql':
+        return []
+    until = _month_start(until or _next_month(datetime.now()))
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    existing = {name for name, _ in _partitions(cursor)}
+    monthly = sorted(name for name in existing if name != 'p_future')
+    month = datetime.strptime(monthly[-1], 'p%Y%m') if monthly else _month_start(datetime.now())
+
+    added = []
+    while month < until:
+        month = _next_month(month)
+        name = _partition_name(month)
+        if name not in existing:
+            added.append((name, _next_month(month)))
+    if added:
+        definitions = ', '.join(
+            f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{bound:%Y-%m-%d}'))" for name, bound in added
+        )
+        cursor.execute(
+            f"ALTER TABLE notifications_archive REORGANIZE PARTITION p_future INTO "
+            f"({definitions}, PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        )
+        logger.info("Добавлены секции архива уведомлений: %s", ', '.join(name for name, _ in added))
+    return [name for name, _ in added]
+
+def _archive_path(created_date) -> str:
+    if isinstance(created_date, str):
+        created_date = datetime.fromisoformat(created_date)
+    template = getattr(config, 'NOTIFICATION_ARCHIVE_PATH', 'archive/notifications-{month}.jsonl')
+    return template.format(month=created_date.strftime('%Y-%m'))
+
+def _write_files(rows: Iterable[tuple]):
+    by_path = {}
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        if isinstance(record['created_date'], datetime):
+            record['created_date'] = record['created_date'].isoformat()
+        record['is_read'] = bool(record['is_read'])
+        by_path.setdefault(_archive_path(record['created_date']), []).append(record)
+    for path, records in by_path.items():
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as fp:
+            for record in records:
+                fp.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def archive_read_notifications(db, ttl_days: Optional[int] = None, mode: Optional[str] = None,
+                               batch_size: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """
+    Переносит прочитанные уведомления старше ttl_days
+
+    Args:
+        db: Database или MySQLDatabase
+        ttl_days: Срок хранения прочитанных (по умолчанию NOTIFICATION_READ_TTL_DAYS)
+        mode: 'table', 'file' или 'delete' (по умолчанию NOTIFICATION_ARCHIVE_MODE)
+        batch_size: Строк за транзакцию
+        now: Момент отсчета срока
+
+    Returns:
+        int: Сколько уведомлений перенесено
+    """
+    ttl_days = getattr(config, 'NOTIFICATION_READ_TTL_DAYS', 90) if ttl_days is None else ttl_days
+    mode = mode or getattr(config, 'NOTIFICATION_ARCHIVE_MODE', 'table')
+    batch_size = batch_size or getattr(config, 'RETENTION_BATCH_SIZE', 1000)
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"Неизвестный режим архивации: {mode}")
+    if not ttl_days:
+        return 0
+
+    mysql = db.dialect == 'mysql'
+    ph = '%s' if mysql else '?'
+    cutoff = (now or datetime.now()) - timedelta(days=ttl_days)
+    cutoff_value = cutoff if mysql else cutoff.isoformat()
+    archived_date = datetime.now() if mysql else datetime.now().isoformat()
+    if mode == 'table':
+        ensure_partitions(db)
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    moved = 0
+    last_id = 0
+    try:
+        while True:
+            # Ключ пачки - id: следующая выборка продолжается после последнего перенесенного
+            cursor.execute(f'''
+                SELECT {', '.join(COLUMNS)} FROM notifications
+                WHERE is_read = TRUE AND created_date < {ph} AND id > {ph}
+                ORDER BY id
+                LIMIT {int(batch_size)}
+            ''', (cutoff_value, last_id))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            last_id = ids[-1]
+
+            if mode == 'table':
+                cursor.executemany(
+                    f"REPLACE INTO notifications_archive ({', '.join(COLUMNS)}, archived_date) "
+                    f"VALUES ({', '.join([ph] * (len(COLUMNS) + 1))})",
+                    [tuple(row) + (archived_date,) for row in rows]
+                )
+            elif mode == 'file':
+                _write_files(rows)
+            cursor.execute(
+                f"DELETE FROM notifications WHERE id IN ({', '.join([ph] * len(ids))})", ids
+            )
+            conn.commit()
+            moved += len(ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if not mysql:
+            conn.close()
+
+    if moved:
+        logger.info("Уведомлений перенесено (%s): %s", mode, moved)
+    return moved
+
+def purge_archive(db, ttl_days: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """
+    Удаляет из архива записи старше ttl_days (по умолчанию NOTIFICATION_ARCHIVE_TTL_DAYS)
+
+    В MySQL удаляются только секции, целиком старше срока.
+
+    Returns:
+        int: Удалено строк (SQLite) или секций (MySQL)
+    """
+    ttl_days = getattr(config, 'NOTIFICATION_ARCHIVE_TTL_DAYS', 0) if ttl_days is None else ttl_days
+    if not ttl_days:
+        return 0
+    cutoff = (now or datetime.now()) - timedelta(days=ttl_days)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    if db.dialect == 'mysql':
+        cursor.execute("SELECT TO_DAYS(%s)", (cutoff,))
+        cutoff_days = cursor.fetchone()[0]
+        expired = [name for name, bound in _partitions(cursor)
+                   if name != 'p_future' and bound != 'MAXVALUE' and int(bound) <= cutoff_days]
+        # Последняя месячная секция нужна как опорная для ensure_partitions
+        monthly = [name for name, _ in _partitions(cursor) if name != 'p_future']
+        expired = [name for name in expired if name != monthly[-1]]
+        if expired:
+            cursor.execute(f"ALTER TABLE notifications_archive DROP PARTITION {', '.join(expired)}")
+            logger.info("Удалены секции архива уведомлений: %s", ', '.join(expired))
+        return len(expired)
+
+    cursor.execute("DELETE FROM notifications_archive WHERE created_date < ?", (cutoff.isoformat(),))
+    deleted = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
+def run(db, mode: Optional[str] = None, ttl_days: Optional[int] = None) -> dict:
+    """Архивация прочитанных и очистка старого архива"""
+    archived = archive_read_notifications(db, ttl_days=ttl_days, mode=mode)
+    purged = purge_archive(db)
+    return {'archived': archived, 'purged': purged}
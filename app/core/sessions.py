@@ -0,0 +1,324 @@
+"""
+Сеансы пользователей
+
+В режиме Flet web один процесс обслуживает много страниц. Общие для
+процесса ресурсы (база данных с ее соединениями, менеджер и сервис
+уведомлений, шина событий, распределитель и очистка заявок) создаются
+один раз в SessionManager, а на страницу приходится только Session:
+AuthManager с текущим пользователем, подписки на события и счетчики
+потребления.
+
+Число сеансов ограничено config.SESSION_MAX. Сеансы без действий дольше
+config.SESSION_IDLE_TIMEOUT закрываются фоновым потоком; при нехватке
+мест простаивающие сеансы вытесняются сразу. Действием считаются показ
+экрана и обработчики экранов (on_activity -> Session.touch).
+
+Фоновые задачи (распределитель, очистка, эскалация сроков) запускаются
+после подготовки схемы базы в warm_up: до нее им не хватает столбцов, а
+пересоздание таблиц миграцией не должно пересекаться с их записью.
+"""
+
+import contextlib
+import itertools
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import app.config as config
+from app.core.auth import AuthManager
+from app.core.telemetry import counter, observe, telemetry
+
+logger = logging.getLogger(__name__)
+
+# При нехватке мест вытесняется сеанс, простаивающий хотя бы столько секунд
+# (половина SESSION_IDLE_TIMEOUT по умолчанию: пользователь мог читать заявку,
+# не нажимая кнопок)
+EVICT_WHEN_FULL_IDLE = 900
+
+class SessionLimitError(RuntimeError):
+    """Открыто максимальное число сеансов"""
+
+class EventBus:
+    """Синхронная шина событий процесса: обработчики вызываются в потоке publish"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Dict[int, Callable]] = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self, topic: str, handler: Callable) -> Callable[[], None]:
+        """Подписывает handler(**payload) на topic; возвращает функцию отписки"""
+        handler_id = next(self._ids)
+        with self._lock:
+            self._handlers.setdefault(topic, {})[handler_id] = handler
+
+        def unsubscribe():
+            with self._lock:
+                handlers = self._handlers.get(topic)
+                if handlers:
+                    handlers.pop(handler_id, None)
+                    if not handlers:
+                        del self._handlers[topic]
+        return unsubscribe
+
+    def publish(self, topic: str, **payload) -> int:
+        """Вызывает обработчики topic; ошибка одного не мешает остальным"""
+        with self._lock:
+            handlers = list(self._handlers.get(topic, {}).values())
+        for handler in handlers:
+            try:
+                handler(**payload)
+            except Exception:
+                logger.exception("Ошибка обработчика события %s", topic)
+        return len(handlers)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._handlers.get(topic, {}))
+            return sum(len(handlers) for handlers in self._handlers.values())
+
+class Session:
+    """Состояние одной страницы: пользователь, подписки и счетчики"""
+
+    def __init__(self, manager: 'SessionManager', page=None):
+        self.id = uuid.uuid4().hex
+        self.manager = manager
+        self.page = page
+        self.auth = AuthManager(manager.db)
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.actions = 0
+        self.busy_ms = 0.0
+        self.closed = False
+        self.close_reason = None
+        self._subscriptions: List[Callable[[], None]] = []
+        self._on_close: List[Callable[[str], None]] = []
+
+    @property
+    def user(self) -> Optional[dict]:
+        return self.auth.current_user
+
+    @property
+    def idle_seconds(self) -> float:
+        return time.time() - self.last_seen
+
+    def touch(self):
+        self.last_seen = time.time()
+
+    @contextlib.contextmanager
+    def track(self, action: str):
+        """Учитывает действие пользователя: время обработки и число действий"""
+        self.touch()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.actions += 1
+            self.busy_ms += elapsed_ms
+            observe('session_action_ms', elapsed_ms, action=action)
+
+    def subscribe(self, topic: str, handler: Callable):
+        """Подписка на шину событий, снимаемая при закрытии сеанса"""
+        self._subscriptions.append(self.manager.bus.subscribe(topic, handler))
+
+    def on_close(self, callback: Callable[[str], None]):
+        """callback(reason) вызывается при закрытии сеанса"""
+        self._on_close.append(callback)
+
+    def _close(self, reason: str):
+        self.closed = True
+        self.close_reason = reason
+        for unsubscribe in self._subscriptions:
+            unsubscribe()
+        self._subscriptions.clear()
+        for callback in self._on_close:
+            try:
+                callback(reason)
+            except Exception:
+                logger.exception("Ошибка при закрытии сеанса %s", self.id)
+        self._on_close.clear()
+        self.auth.logout()
+
+    def stats(self) -> dict:
+        return {
+            'id': self.id,
+            'user': self.user['username'] if self.user else None,
+            'role': self.user['role'] if self.user else None,
+            'age_s': round(time.time() - self.created_at, 1),
+            'idle_s': round(self.idle_seconds, 1),
+            'actions': self.actions,
+            'busy_ms': round(self.busy_ms, 1),
+            'subscriptions': len(self._subscriptions)
+        }
+
+class SessionManager:
+    """Общие ресурсы процесса и реестр открытых сеансов"""
+
+    def __init__(self, db=None, max_sessions: Optional[int] = None, idle_timeout: Optional[float] = None):
+        from app.core.database_factory import create_database, create_notification_manager
+        from app.core.dispatch import Dispatcher
+        from app.core.notifications import NotificationService
+        from app.core.purge import TicketPurger
+        from app.core.sla import SlaEscalator
+
+        self.db = db or create_database(initialize=False)
+        self.bus = EventBus()
+        self.notification_manager = create_notification_manager(self.db)
+        self.notification_service = NotificationService(self.db, self.notification_manager, bus=self.bus)
+        self.dispatcher = Dispatcher(self.db, self.notification_service, bus=self.bus)
+        self.purger = TicketPurger(self.db)
+        self.escalator = SlaEscalator(self.db)
+        self.max_sessions = max_sessions or getattr(config, 'SESSION_MAX', 500)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else getattr(config, 'SESSION_IDLE_TIMEOUT', 1800)
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        # Схема базы готова и фоновые задачи запущены
+        self.ready = threading.Event()
+        self._warm_up_done: Optional[threading.Event] = None
+        self._reaper = None
+
+    def open(self, page=None) -> Session:
+        """
+        Открывает сеанс для страницы
+
+        Raises:
+            SessionLimitError: Все места заняты активными сеансами
+        """
+        with self._lock:
+            full = len(self._sessions) >= self.max_sessions
+        if full:
+            # Освобождаем место за счет самого долго простаивающего сеанса
+            self.evict_idle(limit=1, min_idle=EVICT_WHEN_FULL_IDLE)
+        session = Session(self, page)
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                counter('sessions_rejected_total')
+                raise SessionLimitError(f"Открыто максимальное число сеансов: {self.max_sessions}")
+            self._sessions[session.id] = session
+        counter('sessions_opened_total')
+        logger.debug("Открыт сеанс %s (всего %s)", session.id, len(self._sessions))
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str, reason: str = 'closed') -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session._close(reason)
+        counter('sessions_closed_total', reason=reason)
+        logger.debug("Закрыт сеанс %s: %s", session_id, reason)
+        return True
+
+    def evict_idle(self, limit: Optional[int] = None, min_idle: Optional[float] = None) -> int:
+        """Закрывает сеансы, простаивающие дольше min_idle (по умолчанию idle_timeout)"""
+        min_idle = self.idle_timeout if min_idle is None else min_idle
+        if not min_idle:
+            return 0
+        with self._lock:
+            idle = [session for session in self._sessions.values() if session.idle_seconds >= min_idle]
+        idle.sort(key=lambda session: session.last_seen)
+        if limit is not None:
+            idle = idle[:limit]
+        return sum(1 for session in idle if self.close(session.id, reason='idle'))
+
+    def sessions(self) -> List[Session]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def stats(self) -> dict:
+        """Сводка по сеансам и общим ресурсам"""
+        sessions = [session.stats() for session in self.sessions()]
+        return {
+            'sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'authenticated': sum(1 for session in sessions if session['user']),
+            'actions': sum(session['actions'] for session in sessions),
+            'busy_ms': round(sum(session['busy_ms'] for session in sessions), 1),
+            'subscriptions': self.bus.subscriber_count(),
+            'db_connections': getattr(self.db, 'open_connections', None),
+            'per_session': sessions
+        }
+
+    def warm_up(self, preload: Callable[[], None] = None) -> threading.Event:
+        """
+        Один раз на процесс готовит схему базы (и модули экранов) в фоне
+
+        После подготовки схемы запускает фоновые задачи и устанавливает
+        ready. Если подготовка не удалась, следующий вызов повторяет ее.
+
+        Returns:
+            threading.Event: Устанавливается, когда попытка закончена
+        """
+        with self._lock:
+            if self._warm_up_done is not None:
+                return self._warm_up_done
+            done = self._warm_up_done = threading.Event()
+
+        def run():
+            with telemetry.span('app.warm_up'):
+                try:
+                    self.db.initialize()
+                    self.start_background_jobs()
+                    self.ready.set()
+                except Exception:
+                    logger.exception("Не удалось подготовить базу данных")
+                    with self._lock:
+                        self._warm_up_done = None
+                finally:
+                    done.set()
+                if preload:
+                    preload()
+        threading.Thread(target=run, name='warm-up', daemon=True).start()
+        return done
+
+    def wait_ready(self, preload: Callable[[], None] = None, timeout: Optional[float] = None) -> bool:
+        """Запускает warm_up, если нужно, и ждет его; False - схема не готова"""
+        if not self.ready.is_set():
+            self.warm_up(preload).wait(timeout)
+        return self.ready.is_set()
+
+    def start_background_jobs(self):
+        """Распределитель, очистка удаленных заявок и эскалация сроков (после подготовки схемы)"""
+        self.dispatcher.start()
+        self.purger.start()
+        self.escalator.start()
+
+    def start_reaper(self, interval: Optional[float] = None):
+        """Фоновый поток, закрывающий простаивающие сеансы"""
+        interval = interval or getattr(config, 'SESSION_REAP_INTERVAL', 60)
+        with self._lock:
+            if self._reaper is not None or not self.idle_timeout:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, args=(interval,),
+                                            name='session-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                evicted = self.evict_idle()
+                if evicted:
+                    logger.info("Закрыто простаивающих сеансов: %s", evicted)
+            except Exception:
+                logger.exception("Ошибка при закрытии простаивающих сеансов")
+
+_manager: Optional[SessionManager] = None
+_manager_lock = threading.Lock()
+
+def get_session_manager() -> SessionManager:
+    """SessionManager процесса; создается при первом обращении"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionManager()
+            _manager.start_reaper()
+        return _manager
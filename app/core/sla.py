@@ -0,0 +1,278 @@
+"""
+Сроки выполнения заявок (SLA) по рабочему календарю
+
+BusinessCalendar задает рабочие интервалы для каждого дня недели
+(SLA_WORKING_HOURS) и праздники (SLA_HOLIDAYS). Рабочее время между
+двумя моментами не перебирается по дням: для каждого дня недели заранее
+посчитаны суммы рабочих секунд, для праздников - накопленные потери, так
+что позиция момента на оси рабочего времени вычисляется арифметикой и
+одним bisect по праздникам (O(log H)). Срок - обратная операция: двоичный
+поиск дня по той же позиции.
+
+Срок заявки (tickets.sla_due) считается один раз при создании:
+created_date плюс SLA_RESOLUTION_HOURS рабочих часов. Он хранится и
+индексируется в базе, поэтому панели сортируют и фильтруют открытые
+заявки по сроку без пересчета, а просроченные выбираются запросом по
+индексу (get_overdue_tickets). После изменения календаря сроки открытых
+заявок пересчитывает `python manage.py sla --recompute`.
+
+Приоритет заявки задается вручную, а SlaEscalator раз в
+SLA_ESCALATION_INTERVAL поднимает его по сроку: под угрозой просрочки -
+не ниже высокого, просроченные - критический. Повышение - два UPDATE по
+индексу (status, sla_due); порог "под угрозой" переводится из рабочих
+часов в момент времени через календарь.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Union
+
+import app.config as config
+from app.core.models import PRIORITY_CRITICAL, PRIORITY_HIGH
+
+logger = logging.getLogger(__name__)
+
+# Статусы, для которых срок еще имеет значение
+OPEN_STATUSES = ('pending', 'in_progress', 'waiting_parts')
+
+SLA_OK = 'ok'
+SLA_AT_RISK = 'at_risk'
+SLA_OVERDUE = 'overdue'
+
+DEFAULT_WORKING_HOURS = {weekday: ("09:00-18:00",) for weekday in range(5)}
+
+def _parse_time(value: str) -> int:
+    hours, minutes = value.strip().split(':')
+    seconds = int(hours) * 3600 + int(minutes) * 60
+    if not 0 <= seconds <= 86400:
+        raise ValueError(f"Некорректное время: {value}")
+    return seconds
+
+def _to_datetime(value: Union[str, datetime]) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+class BusinessCalendar:
+    """
+    Рабочий календарь: интервалы по дням недели и праздники
+
+    Args:
+        working_hours: {день недели (0 - понедельник): ["ЧЧ:ММ-ЧЧ:ММ", ...]}
+        holidays: Нерабочие даты (date или строки ГГГГ-ММ-ДД)
+    """
+
+    def __init__(self, working_hours: Dict[int, Iterable[str]], holidays: Iterable = ()):
+        self._intervals: List[List[tuple]] = [[] for _ in range(7)]
+        for weekday, spans in working_hours.items():
+            for span in spans:
+                start, end = (_parse_time(part) for part in span.split('-'))
+                if end <= start:
+                    raise ValueError(f"Пустой рабочий интервал: {span}")
+                self._intervals[int(weekday)].append((start, end))
+        for spans in self._intervals:
+            spans.sort()
+            for (_, previous_end), (start, _) in zip(spans, spans[1:]):
+                if start < previous_end:
+                    raise ValueError("Рабочие интервалы одного дня пересекаются")
+
+        self._day_seconds = [sum(end - start for start, end in spans) for spans in self._intervals]
+        self._week_seconds = sum(self._day_seconds)
+        if not self._week_seconds:
+            raise ValueError("В рабочем календаре нет рабочих часов")
+        # Суммы по дням недели до k-го (ordinal 1 - 0001-01-01 - понедельник)
+        self._week_prefix = [0, *accumulate(self._day_seconds)]
+        self._week_days = sum(1 for seconds in self._day_seconds if seconds)
+        self._days_prefix = [0, *accumulate(1 if seconds else 0 for seconds in self._day_seconds)]
+
+        # Праздники в выходные ничего не меняют
+        ordinals = {
+            (value if isinstance(value, date) else date.fromisoformat(str(value))).toordinal()
+            for value in holidays
+        }
+        self._holidays = sorted(o for o in ordinals if self._day_seconds[(o - 1) % 7])
+        self._holiday_seconds = [0, *accumulate(self._day_seconds[(o - 1) % 7] for o in self._holidays)]
+
+    @classmethod
+    def from_config(cls) -> 'BusinessCalendar':
+        return cls(getattr(config, 'SLA_WORKING_HOURS', DEFAULT_WORKING_HOURS),
+                   getattr(config, 'SLA_HOLIDAYS', ()))
+
+    def _is_holiday(self, ordinal: int) -> bool:
+        index = bisect_left(self._holidays, ordinal)
+        return index < len(self._holidays) and self._holidays[index] == ordinal
+
+    def _seconds_before(self, ordinal: int) -> int:
+        """Рабочие секунды во всех днях до ordinal"""
+        weeks, rest = divmod(ordinal - 1, 7)
+        lost = self._holiday_seconds[bisect_left(self._holidays, ordinal)]
+        return weeks * self._week_seconds + self._week_prefix[rest] - lost
+
+    def _position(self, moment: datetime) -> float:
+        """Рабочие секунды от начала оси до moment"""
+        ordinal = moment.toordinal()
+        position = self._seconds_before(ordinal)
+        if self._is_holiday(ordinal):
+            return position
+        offset = (moment.hour * 3600 + moment.minute * 60 + moment.second
+                  + moment.microsecond / 1_000_000)
+        for start, end in self._intervals[moment.weekday()]:
+            if offset <= start:
+                break
+            position += min(offset, end) - start
+        return position
+
+    def working_seconds(self, start: datetime, end: datetime) -> float:
+        """Рабочее время между моментами в секундах (0, если end раньше start)"""
+        return max(0.0, self._position(end) - self._position(start))
+
+    def working_days(self, start: Union[date, datetime], end: Union[date, datetime]) -> int:
+        """Число рабочих дней с start по end включительно"""
+        first, last = start.toordinal(), end.toordinal()
+        if first > last:
+            return 0
+        return self._days_before(last + 1) - self._days_before(first)
+
+    def _days_before(self, ordinal: int) -> int:
+        weeks, rest = divmod(ordinal - 1, 7)
+        return weeks * self._week_days + self._days_prefix[rest] - bisect_left(self._holidays, ordinal)
+
+    def is_working_time(self, moment: datetime) -> bool:
+        if self._is_holiday(moment.toordinal()):
+            return False
+        offset = moment.hour * 3600 + moment.minute * 60 + moment.second
+        return any(start <= offset < end for start, end in self._intervals[moment.weekday()])
+
+    def add_working_time(self, start: datetime, seconds: float) -> datetime:
+        """Момент, когда от start пройдет seconds рабочих секунд"""
+        if seconds <= 0:
+            return start
+        target = self._position(start) + seconds
+        # Ищется последний день, до начала которого набрано меньше target:
+        # срок наступает в один из его рабочих интервалов
+        low = start.toordinal()
+        step = 7 * (int(seconds // self._week_seconds) + 1)
+        high = low + step
+        while self._seconds_before(high) < target:
+            low, high = high, high + step
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self._seconds_before(middle) < target:
+                low = middle
+            else:
+                high = middle
+
+        remaining = target - self._seconds_before(low)
+        day = datetime.fromordinal(low)
+        spans = self._intervals[day.weekday()]
+        for interval_start, interval_end in spans[:-1]:
+            if remaining <= interval_end - interval_start:
+                break
+            remaining -= interval_end - interval_start
+        else:
+            # Последний интервал дня; min - от погрешности float
+            interval_start, interval_end = spans[-1]
+        return day + timedelta(seconds=min(interval_start + remaining, interval_end))
+
+@lru_cache(maxsize=1)
+def get_calendar() -> BusinessCalendar:
+    """Календарь из настроек; один на процесс"""
+    return BusinessCalendar.from_config()
+
+def due_date(created: Union[str, datetime], calendar: Optional[BusinessCalendar] = None) -> datetime:
+    """Срок выполнения заявки, созданной в created"""
+    hours = getattr(config, 'SLA_RESOLUTION_HOURS', 16)
+    return (calendar or get_calendar()).add_working_time(_to_datetime(created), hours * 3600)
+
+def ticket_state(ticket: dict, now: Optional[datetime] = None,
+                 calendar: Optional[BusinessCalendar] = None) -> Optional[str]:
+    """
+    Состояние срока заявки
+
+    Returns:
+        str: ok, at_risk (осталось меньше SLA_AT_RISK_HOURS рабочих часов),
+            overdue или None - у заявки нет срока или она закрыта
+    """
+    due = ticket.get('sla_due')
+    if not due or ticket.get('status') not in OPEN_STATUSES:
+        return None
+    due = _to_datetime(due)
+    now = now or datetime.now()
+    if due <= now:
+        return SLA_OVERDUE
+    at_risk = getattr(config, 'SLA_AT_RISK_HOURS', 4) * 3600
+    if (calendar or get_calendar()).working_seconds(now, due) < at_risk:
+        return SLA_AT_RISK
+    return SLA_OK
+
+def risk_key(ticket: dict):
+    """Ключ сортировки по риску: открытые заявки с ближайшим сроком первыми, затем остальные"""
+    due = ticket.get('sla_due')
+    if not due or ticket.get('status') not in OPEN_STATUSES:
+        return 1, ''
+    return 0, str(due)
+
+def fill_due_dates(db, recompute: bool = False, calendar: Optional[BusinessCalendar] = None) -> int:
+    """
+    Заполняет sla_due открытых заявок
+
+    Args:
+        recompute: Пересчитать все открытые заявки (после изменения календаря),
+            иначе только те, у которых срока нет (загрузка, вставки в обход приложения)
+
+    Returns:
+        int: Сколько заявок обновлено
+    """
+    calendar = calendar or get_calendar()
+    tickets = db.get_sla_candidates(missing_only=not recompute)
+    updated = db.set_sla_due([(ticket_id, due_date(created, calendar)) for ticket_id, created in tickets])
+    if updated:
+        logger.info("Пересчитаны сроки заявок: %s", updated)
+    return updated
+
+def escalate_priorities(db, now: Optional[datetime] = None,
+                        calendar: Optional[BusinessCalendar] = None) -> int:
+    """
+    Поднимает приоритет открытых заявок по сроку
+
+    Returns:
+        int: Сколько заявок изменено
+    """
+    calendar = calendar or get_calendar()
+    now = now or datetime.now()
+    # Под угрозой - меньше SLA_AT_RISK_HOURS рабочих часов до срока, то есть срок раньше этого момента
+    at_risk_before = calendar.add_working_time(now, getattr(config, 'SLA_AT_RISK_HOURS', 4) * 3600)
+    raised = db.raise_priority(PRIORITY_CRITICAL, now)
+    raised += db.raise_priority(PRIORITY_HIGH, at_risk_before)
+    if raised:
+        logger.info("Повышен приоритет заявок по сроку: %s", raised)
+    return raised
+
+class SlaEscalator:
+    """Фоновое повышение приоритета по сроку; одно на процесс (SessionManager)"""
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, interval: Optional[float] = None):
+        """Проверка сразу и затем раз в interval секунд (по умолчанию SLA_ESCALATION_INTERVAL; 0 - выключена)"""
+        interval = interval if interval is not None else getattr(config, 'SLA_ESCALATION_INTERVAL', 300)
+        with self._lock:
+            if not interval or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                            name='sla-escalation', daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval: float):
+        while True:
+            try:
+                escalate_priorities(self.db)
+            except Exception:
+                logger.exception("Ошибка повышения приоритета заявок")
+            time.sleep(interval)
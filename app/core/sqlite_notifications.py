@@ -0,0 +1,36 @@
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+class SQLiteNotificationManager:
+    """Менеджер уведомлений для SQLite с тем же интерфейсом, что и MySQLNotificationManager"""
+
+    def __init__(self, database):
+        self.database = database
+
+    def create_notification(self, user_id: int, title: str, message: str,
+                          notification_type: str, related_ticket_id: Optional[int] = None) -> bool:
+        """Создает новое уведомление"""
+        return self.database.create_notification(user_id, title, message, notification_type, related_ticket_id)
+
+    def create_notifications(self, notifications: List[dict]) -> int:
+        """Создает группу уведомлений одной вставкой"""
+        return self.database.create_notifications(notifications)
+
+    def get_user_notifications(self, user_id: int, unread_only: bool = False,
+                               limit: Optional[int] = None, before: Optional[int] = None) -> List[dict]:
+        """Получает уведомления пользователя (limit/before - постраничное чтение)"""
+        return self.database.get_user_notifications(user_id, unread_only, limit, before)
+
+    def mark_as_read(self, notification_id: int) -> bool:
+        """Помечает уведомление как прочитанное"""
+        return self.database.mark_notification_as_read(notification_id)
+
+    def mark_all_as_read(self, user_id: int) -> bool:
+        """Помечает все уведомления пользователя как прочитанные"""
+        return self.database.mark_all_notifications_as_read(user_id)
+
+    def get_unread_count(self, user_id: int) -> int:
+        """Получает количество непрочитанных уведомлений"""
+        return self.database.get_unread_notifications_count(user_id)
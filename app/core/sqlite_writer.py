@@ -0,0 +1,167 @@
+"""
+Единственный писатель SQLite
+
+SQLite допускает одну пишущую транзакцию на файл. Когда интерфейс,
+фоновые потоки панелей и рассылка уведомлений пишут каждый через свое
+соединение, они ждут блокировку друг друга и получают "database is
+locked". Здесь все изменения базы выполняет один поток со своим
+соединением: вызывающий код ставит функцию fn(cursor) в очередь и
+получает Future. Поток забирает из очереди все накопившиеся задания
+(до config.SQLITE_WRITER_MAX_BATCH) и выполняет их в одной транзакции,
+каждое внутри своей точки сохранения: ошибка одного задания откатывает
+только его. Результаты отдаются после COMMIT, поэтому после
+future.result() изменения уже видны читателям.
+
+База переводится в режим WAL: чтение из других соединений не ждет
+записи. Все соединения (connect) проверяют внешние ключи: комментарии и
+уведомления удаляются вместе с заявкой (ON DELETE CASCADE).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+import app.config as config
+from app.core.instrumentation import connect_sqlite
+from app.core.telemetry import counter, observe
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+def connect(path: str, **kwargs):
+    """Соединение с файлом базы с проверкой внешних ключей (SQLITE_FOREIGN_KEYS)"""
+    conn = connect_sqlite(path, **kwargs)
+    if getattr(config, 'SQLITE_FOREIGN_KEYS', True):
+        conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+class SQLiteWriter:
+    """Поток, владеющий единственным пишущим соединением с файлом базы"""
+
+    def __init__(self, path: str, max_batch: Optional[int] = None):
+        self.path = path
+        self.max_batch = max_batch or getattr(config, 'SQLITE_WRITER_MAX_BATCH', 64)
+        self._queue = queue.Queue()
+        # Соединение открывается здесь, чтобы ошибка открытия дошла до вызывающего кода
+        self._conn = self._open()
+        self._cursor = self._conn.cursor()
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """
+        Ставит fn(cursor) в очередь записи
+
+        Returns:
+            Future с результатом fn после фиксации транзакции. Вызов из
+            самого потока записи (fn внутри fn) выполняется сразу в
+            текущей транзакции.
+        """
+        future = Future()
+        if threading.current_thread() is self._thread:
+            try:
+                future.set_result(fn(self._cursor))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._queue.put((fn, future))
+        return future
+
+    def execute(self, fn: Callable[[Any], Any], timeout: Optional[float] = None):
+        """submit и ожидание результата"""
+        return self.submit(fn).result(timeout)
+
+    def stop(self, timeout: Optional[float] = 5):
+        """Выполняет уже поставленные задания и завершает поток"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _open(self):
+        conn = connect(self.path, timeout=getattr(config, 'SQLITE_BUSY_TIMEOUT', 30),
+                              isolation_level=None, check_same_thread=False)
+        if getattr(config, 'SQLITE_WAL', True):
+            conn.execute("PRAGMA journal_mode=WAL")
+            # В режиме WAL NORMAL сохраняет целостность и не делает fsync на каждую фиксацию
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [job for job in batch if job is not _STOP]
+            if batch:
+                self._commit_batch(batch)
+        self._conn.close()
+
+    def _commit_batch(self, batch):
+        """Выполняет задания одной транзакцией; каждое в своей точке сохранения"""
+        started = time.perf_counter()
+        cursor = self._cursor
+        results = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT job")
+                try:
+                    results.append((future, True, fn(cursor)))
+                    cursor.execute("RELEASE job")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO job")
+                    cursor.execute("RELEASE job")
+                    results.append((future, False, e))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            logger.error("Ошибка фиксации пакета записи SQLite (%s заданий): %s", len(batch), e)
+            if self._conn.in_transaction:
+                self._conn.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            counter('sqlite_writer_batches_total', result='failed')
+            return
+
+        for future, ok, value in results:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        counter('sqlite_writer_batches_total', result='ok')
+        observe('sqlite_writer_batch_size', len(batch))
+        observe('sqlite_writer_batch_ms', (time.perf_counter() - started) * 1000)
+
+_writers: Dict[str, SQLiteWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_writer(path: str) -> SQLiteWriter:
+    """Писатель для файла базы; один на файл в процессе"""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = SQLiteWriter(path)
+        return writer
+
+@atexit.register
+def stop_all():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop()
@@ -0,0 +1,452 @@
+"""
+Метрики и трассировка
+
+Спаны (telemetry.span / @traced) отмечают построение представлений,
+действия пользователя, запросы к базе и отправку уведомлений. Длительности
+спанов попадают в гистограммы, события считаются счетчиками. Накопленное
+выгружается в текстовом формате Prometheus и в OTLP JSON (формат
+OpenTelemetry) в локальные файлы и, если задан config.TELEMETRY_OTLP_ENDPOINT,
+на коллектор по HTTP. Когда config.TELEMETRY_ENABLED выключен, span()
+возвращает пустой контекст и ничего не копит.
+
+Здесь же настраивается журнал приложения (configure_logging): уровень
+берется из config.LOG_LEVEL, в каждую запись добавляется trace_id текущего
+спана, чтобы по журналу можно было найти медленный сценарий.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограмм длительности, мс
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+MAX_ATTRIBUTE_LENGTH = 300
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+class Span:
+    """Отрезок работы с атрибутами; вложенные спаны наследуют trace_id"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'error')
+
+    def __init__(self, name: str, parent: Optional['Span'] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+class Telemetry:
+    """Реестр метрик и буфер завершенных спанов процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._spans = deque(maxlen=getattr(config, 'TELEMETRY_MAX_SPANS', 10000))
+        self._exporter = None
+        self.started_ns = time.time_ns()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(config, 'TELEMETRY_ENABLED', False)
+
+    # Метрики
+
+    def counter(self, name: str, value: float = 1, **labels):
+        """Увеличивает счетчик name с метками labels"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Добавляет значение в гистограмму name"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    # Трассировка
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Контекст спана
+
+        Args:
+            name: Имя операции (view.build, ui.take_ticket, db.query, ...)
+            **attributes: Атрибуты спана; в метки гистограммы не попадают
+
+        Returns:
+            Span или None, если телеметрия выключена
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._finish(span)
+            _current_span.reset(token)
+
+    def traced(self, name: Optional[str] = None, **attributes):
+        """Декоратор: выполняет функцию внутри спана"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name, **attributes):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_span(self, name: str, duration_ms: float, **attributes):
+        """Записывает уже завершившийся спан (например, замеренный запрос к базе)"""
+        if not self.enabled:
+            return
+        span = Span(name, _current_span.get(), attributes)
+        span.end_ns = time.time_ns()
+        span.start_ns = span.end_ns - int(duration_ms * 1_000_000)
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        if span.end_ns is None:
+            span.end_ns = time.time_ns()
+        duration_ms = span.duration_ms
+        self.observe('span_duration_ms', duration_ms, span=span.name)
+        if span.error:
+            self.counter('span_errors_total', span=span.name)
+        with self._lock:
+            self._spans.append(span)
+        if duration_ms >= getattr(config, 'SLOW_SPAN_MS', 500) and not span.name.startswith('db.'):
+            logger.warning("Медленная операция %s: %.1f мс %s", span.name, duration_ms, span.attributes or '')
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace_id if span else None
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._spans.clear()
+            self.started_ns = time.time_ns()
+
+    # Экспорт
+
+    def prometheus_text(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: (list(h.counts), h.count, h.total, h.buckets)
+                                 for key, h in series.items()}
+                          for name, series in self._histograms.items()}
+
+        lines = []
+        for name in sorted(counters):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_prometheus_labels(key)} {_prometheus_number(value)}")
+        for name in sorted(histograms):
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, count, total, buckets) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else _prometheus_number(bound)
+                    lines.append(f"{name}_bucket{_prometheus_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_prometheus_labels(key)} {_prometheus_number(round(total, 3))}")
+                lines.append(f"{name}_count{_prometheus_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def drain_spans(self) -> list:
+        """Забирает завершенные спаны из буфера"""
+        with self._lock:
+            spans = list(self._spans)
+            self._spans.clear()
+        return spans
+
+    def otlp_traces(self, spans) -> dict:
+        """Спаны в формате ExportTraceServiceRequest (OTLP JSON)"""
+        return {
+            'resourceSpans': [{
+                'resource': _otlp_resource(),
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [_otlp_span(span) for span in spans]
+                }]
+            }]
+        }
+
+    def otlp_metrics(self) -> dict:
+        """Метрики в формате ExportMetricsServiceRequest (OTLP JSON), накопительные"""
+        now = str(time.time_ns())
+        start = str(self.started_ns)
+        metrics = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metrics.append({
+                    'name': name,
+                    'sum': {
+                        'aggregationTemporality': 2,
+                        'isMonotonic': True,
+                        'dataPoints': [{
+                            'attributes': _otlp_attributes(dict(key)),
+                            'startTimeUnixNano': start,
+                            'timeUnixNano': now,
+                            'asDouble': float(value)
+                        } for key, value in sorted(series.items())]
+                    }
+                })
+            for name, series in sorted(self._histograms.items()):
+                metrics.append({
+                    'name': name,
+                    'unit': 'ms',
+                    'histogram': {
+                        'aggregationTemporality': 2,
+                        'dataPoints': [{
+                            'attributes': _otlp_attributes(dict(key)),
+                            'startTimeUnixNano': start,
+                            'timeUnixNano': now,
+                            'count': str(histogram.count),
+                            'sum': histogram.total,
+                            'bucketCounts': [str(count) for count in histogram.counts],
+                            'explicitBounds': [bound for bound in histogram.buckets if bound != float('inf')]
+                        } for key, histogram in sorted(series.items())]
+                    }
+                })
+        return {
+            'resourceMetrics': [{
+                'resource': _otlp_resource(),
+                'scopeMetrics': [{'scope': {'name': __name__}, 'metrics': metrics}]
+            }]
+        }
+
+    def export(self):
+        """
+        Выгружает метрики и новые спаны
+
+        Prometheus-метрики перезаписывают config.TELEMETRY_PROMETHEUS_PATH,
+        OTLP JSON дописывается строкой в config.TELEMETRY_TRACES_PATH и
+        config.TELEMETRY_METRICS_PATH и отправляется на
+        config.TELEMETRY_OTLP_ENDPOINT (/v1/traces, /v1/metrics).
+
+        Returns:
+            int: Количество выгруженных спанов
+        """
+        spans = self.drain_spans()
+        traces = self.otlp_traces(spans) if spans else None
+        metrics = self.otlp_metrics()
+
+        prometheus_path = getattr(config, 'TELEMETRY_PROMETHEUS_PATH', None)
+        if prometheus_path:
+            _write(prometheus_path, self.prometheus_text(), mode='w')
+        traces_path = getattr(config, 'TELEMETRY_TRACES_PATH', None)
+        if traces_path and traces:
+            _write(traces_path, json.dumps(traces, ensure_ascii=False) + '\n', mode='a')
+        metrics_path = getattr(config, 'TELEMETRY_METRICS_PATH', None)
+        if metrics_path:
+            _write(metrics_path, json.dumps(metrics, ensure_ascii=False) + '\n', mode='a')
+
+        endpoint = getattr(config, 'TELEMETRY_OTLP_ENDPOINT', None)
+        if endpoint:
+            endpoint = endpoint.rstrip('/')
+            if traces:
+                _post(f"{endpoint}/v1/traces", traces)
+            _post(f"{endpoint}/v1/metrics", metrics)
+        return len(spans)
+
+    def start_exporter(self, interval: Optional[float] = None):
+        """Запускает фоновую периодическую выгрузку (один раз на процесс)"""
+        if not self.enabled or self._exporter is not None:
+            return
+        interval = interval if interval is not None else getattr(config, 'TELEMETRY_EXPORT_INTERVAL', 60)
+        if not interval or interval <= 0:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.export()
+                except Exception:
+                    logger.exception("Не удалось выгрузить телеметрию")
+
+        self._exporter = threading.Thread(target=loop, name='telemetry-exporter', daemon=True)
+        self._exporter.start()
+
+def _prometheus_labels(key: LabelKey) -> str:
+    if not key:
+        return ''
+    parts = []
+    for name, value in key:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+def _prometheus_number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)[:MAX_ATTRIBUTE_LENGTH]}
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{'key': str(key), 'value': _otlp_value(value)}
+            for key, value in attributes.items() if value is not None]
+
+def _otlp_resource() -> dict:
+    return {'attributes': _otlp_attributes({
+        'service.name': getattr(config, 'TELEMETRY_SERVICE_NAME', 'repair-system'),
+        'process.pid': os.getpid()
+    })}
+
+def _otlp_span(span: Span) -> dict:
+    data = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': _otlp_attributes(span.attributes),
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 0}
+    }
+    if span.parent_id:
+        data['parentSpanId'] = span.parent_id
+    return data
+
+def _write(path: str, text: str, mode: str):
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, mode, encoding='utf-8') as fp:
+            fp.write(text)
+    except OSError as e:
+        logger.warning("Не удалось записать телеметрию в %s: %s", path, e)
+
+def _post(url: str, payload: dict):
+    # urllib.request заметно удлиняет импорт, а нужен только при выгрузке на коллектор
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+    except (urllib.error.URLError, OSError) as e:
+        logger.warning("Коллектор телеметрии %s недоступен: %s", url, e)
+
+telemetry = Telemetry()
+span = telemetry.span
+traced = telemetry.traced
+counter = telemetry.counter
+observe = telemetry.observe
+
+@atexit.register
+def _export_on_exit():
+    if telemetry.enabled:
+        try:
+            telemetry.export()
+        except Exception:
+            pass
+
+# Журнал
+
+class _TraceIdFilter(logging.Filter):
+    """Добавляет в запись trace_id текущего спана"""
+
+    def filter(self, record):
+        record.trace_id = telemetry.current_trace_id() or '-'
+        return True
+
+def configure_logging(level: Optional[str] = None):
+    """Настраивает корневой журнал по config.LOG_LEVEL / config.LOG_FILE"""
+    level = (level or getattr(config, 'LOG_LEVEL', 'INFO')).upper()
+    log_file = getattr(config, 'LOG_FILE', None)
+    handler = logging.FileHandler(log_file, encoding='utf-8') if log_file else logging.StreamHandler()
+    handler.addFilter(_TraceIdFilter())
+    handler.setFormatter(logging.Formatter(
+        getattr(config, 'LOG_FORMAT', '%(asctime)s %(levelname)-7s %(name)s [%(trace_id)s] %(message)s')
+    ))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if getattr(existing, '_repair_system', False):
+            root.removeHandler(existing)
+    handler._repair_system = True
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level, logging.INFO))
@@ -0,0 +1,89 @@
+"""
+Генератор номеров заявок
+
+Номер строится из даты и значения общей последовательности
+(таблица ticket_sequence). Каждый процесс резервирует в базе блок
+значений одним коротким запросом и дальше выдает номера из памяти,
+поэтому номера не повторяются между экземплярами приложения, а создание
+заявки не требует проверки уникальности номера.
+"""
+
+import threading
+from datetime import datetime
+from typing import List
+
+import app.config as config
+from app.utils.helpers import generate_ticket_number
+
+SEQUENCE_NAME = 'tickets'
+DEFAULT_BLOCK_SIZE = 50
+
+class TicketNumberGenerator:
+    def __init__(self, db, block_size: int = None):
+        self.db = db
+        self.block_size = block_size or getattr(config, 'TICKET_NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+        self._lock = threading.Lock()
+        self._next_value = 0
+        self._block_end = 0
+
+    def next_number(self) -> str:
+        """Возвращает следующий номер заявки"""
+        with self._lock:
+            if self._next_value >= self._block_end:
+                self._next_value, self._block_end = self._reserve_block(self.block_size)
+            value = self._next_value
+            self._next_value += 1
+        return generate_ticket_number(value, date=datetime.now())
+
+    def allocate(self, count: int, cursor) -> List[str]:
+        """
+        Выделяет номера в транзакции вызывающего кода (cursor)
+
+        Значения не кэшируются: при откате транзакции они откатываются
+        вместе с заявками. Используется при массовой загрузке, когда
+        транзакция уже держит блокировку на запись.
+        """
+        if count <= 0:
+            return []
+        start = self._increment(cursor, count)
+        today = datetime.now()
+        return [generate_ticket_number(value, date=today) for value in range(start, start + count)]
+
+    def _reserve_block(self, size: int):
+        """Резервирует в базе блок значений [start, end)"""
+        if self.db.dialect == 'mysql':
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            try:
+                start = self._increment(cursor, size)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        else:
+            # Через поток записи: не ждет блокировку наравне с остальными писателями
+            start = self.db._write(lambda cursor: self._increment(cursor, size))
+        return start, start + size
+
+    def _increment(self, cursor, count: int) -> int:
+        """Сдвигает последовательность на count и возвращает первое выделенное значение"""
+        if self.db.dialect == 'mysql':
+            # LAST_INSERT_ID(expr) запоминает значение для текущего соединения
+            cursor.execute(
+                "UPDATE ticket_sequence SET next_value = LAST_INSERT_ID(next_value + %s) WHERE name = %s",
+                (count, SEQUENCE_NAME)
+            )
+            if cursor.rowcount == 0:
+                raise RuntimeError("Последовательность номеров заявок не инициализирована")
+            cursor.execute("SELECT LAST_INSERT_ID()")
+        else:
+            cursor.execute(
+                "UPDATE ticket_sequence SET next_value = next_value + ? WHERE name = ?",
+                (count, SEQUENCE_NAME)
+            )
+            if cursor.rowcount == 0:
+                raise RuntimeError("Последовательность номеров заявок не инициализирована")
+            cursor.execute("SELECT next_value FROM ticket_sequence WHERE name = ?", (SEQUENCE_NAME,))
+        return int(cursor.fetchone()[0]) - count
@@ -1,33 +1,83 @@
+import functools
+import logging
 import flet as ft
-from app.core.database_factory import create_database
-from app.core.auth import AuthManager
-from app.core.mysql_notifications import MySQLNotificationManager  # Добавьте этот импорт
-from app.core.notifications import NotificationService
-from app.ui.views.auth.login import LoginView
-from app.ui.views.auth.register import RegisterView
-from app.ui.views.dashboard.admin import AdminDashboardView
-from app.ui.views.dashboard.master import MasterDashboardView
-from app.ui.views.dashboard.client import ClientDashboardView
-from app.ui.views.tickets.create import TicketCreateView
-from app.ui.views.tickets.edit import TicketEditView
-from app.ui.views.tickets.view import TicketCommentsView
-from app.ui.views.shared.stats import StatsView
+from app.core.sessions import Session, SessionLimitError, get_session_manager
+from app.core.telemetry import configure_logging, telemetry, traced
+from app.ui.views import get_view_class, preload_views
 import app.config as config
 
+logger = logging.getLogger(__name__)
+
+def session_action(func):
+    """Учитывает вызов как действие пользователя в счетчиках сеанса"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.session.track(func.__name__):
+            return func(self, *args, **kwargs)
+    return wrapper
+
 class RepairSystemApp:
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, session: Session):
         self.page = page
         self.setup_page()
         
-        # Инициализация компонентов
-        self.db = create_database()
-        self.auth_manager = AuthManager(self.db)
-        
-        # Используем MySQL NotificationManager
-        self.notification_manager = MySQLNotificationManager(self.db)
-        self.notification_service = NotificationService(self.db, self.notification_manager)
+        # База, уведомления и шина событий общие для процесса; у страницы только сеанс
+        manager = session.manager
+        self.db = manager.db
+        self.notification_manager = manager.notification_manager
+        self.notification_service = manager.notification_service
+        self.dispatcher = manager.dispatcher
+        self._attach(session)
         
-        # Показываем экран входа при запуске
+        self.show_when_ready()
+    
+    def show_when_ready(self):
+        """Экран входа после подготовки схемы базы: на новой базе таблиц еще нет"""
+        manager = self.session.manager
+        if not manager.ready.is_set():
+            self._show_notice("Подготовка базы данных...")
+        if manager.wait_ready(preload_views):
+            self.show_login()
+        else:
+            self._show_notice("Не удалось подготовить базу данных", "Повторить", self.show_when_ready)
+    
+    def _attach(self, session: Session):
+        self.session = session
+        self.auth_manager = session.auth
+        session.on_close(self._session_closed)
+    
+    def _session_closed(self, reason: str):
+        """Сеанс закрыт менеджером (простой): предлагаем войти заново"""
+        if reason != 'idle':
+            return
+        try:
+            self._show_notice("Сеанс завершен из-за неактивности", "Войти снова", self._reopen)
+        except Exception:
+            logger.debug("Страница сеанса %s уже закрыта", self.session.id)
+    
+    def _show_notice(self, text: str, button: str = None, on_click=None):
+        """Сообщение вместо экрана (с кнопкой действия, если задана)"""
+        self.page.clean()
+        controls = [ft.Text(text, size=18)]
+        if button:
+            controls.append(ft.ElevatedButton(button, on_click=lambda _: on_click()))
+        self.page.add(ft.Column(controls))
+        self.page.update()
+    
+    def _on_activity(self):
+        """Действие на экране: сеанс не считается простаивающим"""
+        self.session.touch()
+    
+    def _reopen(self):
+        try:
+            self._attach(self.session.manager.open(self.page))
+        except SessionLimitError:
+            show_session_limit(self.page)
+            return
+        self.show_login()
+    
+    def logout(self):
+        self.auth_manager.logout()
         self.show_login()
     
     def setup_page(self):
@@ -40,10 +90,12 @@ class RepairSystemApp:
         self.page.window.min_width = config.APP_MIN_WIDTH
         self.page.window.min_height = config.APP_MIN_HEIGHT
     
+    @traced('view.show', view='login')
+    @session_action
     def show_login(self):
         """Показать экран входа"""
         self.page.clean()
-        login_view = LoginView(
+        login_view = get_view_class('login')(
             auth_manager=self.auth_manager,
             on_login_success=self.show_role_based_dashboard,
             on_show_register=self.show_register
@@ -51,10 +103,12 @@ class RepairSystemApp:
         self.page.add(login_view.build())
         self.page.update()
     
+    @traced('view.show', view='register')
+    @session_action
     def show_register(self):
         """Показать экран регистрации"""
         self.page.clean()
-        register_view = RegisterView(
+        register_view = get_view_class('register')(
             auth_manager=self.auth_manager,
             on_register_success=self.show_role_based_dashboard,
             on_show_login=self.show_login
@@ -73,69 +127,85 @@ class RepairSystemApp:
         else:
             self.show_client_dashboard()
     
+    @traced('view.show', view='admin')
+    @session_action
     def show_admin_dashboard(self):
         """Показать панель администратора"""
-        admin_view = AdminDashboardView(
+        admin_view = get_view_class('admin_dashboard')(
             auth_manager=self.auth_manager,
             db=self.db,
-            on_logout=self.show_login,
+            on_logout=self.logout,
             on_edit_ticket=self.show_edit_ticket,
             on_show_comments=self.show_ticket_comments,
             on_show_stats=self.show_stats,
-            notification_service=self.notification_service
+            notification_service=self.notification_service,
+            dispatcher=self.dispatcher,
+            on_activity=self._on_activity
         )
         self.page.add(admin_view.build(self.page))
         self.page.update()
 
+    @traced('view.show', view='master')
+    @session_action
     def show_master_dashboard(self):
         """Показать панель мастера"""
-        master_view = MasterDashboardView(
+        master_view = get_view_class('master_dashboard')(
             auth_manager=self.auth_manager,
             db=self.db,
-            on_logout=self.show_login,
+            on_logout=self.logout,
             on_edit_ticket=self.show_edit_ticket,
             on_show_comments=self.show_ticket_comments,
-            notification_service=self.notification_service
+            notification_service=self.notification_service,
+            on_activity=self._on_activity
         )
         self.page.add(master_view.build(self.page))
         self.page.update()
     
+    @traced('view.show', view='client')
+    @session_action
     def show_client_dashboard(self):
         """Показать панель клиента"""
-        dashboard_view = ClientDashboardView(
+        dashboard_view = get_view_class('client_dashboard')(
             auth_manager=self.auth_manager,
             db=self.db,
-            on_logout=self.show_login,
+            on_logout=self.logout,
             on_create_ticket=self.show_create_ticket,
             on_edit_ticket=self.show_edit_ticket,
             notification_manager=self.notification_manager,
-            notification_service=self.notification_service
+            notification_service=self.notification_service,
+            on_activity=self._on_activity
         )
         dashboard_content = dashboard_view.build(self.page)
         self.page.add(dashboard_content)
         self.page.update()
     
+    @traced('view.show', view='create_ticket')
+    @session_action
     def show_create_ticket(self):
         """Показать форму создания заявки"""
         self.page.clean()
-        ticket_view = TicketCreateView(
+        ticket_view = get_view_class('create_ticket')(
             db=self.db,
             current_user=self.auth_manager.current_user,
             on_back=self.show_role_based_dashboard,
             on_ticket_created=lambda: self.show_success_message("Заявка успешно создана!"),
-            notification_service=self.notification_service
+            notification_service=self.notification_service,
+            on_activity=self._on_activity
         )
         self.page.add(ticket_view.build())
         self.page.update()
     
+    @traced('view.show', view='ticket_comments')
+    @session_action
     def show_ticket_comments(self, ticket_id: int):
         """Показывает комментарии к заявке"""
         self.page.clean()
-        comments_view = TicketCommentsView(
+        comments_view = get_view_class('ticket_comments')(
             db=self.db,
             current_user=self.auth_manager.current_user,
             ticket_id=ticket_id,
-            on_back=self.show_role_based_dashboard
+            on_back=self.show_role_based_dashboard,
+            on_activity=self._on_activity
         )
         content = comments_view.build()
         
@@ -144,14 +214,17 @@ class RepairSystemApp:
         
         self.page.add(content)
         self.page.update()
-        print(f"Открыты комментарии для заявки {ticket_id}")
+        logger.debug("Открыты комментарии для заявки %s", ticket_id)
 
+    @traced('view.show', view='stats')
+    @session_action
     def show_stats(self):
         """Показывает статистику"""
         self.page.clean()
-        stats_view = StatsView(
+        stats_view = get_view_class('stats')(
             db=self.db,
-            on_back=self.show_role_based_dashboard
+            on_back=self.show_role_based_dashboard,
+            on_activity=self._on_activity
         )
         content = stats_view.build()
         
@@ -161,15 +234,18 @@ class RepairSystemApp:
         self.page.add(content)
         self.page.update()
 
+    @traced('view.show', view='edit_ticket')
+    @session_action
     def show_edit_ticket(self, ticket_id: int):
         """Показать форму редактирования заявки"""
         self.page.clean()
-        edit_view = TicketEditView(
+        edit_view = get_view_class('edit_ticket')(
             db=self.db,
             current_user=self.auth_manager.current_user,
             ticket_id=ticket_id,
             on_back=self.show_role_based_dashboard,
-            on_ticket_updated=lambda: self.show_success_message("Заявка успешно обновлена!")
+            on_ticket_updated=lambda: self.show_success_message("Заявка успешно обновлена!"),
+            on_activity=self._on_activity
         )
         self.page.add(edit_view.build())
         self.page.update()
@@ -183,5 +259,21 @@ class RepairSystemApp:
         self.page.snack_bar.open = True
         self.show_role_based_dashboard()
         
+def show_session_limit(page: ft.Page):
+    page.clean()
+    page.add(ft.Text("Сервер перегружен: открыто максимальное число сеансов. Попробуйте позже.", size=16))
+    page.update()
+
 def main(page: ft.Page):
-    app = RepairSystemApp(page)
\ No newline at end of file
+    configure_logging()
+    telemetry.start_exporter()
+    manager = get_session_manager()
+    try:
+        session = manager.open(page)
+    except SessionLimitError:
+        logger.warning("Отказано в новом сеансе: достигнут предел %s", manager.max_sessions)
+        show_session_limit(page)
+        return
+    
+    app = RepairSystemApp(page, session)
+    page.on_close = lambda _: manager.close(app.session.id, reason='page_closed')
@@ -1,41 +1,27 @@
-from .components.base import BaseComponent
-from .components.ticket_cards import create_ticket_card, create_admin_ticket_card
-from .components.forms import create_form_field
-from .components.navigation import create_nav_bar
-from .views.auth.login import LoginView
-from .views.auth.register import RegisterView
-from .views.dashboard.client import ClientDashboardView
-from .views.dashboard.admin import AdminDashboardView
-from .views.dashboard.master import MasterDashboardView
-from .views.tickets.create import TicketCreateView
-from .views.tickets.edit import TicketEditView
-from .views.tickets.view import TicketCommentsView
-from .views.tickets.comments import TicketCommentsComponent
-from .views.shared.notifications import NotificationsView
-from .views.shared.stats import StatsView
-from .themes.colors import AppColors
-from .themes.styles import get_button_style, get_card_style
-from .themes.icons import AppIcons
+from app._lazy import lazy_exports
 
-__all__ = [
-    'BaseComponent',
-    'create_ticket_card',
-    'create_admin_ticket_card', 
-    'create_form_field',
-    'create_nav_bar',
-    'LoginView',
-    'RegisterView',
-    'ClientDashboardView',
-    'AdminDashboardView',
-    'MasterDashboardView',
-    'TicketCreateView',
-    'TicketEditView',
-    'TicketCommentsView',
-    'TicketCommentsComponent',
-    'NotificationsView',
-    'StatsView',
-    'AppColors',
-    'get_button_style',
-    'get_card_style',
-    'AppIcons'
-]
\ No newline at end of file
+_EXPORTS = {
+    'BaseComponent': '.components.base',
+    'create_ticket_card': '.components.ticket_cards',
+    'create_admin_ticket_card': '.components.ticket_cards',
+    'create_form_field': '.components.forms',
+    'create_nav_bar': '.components.navigation',
+    'LoginView': '.views.auth.login',
+    'RegisterView': '.views.auth.register',
+    'ClientDashboardView': '.views.dashboard.client',
+    'AdminDashboardView': '.views.dashboard.admin',
+    'MasterDashboardView': '.views.dashboard.master',
+    'TicketCreateView': '.views.tickets.create',
+    'TicketEditView': '.views.tickets.edit',
+    'TicketCommentsView': '.views.tickets.view',
+    'TicketCommentsComponent': '.views.tickets.comments',
+    'NotificationsView': '.views.shared.notifications',
+    'StatsView': '.views.shared.stats',
+    'AppColors': '.themes.colors',
+    'get_button_style': '.themes.styles',
+    'get_card_style': '.themes.styles',
+    'AppIcons': '.themes.icons'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
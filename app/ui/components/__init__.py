@@ -1,16 +1,17 @@
-from .base import BaseComponent
-from .ticket_cards import create_ticket_card, create_admin_ticket_card, create_master_ticket_card
-from .forms import create_form_field, create_search_field, create_status_filter
-from .navigation import create_nav_bar, create_notification_button
+from app._lazy import lazy_exports
 
-__all__ = [
-    'BaseComponent',
-    'create_ticket_card',
-    'create_admin_ticket_card',
-    'create_master_ticket_card',
-    'create_form_field',
-    'create_search_field', 
-    'create_status_filter',
-    'create_nav_bar',
-    'create_notification_button'
-]
\ No newline at end of file
+_EXPORTS = {
+    'BaseComponent': '.base',
+    'user_action': '.base',
+    'create_ticket_card': '.ticket_cards',
+    'create_admin_ticket_card': '.ticket_cards',
+    'create_master_ticket_card': '.ticket_cards',
+    'create_form_field': '.forms',
+    'create_search_field': '.forms',
+    'create_status_filter': '.forms',
+    'create_nav_bar': '.navigation',
+    'create_notification_button': '.navigation'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
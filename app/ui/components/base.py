@@ -1,5 +1,15 @@
+import functools
 import flet as ft
 
+def user_action(handler):
+    """Отмечает вызов обработчика как действие пользователя (self.on_activity, если задан)"""
+    @functools.wraps(handler)
+    def wrapper(self, *args, **kwargs):
+        if self.on_activity:
+            self.on_activity()
+        return handler(self, *args, **kwargs)
+    return wrapper
+
 class BaseComponent:
     """Базовый класс для всех UI компонентов"""
     
@@ -20,32 +20,40 @@ def create_search_field(on_change=None, width: int = 400):
         width=width
     )
 
-def create_status_filter(on_change=None, width: int = 200):
-    """Создает фильтр по статусу"""
+def create_status_filter(on_change=None, width: int = 200, with_sla: bool = False):
+    """Создает фильтр по статусу (with_sla - еще заявки под угрозой просрочки)"""
+    options = [
+        ft.dropdown.Option("all", "Все заявки"),
+        ft.dropdown.Option("pending", "Ожидают"),
+        ft.dropdown.Option("in_progress", "В работе"),
+        ft.dropdown.Option("completed", "Завершены"),
+        ft.dropdown.Option("cancelled", "Отменены"),
+    ]
+    if with_sla:
+        options.append(ft.dropdown.Option("sla_risk", "Срок SLA под угрозой"))
     return ft.Dropdown(
         label="Фильтр по статусу",
         width=width,
-        options=[
-            ft.dropdown.Option("all", "Все заявки"),
-            ft.dropdown.Option("pending", "Ожидают"),
-            ft.dropdown.Option("in_progress", "В работе"),
-            ft.dropdown.Option("completed", "Завершены"),
-            ft.dropdown.Option("cancelled", "Отменены"),
-        ],
+        options=options,
         value="all",
         on_change=on_change
     )
 
-def create_date_filter(on_change=None, width: int = 200, label: str = "Сортировка по дате"):
-    """Создает фильтр по дате"""
+def create_date_filter(on_change=None, width: int = 200, label: str = "Сортировка по дате", with_sla: bool = False,
+                       value: str = "newest"):
+    """Создает фильтр по дате (with_sla - еще сортировка по приоритету и сроку SLA)"""
+    options = [
+        ft.dropdown.Option("newest", "Сначала новые"),
+        ft.dropdown.Option("oldest", "Сначала старые")
+    ]
+    if with_sla:
+        options.append(ft.dropdown.Option("priority", "Сначала срочные"))
+        options.append(ft.dropdown.Option("sla", "Ближе к сроку"))
     return ft.Dropdown(
         label=label,
         width=width,
-        options=[
-            ft.dropdown.Option("newest", "Сначала новые"),
-            ft.dropdown.Option("oldest", "Сначала старые")
-        ],
-        value="newest",
+        options=options,
+        value=value,
         on_change=on_change
     )
 
@@ -1,6 +1,8 @@
 import flet as ft
-from datetime import datetime
+from app.core import sla
+from app.core.models import PRIORITY_CRITICAL, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NAMES, PRIORITY_NORMAL
 from app.ui.themes.colors import AppColors
+from app.utils.formatters import format_date
 
 def create_ticket_card(ticket: dict, current_user: dict, on_edit=None, on_delete=None, on_comments=None):
     """Создает карточку заявки для клиента"""
@@ -76,7 +78,7 @@ def create_ticket_card(ticket: dict, current_user: dict, on_edit=None, on_delete
         ft.Text(ticket['title'], weight=ft.FontWeight.BOLD, size=14),
         ft.Text(ticket['description'], size=12),
         ft.Text(f"Клиент: {ticket['client_name']}", size=12),
-        ft.Text(f"Создана: {_format_date(ticket['created_date'])}", size=10),
+        ft.Text(f"Создана: {format_date(ticket['created_date'], 'datetime')}", size=10),
     ]
     
     if action_buttons:
@@ -93,8 +95,14 @@ def create_ticket_card(ticket: dict, current_user: dict, on_edit=None, on_delete
         elevation=2
     )
 
-def create_admin_ticket_card(ticket: dict, on_assign=None, on_status_change=None, on_edit=None, on_comments=None, on_delete=None):
-    """Создает карточку заявки для администратора"""
+def create_admin_ticket_card(ticket: dict, on_assign=None, on_status_change=None, on_edit=None, on_comments=None, on_delete=None,
+                             on_select=None, selected: bool = False, on_priority_change=None):
+    """
+    Создает карточку заявки для администратора
+
+    on_select(ticket, value) - флажок выбора для массовых действий,
+    on_priority_change(ticket, priority) - выбор приоритета
+    """
     status_colors = {
         'pending': AppColors.PENDING,
         'in_progress': AppColors.IN_PROGRESS, 
@@ -118,14 +126,22 @@ def create_admin_ticket_card(ticket: dict, on_assign=None, on_status_change=None
                 bgcolor=status_color,
                 padding=ft.padding.symmetric(horizontal=8, vertical=4),
                 border_radius=ft.border_radius.all(6)
-            )
+            ),
+            _priority_badge(ticket)
         ]),
         ft.Text(ticket['title'], weight=ft.FontWeight.BOLD, size=14),
         ft.Text(ticket['description'], size=12),
         ft.Text(f"Клиент: {ticket['client_name']}", size=12),
         ft.Text(f"Мастер: {ticket.get('master_name', 'Не назначен')}", size=12),
-        ft.Text(f"Создана: {_format_date(ticket['created_date'])}", size=10),
+        ft.Text(f"Создана: {format_date(ticket['created_date'], 'datetime')}", size=10),
     ]
+    _append_sla_text(card_content, ticket)
+    
+    if on_select:
+        card_content[0].controls.insert(0, ft.Checkbox(
+            value=selected,
+            on_change=lambda e, t=ticket: on_select(t, e.control.value)
+        ))
     
     # Создаем кнопки управления для администратора
     action_rows = []
@@ -166,6 +182,16 @@ def create_admin_ticket_card(ticket: dict, on_assign=None, on_status_change=None
         )
         first_row_buttons.append(status_dropdown)
     
+    # Выпадающий список приоритета
+    if on_priority_change:
+        first_row_buttons.append(ft.Dropdown(
+            label="Приоритет",
+            width=150,
+            options=[ft.dropdown.Option(str(value), name) for value, name in PRIORITY_NAMES.items()],
+            value=str(ticket.get('priority', PRIORITY_NORMAL)),
+            on_change=lambda e, t=ticket: on_priority_change(t, int(e.control.value))
+        ))
+    
     if first_row_buttons:
         action_rows.append(ft.Row(first_row_buttons, spacing=10))
     
@@ -224,7 +250,7 @@ def create_admin_ticket_card(ticket: dict, on_assign=None, on_status_change=None
     )
 
 def create_master_ticket_card(ticket: dict, on_take=None, on_status_change=None, on_edit=None, on_comments=None, show_client_phone=True):
-    """Создает карточку заявки для мастера"""
+    """Создает карточку заявки для мастера (контакты клиента приходят в самой заявке: client_phone, client_email)"""
     status_colors = {
         'pending': AppColors.PENDING,
         'in_progress': AppColors.IN_PROGRESS,
@@ -248,13 +274,20 @@ def create_master_ticket_card(ticket: dict, on_take=None, on_status_change=None,
                 bgcolor=status_color,
                 padding=ft.padding.symmetric(horizontal=8, vertical=4),
                 border_radius=ft.border_radius.all(6)
-            )
+            ),
+            _priority_badge(ticket)
         ]),
         ft.Text(ticket['title'], weight=ft.FontWeight.BOLD, size=14),
         ft.Text(ticket['description'], size=12),
         ft.Text(f"Клиент: {ticket['client_name']}", size=12),
-        ft.Text(f"Создана: {_format_date(ticket['created_date'])}", size=10),
+        ft.Text(f"Создана: {format_date(ticket['created_date'], 'datetime')}", size=10),
     ]
+    if show_client_phone:
+        contacts = f"📞 {ticket.get('client_phone') or 'Не указан'}"
+        if ticket.get('client_email'):
+            contacts += f"  ✉️ {ticket['client_email']}"
+        card_content.insert(4, ft.Text(contacts, size=12))
+    _append_sla_text(card_content, ticket)
     
     # Добавляем кнопки управления статусом
     status_controls = []
@@ -330,6 +363,43 @@ def create_master_ticket_card(ticket: dict, on_take=None, on_status_change=None,
         elevation=2
     )
 
+def _priority_badge(ticket: dict) -> ft.Container:
+    """Метка приоритета заявки"""
+    priority = ticket.get('priority', PRIORITY_NORMAL)
+    priority_colors = {
+        PRIORITY_LOW: AppColors.LOW,
+        PRIORITY_NORMAL: AppColors.GREY,
+        PRIORITY_HIGH: AppColors.HIGH,
+        PRIORITY_CRITICAL: AppColors.CRITICAL
+    }
+    return ft.Container(
+        content=ft.Text(
+            PRIORITY_NAMES.get(priority, str(priority)).upper(),
+            color=ft.Colors.WHITE,
+            size=10,
+            weight=ft.FontWeight.BOLD
+        ),
+        bgcolor=priority_colors.get(priority, AppColors.GREY),
+        padding=ft.padding.symmetric(horizontal=8, vertical=4),
+        border_radius=ft.border_radius.all(6)
+    )
+
+def _append_sla_text(card_content: list, ticket: dict):
+    """Добавляет срок SLA открытой заявки с цветом по риску просрочки"""
+    state = sla.ticket_state(ticket)
+    if state is None:
+        return
+    labels = {
+        sla.SLA_OK: ("", AppColors.GREY_DARK),
+        sla.SLA_AT_RISK: (" (скоро срок)", AppColors.WARNING),
+        sla.SLA_OVERDUE: (" (просрочена)", AppColors.ERROR)
+    }
+    suffix, color = labels[state]
+    card_content.append(
+        ft.Text(f"⏰ Срок: {format_date(ticket['sla_due'], 'datetime')}{suffix}", size=10, color=color,
+                weight=ft.FontWeight.BOLD if state != sla.SLA_OK else None)
+    )
+
 def _get_status_text(status: str) -> str:
     """Возвращает читаемый текст статуса"""
     status_texts = {
@@ -338,12 +408,4 @@ def _get_status_text(status: str) -> str:
         'completed': 'ЗАВЕРШЕНА',
         'cancelled': 'ОТМЕНЕНА'
     }
-    return status_texts.get(status, status.upper())
-
-def _format_date(date_string: str) -> str:
-    """Форматирует дату в читаемый вид"""
-    try:
-        dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-        return dt.strftime("%d.%m.%Y %H:%M")
-    except:
-        return date_string[:16].replace('T', ' ')
\ No newline at end of file
+    return status_texts.get(status, status.upper())
\ No newline at end of file
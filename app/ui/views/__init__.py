@@ -1 +1,26 @@
-# Этот файл инициализирует пакет views и его подпакеты
\ No newline at end of file
+# Этот файл инициализирует пакет views и его подпакеты
+
+import importlib
+
+# Экран -> (модуль, класс). Модуль импортируется при первом показе экрана
+VIEW_REGISTRY = {
+    'login': ('app.ui.views.auth.login', 'LoginView'),
+    'register': ('app.ui.views.auth.register', 'RegisterView'),
+    'admin_dashboard': ('app.ui.views.dashboard.admin', 'AdminDashboardView'),
+    'master_dashboard': ('app.ui.views.dashboard.master', 'MasterDashboardView'),
+    'client_dashboard': ('app.ui.views.dashboard.client', 'ClientDashboardView'),
+    'create_ticket': ('app.ui.views.tickets.create', 'TicketCreateView'),
+    'edit_ticket': ('app.ui.views.tickets.edit', 'TicketEditView'),
+    'ticket_comments': ('app.ui.views.tickets.view', 'TicketCommentsView'),
+    'stats': ('app.ui.views.shared.stats', 'StatsView'),
+}
+
+def get_view_class(name: str):
+    """Возвращает класс экрана по имени из VIEW_REGISTRY"""
+    module_name, class_name = VIEW_REGISTRY[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+def preload_views(names=None):
+    """Импортирует модули экранов заранее (например, в фоне после показа входа)"""
+    for name in names or VIEW_REGISTRY:
+        importlib.import_module(VIEW_REGISTRY[name][0])
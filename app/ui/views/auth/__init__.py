@@ -1,7 +1,9 @@
-from .login import LoginView
-from .register import RegisterView
+from app._lazy import lazy_exports
 
-__all__ = [
-    'LoginView',
-    'RegisterView'
-]
\ No newline at end of file
+_EXPORTS = {
+    'LoginView': '.login',
+    'RegisterView': '.register'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
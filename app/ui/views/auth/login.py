@@ -27,11 +27,24 @@ class LoginView(BaseComponent):
             self.error_text.update()
             return
         
-        if self.auth_manager.login(self.username_field.value, self.password_field.value):
+        self.error_text.value = ""
+        self.error_text.update()
+        self.login_button.disabled = True
+        self.login_button.update()
+        self.auth_manager.login_async(
+            self.username_field.value,
+            self.password_field.value,
+            self._login_done
+        )
+    
+    def _login_done(self, success: bool):
+        if success:
             self.on_login_success()
-        else:
-            self.error_text.value = "Неверное имя пользователя или пароль"
-            self.error_text.update()
+            return
+        self.login_button.disabled = False
+        self.login_button.update()
+        self.error_text.value = "Неверное имя пользователя или пароль"
+        self.error_text.update()
     
     def build(self):
         return ft.Container(
@@ -45,14 +45,24 @@ class RegisterView(BaseComponent):
             self.error_text.update()
             return
         
-        # Регистрация
-        if self.auth_manager.register(
+        # Регистрация (хеширование пароля выполняется в фоне)
+        self.error_text.value = ""
+        self.error_text.update()
+        self.register_button.disabled = True
+        self.register_button.update()
+        self.auth_manager.register_async(
             self.username_field.value,
             self.password_field.value,
             self.full_name_field.value,
             self.email_field.value,
-            self.phone_field.value
-        ):
+            self.phone_field.value,
+            self._register_done
+        )
+    
+    def _register_done(self, success: bool):
+        self.register_button.disabled = False
+        self.register_button.update()
+        if success:
             self.success_text.value = "Регистрация успешна! Теперь войдите в систему."
             self.success_text.update()
             # Автоматически переходим к входу через 2 секунды
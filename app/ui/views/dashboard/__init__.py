@@ -1,9 +1,10 @@
-from .admin import AdminDashboardView
-from .master import MasterDashboardView
-from .client import ClientDashboardView
+from app._lazy import lazy_exports
 
-__all__ = [
-    'AdminDashboardView',
-    'MasterDashboardView', 
-    'ClientDashboardView'
-]
\ No newline at end of file
+_EXPORTS = {
+    'AdminDashboardView': '.admin',
+    'MasterDashboardView': '.master',
+    'ClientDashboardView': '.client'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
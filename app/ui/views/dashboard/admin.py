@@ -1,19 +1,28 @@
 # app/ui/views/dashboard/admin.py
 
+import logging
 import flet as ft
 import sqlite3
 import threading
 import time
+from datetime import datetime
+from app.core import sla
+from app.core.models import PRIORITY_NAMES
 from app.core.database import Database
 from app.core.auth import AuthManager
+from app.core.telemetry import traced
+from app.ui.components.base import user_action
 from app.ui.components.navigation import create_nav_bar, create_notification_button, create_logout_button, create_stats_button
 from app.ui.components.forms import create_search_field, create_status_filter, create_date_filter
 from app.ui.components.ticket_cards import create_admin_ticket_card
 from app.ui.views.shared.notifications import NotificationsView
 from app.ui.themes.colors import AppColors
 
+logger = logging.getLogger(__name__)
+
 class AdminDashboardView:
-    def __init__(self, auth_manager, db: Database, on_logout, on_edit_ticket=None, on_show_comments=None, on_show_stats=None, notification_service=None):
+    def __init__(self, auth_manager, db: Database, on_logout, on_edit_ticket=None, on_show_comments=None, on_show_stats=None, notification_service=None, dispatcher=None,
+                 on_activity=None):
         self.auth_manager = auth_manager
         self.db = db
         self.on_logout = on_logout
@@ -21,6 +30,10 @@ class AdminDashboardView:
         self.on_show_comments = on_show_comments
         self.on_show_stats = on_show_stats
         self.notification_service = notification_service
+        # Распределитель заявок процесса (app/core/dispatch.py)
+        self.dispatcher = dispatcher
+        # Отметка активности сеанса (app/core/sessions.py) из обработчиков действий
+        self.on_activity = on_activity
         self.page = None
         
         # Добавляем инициализацию кнопки уведомлений
@@ -28,8 +41,43 @@ class AdminDashboardView:
         
         self.tickets_column = ft.Column(scroll=ft.ScrollMode.AUTO)
         self.search_field = create_search_field(on_change=self._on_search, width=400)
-        self.status_filter = create_status_filter(on_change=self._on_filter_change, width=200)
-        self.date_filter = create_date_filter(on_change=self._on_date_filter_change, width=200)
+        self.status_filter = create_status_filter(on_change=self._on_filter_change, width=200, with_sla=True)
+        self.date_filter = create_date_filter(on_change=self._on_date_filter_change, width=200, with_sla=True,
+                                              value="priority")
+        
+        # Выбранные заявки для массовых действий
+        self._selected_ids = set()
+        self._visible_tickets = []
+        self.selection_text = ft.Text("", size=14, weight=ft.FontWeight.BOLD)
+        self.bulk_status = ft.Dropdown(
+            label="Статус для выбранных",
+            width=200,
+            options=[
+                ft.dropdown.Option("pending", "Ожидание"),
+                ft.dropdown.Option("in_progress", "В работе"),
+                ft.dropdown.Option("completed", "Завершена"),
+                ft.dropdown.Option("cancelled", "Отменена")
+            ],
+            on_change=self._bulk_status_change
+        )
+        self.bulk_bar = ft.Container(
+            content=ft.Row([
+                self.selection_text,
+                ft.TextButton("Выбрать все на экране", on_click=self._select_visible),
+                ft.TextButton("Снять выбор", on_click=self._clear_selection),
+                self.bulk_status,
+                ft.ElevatedButton("Назначить мастера", on_click=self._show_bulk_assign),
+                ft.ElevatedButton(
+                    "Удалить",
+                    style=ft.ButtonStyle(color=AppColors.WHITE, bgcolor=AppColors.ERROR),
+                    on_click=self._confirm_bulk_delete
+                ),
+            ], spacing=10, wrap=True),
+            bgcolor=AppColors.GREY_LIGHT,
+            padding=10,
+            border_radius=8,
+            visible=False
+        )
 
         # Сразу загружаем данные
         self._tickets_data = self._get_tickets_data()
@@ -39,8 +87,9 @@ class AdminDashboardView:
         if hasattr(self, 'on_show_stats') and self.on_show_stats:
             self.on_show_stats()
         else:
-            print("Would show stats")
+            logger.debug("Would show stats")
 
+    @user_action
     def _on_date_filter_change(self, e):
         """Обработчик изменения фильтра по дате"""
         self._load_tickets(self.status_filter.value, self.search_field.value)
@@ -50,7 +99,7 @@ class AdminDashboardView:
         if hasattr(self, 'on_show_comments') and self.on_show_comments:
             self.on_show_comments(ticket['id'])
         else:
-            print(f"Would show comments for ticket {ticket['id']}")
+            logger.debug("Would show comments for ticket %s", ticket['id'])
 
     def _update_notification_button(self, unread_count=None):
         """Обновляет кнопку уведомлений с актуальным счетчиком"""
@@ -62,7 +111,7 @@ class AdminDashboardView:
             else:
                 unread_count = 0
         
-        print(f"Обновление кнопки уведомлений (admin/master): {unread_count} непрочитанных")
+        logger.debug("Обновление кнопки уведомлений (admin/master): %s непрочитанных", unread_count)
         
         # Сохраняем старую кнопку для замены
         old_button = self.notification_button
@@ -88,7 +137,7 @@ class AdminDashboardView:
                     if child == old_button:
                         # Нашли старую кнопку - заменяем на новую
                         control.controls[i] = new_button
-                        print("Кнопка уведомлений заменена в навигационной панели!")
+                        logger.debug("Кнопка уведомлений заменена в навигационной панели!")
                         return True
                     elif find_and_replace(child):
                         return True
@@ -101,6 +150,7 @@ class AdminDashboardView:
         """Получаем данные о заявках без обновления UI"""
         return self.db.get_all_tickets()
     
+    @traced('view.load_tickets')
     def _load_tickets(self, status_filter="all", search_query=None):
         """Загружает заявки в колонку"""
         self.tickets_column.controls.clear()
@@ -108,7 +158,11 @@ class AdminDashboardView:
         tickets = self._tickets_data
         
         # Фильтрация по статусу
-        if status_filter != "all":
+        if status_filter == "sla_risk":
+            now = datetime.now()
+            risky = (sla.SLA_AT_RISK, sla.SLA_OVERDUE)
+            tickets = [t for t in tickets if sla.ticket_state(t, now) in risky]
+        elif status_filter != "all":
             tickets = [t for t in tickets if t['status'] == status_filter]
         
         # Фильтрация по поисковому запросу
@@ -122,10 +176,18 @@ class AdminDashboardView:
         # Сортировка по дате
         if hasattr(self, 'date_filter') and self.date_filter.value == "oldest":
             tickets.sort(key=lambda x: x['created_date'])
+        elif hasattr(self, 'date_filter') and self.date_filter.value == "priority":
+            # Как очереди в базе: срочные первыми, при равном приоритете - старые
+            tickets.sort(key=lambda x: (-x['priority'], x['created_date']))
+        elif hasattr(self, 'date_filter') and self.date_filter.value == "sla":
+            # Срок хранится в заявке, поэтому сортировка без расчетов по календарю
+            tickets.sort(key=sla.risk_key)
         else:
             # По умолчанию - сначала новые
             tickets.sort(key=lambda x: x['created_date'], reverse=True)
         
+        self._visible_tickets = tickets
+        
         if not tickets:
             self.tickets_column.controls.append(
                 ft.Text("Заявки не найдены", size=16, color="grey")
@@ -138,7 +200,10 @@ class AdminDashboardView:
                     on_status_change=self._update_ticket_status,
                     on_edit=self._edit_ticket,
                     on_comments=self._show_comments,
-                    on_delete=self._delete_ticket
+                    on_delete=self._delete_ticket,
+                    on_select=self._on_select,
+                    selected=ticket['id'] in self._selected_ids,
+                    on_priority_change=self._update_ticket_priority
                 )
                 self.tickets_column.controls.append(card)
         
@@ -146,30 +211,36 @@ class AdminDashboardView:
         if self.page:
             self.tickets_column.update()
     
+    @traced('ui.search')
+    @user_action
     def _on_search(self, e):
         """Обработчик поиска"""
         self._load_tickets(self.status_filter.value, e.control.value)
     
+    @user_action
     def _on_filter_change(self, e):
         """Обработчик изменения фильтра"""
         self._load_tickets(e.control.value, self.search_field.value)
     
+    @traced('ui.open_notifications')
+    @user_action
     def _show_notifications(self, e):
         """Показывает уведомления во всплывающем окне"""
-        print("Кнопка уведомлений нажата!")
+        logger.debug("Кнопка уведомлений нажата!")
         
         if hasattr(self, 'notification_service') and self.notification_service and self.page:
-            print("Создаем всплывающее окно...")
+            logger.debug("Создаем всплывающее окно...")
             
             notifications_view = NotificationsView(
                 self.notification_service.notification_manager, 
                 self.auth_manager.current_user['id'],
                 on_ticket_click=self._highlight_ticket,
-                on_notifications_update=self._update_notification_button
+                on_notifications_update=self._update_notification_button,
+                on_activity=self.on_activity
             )
             
             def close_popup(e=None):
-                print("Закрытие всплывающего окна")
+                logger.debug("Закрытие всплывающего окна")
                 # Убираем overlay со страницы
                 if hasattr(self, '_notifications_overlay'):
                     self.page.overlay.remove(self._notifications_overlay)
@@ -230,11 +301,10 @@ class AdminDashboardView:
             # Добавляем overlay на страницу
             self.page.overlay.append(self._notifications_overlay)
             self.page.update()
-            print("Всплывающее окно открыто!")
+            logger.debug("Всплывающее окно открыто!")
         else:
-            print("Условия не выполнены:")
-            print(f"notification_service: {hasattr(self, 'notification_service')}")
-            print(f"page: {self.page}")
+            logger.warning("Всплывающее окно не открыто: notification_service=%s, page=%s",
+                           hasattr(self, 'notification_service'), self.page)
     
     def _highlight_ticket(self, ticket_id: int):
         """Подсвечивает заявку в списке"""
@@ -249,21 +319,43 @@ class AdminDashboardView:
         self.page.snack_bar.open = True
         self.page.update()
         
-        print(f"Переход к заявке {ticket_id}")
+        logger.debug("Переход к заявке %s", ticket_id)
     
     def _edit_ticket(self, ticket: dict):
         """Редактирует заявку (для администратора)"""
         if hasattr(self, 'on_edit_ticket') and self.on_edit_ticket:
             self.on_edit_ticket(ticket['id'])
         else:
-            print(f"Would edit ticket {ticket['id']}")
+            logger.debug("Would edit ticket %s", ticket['id'])
 
+    def _get_masters(self):
+        """Мастера для назначения"""
+        if self.dispatcher:
+            # Загрузка мастеров хранится у распределителя: без запроса на каждое открытие
+            return self.dispatcher.workloads()
+        return self.db.get_masters()
+    
+    def _create_master_dropdown(self, masters):
+        return ft.Dropdown(
+            label="Выберите мастера",
+            options=[
+                ft.dropdown.Option(
+                    str(m['id']),
+                    f"{m['full_name']} (в работе: {m['open_tickets']})" if 'open_tickets' in m else m['full_name']
+                )
+                for m in masters
+            ],
+            width=400
+        )
+    
+    @traced('ui.open_assign_dialog')
+    @user_action
     def _show_assign_dialog(self, ticket: dict):
         """Показывает диалог назначения мастера через BottomSheet"""
-        print(f"Открытие диалога назначения мастера для заявки {ticket['id']}")
+        logger.debug("Открытие диалога назначения мастера для заявки %s", ticket['id'])
         
-        masters = self.db.get_masters()
-        print(f"Available masters: {masters}")
+        masters = self._get_masters()
+        logger.debug("Available masters: %s", masters)
         
         if not masters:
             self.page.snack_bar = ft.SnackBar(
@@ -275,12 +367,9 @@ class AdminDashboardView:
             return
         
         # Создаем выпадающий список с мастерами
-        master_dropdown = ft.Dropdown(
-            label="Выберите мастера",
-            options=[ft.dropdown.Option(str(m['id']), m['full_name']) for m in masters],
-            width=400
-        )
+        master_dropdown = self._create_master_dropdown(masters)
 
+        @traced('ui.assign_master')
         def assign_ticket(e):
             if not master_dropdown.value:
                 self.page.snack_bar = ft.SnackBar(
@@ -292,18 +381,23 @@ class AdminDashboardView:
                 return
                 
             master_id = int(master_dropdown.value)
-            print(f"Назначение мастера {master_id} для заявки {ticket['id']}")
+            logger.info("Назначение мастера %s для заявки %s", master_id, ticket['id'])
             
             if hasattr(self, 'notification_service') and self.notification_service:
-                success = self.db.assign_ticket_to_master_with_notification(
-                    ticket['id'], master_id, self.notification_service
+                result = self.db.assign_ticket_to_master_with_notification(
+                    ticket['id'], master_id, self.notification_service,
+                    expected_version=ticket.get('version')
                 )
             else:
-                success = self.db.assign_ticket_to_master(ticket['id'], master_id)
+                result = self.db.assign_ticket_to_master(
+                    ticket['id'], master_id, expected_version=ticket.get('version')
+                )
             
-            print(f"Результат назначения: {success}")
+            logger.info("Результат назначения: %s", result.status)
             
-            if success:
+            if result.conflict:
+                self._show_conflict()
+            elif result:
                 self.page.snack_bar = ft.SnackBar(
                     content=ft.Text("Мастер успешно назначен!"),
                     bgcolor=AppColors.SUCCESS
@@ -355,14 +449,16 @@ class AdminDashboardView:
         
         self.page.overlay.append(bottom_sheet)
         self.page.update()
-        print("BottomSheet для назначения мастера открыт")
+        logger.debug("BottomSheet для назначения мастера открыт")
     
+    @traced('ui.update_status')
+    @user_action
     def _update_ticket_status(self, ticket: dict, new_status: str):
         """Обновляет статус заявки с проверкой"""
         if not self.page:
             return
         
-        print(f"Обновление статуса заявки {ticket['id']} на {new_status}")
+        logger.info("Обновление статуса заявки %s на %s", ticket['id'], new_status)
         
         # Проверяем есть ли назначенный мастер для определенных статусов
         if new_status in ['in_progress', 'completed'] and not ticket.get('assigned_master_id'):
@@ -376,13 +472,18 @@ class AdminDashboardView:
         
         # Если проверка пройдена - обновляем статус
         if hasattr(self, 'notification_service') and self.notification_service:
-            success = self.db.update_ticket_status_with_notification(
-                ticket['id'], new_status, self.notification_service
+            result = self.db.update_ticket_status_with_notification(
+                ticket['id'], new_status, self.notification_service,
+                expected_version=ticket.get('version')
             )
         else:
-            success = self.db.update_ticket_status(ticket['id'], new_status)
+            result = self.db.update_ticket_status(
+                ticket['id'], new_status, expected_version=ticket.get('version')
+            )
         
-        if success:
+        if result.conflict:
+            self._show_conflict()
+        elif result:
             status_text = self._get_status_text(new_status)
             self.page.snack_bar = ft.SnackBar(
                 content=ft.Text(f"✅ Статус заявки изменен на: {status_text}"),
@@ -401,6 +502,47 @@ class AdminDashboardView:
         
         self.page.update()
     
+    @traced('ui.update_priority')
+    @user_action
+    def _update_ticket_priority(self, ticket: dict, priority: int):
+        """Задает приоритет заявки вручную"""
+        if not self.page:
+            return
+        
+        result = self.db.update_ticket_priority(ticket['id'], priority, expected_version=ticket.get('version'))
+        
+        if result.conflict:
+            self._show_conflict()
+        elif result:
+            self.page.snack_bar = ft.SnackBar(
+                content=ft.Text(f"✅ Приоритет заявки: {PRIORITY_NAMES.get(priority, priority)}"),
+                bgcolor="#4CAF50"
+            )
+            self.page.snack_bar.open = True
+            
+            self._tickets_data = self._get_tickets_data()
+            self._load_tickets(self.status_filter.value, self.search_field.value)
+        else:
+            self.page.snack_bar = ft.SnackBar(
+                content=ft.Text("❌ Ошибка при изменении приоритета"),
+                bgcolor="#F44336"
+            )
+            self.page.snack_bar.open = True
+        
+        self.page.update()
+    
+    def _show_conflict(self):
+        """Заявку изменили после загрузки списка: перечитываем список вместо перезаписи"""
+        self.page.snack_bar = ft.SnackBar(
+            content=ft.Text("⚠️ Заявку уже изменил другой пользователь. Список обновлен, повторите действие"),
+            bgcolor=AppColors.WARNING
+        )
+        self.page.snack_bar.open = True
+        self._tickets_data = self._get_tickets_data()
+        self._load_tickets(self.status_filter.value, self.search_field.value)
+    
+    @traced('ui.delete_ticket')
+    @user_action
     def _delete_ticket(self, ticket: dict):
         """Удаляет заявку"""
         if not self.page:
@@ -430,6 +572,226 @@ class AdminDashboardView:
         
         self.page.update()
     
+    # МАССОВЫЕ ДЕЙСТВИЯ
+    @user_action
+    def _on_select(self, ticket: dict, selected: bool):
+        """Флажок на карточке: меняется только панель массовых действий"""
+        if selected:
+            self._selected_ids.add(ticket['id'])
+        else:
+            self._selected_ids.discard(ticket['id'])
+        self._update_bulk_bar()
+    
+    def _update_bulk_bar(self):
+        self.selection_text.value = f"Выбрано: {len(self._selected_ids)}"
+        self.bulk_bar.visible = bool(self._selected_ids)
+        if self.page:
+            self.bulk_bar.update()
+    
+    @user_action
+    def _select_visible(self, e=None):
+        self._selected_ids.update(ticket['id'] for ticket in self._visible_tickets)
+        self._load_tickets(self.status_filter.value, self.search_field.value)
+        self._update_bulk_bar()
+    
+    @user_action
+    def _clear_selection(self, e=None):
+        self._selected_ids.clear()
+        self._load_tickets(self.status_filter.value, self.search_field.value)
+        self._update_bulk_bar()
+    
+    def _finish_bulk(self, message: str, color=AppColors.SUCCESS):
+        """Итог массового действия: сообщение и одно обновление списка"""
+        self.page.snack_bar = ft.SnackBar(content=ft.Text(message), bgcolor=color)
+        self.page.snack_bar.open = True
+        self._selected_ids.clear()
+        self._tickets_data = self._get_tickets_data()
+        self._load_tickets(self.status_filter.value, self.search_field.value)
+        self._update_bulk_bar()
+        self.page.update()
+    
+    @staticmethod
+    def _skipped_text(requested: int, done: int) -> str:
+        skipped = requested - done
+        return f", пропущено: {skipped}" if skipped else ""
+    
+    @traced('ui.bulk_status')
+    @user_action
+    def _bulk_status_change(self, e):
+        """Меняет статус выбранных заявок одним запросом"""
+        new_status = e.control.value
+        ticket_ids = list(self._selected_ids)
+        self.bulk_status.value = None
+        if not new_status or not ticket_ids:
+            return
+        
+        if self.notification_service:
+            changed = self.db.bulk_update_status_with_notification(ticket_ids, new_status, self.notification_service)
+        else:
+            changed = self.db.bulk_update_status(ticket_ids, new_status)
+        
+        # Заявки уже в этом статусе и без мастера для 'в работе'/'завершена' не меняются
+        self._finish_bulk(
+            f"✅ Статус {self._get_status_text(new_status)} установлен для {len(changed)} заявок"
+            f"{self._skipped_text(len(ticket_ids), len(changed))}"
+        )
+    
+    @traced('ui.open_bulk_assign')
+    @user_action
+    def _show_bulk_assign(self, e=None):
+        """Назначение мастера выбранным заявкам"""
+        masters = self._get_masters()
+        if not masters:
+            self._finish_bulk("Нет доступных мастеров", AppColors.ERROR)
+            return
+        master_dropdown = self._create_master_dropdown(masters)
+        
+        def close(e=None):
+            bottom_sheet.open = False
+            self.page.update()
+        
+        @traced('ui.bulk_assign')
+        def assign(e):
+            if not master_dropdown.value:
+                return
+            master_id = int(master_dropdown.value)
+            ticket_ids = list(self._selected_ids)
+            if self.notification_service:
+                assigned = self.db.bulk_assign_with_notification(ticket_ids, master_id, self.notification_service)
+            else:
+                assigned = self.db.bulk_assign(ticket_ids, master_id)
+            bottom_sheet.open = False
+            # Назначаются только заявки в статусе 'ожидает'
+            self._finish_bulk(
+                f"✅ Мастер назначен на {len(assigned)} заявок{self._skipped_text(len(ticket_ids), len(assigned))}"
+            )
+        
+        bottom_sheet = ft.BottomSheet(
+            ft.Container(
+                ft.Column([
+                    ft.Text(f"Назначение мастера: выбрано заявок {len(self._selected_ids)}",
+                            size=18, weight=ft.FontWeight.BOLD),
+                    ft.Text("Мастер назначается только на заявки в статусе 'ожидает'", size=12, color=AppColors.GREY),
+                    master_dropdown,
+                    ft.Row([
+                        ft.ElevatedButton("Отмена", on_click=close),
+                        ft.ElevatedButton("Назначить", on_click=assign),
+                    ], alignment=ft.MainAxisAlignment.END)
+                ]),
+                padding=20,
+            ),
+            open=True,
+            dismissible=True
+        )
+        self.page.overlay.append(bottom_sheet)
+        self.page.update()
+    
+    @user_action
+    def _confirm_bulk_delete(self, e=None):
+        """Подтверждение удаления выбранных заявок"""
+        def close(e=None):
+            bottom_sheet.open = False
+            self.page.update()
+        
+        @traced('ui.bulk_delete')
+        def delete(e):
+            ticket_ids = list(self._selected_ids)
+            deleted = self.db.bulk_delete(
+                ticket_ids,
+                self.auth_manager.current_user['id'],
+                self.auth_manager.current_user['role']
+            )
+            bottom_sheet.open = False
+            self._finish_bulk(f"Удалено заявок: {deleted}{self._skipped_text(len(ticket_ids), deleted)}")
+        
+        bottom_sheet = ft.BottomSheet(
+            ft.Container(
+                ft.Column([
+                    ft.Text(f"Удалить выбранные заявки ({len(self._selected_ids)})?", size=18, weight=ft.FontWeight.BOLD),
+                    ft.Text("Комментарии и уведомления по ним тоже будут удалены", size=12, color=AppColors.GREY),
+                    ft.Row([
+                        ft.ElevatedButton("Отмена", on_click=close),
+                        ft.ElevatedButton(
+                            "Удалить",
+                            style=ft.ButtonStyle(color=AppColors.WHITE, bgcolor=AppColors.ERROR),
+                            on_click=delete
+                        ),
+                    ], alignment=ft.MainAxisAlignment.END)
+                ]),
+                padding=20,
+            ),
+            open=True,
+            dismissible=True
+        )
+        self.page.overlay.append(bottom_sheet)
+        self.page.update()
+    
+    @traced('ui.dispatch_preview')
+    @user_action
+    def _show_dispatch_preview(self, e=None):
+        """Предпросмотр автоматического распределения свободных заявок"""
+        plan = self.dispatcher.plan()
+        
+        if not plan:
+            self.page.snack_bar = ft.SnackBar(
+                content=ft.Text("Нечего распределять: нет свободных заявок или мастера загружены"),
+                bgcolor=AppColors.WARNING
+            )
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+        
+        def close(e=None):
+            bottom_sheet.open = False
+            self.page.update()
+        
+        @traced('ui.dispatch')
+        def run_dispatch(e):
+            results = self.dispatcher.dispatch(len(plan))
+            assigned = sum(1 for item in results if item.status == 'ok')
+            skipped = len(results) - assigned
+            message = f"✅ Распределено заявок: {assigned}"
+            if skipped:
+                message += f", пропущено (заявки изменились): {skipped}"
+            self.page.snack_bar = ft.SnackBar(content=ft.Text(message), bgcolor=AppColors.SUCCESS)
+            self.page.snack_bar.open = True
+            self._tickets_data = self._get_tickets_data()
+            self._load_tickets(self.status_filter.value, self.search_field.value)
+            close()
+        
+        rows = ft.Column([
+            ft.Text(
+                f"#{item.ticket['ticket_number']} {item.ticket['title']} → "
+                f"{item.master_name} (в работе: {item.load_before})",
+                size=13
+            )
+            for item in plan
+        ], scroll=ft.ScrollMode.AUTO, height=300)
+        
+        bottom_sheet = ft.BottomSheet(
+            ft.Container(
+                ft.Column([
+                    ft.Row([
+                        ft.Text("Автоматическое распределение", size=18, weight=ft.FontWeight.BOLD, expand=True),
+                        ft.TextButton("Закрыть", on_click=close),
+                    ]),
+                    ft.Divider(),
+                    ft.Text(f"Заявок к назначению: {len(plan)}. Срочные, затем старые заявки - наименее загруженным мастерам",
+                            size=12, color=AppColors.GREY),
+                    rows,
+                    ft.Row([
+                        ft.ElevatedButton("Отмена", on_click=close),
+                        ft.ElevatedButton("Распределить", on_click=run_dispatch),
+                    ], alignment=ft.MainAxisAlignment.END)
+                ]),
+                padding=20,
+            ),
+            open=True,
+            dismissible=True
+        )
+        self.page.overlay.append(bottom_sheet)
+        self.page.update()
+    
     def _get_status_text(self, status: str) -> str:
         """Возвращает читаемый текст статуса"""
         status_texts = {
@@ -440,6 +802,8 @@ class AdminDashboardView:
         }
         return status_texts.get(status, status.upper())
 
+    @traced('ui.refresh')
+    @user_action
     def _on_refresh(self, e):
         """Обработчик обновления"""
         self._tickets_data = self._get_tickets_data()
@@ -475,6 +839,10 @@ class AdminDashboardView:
             self.date_filter,
             self.search_field
         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
+        if self.dispatcher:
+            filters_row.controls.append(
+                ft.ElevatedButton("Автораспределение", icon="AUTO_MODE", on_click=self._show_dispatch_preview)
+            )
         
         # Легенда статусов
         status_legend = ft.Row([
@@ -512,6 +880,7 @@ class AdminDashboardView:
             filters_row,
             status_legend,
             ft.Text(f"Всего заявок: {len(self._tickets_data)}", size=14, color=AppColors.GREY),
+            self.bulk_bar,
             self.tickets_column
         ])
         
@@ -1,15 +1,20 @@
+import logging
 import flet as ft
 from app.core.database import Database
 from app.core.auth import AuthManager
+from app.core.telemetry import traced
+from app.ui.components.base import user_action
 from app.ui.components.navigation import create_nav_bar, create_notification_button, create_logout_button, create_create_ticket_button
 from app.ui.components.forms import create_search_field
 from app.ui.components.ticket_cards import create_ticket_card
 from app.ui.views.shared.notifications import NotificationsView
 from app.ui.themes.colors import AppColors
 
+logger = logging.getLogger(__name__)
+
 class ClientDashboardView:
     def __init__(self, auth_manager, db: Database, on_logout, on_create_ticket=None, on_edit_ticket=None,
-                 notification_manager=None, notification_service=None):
+                 notification_manager=None, notification_service=None, on_activity=None):
         self.auth_manager = auth_manager
         self.db = db
         self.on_logout = on_logout
@@ -17,6 +22,7 @@ class ClientDashboardView:
         self.on_edit_ticket = on_edit_ticket
         self.notification_manager = notification_manager
         self.notification_service = notification_service
+        self.on_activity = on_activity
         self.page = None
         
         # Добавляем инициализацию кнопки уведомлений
@@ -38,7 +44,7 @@ class ClientDashboardView:
             else:
                 unread_count = 0
         
-        print(f"Обновление кнопки уведомлений: {unread_count} непрочитанных")
+        logger.debug("Обновление кнопки уведомлений: %s непрочитанных", unread_count)
         
         # Создаем новую кнопку
         if unread_count > 0:
@@ -65,7 +71,7 @@ class ClientDashboardView:
                     if child == old_button:
                         # Нашли старую кнопку - заменяем на новую
                         control.controls[i] = new_button
-                        print("Кнопка заменена в интерфейсе!")
+                        logger.debug("Кнопка заменена в интерфейсе!")
                         return True
                     elif find_and_replace(child):
                         return True
@@ -84,24 +90,27 @@ class ClientDashboardView:
     def _show_comments(self, ticket: dict):
         """Показывает комментарии к заявке"""
         # Для клиента комментарии показываются через отдельный view
-        print(f"Would show comments for ticket {ticket['id']}")
+        logger.debug("Would show comments for ticket %s", ticket['id'])
 
+    @traced('ui.open_notifications')
+    @user_action
     def _show_notifications(self, e):
         """Показывает уведомления во всплывающем окне"""
-        print("Кнопка уведомлений нажата!")
+        logger.debug("Кнопка уведомлений нажата!")
         
         if hasattr(self, 'notification_service') and self.notification_service and self.page:
-            print("Создаем всплывающее окно...")
+            logger.debug("Создаем всплывающее окно...")
             
             notifications_view = NotificationsView(
                 self.notification_service.notification_manager, 
                 self.auth_manager.current_user['id'],
                 on_ticket_click=self._highlight_ticket,
-                on_notifications_update=self._update_notification_button
+                on_notifications_update=self._update_notification_button,
+                on_activity=self.on_activity
             )
             
             def close_popup(e=None):
-                print("Закрытие всплывающего окна")
+                logger.debug("Закрытие всплывающего окна")
                 # Убираем overlay со страницы
                 if hasattr(self, '_notifications_overlay'):
                     self.page.overlay.remove(self._notifications_overlay)
@@ -162,11 +171,10 @@ class ClientDashboardView:
             # Добавляем overlay на страницу
             self.page.overlay.append(self._notifications_overlay)
             self.page.update()
-            print("Всплывающее окно открыто!")
+            logger.debug("Всплывающее окно открыто!")
         else:
-            print("Условия не выполнены:")
-            print(f"notification_service: {hasattr(self, 'notification_service')}")
-            print(f"page: {self.page}")
+            logger.warning("Всплывающее окно не открыто: notification_service=%s, page=%s",
+                           hasattr(self, 'notification_service'), self.page)
     
     def _highlight_ticket(self, ticket_id: int):
         """Подсвечивает заявку в списке"""
@@ -182,7 +190,7 @@ class ClientDashboardView:
         self.page.snack_bar.open = True
         self.page.update()
         
-        print(f"Переход к заявке {ticket_id}")
+        logger.debug("Переход к заявке %s", ticket_id)
         
         # Здесь можно добавить логику для подсветки конкретной заявки
         # Например, прокрутка к заявке или выделение ее цветом
@@ -192,8 +200,10 @@ class ClientDashboardView:
         if hasattr(self, 'on_edit_ticket') and self.on_edit_ticket:
             self.on_edit_ticket(ticket['id'])
         else:
-            print(f"Would edit ticket {ticket['id']}")
+            logger.debug("Would edit ticket %s", ticket['id'])
     
+    @traced('ui.delete_ticket')
+    @user_action
     def _delete_ticket(self, ticket: dict):
         """Удаляет заявку"""
         if not self.page:
@@ -271,11 +281,15 @@ class ClientDashboardView:
                     )
                 self.tickets_column.controls.append(card)
     
+    @traced('ui.search')
+    @user_action
     def _on_search(self, e):
         """Обработчик поиска"""
         self._build_tickets_column(e.control.value)
         self.tickets_column.update()
     
+    @traced('ui.refresh')
+    @user_action
     def _on_refresh(self, e):
         """Обработчик обновления"""
         self._tickets_data = self._get_tickets_data()
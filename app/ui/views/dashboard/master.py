@@ -1,24 +1,32 @@
 # app/ui/views/dashboard/master.py
 
+import logging
 import flet as ft
-import sqlite3
 import threading
 import time
+import app.config as config
 from app.core.database import Database
 from app.core.auth import AuthManager
+from app.core.telemetry import traced
+from app.ui.components.base import user_action
 from app.ui.components.navigation import create_nav_bar, create_notification_button, create_logout_button
 from app.ui.components.ticket_cards import create_master_ticket_card
 from app.ui.views.shared.notifications import NotificationsView
 from app.ui.themes.colors import AppColors
+from app.utils.formatters import format_date
+
+logger = logging.getLogger(__name__)
 
 class MasterDashboardView:
-    def __init__(self, auth_manager, db: Database, on_logout, on_edit_ticket=None, on_show_comments=None, notification_service=None):
+    def __init__(self, auth_manager, db: Database, on_logout, on_edit_ticket=None, on_show_comments=None, notification_service=None,
+                 on_activity=None):
         self.auth_manager = auth_manager
         self.db = db
         self.on_logout = on_logout
         self.on_edit_ticket = on_edit_ticket
         self.on_show_comments = on_show_comments
         self.notification_service = notification_service
+        self.on_activity = on_activity
         self.page = None
         self.notification_button = None
         
@@ -34,16 +42,18 @@ class MasterDashboardView:
         return self.db.get_tickets_by_master(self.auth_manager.current_user['id'])
     
     def _get_available_tickets_data(self):
-        """Получаем данные о доступных заявках"""
-        return self.db.get_pending_tickets()
+        """Получаем самые срочные доступные заявки (без закрепленных за другими мастерами)"""
+        return self.db.get_pending_tickets(self.auth_manager.current_user['id'],
+                                           limit=getattr(config, 'MASTER_QUEUE_SIZE', 50))
     
     def _show_comments(self, ticket: dict):
         """Показывает комментарии к заявке"""
         if hasattr(self, 'on_show_comments') and self.on_show_comments:
             self.on_show_comments(ticket['id'])
         else:
-            print(f"Would show comments for ticket {ticket['id']}")
+            logger.debug("Would show comments for ticket %s", ticket['id'])
 
+    @traced('view.load_tickets', tab='my')
     def _load_my_tickets(self):
         """Загружает назначенные заявки"""
         self.my_tickets_column.controls.clear()
@@ -68,6 +78,7 @@ class MasterDashboardView:
         if self.page:
             self.my_tickets_column.update()
     
+    @traced('view.load_tickets', tab='available')
     def _load_available_tickets(self):
         """Загружает доступные заявки"""
         self.available_tickets_column.controls.clear()
@@ -102,7 +113,7 @@ class MasterDashboardView:
             else:
                 unread_count = 0
         
-        print(f"Обновление кнопки уведомлений (admin/master): {unread_count} непрочитанных")
+        logger.debug("Обновление кнопки уведомлений (admin/master): %s непрочитанных", unread_count)
         
         # Сохраняем старую кнопку для замены
         old_button = self.notification_button
@@ -128,7 +139,7 @@ class MasterDashboardView:
                     if child == old_button:
                         # Нашли старую кнопку - заменяем на новую
                         control.controls[i] = new_button
-                        print("Кнопка уведомлений заменена в навигационной панели!")
+                        logger.debug("Кнопка уведомлений заменена в навигационной панели!")
                         return True
                     elif find_and_replace(child):
                         return True
@@ -137,22 +148,25 @@ class MasterDashboardView:
         if hasattr(self, '_current_nav_bar'):
             find_and_replace(self._current_nav_bar)
         
+    @traced('ui.open_notifications')
+    @user_action
     def _show_notifications(self, e):
         """Показывает уведомления во всплывающем окне"""
-        print("Кнопка уведомлений нажата!")
+        logger.debug("Кнопка уведомлений нажата!")
         
         if hasattr(self, 'notification_service') and self.notification_service and self.page:
-            print("Создаем всплывающее окно...")
+            logger.debug("Создаем всплывающее окно...")
             
             notifications_view = NotificationsView(
                 self.notification_service.notification_manager, 
                 self.auth_manager.current_user['id'],
                 on_ticket_click=self._highlight_ticket,
-                on_notifications_update=self._update_notification_button
+                on_notifications_update=self._update_notification_button,
+                on_activity=self.on_activity
             )
             
             def close_popup(e=None):
-                print("Закрытие всплывающего окна")
+                logger.debug("Закрытие всплывающего окна")
                 # Убираем overlay со страницы
                 if hasattr(self, '_notifications_overlay'):
                     self.page.overlay.remove(self._notifications_overlay)
@@ -213,11 +227,10 @@ class MasterDashboardView:
             # Добавляем overlay на страницу
             self.page.overlay.append(self._notifications_overlay)
             self.page.update()
-            print("Всплывающее окно открыто!")
+            logger.debug("Всплывающее окно открыто!")
         else:
-            print("Условия не выполнены:")
-            print(f"notification_service: {hasattr(self, 'notification_service')}")
-            print(f"page: {self.page}")
+            logger.warning("Всплывающее окно не открыто: notification_service=%s, page=%s",
+                           hasattr(self, 'notification_service'), self.page)
     
     def _highlight_ticket(self, ticket_id: int):
         """Подсвечивает заявку в списке"""
@@ -232,41 +245,38 @@ class MasterDashboardView:
         self.page.snack_bar.open = True
         self.page.update()
         
-        print(f"Переход к заявке {ticket_id}")
+        logger.debug("Переход к заявке %s", ticket_id)
     
     def _edit_ticket(self, ticket: dict):
         """Редактирует заявку (для мастера)"""
         if hasattr(self, 'on_edit_ticket') and self.on_edit_ticket:
             self.on_edit_ticket(ticket['id'])
         else:
-            print(f"Would edit ticket {ticket['id']}")
-    
-    def _get_client_phone(self, client_id: int) -> str:
-        """Получает телефон клиента"""
-        try:
-            conn = sqlite3.connect('repair_system.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT phone FROM users WHERE id = ?", (client_id,))
-            result = cursor.fetchone()
-            conn.close()
-            return result[0] if result else "Не указан"
-        except:
-            return "Не указан"
+            logger.debug("Would edit ticket %s", ticket['id'])
     
+    @traced('ui.take_ticket')
+    @user_action
     def _take_ticket(self, ticket_id: int):
         """Берет заявку в работу"""
-        print(f"Взятие заявки в работу: {ticket_id}")
+        logger.info("Взятие заявки в работу: %s", ticket_id)
+        version = self._known_version(self._available_tickets_data, ticket_id)
         
         if hasattr(self, 'notification_service') and self.notification_service:
-            print("Notification service доступен")
-            success = self.db.assign_ticket_to_master_with_notification(
-                ticket_id, self.auth_manager.current_user['id'], self.notification_service
+            logger.debug("Notification service доступен")
+            result = self.db.assign_ticket_to_master_with_notification(
+                ticket_id, self.auth_manager.current_user['id'], self.notification_service,
+                expected_version=version
             )
         else:
-            print("Notification service НЕ доступен")
-            success = self.db.assign_ticket_to_master(ticket_id, self.auth_manager.current_user['id'])
+            logger.warning("Notification service НЕ доступен")
+            result = self.db.assign_ticket_to_master(
+                ticket_id, self.auth_manager.current_user['id'], expected_version=version
+            )
         
-        if success:
+        if result.status in (result.CONFLICT, result.REJECTED, result.NOT_FOUND):
+            # Список устарел: заявку уже взяли или изменили
+            self._show_stale("Заявку уже взял другой мастер или ее изменили. Список обновлен")
+        elif result:
             self.page.snack_bar = ft.SnackBar(
                 content=ft.Text("Заявка взята в работу!"),
                 bgcolor=AppColors.SUCCESS
@@ -286,32 +296,97 @@ class MasterDashboardView:
             self.page.snack_bar.open = True
             self.page.update()
 
-    def _format_date(self, date_string: str) -> str:
-        """Форматирует дату в читаемый вид"""
-        try:
-            from datetime import datetime
-            # Парсим дату из ISO формата
-            dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-            # Форматируем в удобный вид: "дд.мм.гггг чч:мм"
-            return dt.strftime("%d.%m.%Y %H:%M")
-        except:
-            # Если не удалось распарсить, возвращаем как есть
-            return date_string[:16].replace('T', ' ')
+    @traced('ui.claim_ticket')
+    @user_action
+    def _claim_next(self, e=None):
+        """Закрепляет за мастером следующую заявку из очереди"""
+        ticket = self.db.claim_next_ticket(self.auth_manager.current_user['id'])
+        if not ticket:
+            self.page.snack_bar = ft.SnackBar(
+                content=ft.Text("Свободных заявок нет"),
+                bgcolor=AppColors.WARNING
+            )
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+        logger.info("Заявка %s закреплена за мастером до %s", ticket['id'], ticket['claim_expires'])
+        self._show_claim(ticket)
+    
+    def _show_claim(self, ticket: dict):
+        """Показывает закрепленную заявку: взять в работу или вернуть в очередь"""
+        master_id = self.auth_manager.current_user['id']
+        
+        def close(message=None, color=AppColors.SUCCESS):
+            bottom_sheet.open = False
+            if message:
+                self.page.snack_bar = ft.SnackBar(content=ft.Text(message), bgcolor=color)
+                self.page.snack_bar.open = True
+            self._my_tickets_data = self._get_my_tickets_data()
+            self._available_tickets_data = self._get_available_tickets_data()
+            self._load_my_tickets()
+            self._load_available_tickets()
+            self.page.update()
+        
+        def confirm(e):
+            result = self.db.confirm_claim(ticket['id'], master_id, self.notification_service)
+            if result:
+                close("Заявка взята в работу!")
+            elif result.status == result.ERROR:
+                close("Ошибка при взятии заявки в работу", AppColors.ERROR)
+            else:
+                close("Время на решение истекло, заявка вернулась в очередь", AppColors.WARNING)
+        
+        def release(e):
+            self.db.release_claim(ticket['id'], master_id)
+            close()
+        
+        bottom_sheet = ft.BottomSheet(
+            ft.Container(
+                ft.Column([
+                    ft.Text("Следующая заявка", size=18, weight=ft.FontWeight.BOLD),
+                    ft.Divider(),
+                    ft.Text(f"Заявка: #{ticket['ticket_number']} - {ticket['title']}", weight=ft.FontWeight.BOLD),
+                    ft.Text(ticket['description']),
+                    ft.Text(f"Клиент: {ticket['client_name']}"),
+                    ft.Text(f"Создана: {format_date(ticket['created_date'], 'datetime')}"),
+                    ft.Text(
+                        f"Закреплена за вами до {format_date(ticket['claim_expires'], 'time')}",
+                        size=12, color=AppColors.GREY
+                    ),
+                    ft.Container(height=10),
+                    ft.Row([
+                        ft.ElevatedButton("Вернуть в очередь", on_click=release),
+                        ft.ElevatedButton("Взять в работу", on_click=confirm),
+                    ], alignment=ft.MainAxisAlignment.END)
+                ]),
+                padding=20,
+            ),
+            open=True,
+            # Закрытие без выбора оставляет заявку закрепленной до конца аренды
+            dismissible=True
+        )
+        self.page.overlay.append(bottom_sheet)
+        self.page.update()
     
+    @traced('ui.update_status')
+    @user_action
     def _update_status(self, ticket_id: int, status: str):
         """Обновляет статус заявки"""
-        print(f"Обновление статуса заявки {ticket_id} на {status}")
+        logger.info("Обновление статуса заявки %s на %s", ticket_id, status)
+        version = self._known_version(self._my_tickets_data, ticket_id)
         
         if hasattr(self, 'notification_service') and self.notification_service:
-            print("Notification service доступен")
-            success = self.db.update_ticket_status_with_notification(
-                ticket_id, status, self.notification_service
+            logger.debug("Notification service доступен")
+            result = self.db.update_ticket_status_with_notification(
+                ticket_id, status, self.notification_service, expected_version=version
             )
         else:
-            print("Notification service НЕ доступен")
-            success = self.db.update_ticket_status(ticket_id, status)
+            logger.warning("Notification service НЕ доступен")
+            result = self.db.update_ticket_status(ticket_id, status, expected_version=version)
         
-        if success:
+        if result.conflict:
+            self._show_stale("Заявку уже изменили. Проверьте ее состояние и повторите действие")
+        elif result:
             status_texts = {
                 'in_progress': 'в работу',
                 'waiting_parts': 'ожидание запчастей', 
@@ -334,6 +409,29 @@ class MasterDashboardView:
             self.page.snack_bar.open = True
             self.page.update()
     
+    @staticmethod
+    def _known_version(tickets, ticket_id: int):
+        """Версия заявки, которую видит мастер (для изменения с проверкой)"""
+        for ticket in tickets:
+            if ticket['id'] == ticket_id:
+                return ticket.get('version')
+        return None
+    
+    def _show_stale(self, message: str):
+        """Сообщает о конфликте изменений и перечитывает списки"""
+        self.page.snack_bar = ft.SnackBar(
+            content=ft.Text(message),
+            bgcolor=AppColors.WARNING
+        )
+        self.page.snack_bar.open = True
+        self._my_tickets_data = self._get_my_tickets_data()
+        self._available_tickets_data = self._get_available_tickets_data()
+        self._load_my_tickets()
+        self._load_available_tickets()
+        self.page.update()
+    
+    @traced('ui.refresh')
+    @user_action
     def _on_refresh(self, e):
         """Обработчик обновления"""
         self._my_tickets_data = self._get_my_tickets_data()
@@ -378,7 +476,14 @@ class MasterDashboardView:
                 ft.Tab(
                     text="Доступные заявки",
                     content=ft.Container(
-                        content=self.available_tickets_column,
+                        content=ft.Column([
+                            ft.ElevatedButton(
+                                "Взять следующую заявку",
+                                icon="PLAYLIST_ADD_CHECK",
+                                on_click=self._claim_next
+                            ),
+                            self.available_tickets_column
+                        ], expand=True),
                         padding=20
                     )
                 )
@@ -1,7 +1,9 @@
-from .notifications import NotificationsView
-from .stats import StatsView
+from app._lazy import lazy_exports
 
-__all__ = [
-    'NotificationsView',
-    'StatsView'
-]
\ No newline at end of file
+_EXPORTS = {
+    'NotificationsView': '.notifications',
+    'StatsView': '.stats'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
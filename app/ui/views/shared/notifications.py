@@ -1,40 +1,77 @@
+import logging
 import flet as ft
+import app.config as config
 from app.core.mysql_notifications import MySQLNotificationManager as NotificationManager
+from app.core.telemetry import traced
+from app.ui.components.base import user_action
 from app.ui.themes.colors import AppColors
 
+logger = logging.getLogger(__name__)
+
 class NotificationsView:
-    def __init__(self, notification_manager: NotificationManager, current_user_id: int, on_ticket_click=None, on_notifications_update=None):
+    def __init__(self, notification_manager: NotificationManager, current_user_id: int, on_ticket_click=None, on_notifications_update=None,
+                 on_activity=None):
         self.notification_manager = notification_manager
         self.current_user_id = current_user_id
         self.on_ticket_click = on_ticket_click
         self.on_notifications_update = on_notifications_update
+        self.on_activity = on_activity
         self.page = None
         self.on_close_callback = None
+        self.page_size = getattr(config, 'NOTIFICATIONS_PAGE_SIZE', 20)
+        self.unread_only = False
+        self.notifications = []
+        self.has_more = False
+        self.unread_count = 0
+        # Карточки загруженных уведомлений по id: отметка о прочтении меняет одну карточку
+        self._cards = {}
+        self._loading = False
         
     def build_popup_content(self, page: ft.Page, on_close):
         """Строит содержимое для всплывающего окна"""
         self.page = page
         self.on_close_callback = on_close
         
-        # Обновляем данные уведомлений
+        # Загружаем первую страницу и счетчик
         self._refresh_notifications_data()
         
         return self._create_notifications_ui()
     
+    @traced('view.load_notifications')
     def _refresh_notifications_data(self):
-        """Обновляет данные уведомлений"""
-        self.notifications = self.notification_manager.get_user_notifications(self.current_user_id)
+        """Загружает первую страницу уведомлений и счетчик непрочитанных"""
+        self.notifications = []
+        self._cards = {}
+        self._fetch_page()
         self.unread_count = self.notification_manager.get_unread_count(self.current_user_id)
-        print(f"Обновлены данные уведомлений: {self.unread_count} непрочитанных")
+        logger.debug("Обновлены данные уведомлений: %s непрочитанных", self.unread_count)
+    
+    def _fetch_page(self) -> list:
+        """Дочитывает следующую страницу после последнего загруженного уведомления"""
+        before = self.notifications[-1]['id'] if self.notifications else None
+        # Одна лишняя запись показывает, есть ли следующая страница
+        page = self.notification_manager.get_user_notifications(
+            self.current_user_id,
+            unread_only=self.unread_only,
+            limit=self.page_size + 1,
+            before=before
+        )
+        self.has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.notifications.extend(page)
+        return page
     
     def _create_notifications_ui(self):
         """Создает интерфейс уведомлений"""
-        # Создаем колонку для уведомлений
+        # Следующая страница подгружается при прокрутке к концу списка
         self.notifications_column = ft.Column(
             scroll=ft.ScrollMode.AUTO, 
             expand=True,
-            spacing=10
+            spacing=10,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=100
         )
+        self.load_more_button = ft.TextButton("Показать еще", on_click=lambda e: self._load_more())
         
         # Заполняем колонку, но НЕ обновляем ее (она еще не добавлена на страницу)
         self._fill_notifications_column()
@@ -71,30 +108,57 @@ class NotificationsView:
         
         return content
     
-    def _fill_notifications_column(self, notifications_filter=None):
-        """Заполняет колонку уведомлениями с учетом фильтра"""
+    def _empty_placeholder(self):
+        return ft.Container(
+            content=ft.Column([
+                ft.Icon("NOTIFICATIONS_NONE", size=48, color=ft.Colors.GREY),
+                ft.Text("Нет уведомлений", size=16, color=ft.Colors.GREY)
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=20),
+            padding=40,
+            alignment=ft.alignment.center
+        )
+    
+    def _fill_notifications_column(self):
+        """Заполняет колонку загруженными уведомлениями"""
         self.notifications_column.controls.clear()
+        self._cards = {}
         
-        if notifications_filter:
-            notifications_to_show = notifications_filter
-        else:
-            notifications_to_show = self.notifications
+        if not self.notifications:
+            self.notifications_column.controls.append(self._empty_placeholder())
+            return
         
-        if not notifications_to_show:
-            self.notifications_column.controls.append(
-                ft.Container(
-                    content=ft.Column([
-                        ft.Icon("NOTIFICATIONS_NONE", size=48, color=ft.Colors.GREY),
-                        ft.Text("Нет уведомлений", size=16, color=ft.Colors.GREY)
-                    ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=20),
-                    padding=40,
-                    alignment=ft.alignment.center
-                )
-            )
-        else:
-            for notification in notifications_to_show:
-                card = self._create_notification_card(notification)
-                self.notifications_column.controls.append(card)
+        self._append_cards(self.notifications)
+    
+    def _append_cards(self, notifications):
+        """Добавляет карточки в конец списка, перед кнопкой «Показать еще»"""
+        controls = self.notifications_column.controls
+        if self.load_more_button in controls:
+            controls.remove(self.load_more_button)
+        for notification in notifications:
+            card = self._create_notification_card(notification)
+            self._cards[notification['id']] = card
+            controls.append(card)
+        if self.has_more:
+            controls.append(self.load_more_button)
+    
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - 100:
+            self._load_more()
+    
+    @traced('view.load_notifications_page')
+    @user_action
+    def _load_more(self):
+        """Подгружает следующую страницу и добавляет только ее карточки"""
+        if self._loading or not self.has_more:
+            return
+        self._loading = True
+        try:
+            page = self._fetch_page()
+            self._append_cards(page)
+            if self.page:
+                self.notifications_column.update()
+        finally:
+            self._loading = False
     
     def _create_notification_card(self, notification):
         """Создает карточку уведомления"""
@@ -166,98 +230,111 @@ class NotificationsView:
     
     def _show_all_notifications(self):
         """Показывает все уведомления"""
-        self._fill_notifications_column(self.notifications)
-        # Теперь можно обновлять, так как колонка уже на странице
-        if self.page:
-            self.notifications_column.update()
+        self._switch_filter(unread_only=False)
     
     def _show_unread_notifications(self):
         """Показывает только непрочитанные уведомления"""
-        unread_notifications = [n for n in self.notifications if not n['is_read']]
-        self._fill_notifications_column(unread_notifications)
+        self._switch_filter(unread_only=True)
+    
+    @user_action
+    def _switch_filter(self, unread_only: bool):
+        """Перечитывает первую страницу с новым фильтром"""
+        self.unread_only = unread_only
+        self.notifications = []
+        self._fetch_page()
+        self._fill_notifications_column()
+        # Теперь можно обновлять, так как колонка уже на странице
         if self.page:
             self.notifications_column.update()
     
-    def _update_ui_after_change(self):
-        """Полностью обновляет интерфейс после изменений"""
-        # Обновляем данные
-        self._refresh_notifications_data()
-        
-        print(f"Обновление UI после изменений: {self.unread_count} непрочитанных")
+    def _mark_card_read(self, notification: dict):
+        """Меняет одну карточку на прочитанную (или убирает ее из списка непрочитанных)"""
+        notification['is_read'] = True
+        card = self._cards.get(notification['id'])
+        if card is None:
+            return
+        if self.unread_only:
+            self.notifications.remove(notification)
+            del self._cards[notification['id']]
+            self.notifications_column.controls.remove(card)
+            if not self.notifications and not self.has_more:
+                self.notifications_column.controls.append(self._empty_placeholder())
+            return card
+        card.content = self._create_notification_card(notification).content
+        return card
+    
+    def _set_unread_count(self, unread_count: int):
+        """Обновляет счетчик в заголовке и в главном интерфейсе"""
+        self.unread_count = max(unread_count, 0)
+        logger.debug("Непрочитанных уведомлений: %s", self.unread_count)
         
-        # Обновляем счетчик в заголовке
         if hasattr(self, 'unread_count_text'):
             self.unread_count_text.value = f"Непрочитанные: {self.unread_count}"
             if self.page:
                 self.unread_count_text.update()
         
-        # Обновляем колонку уведомлений
-        self._fill_notifications_column()
-        if self.page:
-            self.notifications_column.update()
-        
-        # ВАЖНО: Обновляем счетчик в главном интерфейсе
         if self.on_notifications_update:
-            print(f"Вызываем колбэк обновления с unread_count: {self.unread_count}")
             self.on_notifications_update(self.unread_count)
     
+    def _show_snack(self, message: str, color: str):
+        if self.page:
+            self.page.snack_bar = ft.SnackBar(
+                content=ft.Text(message),
+                bgcolor=color
+            )
+            self.page.snack_bar.open = True
+            self.page.update()
+    
+    @traced('ui.mark_notification_read')
+    @user_action
     def _mark_as_read(self, notification_id: int):
-        """Помечает уведомление как прочитанное и обновляет интерфейс"""
-        print(f"Помечаем уведомление {notification_id} как прочитанное")
+        """Помечает уведомление как прочитанное без перечитывания списка"""
+        logger.debug("Помечаем уведомление %s как прочитанное", notification_id)
+        
+        notification = next((n for n in self.notifications if n['id'] == notification_id), None)
+        if notification is None or notification['is_read']:
+            return
         
         success = self.notification_manager.mark_as_read(notification_id)
         if success:
-            print("Уведомление успешно помечено как прочитанное")
-            
-            # Полностью обновляем интерфейс
-            self._update_ui_after_change()
-            
-            # Показываем сообщение
+            card = self._mark_card_read(notification)
             if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("Уведомление прочитано"),
-                    bgcolor=AppColors.SUCCESS
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+                if self.unread_only:
+                    self.notifications_column.update()
+                elif card is not None:
+                    card.update()
+            self._set_unread_count(self.unread_count - 1)
+            self._show_snack("Уведомление прочитано", AppColors.SUCCESS)
         else:
-            print("Ошибка при отметке уведомления как прочитанного")
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("Ошибка при отметке уведомления"),
-                    bgcolor=AppColors.ERROR
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            logger.warning("Ошибка при отметке уведомления как прочитанного")
+            self._show_snack("Ошибка при отметке уведомления", AppColors.ERROR)
 
+    @traced('ui.mark_all_notifications_read')
+    @user_action
     def _mark_all_read(self):
         """Помечает все уведомления как прочитанные"""
-        print("Помечаем все уведомления как прочитанные")
+        logger.debug("Помечаем все уведомления как прочитанные")
         
         success = self.notification_manager.mark_all_as_read(self.current_user_id)
         if success:
-            print("Все уведомления помечены как прочитанные")
-            
-            # Полностью обновляем интерфейс
-            self._update_ui_after_change()
-            
-            # Показываем сообщение
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("Все уведомления прочитаны"),
-                    bgcolor=AppColors.SUCCESS
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            if self.unread_only:
+                # В фильтре «Непрочитанные» список становится пустым
+                self.notifications = []
+                self.has_more = False
+                self._fill_notifications_column()
+                if self.page:
+                    self.notifications_column.update()
+            else:
+                for notification in self.notifications:
+                    if not notification['is_read']:
+                        card = self._mark_card_read(notification)
+                        if self.page and card is not None:
+                            card.update()
+            self._set_unread_count(0)
+            self._show_snack("Все уведомления прочитаны", AppColors.SUCCESS)
         else:
-            print("Ошибка при отметке всех уведомлений")
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("Ошибка при отметке уведомлений"),
-                    bgcolor=AppColors.ERROR
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            logger.warning("Ошибка при отметке всех уведомлений")
+            self._show_snack("Ошибка при отметке уведомлений", AppColors.ERROR)
     
     def _go_to_ticket(self, ticket_id: int):
         """Переходит к заявке"""
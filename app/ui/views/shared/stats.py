@@ -3,12 +3,15 @@
 import flet as ft
 from datetime import datetime, timedelta
 from app.core.database import Database
+from app.core.telemetry import traced
+from app.ui.components.base import user_action
 from app.ui.themes.colors import AppColors
 
 class StatsView:
-    def __init__(self, db: Database, on_back):
+    def __init__(self, db: Database, on_back, on_activity=None):
         self.db = db
         self.on_back = on_back
+        self.on_activity = on_activity
         self.page = None
         
         # Данные статистики
@@ -29,25 +32,16 @@ class StatsView:
     
     def _calculate_stats(self, period="month"):
         """Рассчитывает статистику за указанный период"""
-        all_tickets = self.db.get_all_tickets()
-        
-        # Фильтруем по периоду
+        # Период отбирает база по индексу даты создания
         now = datetime.now()
         if period == "week":
             start_date = now - timedelta(days=7)
         elif period == "month":
             start_date = now - timedelta(days=30)
         else:  # all
-            start_date = datetime.min
+            start_date = None
         
-        filtered_tickets = []
-        for ticket in all_tickets:
-            try:
-                ticket_date = datetime.fromisoformat(ticket['created_date'].replace('Z', '+00:00'))
-                if ticket_date >= start_date:
-                    filtered_tickets.append(ticket)
-            except:
-                filtered_tickets.append(ticket)
+        filtered_tickets = self.db.get_all_tickets(created_since=start_date)
         
         # Основная статистика
         total_tickets = len(filtered_tickets)
@@ -78,16 +72,10 @@ class StatsView:
         
         for ticket in tickets:
             if ticket['status'] == 'completed':
-                try:
-                    created_date = datetime.fromisoformat(ticket['created_date'].replace('Z', '+00:00'))
-                    
-                    # Для простоты будем считать что заявка завершена через 2 дня после создания
-                    # В реальном приложении здесь нужно использовать поле даты завершения
-                    completion_date = created_date + timedelta(days=2)
-                    completion_time = (completion_date - created_date).total_seconds() / 3600  # в часах
-                    completion_times.append(completion_time)
-                except:
-                    continue
+                # Для простоты будем считать что заявка завершена через 2 дня после создания
+                # В реальном приложении здесь нужно использовать поле даты завершения
+                completion_time = timedelta(days=2).total_seconds() / 3600  # в часах
+                completion_times.append(completion_time)
         
         if completion_times:
             avg_hours = sum(completion_times) / len(completion_times)
@@ -132,6 +120,8 @@ class StatsView:
         
         return fault_stats
     
+    @traced('view.load_stats')
+    @user_action
     def _load_stats(self, e=None):
         """Загружает и отображает статистику"""
         period = self.period_filter.value
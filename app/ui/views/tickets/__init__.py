@@ -1,11 +1,11 @@
-from .create import TicketCreateView
-from .edit import TicketEditView
-from .view import TicketCommentsView
-from .comments import TicketCommentsComponent
+from app._lazy import lazy_exports
 
-__all__ = [
-    'TicketCreateView',
-    'TicketEditView', 
-    'TicketCommentsView',
-    'TicketCommentsComponent'
-]
\ No newline at end of file
+_EXPORTS = {
+    'TicketCreateView': '.create',
+    'TicketEditView': '.edit',
+    'TicketCommentsView': '.view',
+    'TicketCommentsComponent': '.comments'
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
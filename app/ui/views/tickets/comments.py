@@ -1,5 +1,7 @@
 import flet as ft
+import app.config as config
 from app.ui.themes.colors import AppColors
+from app.utils.formatters import format_date
 
 class TicketCommentsComponent:
     """Компонент для работы с комментариями к заявке"""
@@ -12,8 +14,10 @@ class TicketCommentsComponent:
         self.comments_column = ft.Column(scroll=ft.ScrollMode.AUTO, expand=True)
         
     def load_comments(self):
-        """Загружает комментарии для заявки"""
-        self.comments = self.db.get_comments_by_ticket(self.ticket_id)
+        """Загружает последние комментарии заявки"""
+        self.comments = self.db.get_comments_by_ticket(
+            self.ticket_id, limit=getattr(config, 'COMMENTS_PAGE_SIZE', 30)
+        )
         self._refresh_comments_display()
         
     def _refresh_comments_display(self):
@@ -65,7 +69,7 @@ class TicketCommentsComponent:
                             border_radius=4
                         ),
                         ft.Text(
-                            self._format_date(comment['created_date']),
+                            format_date(comment['created_date'], "datetime"),
                             size=10,
                             color=ft.Colors.GREY_600
                         )
@@ -80,26 +84,22 @@ class TicketCommentsComponent:
             elevation=1
         )
         
-    def _format_date(self, date_string):
-        """Форматирует дату в читаемый вид"""
-        try:
-            from datetime import datetime
-            dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-            return dt.strftime("%d.%m.%Y %H:%M")
-        except:
-            return date_string[:16].replace('T', ' ')
-            
     def add_comment(self, comment_text):
         """Добавляет новый комментарий"""
-        success = self.db.add_comment(
+        comment = self.db.add_comment(
             self.ticket_id,
             self.current_user['id'],
             self.current_user['full_name'],
-            comment_text
+            comment_text,
+            user_role=self.current_user.get('role')
         )
         
-        if success:
-            self.load_comments()  # Перезагружаем комментарии
+        if comment:
+            # Добавляем карточку нового комментария без перечитывания списка
+            if not self.comments:
+                self.comments_column.controls.clear()
+            self.comments.append(comment)
+            self.comments_column.controls.append(self._create_comment_card(comment))
             return True
         return False
         
@@ -1,17 +1,24 @@
+import logging
 import flet as ft
 from app.core.database import Database
+from app.core.telemetry import traced
 from app.ui.components.forms import create_form_field, create_button
 from app.ui.components.base import BaseComponent
+from app.ui.components.base import user_action
 from app.ui.themes.colors import AppColors
 
+logger = logging.getLogger(__name__)
+
 class TicketCreateView(BaseComponent):
-    def __init__(self, db: Database, current_user: dict, on_back, on_ticket_created, notification_service=None):
+    def __init__(self, db: Database, current_user: dict, on_back, on_ticket_created, notification_service=None,
+                 on_activity=None):
         super().__init__()
         self.db = db
         self.current_user = current_user
         self.on_back = on_back
         self.on_ticket_created = on_ticket_created
         self.notification_service = notification_service
+        self.on_activity = on_activity
         
         self.title_field = create_form_field(
             "Название заявки*", 
@@ -38,6 +45,8 @@ class TicketCreateView(BaseComponent):
         self.error_text = ft.Text("", color=AppColors.ERROR)
         self.success_text = ft.Text("", color=AppColors.SUCCESS)
     
+    @traced('ui.create_ticket')
+    @user_action
     def _create_ticket(self, e):
         # Валидация
         if not all([
@@ -48,11 +57,11 @@ class TicketCreateView(BaseComponent):
             self.error_text.update()
             return
         
-        print("Создание заявки...")
+        logger.info("Создание заявки...")
         
         # Создание заявки через метод базы данных с уведомлениями
         if hasattr(self, 'notification_service') and self.notification_service:
-            print("Notification service доступен")
+            logger.debug("Notification service доступен")
             success = self.db.create_ticket_with_notification(
                 title=self.title_field.value,
                 description=self.description_field.value,
@@ -60,7 +69,7 @@ class TicketCreateView(BaseComponent):
                 notification_service=self.notification_service
             )
         else:
-            print("Notification service НЕ доступен")
+            logger.warning("Notification service НЕ доступен")
             success = self.db.create_ticket(
                 title=self.title_field.value,
                 description=self.description_field.value,
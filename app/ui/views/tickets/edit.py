@@ -4,16 +4,19 @@ import time
 from app.core.database import Database
 from app.ui.components.forms import create_form_field, create_button
 from app.ui.components.base import BaseComponent
+from app.ui.components.base import user_action
 from app.ui.themes.colors import AppColors
+from app.utils.formatters import format_date
 
 class TicketEditView(BaseComponent):
-    def __init__(self, db: Database, current_user: dict, ticket_id: int, on_back, on_ticket_updated):
+    def __init__(self, db: Database, current_user: dict, ticket_id: int, on_back, on_ticket_updated, on_activity=None):
         super().__init__()
         self.db = db
         self.current_user = current_user
         self.ticket_id = ticket_id
         self.on_back = on_back
         self.on_ticket_updated = on_ticket_updated
+        self.on_activity = on_activity
         
         # Загружаем данные заявки
         self.ticket = self.db.get_ticket_by_id(ticket_id)
@@ -38,7 +41,7 @@ class TicketEditView(BaseComponent):
         self.success_text = ft.Text("", color=AppColors.SUCCESS)
         
         # Информация о заявке (только для чтения)
-        self.ticket_info = self._create_ticket_info()
+        self.ticket_info = ft.Container(content=self._create_ticket_info())
     
     def _create_ticket_info(self):
         """Создает блок с информацией о заявке (только для чтения)"""
@@ -76,7 +79,7 @@ class TicketEditView(BaseComponent):
                         )
                     ]),
                     ft.Text(f"Статус: {self.ticket['status']}"),
-                    ft.Text(f"Создана: {self._format_date(self.ticket['created_date'])}"),
+                    ft.Text(f"Создана: {format_date(self.ticket['created_date'], 'datetime')}"),
                     ft.Text(f"Клиент: {self.ticket['client_name']}"),
                     ft.Text(f"Мастер: {self.ticket.get('master_name', 'Не назначен')}"),
                 ], spacing=5),
@@ -86,18 +89,7 @@ class TicketEditView(BaseComponent):
             )
         ])
     
-    def _format_date(self, date_string: str) -> str:
-        """Форматирует дату в читаемый вид"""
-        try:
-            from datetime import datetime
-            # Парсим дату из ISO формата
-            dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-            # Форматируем в удобный вид: "дд.мм.гггг чч:мм"
-            return dt.strftime("%d.%m.%Y %H:%M")
-        except:
-            # Если не удалось распарсить, возвращаем как есть
-            return date_string[:16].replace('T', ' ')
-    
+    @user_action
     def _update_ticket(self, e):
         """Обновляет заявку"""
         if not self.ticket:
@@ -118,16 +110,19 @@ class TicketEditView(BaseComponent):
             self.error_text.update()
             return
         
-        # Обновляем заявку
-        success = self.db.update_ticket(
+        # Обновляем заявку; версия - та, что была открыта в редакторе
+        result = self.db.update_ticket(
             self.ticket_id,
             self.title_field.value,
             self.description_field.value,
             self.current_user['id'],
-            self.current_user['role']
+            self.current_user['role'],
+            expected_version=self.ticket.get('version')
         )
         
-        if success:
+        if result.conflict and result.ticket:
+            self._show_conflict(result.ticket)
+        elif result:
             self.success_text.value = "Заявка успешно обновлена!"
             self.success_text.update()
             
@@ -143,6 +138,19 @@ class TicketEditView(BaseComponent):
             self.error_text.value = "Ошибка при обновлении заявки. Проверьте права доступа."
             self.error_text.update()
     
+    def _show_conflict(self, ticket: dict):
+        """Заявку изменили, пока она была открыта: показываем новые данные, правки пользователя остаются в полях"""
+        self.ticket = ticket
+        self.ticket_info.content = self._create_ticket_info()
+        self.ticket_info.update()
+        self.error_text.value = (
+            "Заявку уже изменил другой пользователь. Сейчас в ней:\n"
+            f"Название: {ticket['title']}\n"
+            f"Описание: {ticket['description']}\n"
+            "Нажмите «Сохранить изменения» еще раз, чтобы записать ваш вариант."
+        )
+        self.error_text.update()
+    
     def build(self):
         if not self.ticket:
             return ft.Column([
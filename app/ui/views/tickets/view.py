@@ -1,20 +1,33 @@
+import logging
 import flet as ft
+import app.config as config
 from app.core.database import Database
+from app.core.telemetry import traced
 from app.ui.components.forms import create_form_field, create_button
 from app.ui.components.base import BaseComponent
+from app.ui.components.base import user_action
 from app.ui.themes.colors import AppColors
+from app.utils.formatters import format_date
+
+logger = logging.getLogger(__name__)
 
 class TicketCommentsView(BaseComponent):
-    def __init__(self, db: Database, current_user: dict, ticket_id: int, on_back):
+    def __init__(self, db: Database, current_user: dict, ticket_id: int, on_back, on_activity=None):
         super().__init__()
         self.db = db
         self.current_user = current_user
         self.ticket_id = ticket_id
         self.on_back = on_back
+        self.on_activity = on_activity
         
-        # Загружаем данные заявки и комментарии
+        # Загружаем данные заявки и последнюю страницу комментариев;
+        # более ранние подгружаются при прокрутке вверх
+        self.page_size = getattr(config, 'COMMENTS_PAGE_SIZE', 30)
         self.ticket = self.db.get_ticket_by_id(ticket_id)
-        self.comments = self.db.get_comments_by_ticket(ticket_id)
+        self.comments = []
+        self.has_older = False
+        self._loading = False
+        self._fetch_older()
         
         # Поле для ввода комментария
         self.comment_field = create_form_field(
@@ -27,17 +40,55 @@ class TicketCommentsView(BaseComponent):
         )
         
         # Колонка для отображения комментариев
-        self.comments_column = ft.Column(scroll=ft.ScrollMode.AUTO, expand=True)
+        self.comments_column = ft.Column(
+            scroll=ft.ScrollMode.AUTO,
+            expand=True,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=100
+        )
+        self.load_older_button = ft.TextButton(
+            "Показать более ранние",
+            on_click=lambda e: self._load_older()
+        )
+        self.count_text = ft.Text("", size=12, color=AppColors.GREY)
+
+    def _fetch_older(self) -> list:
+        """Читает страницу комментариев перед самым ранним загруженным"""
+        before = self.comments[0]['id'] if self.comments else None
+        # Одна лишняя запись показывает, есть ли еще более ранние
+        older = self.db.get_comments_by_ticket(self.ticket_id, limit=self.page_size + 1, before=before)
+        self.has_older = len(older) > self.page_size
+        older = older[-self.page_size:]
+        self.comments[:0] = older
+        return older
 
-    def _format_date(self, date_string: str) -> str:
-        """Форматирует дату в читаемый вид"""
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        if e.pixels is not None and e.pixels <= (e.min_scroll_extent or 0) + 50:
+            self._load_older()
+
+    @traced('view.load_older_comments')
+    @user_action
+    def _load_older(self):
+        """Добавляет в начало списка карточки предыдущей страницы"""
+        if self._loading or not self.has_older:
+            return
+        self._loading = True
         try:
-            from datetime import datetime
-            dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-            return dt.strftime("%d.%m.%Y %H:%M")
-        except:
-            return date_string[:16].replace('T', ' ')
+            older = self._fetch_older()
+            controls = self.comments_column.controls
+            controls.remove(self.load_older_button)
+            controls[:0] = [self._create_comment_card(comment) for comment in older]
+            if self.has_older:
+                controls.insert(0, self.load_older_button)
+            if self.page:
+                self.comments_column.update()
+        finally:
+            self._loading = False
 
+    def _total_comments(self) -> int:
+        return max(self.ticket.get('comment_count') or 0, len(self.comments))
+
+    @traced('view.load_comments')
     def _load_comments(self):
         """Загружает комментарии в колонку"""
         # Полностью очищаем колонку
@@ -56,6 +107,8 @@ class TicketCommentsView(BaseComponent):
                 )
             )
         else:
+            if self.has_older:
+                self.comments_column.controls.append(self.load_older_button)
             for comment in self.comments:
                 comment_card = self._create_comment_card(comment)
                 self.comments_column.controls.append(comment_card)
@@ -109,7 +162,7 @@ class TicketCommentsView(BaseComponent):
                             border_radius=4
                         ),
                         ft.Text(
-                            self._format_date(comment['created_date']),
+                            format_date(comment['created_date'], "datetime"),
                             size=10,
                             color=ft.Colors.GREY_700
                         )
@@ -125,48 +178,54 @@ class TicketCommentsView(BaseComponent):
             elevation=1
         )
 
+    @traced('ui.add_comment')
+    @user_action
     def _add_comment(self, e):
         """Добавляет новый комментарий"""
-        print(f"Добавление комментария для заявки {self.ticket_id}")
+        logger.info("Добавление комментария для заявки %s", self.ticket_id)
         
         if not self.comment_field.value.strip():
-            print("Пустой комментарий - пропускаем")
+            logger.debug("Пустой комментарий - пропускаем")
             return
         
         # Сохраняем текст комментария перед очисткой
         comment_text = self.comment_field.value.strip()
-        print(f"Текст комментария: {comment_text}")
+        logger.debug("Текст комментария: %s", comment_text)
         
         # Очищаем поле ввода СРАЗУ
         self.comment_field.value = ""
-        print("Поле ввода очищено")
+        logger.debug("Поле ввода очищено")
         
         # Принудительно обновляем поле ввода
         if hasattr(self, 'page'):
             self.comment_field.update()
-            print("Поле ввода обновлено")
+            logger.debug("Поле ввода обновлено")
         
-        success = self.db.add_comment(
+        comment = self.db.add_comment(
             self.ticket_id,
             self.current_user['id'],
             self.current_user['full_name'],
-            comment_text
+            comment_text,
+            user_role=self.current_user.get('role')
         )
         
-        print(f"Результат добавления в БД: {success}")
+        logger.debug("Результат добавления в БД: %s", comment)
         
-        if success:
-            # Получаем обновленный список комментариев
-            self.comments = self.db.get_comments_by_ticket(self.ticket_id)
-            print(f"Получено комментариев: {len(self.comments)}")
-            
-            # Полностью перезагружаем комментарии
-            self._load_comments()
-            print("Комментарии перезагружены")
+        if comment:
+            # Добавляем только карточку нового комментария
+            if not self.comments:
+                self.comments_column.controls.clear()
+            self.comments.append(comment)
+            self.comments_column.controls.append(self._create_comment_card(comment))
+            self.ticket['comment_count'] = (self.ticket.get('comment_count') or 0) + 1
+            self.count_text.value = f"Всего: {self._total_comments()}"
+            if self.page:
+                self.comments_column.update()
+                self.count_text.update()
             
             # Прокручиваем к новому комментарию
             self._scroll_to_bottom()
-            print("Прокрутка выполнена")
+            logger.debug("Прокрутка выполнена")
             
             # Показываем сообщение об успехе
             if hasattr(self, 'page'):
@@ -176,7 +235,7 @@ class TicketCommentsView(BaseComponent):
                 )
                 self.page.snack_bar.open = True
                 self.page.update()
-                print("Сообщение показано")
+                logger.debug("Сообщение показано")
         else:
             # Показываем ошибку
             if hasattr(self, 'page'):
@@ -186,7 +245,7 @@ class TicketCommentsView(BaseComponent):
                 )
                 self.page.snack_bar.open = True
                 self.page.update()
-                print("Ошибка показана")
+                logger.debug("Ошибка показана")
 
     def build(self):
         """Строит интерфейс комментариев"""
@@ -198,6 +257,7 @@ class TicketCommentsView(BaseComponent):
         
         # Загружаем комментарии
         self._load_comments()
+        self.count_text.value = f"Всего: {self._total_comments()}"
         
         content = ft.Column([
             ft.Row([
@@ -242,7 +302,7 @@ class TicketCommentsView(BaseComponent):
                         # Список комментариев
                         ft.Row([
                             ft.Text("Комментарии:", weight=ft.FontWeight.BOLD, expand=True),
-                            ft.Text(f"Всего: {len(self.comments)}", size=12, color=AppColors.GREY),
+                            self.count_text,
                         ]),
                         ft.Container(
                             content=self.comments_column,
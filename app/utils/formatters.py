@@ -1,41 +1,53 @@
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Union
 
-def format_date(date_string: str, format_type: str = "short") -> str:
+DATE_FORMATS = {
+    "short": "%d.%m.%Y",           # 15.12.2023
+    "long": "%d %B %Y",            # 15 декабря 2023
+    "datetime": "%d.%m.%Y %H:%M",  # 15.12.2023 14:30
+    "time": "%H:%M",               # 14:30
+    "full": "%d.%m.%Y %H:%M:%S"   # 15.12.2023 14:30:25
+}
+
+# Сколько разных дат помнит format_date (порядка числа заявок и комментариев на экранах)
+DATE_CACHE_SIZE = 8192
+
+def format_date(value: Union[str, datetime, int, float, None], format_type: str = "short") -> str:
     """
     Форматирует дату в читаемый вид
     
+    Общая для всех экранов: результат запоминается, поэтому при повторной
+    отрисовке списка строка с датой не разбирается заново.
+    
     Args:
-        date_string: Строка с датой в ISO формате
-        format_type: Тип формата ("short", "long", "datetime")
+        value: Строка ISO, datetime или секунды эпохи
+        format_type: Тип формата ("short", "long", "datetime", "time", "full")
         
     Returns:
         str: Отформатированная дата
     """
-    if not date_string:
+    if not value:
         return "Не указана"
-    
+    return _format_date_cached(value, format_type)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _format_date_cached(value, format_type: str) -> str:
     try:
-        # Парсим дату из ISO формата
-        if 'Z' in date_string:
-            dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        if isinstance(value, datetime):
+            dt = value
+        elif isinstance(value, (int, float)):
+            dt = datetime.fromtimestamp(value)
         else:
-            dt = datetime.fromisoformat(date_string)
-        
-        formats = {
-            "short": "%d.%m.%Y",           # 15.12.2023
-            "long": "%d %B %Y",            # 15 декабря 2023
-            "datetime": "%d.%m.%Y %H:%M",  # 15.12.2023 14:30
-            "time": "%H:%M",               # 14:30
-            "full": "%d.%m.%Y %H:%M:%S"   # 15.12.2023 14:30:25
-        }
+            # Парсим дату из ISO формата
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
         
-        format_str = formats.get(format_type, "%d.%m.%Y %H:%M")
-        return dt.strftime(format_str)
+        return dt.strftime(DATE_FORMATS.get(format_type, "%d.%m.%Y %H:%M"))
         
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, OverflowError, OSError):
         # Если не удалось распарсить, возвращаем как есть (обрезаем время если есть)
-        return date_string[:16].replace('T', ' ') if 'T' in date_string else date_string
+        text = str(value)
+        return text[:16].replace('T', ' ') if 'T' in text else text
 
 def format_phone(phone: str) -> str:
     """
@@ -1,25 +1,30 @@
 import random
 import string
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Optional
 
-def generate_ticket_number(prefix: str = "T") -> str:
+def generate_ticket_number(sequence: int, prefix: str = "T", date: Optional[datetime] = None) -> str:
     """
-    Генерирует уникальный номер заявки
+    Формирует номер заявки из значения последовательности
+    
+    Сами значения выдает TicketNumberGenerator (app.core.ticket_numbers),
+    поэтому номера уникальны без дополнительных проверок.
     
     Args:
+        sequence: Значение последовательности номеров
         prefix: Префикс для номера
+        date: Дата заявки (по умолчанию текущая)
         
     Returns:
-        str: Уникальный номер заявки
+        str: Номер заявки вида T20231215000042
     """
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = ''.join(random.choices(string.digits, k=4))
-    return f"{prefix}{timestamp}{random_suffix}"
+    date = date or datetime.now()
+    return f"{prefix}{date.strftime('%Y%m%d')}{sequence:06d}"
 
 def calculate_working_days(start_date: datetime, end_date: datetime) -> int:
     """
     Рассчитывает количество рабочих дней между двумя датами
+    (включительно, по рабочему календарю SLA: выходные и праздники)
     
     Args:
         start_date: Начальная дата
@@ -28,19 +33,8 @@ def calculate_working_days(start_date: datetime, end_date: datetime) -> int:
     Returns:
         int: Количество рабочих дней
     """
-    if start_date > end_date:
-        return 0
-    
-    working_days = 0
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Пропускаем выходные (суббота=5, воскресенье=6)
-        if current_date.weekday() < 5:
-            working_days += 1
-        current_date += timedelta(days=1)
-    
-    return working_days
+    from app.core.sla import get_calendar
+    return get_calendar().working_days(start_date, end_date)
 
 def get_status_color(status: str) -> str:
     """
@@ -222,19 +216,10 @@ def get_first_letter_uppercase(text: str) -> str:
 def is_working_hours() -> bool:
     """
     Проверяет, находятся ли текущие время в рабочих часах
-    (предполагается 9:00-18:00 по будням)
+    (config.SLA_WORKING_HOURS и SLA_HOLIDAYS)
     
     Returns:
         bool: True если рабочие часы
     """
-    now = datetime.now()
-    
-    # Проверяем будний день (пн-пт)
-    if now.weekday() >= 5:  # 5=суббота, 6=воскресенье
-        return False
-    
-    # Проверяем время (9:00-18:00)
-    if now.hour < 9 or now.hour >= 18:
-        return False
-    
-    return True
\ No newline at end of file
+    from app.core.sla import get_calendar
+    return get_calendar().is_working_time(datetime.now())
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""
+Нагрузочные тесты системы учета заявок
+
+Запуск:
+    python -m benchmarks.run --scales small,medium -o results.json
+"""
@@ -0,0 +1,141 @@
+"""
+Замеры задержки и пропускной способности методов слоя данных
+"""
+
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from app.core.notifications import NotificationService
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(timings: List[float], total: float = None) -> dict:
+    """
+    Статистика по списку замеров в миллисекундах
+
+    Returns:
+        dict: Время в миллисекундах (mean, p50, p95, p99, max) и операций в секунду
+    """
+    timings = sorted(timings)
+    if total is None:
+        total = sum(timings) / 1000.0
+    return {
+        'iterations': len(timings),
+        'total_s': round(total, 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'p50_ms': round(_percentile(timings, 50), 4),
+        'p95_ms': round(_percentile(timings, 95), 4),
+        'p99_ms': round(_percentile(timings, 99), 4),
+        'max_ms': round(timings[-1], 4),
+        'ops_per_s': round(len(timings) / total, 2) if total > 0 else None
+    }
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 2) -> dict:
+    """Выполняет fn заданное число раз и возвращает статистику summarize"""
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - call_started) * 1000.0)
+    total = time.perf_counter() - started
+
+    return summarize(timings, total)
+
+class NotificationApi:
+    """Единый интерфейс уведомлений для обоих бэкендов"""
+
+    def __init__(self, db):
+        if db.dialect == 'mysql':
+            from app.core.mysql_notifications import MySQLNotificationManager
+            self.manager = MySQLNotificationManager(db)
+            self.get_user_notifications = self.manager.get_user_notifications
+            self.get_unread_count = self.manager.get_unread_count
+            self.mark_as_read = self.manager.mark_as_read
+        else:
+            self.manager = db
+            self.get_user_notifications = db.get_user_notifications
+            self.get_unread_count = db.get_unread_notifications_count
+            self.mark_as_read = db.mark_notification_as_read
+        self.create_notification = self.manager.create_notification
+
+def build_cases(db, dataset, seed: int = 7) -> Dict[str, Callable[[], object]]:
+    """Формирует замеряемые вызовы с аргументами из сгенерированного набора"""
+    rng = random.Random(seed)
+    notifications = NotificationApi(db)
+    service = NotificationService(db, notifications.manager)
+
+    clients = dataset.client_ids
+    masters = dataset.master_ids
+    tickets = dataset.ticket_ids
+    pending = list(dataset.pending_ticket_ids)
+    statuses = ['in_progress', 'waiting_parts', 'completed']
+    # Уведомления в основном у администраторов, поэтому читаем их ленту
+    heavy_user = dataset.admin_ids[0] if dataset.admin_ids else clients[0]
+
+    def assign_next():
+        if pending:
+            db.assign_ticket_to_master_with_notification(pending.pop(), rng.choice(masters), service)
+
+    return {
+        # Чтение
+        'get_all_tickets': lambda: db.get_all_tickets(),
+        'get_all_tickets_week': lambda: db.get_all_tickets(created_since=datetime.now() - timedelta(days=7)),
+        'get_pending_tickets': lambda: db.get_pending_tickets(),
+        'get_pending_tickets_top': lambda: db.get_pending_tickets(limit=50),
+        'get_tickets_by_master': lambda: db.get_tickets_by_master(rng.choice(masters)),
+        'get_tickets_by_client': lambda: db.get_tickets_by_client(rng.choice(clients)),
+        'get_ticket_by_id': lambda: db.get_ticket_by_id(rng.choice(tickets)),
+        'get_comments_by_ticket': lambda: db.get_comments_by_ticket(rng.choice(tickets)),
+        'get_masters': lambda: db.get_masters(),
+        'get_users_by_ids': lambda: db.get_users_by_ids(rng.sample(clients, min(20, len(clients)))),
+        'get_user_by_credentials': lambda: db.get_user_by_credentials('admin', 'admin123'),
+        'get_user_notifications': lambda: notifications.get_user_notifications(heavy_user),
+        'get_user_notifications_unread': lambda: notifications.get_user_notifications(heavy_user, unread_only=True),
+        'get_unread_notifications_count': lambda: notifications.get_unread_count(rng.choice(clients)),
+        # Запись
+        'create_ticket': lambda: db.create_ticket("Нагрузочный тест", "Создано бенчмарком", rng.choice(clients)),
+        'create_ticket_with_notification': lambda: db.create_ticket_with_notification(
+            "Нагрузочный тест", "Создано бенчмарком", rng.choice(clients), service),
+        'update_ticket_status': lambda: db.update_ticket_status(rng.choice(tickets), rng.choice(statuses)),
+        'update_ticket_status_with_notification': lambda: db.update_ticket_status_with_notification(
+            rng.choice(tickets), rng.choice(statuses), service),
+        'assign_ticket_to_master_with_notification': assign_next,
+        'add_comment': lambda: db.add_comment(rng.choice(tickets), clients[0], "Бенчмарк", "Комментарий"),
+        'create_notification': lambda: notifications.create_notification(
+            rng.choice(clients), "Бенчмарк", "Сообщение", 'status_change', rng.choice(tickets)),
+        'mark_notification_as_read': lambda: notifications.mark_as_read(rng.randint(1, max(1, dataset.notifications))),
+    }
+
+def run_database_benchmarks(db, dataset, iterations: int = 50, only: List[str] = None) -> Dict[str, dict]:
+    """
+    Замеряет все методы слоя данных
+
+    Args:
+        db: Database или MySQLDatabase с данными из generate_dataset
+        dataset: Результат generate_dataset
+        iterations: Вызовов на метод
+        only: Ограничить замер указанными методами
+
+    Returns:
+        Dict[str, dict]: Статистика по каждому методу
+    """
+    results = {}
+    for name, fn in build_cases(db, dataset).items():
+        if only and name not in only:
+            continue
+        try:
+            results[name] = measure(fn, iterations)
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+    return results
@@ -0,0 +1,345 @@
+"""
+Замеры построения интерфейса без запуска Flet
+
+Представления строятся на заполненной базе с поддельной страницей:
+Control.update() отключается, а фоновая загрузка, которую представления
+запускают через threading.Thread с задержкой, выполняется сразу. Для
+каждого представления и фабрики карточек считаются время построения,
+количество элементов в дереве и расход памяти.
+
+Пример:
+    python -m benchmarks.bench_ui --scales small,medium -o ui.json
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import flet as ft
+
+from app.core.auth import AuthManager
+from app.core.notifications import NotificationService
+from app.ui.components import ticket_cards
+from benchmarks.bench_database import NotificationApi, summarize
+from benchmarks.datagen import SCALES, generate_dataset
+from benchmarks.run import compare, sqlite_database
+
+# Модули, которые запускают загрузку данных в фоновом потоке
+VIEW_MODULES = (
+    'app.ui.views.dashboard.admin',
+    'app.ui.views.dashboard.master',
+    'app.ui.views.dashboard.client',
+    'app.ui.views.shared.stats',
+)
+
+class FakePage:
+    """Минимальная замена ft.Page для построения представлений"""
+
+    def __init__(self):
+        self.controls = []
+        self.overlay = []
+        self.snack_bar = None
+        self.dialog = None
+        self.title = None
+        self.window = SimpleNamespace(width=None, height=None, min_width=None, min_height=None)
+        self.updates = 0
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def clean(self):
+        self.controls.clear()
+
+    def open(self, control):
+        self.overlay.append(control)
+
+    def close(self, control):
+        if control in self.overlay:
+            self.overlay.remove(control)
+
+class _InlineThread:
+    """Выполняет target сразу при start(), чтобы замер включал отложенную загрузку"""
+
+    def __init__(self, target=None, args=(), kwargs=None, daemon=None, **_):
+        self._target = target
+        self._args = args
+        self._kwargs = kwargs or {}
+
+    def start(self):
+        if self._target:
+            self._target(*self._args, **self._kwargs)
+
+    def join(self, timeout=None):
+        pass
+
+_inline_threading = SimpleNamespace(Thread=_InlineThread)
+_instant_time = SimpleNamespace(sleep=lambda seconds: None, time=time.time, perf_counter=time.perf_counter)
+
+@contextlib.contextmanager
+def headless():
+    """Отключает обращения к клиенту Flet и фоновые потоки представлений"""
+    patches = [(ft.Control, 'update', lambda self: None)]
+    for name in VIEW_MODULES:
+        module = importlib.import_module(name)
+        if hasattr(module, 'threading'):
+            patches.append((module, 'threading', _inline_threading))
+        if hasattr(module, 'time'):
+            patches.append((module, 'time', _instant_time))
+
+    originals = [(target, attr, getattr(target, attr)) for target, attr, _ in patches]
+    try:
+        for target, attr, value in patches:
+            setattr(target, attr, value)
+        yield
+    finally:
+        for target, attr, value in originals:
+            setattr(target, attr, value)
+
+def count_controls(root) -> int:
+    """Количество элементов в дереве, включая корень"""
+    seen = set()
+    stack = [root]
+    while stack:
+        control = stack.pop()
+        if control is None or id(control) in seen:
+            continue
+        seen.add(id(control))
+        if hasattr(control, '_get_children'):
+            try:
+                stack.extend(control._get_children())
+                continue
+            except Exception:
+                pass
+        for attr in ('controls', 'content', 'tabs'):
+            child = getattr(control, attr, None)
+            if isinstance(child, list):
+                stack.extend(child)
+            elif child is not None:
+                stack.append(child)
+    return len(seen)
+
+def _memory(fn: Callable[[], object]) -> dict:
+    """Пиковая и удерживаемая память при вызове fn"""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {
+        'peak_kb': round((peak - before) / 1024, 1),
+        'retained_kb': round((after - before) / 1024, 1)
+    }
+
+class ViewFactory:
+    """Создает представления так же, как RepairSystemApp"""
+
+    def __init__(self, db, dataset):
+        self.db = db
+        self.notifications = NotificationApi(db)
+        self.service = NotificationService(db, self.notifications)
+        self.users = {
+            'admin': self._user(dataset.admin_ids[0]),
+            'master': self._user(self._busiest('assigned_master_id', dataset.master_ids)),
+            'client': self._user(self._busiest('client_id', dataset.client_ids)),
+        }
+
+    def _busiest(self, column: str, candidates: List[int]) -> int:
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {column}, COUNT(*) AS total FROM tickets WHERE {column} IS NOT NULL "
+            f"GROUP BY {column} ORDER BY total DESC"
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        if self.db.dialect == 'sqlite':
+            conn.close()
+        allowed = set(candidates)
+        return next((row[0] for row in rows if row[0] in allowed), candidates[0])
+
+    def _user(self, user_id: int) -> dict:
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        ph = '%s' if self.db.dialect == 'mysql' else '?'
+        cursor.execute(f"SELECT id, username, full_name, role, email, phone FROM users WHERE id = {ph}", (user_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        if self.db.dialect == 'sqlite':
+            conn.close()
+        return dict(zip(('id', 'username', 'full_name', 'role', 'email', 'phone'), row))
+
+    def _auth(self, role: str) -> AuthManager:
+        auth_manager = AuthManager(self.db)
+        auth_manager.current_user = self.users[role]
+        return auth_manager
+
+    def create(self, name: str):
+        noop = lambda *args, **kwargs: None
+        if name == 'admin':
+            from app.ui.views.dashboard.admin import AdminDashboardView
+            return AdminDashboardView(self._auth('admin'), self.db, noop, noop, noop, noop,
+                                      notification_service=self.service)
+        if name == 'master':
+            from app.ui.views.dashboard.master import MasterDashboardView
+            return MasterDashboardView(self._auth('master'), self.db, noop, noop, noop,
+                                       notification_service=self.service)
+        if name == 'client':
+            from app.ui.views.dashboard.client import ClientDashboardView
+            return ClientDashboardView(self._auth('client'), self.db, noop, noop, noop,
+                                       notification_manager=self.notifications,
+                                       notification_service=self.service)
+        if name == 'stats':
+            from app.ui.views.shared.stats import StatsView
+            return StatsView(self.db, noop)
+        raise ValueError(f"Неизвестное представление: {name}")
+
+    def open(self, name: str):
+        """Создает и строит представление, возвращает корневой элемент"""
+        view = self.create(name)
+        if name == 'stats':
+            # Как в RepairSystemApp.show_stats: страница назначается после build()
+            return view.build()
+        return view.build(FakePage())
+
+VIEWS = ('admin', 'master', 'client', 'stats')
+
+def bench_views(factory: ViewFactory, iterations: int) -> Dict[str, dict]:
+    """Время создания (данные) и построения (элементы) каждого представления"""
+    results = {}
+    for name in VIEWS:
+        init_timings, build_timings, total_timings = [], [], []
+        root = None
+        for _ in range(iterations):
+            page = FakePage()
+            started = time.perf_counter()
+            view = factory.create(name)
+            created = time.perf_counter()
+            if name == 'stats':
+                root = view.build()
+            else:
+                root = view.build(page)
+            finished = time.perf_counter()
+            init_timings.append((created - started) * 1000.0)
+            build_timings.append((finished - created) * 1000.0)
+            total_timings.append((finished - started) * 1000.0)
+
+        results[f"view:{name}"] = {
+            **summarize(total_timings),
+            'init_p50_ms': summarize(init_timings)['p50_ms'],
+            'build_p50_ms': summarize(build_timings)['p50_ms'],
+            'controls': count_controls(root),
+            **_memory(lambda: factory.open(name))
+        }
+    return results
+
+def bench_cards(factory: ViewFactory, iterations: int) -> Dict[str, dict]:
+    """Стоимость одной карточки для каждой фабрики из ticket_cards"""
+    tickets = factory.db.get_all_tickets()
+    client = factory.users['client']
+    noop = lambda *args, **kwargs: None
+    factories = {
+        'create_ticket_card': lambda t: ticket_cards.create_ticket_card(
+            t, client, on_edit=noop, on_delete=noop, on_comments=noop),
+        'create_admin_ticket_card': lambda t: ticket_cards.create_admin_ticket_card(
+            t, on_assign=noop, on_status_change=noop, on_edit=noop, on_comments=noop, on_delete=noop),
+        'create_master_ticket_card': lambda t: ticket_cards.create_master_ticket_card(
+            t, on_take=noop, on_status_change=noop, on_edit=noop, on_comments=noop),
+    }
+
+    results = {}
+    for name, create_card in factories.items():
+        timings = []
+        cards = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            cards = [create_card(ticket) for ticket in tickets]
+            timings.append((time.perf_counter() - started) * 1000.0)
+
+        stats = summarize(timings)
+        memory = _memory(lambda: [create_card(ticket) for ticket in tickets])
+        per_card = max(1, len(tickets))
+        results[f"cards:{name}"] = {
+            **stats,
+            'cards': len(tickets),
+            'per_card_us': round(stats['p50_ms'] * 1000.0 / per_card, 2),
+            'controls_per_card': round(sum(count_controls(card) for card in cards) / per_card, 2),
+            'bytes_per_card': round(memory['retained_kb'] * 1024 / per_card, 1),
+            **memory
+        }
+    return results
+
+def run_ui_benchmarks(scale: str, iterations: int, seed: int) -> dict:
+    with contextlib.redirect_stdout(sys.stderr), sqlite_database() as db:
+        dataset = generate_dataset(db, scale, seed=seed)
+        print(f"📦 ui/{scale}: {dataset.counts()}")
+        factory = ViewFactory(db, dataset)
+        with headless():
+            benchmarks = bench_views(factory, iterations)
+            benchmarks.update(bench_cards(factory, iterations))
+    return {
+        'backend': 'ui',
+        'scale': scale,
+        'dataset': dataset.counts(),
+        'benchmarks': benchmarks
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры построения интерфейса")
+    parser.add_argument('--scales', default='small',
+                        help=f"Размеры наборов через запятую ({', '.join(SCALES)})")
+    parser.add_argument('--iterations', type=int, default=5, help="Построений на представление")
+    parser.add_argument('--seed', type=int, default=42, help="Зерно генератора данных")
+    parser.add_argument('-o', '--output', default='-', help="Файл для результатов ('-' — stdout)")
+    parser.add_argument('--compare', default=None, help="JSON с базовыми результатами")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Допустимый рост p95 относительно базовых результатов")
+    args = parser.parse_args(argv)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'iterations': args.iterations,
+            'seed': args.seed
+        },
+        'results': []
+    }
+    for scale in [item.strip() for item in args.scales.split(',') if item.strip()]:
+        if scale not in SCALES:
+            parser.error(f"неизвестный размер: {scale}")
+        results['results'].append(run_ui_benchmarks(scale, args.iterations, args.seed))
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fp:
+            results['regressions'] = compare(results, json.load(fp), args.threshold)
+        for item in results['regressions']:
+            print(f"❌ {item['scale']} {item['benchmark']}: {item['metric']} "
+                  f"{item['baseline']} → {item['current']} (x{item['ratio']})", file=sys.stderr)
+        if results['regressions']:
+            exit_code = 1
+
+    payload = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(payload)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(payload)
+        print(f"✅ Результаты сохранены в {args.output}", file=sys.stderr)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
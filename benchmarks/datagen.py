@@ -0,0 +1,238 @@
+"""
+Генерация синтетических данных для нагрузочных тестов
+
+Распределения приближены к реальной работе сервиса: клиентов много и
+у небольшой части из них большинство заявок, мастеров мало и загружены
+они неравномерно, большая часть заявок уже завершена, комментариев и
+уведомлений на заявку - единицы, новые заявки встречаются чаще старых.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List
+
+from app.core import bulk_io
+
+# Размеры наборов данных
+SCALES = {
+    'small': {'clients': 50, 'masters': 5, 'tickets': 500},
+    'medium': {'clients': 500, 'masters': 20, 'tickets': 5000},
+    'large': {'clients': 5000, 'masters': 50, 'tickets': 50000},
+}
+
+STATUS_WEIGHTS = {
+    'pending': 0.20,
+    'in_progress': 0.25,
+    'waiting_parts': 0.10,
+    'completed': 0.40,
+    'cancelled': 0.05
+}
+
+# Приоритеты заявок (app.core.models.PRIORITY_*)
+PRIORITY_WEIGHTS = {
+    1: 0.20,
+    2: 0.60,
+    3: 0.15,
+    4: 0.05
+}
+
+# Средние значения распределений
+MEAN_COMMENTS_PER_TICKET = 2.0
+MEAN_TICKET_AGE_DAYS = 60.0
+READ_NOTIFICATION_SHARE = 0.7
+
+BENCH_PASSWORD = 'bench123'
+
+FIRST_NAMES = ['Иван', 'Петр', 'Алексей', 'Сергей', 'Андрей', 'Дмитрий', 'Ольга', 'Анна',
+               'Мария', 'Елена', 'Наталья', 'Татьяна']
+LAST_NAMES = ['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Соколов',
+              'Михайлов', 'Новиков', 'Федоров']
+EQUIPMENT = ['принтера', 'станка', 'компьютера', 'сканера', 'кондиционера', 'котла',
+             'насоса', 'сервера', 'проектора', 'холодильника']
+PROBLEMS = ['Не включается', 'Издает посторонний шум', 'Перегревается', 'Выдает ошибку',
+            'Работает медленно', 'Требуется плановое обслуживание']
+
+@dataclass
+class Dataset:
+    """Идентификаторы сгенерированных записей для выбора аргументов в тестах"""
+    scale: str
+    admin_ids: List[int] = field(default_factory=list)
+    client_ids: List[int] = field(default_factory=list)
+    master_ids: List[int] = field(default_factory=list)
+    ticket_ids: List[int] = field(default_factory=list)
+    pending_ticket_ids: List[int] = field(default_factory=list)
+    comments: int = 0
+    notifications: int = 0
+
+    def counts(self) -> dict:
+        return {
+            'clients': len(self.client_ids),
+            'masters': len(self.master_ids),
+            'tickets': len(self.ticket_ids),
+            'comments': self.comments,
+            'notifications': self.notifications
+        }
+
+def _placeholder(db) -> str:
+    return '%s' if db.dialect == 'mysql' else '?'
+
+def _max_id(db, table: str) -> int:
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    value = cursor.fetchone()[0]
+    cursor.close()
+    if db.dialect == 'sqlite':
+        conn.close()
+    return int(value)
+
+def _insert_users(db, users: List[tuple]):
+    ph = _placeholder(db)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO users (id, username, password, full_name, role, email, phone) "
+        f"VALUES ({', '.join([ph] * 7)})",
+        users
+    )
+    conn.commit()
+    cursor.close()
+    if db.dialect == 'sqlite':
+        conn.close()
+
+def _pareto_weights(rng: random.Random, count: int, alpha: float = 1.2) -> List[float]:
+    """Веса с тяжелым хвостом: немногие получают большую часть выборок"""
+    return [rng.paretovariate(alpha) for _ in range(count)]
+
+def _geometric(rng: random.Random, mean: float) -> int:
+    """Неотрицательное целое с геометрическим распределением и заданным средним"""
+    p = 1.0 / (mean + 1.0)
+    count = 0
+    while rng.random() > p:
+        count += 1
+    return count
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}"
+
+def generate_dataset(db, scale: str = 'small', seed: int = 42) -> Dataset:
+    """
+    Заполняет базу синтетическими данными
+
+    Args:
+        db: Database или MySQLDatabase (желательно пустая)
+        scale: Размер набора из SCALES
+        seed: Зерно генератора случайных чисел
+
+    Returns:
+        Dataset: Идентификаторы созданных записей
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Неизвестный размер: {scale}. Доступны: {', '.join(SCALES)}")
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    dataset = Dataset(scale=scale)
+    now = datetime.now().replace(microsecond=0)
+
+    # Пользователи
+    next_user_id = _max_id(db, 'users') + 1
+    users = []
+    for role, count in (('master', sizes['masters']), ('client', sizes['clients'])):
+        for i in range(count):
+            user_id = next_user_id
+            next_user_id += 1
+            users.append((
+                user_id, f"bench_{role}{i}", BENCH_PASSWORD, _person(rng), role,
+                f"bench_{role}{i}@example.com", f"+7999{user_id:07d}"
+            ))
+            (dataset.master_ids if role == 'master' else dataset.client_ids).append(user_id)
+    _insert_users(db, users)
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM users WHERE role = 'admin'")
+    dataset.admin_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    if db.dialect == 'sqlite':
+        conn.close()
+
+    # Заявки
+    client_weights = _pareto_weights(rng, len(dataset.client_ids))
+    master_weights = _pareto_weights(rng, len(dataset.master_ids), alpha=3.0)
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    priorities = list(PRIORITY_WEIGHTS)
+    priority_weights = list(PRIORITY_WEIGHTS.values())
+
+    next_ticket_id = _max_id(db, 'tickets') + 1
+    tickets = []
+    for _ in range(sizes['tickets']):
+        ticket_id = next_ticket_id
+        next_ticket_id += 1
+        status = rng.choices(statuses, status_weights)[0]
+        client_id = rng.choices(dataset.client_ids, client_weights)[0]
+        master_id = None if status == 'pending' else rng.choices(dataset.master_ids, master_weights)[0]
+        created = now - timedelta(days=rng.expovariate(1.0 / MEAN_TICKET_AGE_DAYS))
+        tickets.append({
+            'id': ticket_id,
+            'ticket_number': None,
+            'title': f"Ремонт {rng.choice(EQUIPMENT)}",
+            'description': rng.choice(PROBLEMS),
+            'status': status,
+            'created_date': created.isoformat(timespec='seconds'),
+            'client_id': client_id,
+            'assigned_master_id': master_id,
+            'priority': rng.choices(priorities, priority_weights)[0]
+        })
+        dataset.ticket_ids.append(ticket_id)
+        if status == 'pending':
+            dataset.pending_ticket_ids.append(ticket_id)
+    bulk_io.import_rows(db, 'tickets', tickets)
+
+    # Комментарии и уведомления
+    user_names = {user[0]: user[3] for user in users}
+
+    def comment_rows():
+        for ticket in tickets:
+            created = datetime.fromisoformat(ticket['created_date'])
+            authors = [ticket['client_id']]
+            if ticket['assigned_master_id']:
+                authors.append(ticket['assigned_master_id'])
+            for _ in range(_geometric(rng, MEAN_COMMENTS_PER_TICKET)):
+                created += timedelta(minutes=rng.randint(5, 24 * 60))
+                author = rng.choice(authors)
+                dataset.comments += 1
+                yield {
+                    'ticket_id': ticket['id'],
+                    'user_id': author,
+                    'user_name': user_names[author],
+                    'comment_text': rng.choice(PROBLEMS),
+                    'created_date': min(created, now).isoformat(timespec='seconds')
+                }
+
+    def notification_rows():
+        for ticket in tickets:
+            created = datetime.fromisoformat(ticket['created_date'])
+            recipients = [(admin_id, 'new_ticket') for admin_id in dataset.admin_ids]
+            if ticket['assigned_master_id']:
+                recipients.append((ticket['assigned_master_id'], 'assignment'))
+                recipients.append((ticket['client_id'], 'master_assigned'))
+            if ticket['status'] != 'pending':
+                recipients.append((ticket['client_id'], 'status_change'))
+            for user_id, notification_type in recipients:
+                dataset.notifications += 1
+                yield {
+                    'user_id': user_id,
+                    'title': "Уведомление по заявке",
+                    'message': f"{ticket['title']}: {ticket['status']}",
+                    'notification_type': notification_type,
+                    'is_read': rng.random() < READ_NOTIFICATION_SHARE,
+                    'created_date': created.isoformat(timespec='seconds'),
+                    'related_ticket_id': ticket['id']
+                }
+
+    bulk_io.import_rows(db, 'comments', comment_rows(), keep_ids=False)
+    bulk_io.import_rows(db, 'notifications', notification_rows(), keep_ids=False)
+
+    return dataset
@@ -0,0 +1,219 @@
+"""
+Запуск нагрузочных тестов слоя данных
+
+Примеры:
+    python -m benchmarks.run --scales small,medium -o results.json
+    python -m benchmarks.run --backends sqlite,mysql --iterations 100
+    python -m benchmarks.run -o new.json --compare baseline.json --threshold 1.25
+
+Для MySQL используется отдельная база <MYSQL_DATABASE>_bench, которая
+создается перед замером и удаляется после него. Если MySQL недоступен,
+бэкенд пропускается с указанием причины в результатах.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import app.config as config
+from benchmarks.bench_database import run_database_benchmarks
+from benchmarks.datagen import SCALES, generate_dataset
+
+BACKENDS = ('sqlite', 'mysql')
+
+@contextlib.contextmanager
+def sqlite_database():
+    """Временная SQLite база в отдельном каталоге"""
+    from app.core.database import Database
+
+    workdir = tempfile.mkdtemp(prefix='repair_bench_')
+    original_path = config.DATABASE_PATH
+    config.DATABASE_PATH = os.path.join(workdir, 'bench.db')
+    try:
+        yield Database()
+    finally:
+        config.DATABASE_PATH = original_path
+        shutil.rmtree(workdir, ignore_errors=True)
+
+@contextlib.contextmanager
+def mysql_database():
+    """Отдельная MySQL база для замеров, удаляется после использования"""
+    import mysql.connector
+    from app.core.mysql_database import MySQLDatabase
+
+    bench_name = f"{config.MYSQL_DATABASE}_bench"
+    server = mysql.connector.connect(
+        host=config.MYSQL_HOST,
+        user=config.MYSQL_USER,
+        password=config.MYSQL_PASSWORD,
+        port=config.MYSQL_PORT
+    )
+    cursor = server.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{bench_name}`")
+    cursor.execute(f"CREATE DATABASE `{bench_name}` CHARACTER SET utf8mb4")
+
+    original_name = config.MYSQL_DATABASE
+    config.MYSQL_DATABASE = bench_name
+    db = None
+    try:
+        db = MySQLDatabase()
+        yield db
+    finally:
+        if db is not None:
+            db.close()
+        config.MYSQL_DATABASE = original_name
+        cursor.execute(f"DROP DATABASE IF EXISTS `{bench_name}`")
+        server.close()
+
+def mysql_unavailable_reason():
+    """Возвращает причину недоступности MySQL или None"""
+    try:
+        import mysql.connector
+    except ImportError:
+        return "mysql-connector-python не установлен"
+    try:
+        conn = mysql.connector.connect(
+            host=config.MYSQL_HOST,
+            user=config.MYSQL_USER,
+            password=config.MYSQL_PASSWORD,
+            port=config.MYSQL_PORT,
+            connection_timeout=3
+        )
+        conn.close()
+    except Exception as e:
+        return f"нет подключения к MySQL: {e}"
+    return None
+
+def run_backend(backend: str, scale: str, iterations: int, seed: int, only=None) -> dict:
+    """Генерирует данные и замеряет методы одного бэкенда"""
+    factory = sqlite_database if backend == 'sqlite' else mysql_database
+    # Методы базы печатают служебные сообщения, они не должны попасть в JSON
+    with contextlib.redirect_stdout(sys.stderr), factory() as db:
+        started = time.perf_counter()
+        dataset = generate_dataset(db, scale, seed=seed)
+        generate_s = time.perf_counter() - started
+        print(f"📦 {backend}/{scale}: данные сгенерированы за {generate_s:.1f} с "
+              f"({dataset.counts()})")
+
+        benchmarks = run_database_benchmarks(db, dataset, iterations, only=only)
+
+    return {
+        'backend': backend,
+        'scale': scale,
+        'dataset': dataset.counts(),
+        'generate_s': round(generate_s, 3),
+        'benchmarks': benchmarks
+    }
+
+def compare(results: dict, baseline: dict, threshold: float, metric: str = 'p95_ms') -> list:
+    """
+    Сравнивает результаты с базовыми и возвращает регрессии
+
+    Регрессией считается рост метрики больше чем в threshold раз.
+    """
+    baseline_index = {
+        (run['backend'], run['scale']): run['benchmarks'] for run in baseline.get('results', [])
+    }
+    regressions = []
+    for run in results['results']:
+        previous = baseline_index.get((run['backend'], run['scale']))
+        if not previous:
+            continue
+        for name, stats in run['benchmarks'].items():
+            old = previous.get(name, {}).get(metric)
+            new = stats.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            if ratio > threshold:
+                regressions.append({
+                    'backend': run['backend'],
+                    'scale': run['scale'],
+                    'benchmark': name,
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'ratio': round(ratio, 3)
+                })
+    return regressions
+
+def _split(value: str) -> list:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочные тесты слоя данных")
+    parser.add_argument('--scales', default='small',
+                        help=f"Размеры наборов через запятую ({', '.join(SCALES)})")
+    parser.add_argument('--backends', default='sqlite,mysql',
+                        help="Бэкенды через запятую (sqlite, mysql)")
+    parser.add_argument('--iterations', type=int, default=50, help="Вызовов на метод")
+    parser.add_argument('--only', default=None, help="Замерять только указанные методы")
+    parser.add_argument('--seed', type=int, default=42, help="Зерно генератора данных")
+    parser.add_argument('-o', '--output', default='-', help="Файл для результатов ('-' — stdout)")
+    parser.add_argument('--compare', default=None, help="JSON с базовыми результатами")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Допустимый рост p95 относительно базовых результатов")
+    args = parser.parse_args(argv)
+
+    scales = _split(args.scales)
+    backends = _split(args.backends)
+    for scale in scales:
+        if scale not in SCALES:
+            parser.error(f"неизвестный размер: {scale}")
+    for backend in backends:
+        if backend not in BACKENDS:
+            parser.error(f"неизвестный бэкенд: {backend}")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'seed': args.seed
+        },
+        'results': [],
+        'skipped': []
+    }
+
+    only = _split(args.only) if args.only else None
+    for backend in backends:
+        if backend == 'mysql':
+            reason = mysql_unavailable_reason()
+            if reason:
+                print(f"⚠️ MySQL пропущен: {reason}", file=sys.stderr)
+                results['skipped'].append({'backend': backend, 'reason': reason})
+                continue
+        for scale in scales:
+            results['results'].append(run_backend(backend, scale, args.iterations, args.seed, only))
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fp:
+            baseline = json.load(fp)
+        results['regressions'] = compare(results, baseline, args.threshold)
+        for item in results['regressions']:
+            print(f"❌ {item['backend']}/{item['scale']} {item['benchmark']}: "
+                  f"{item['metric']} {item['baseline']} → {item['current']} (x{item['ratio']})",
+                  file=sys.stderr)
+        if results['regressions']:
+            exit_code = 1
+
+    payload = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(payload)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(payload)
+        print(f"✅ Результаты сохранены в {args.output}", file=sys.stderr)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Служебные команды системы учета заявок
+
+Примеры:
+    python manage.py export tickets -o tickets.jsonl
+    python manage.py export comments -o comments.csv
+    python manage.py import tickets tickets.jsonl
+    python manage.py query-stats --sort p95_ms --limit 10
+    python manage.py migrate
+    python manage.py seed
+    python manage.py retention --mode file
+    python manage.py purge --grace-seconds 0
+    python manage.py sla --recompute
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import app.config as config
+from app.core import bulk_io
+from app.core.telemetry import configure_logging
+
+def _open_database(initialize: bool = True):
+    """Создает базу данных, не засоряя stdout служебными сообщениями"""
+    from app.core.database_factory import create_database
+    with contextlib.redirect_stdout(sys.stderr):
+        return create_database(initialize=initialize)
+
+def cmd_export(args):
+    db = _open_database()
+    fmt = args.format or bulk_io.detect_format(args.output)
+    started = time.perf_counter()
+
+    if args.output == '-':
+        count = bulk_io.export_table(db, args.table, sys.stdout, fmt, args.batch_size)
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='') as fp:
+            count = bulk_io.export_table(db, args.table, fp, fmt, args.batch_size)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {args.table}: выгружено {count} строк за {elapsed:.1f} с", file=sys.stderr)
+    return 0
+
+def cmd_import(args):
+    db = _open_database()
+    fmt = args.format or bulk_io.detect_format(args.input)
+    started = time.perf_counter()
+
+    if args.input == '-':
+        count = bulk_io.import_table(db, args.table, sys.stdin, fmt, args.batch_size,
+                                     keep_ids=not args.new_ids)
+    else:
+        with open(args.input, 'r', encoding='utf-8', newline='') as fp:
+            count = bulk_io.import_table(db, args.table, fp, fmt, args.batch_size,
+                                         keep_ids=not args.new_ids)
+
+    if args.table == 'tickets':
+        # Срок SLA заявкам, загруженным без него (выгрузки до появления sla_due)
+        from app.core import sla
+        sla.fill_due_dates(db)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {args.table}: обработано {count} строк за {elapsed:.1f} с "
+          f"(дубликаты пропущены)", file=sys.stderr)
+    return 0
+
+def cmd_query_stats(args):
+    from app.core import instrumentation
+
+    path = args.file or config.QUERY_STATS_PATH
+    if not os.path.exists(path):
+        print(f"❌ Файл {path} не найден. Включите QUERY_INSTRUMENTATION в config.py, "
+              f"сводка сохраняется при завершении приложения", file=sys.stderr)
+        return 1
+
+    with open(path, encoding='utf-8') as fp:
+        data = json.load(fp)
+    data['top'].sort(key=lambda item: item.get(args.sort, 0), reverse=True)
+    data['top'] = data['top'][:args.limit]
+
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print(instrumentation.format_summary(data))
+
+    if args.slow:
+        log_path = config.SLOW_QUERY_LOG_PATH
+        if not log_path or not os.path.exists(log_path):
+            print(f"\n⚠️ Журнал медленных запросов {log_path} пуст", file=sys.stderr)
+            return 0
+        with open(log_path, encoding='utf-8') as fp:
+            entries = [json.loads(line) for line in fp if line.strip()]
+        entries.sort(key=lambda entry: entry['ms'], reverse=True)
+        print(f"\n🐢 Самые медленные запросы ({log_path}):")
+        for entry in entries[:args.slow]:
+            print(f"{entry['ms']:>10.1f} мс  {entry['ts']}  {entry['call_site']}")
+            print(f"{'':>14}{entry['sql']}  {entry['params'] or ''}")
+    return 0
+
+def cmd_migrate(args):
+    from app.core import bootstrap
+    db = _open_database(initialize=False)
+    before, after = bootstrap.ensure_schema(db, seed=args.seed)
+    if before == after:
+        print(f"✅ Схема актуальна (версия {after})")
+    else:
+        print(f"✅ Схема обновлена: версия {before} → {after}")
+    return 0
+
+def cmd_seed(args):
+    from app.core import bootstrap
+    db = _open_database()
+    if bootstrap.seed_demo_data(db, force=args.force):
+        print("✅ Демо-данные загружены")
+    else:
+        print(f"⚠️ Демо-данные уже загружались ({bootstrap.get_meta(db, bootstrap.SEED_KEY)}), "
+              f"используйте --force")
+    return 0
+
+def cmd_retention(args):
+    from app.core import retention
+    db = _open_database()
+    started = time.perf_counter()
+    archived = retention.archive_read_notifications(db, ttl_days=args.ttl_days, mode=args.mode)
+    purged = retention.purge_archive(db, ttl_days=args.archive_ttl_days)
+    elapsed = time.perf_counter() - started
+    unit = "секций" if db.dialect == 'mysql' else "строк"
+    print(f"✅ Уведомлений перенесено: {archived}, удалено из архива {unit}: {purged} "
+          f"за {elapsed:.1f} с")
+    return 0
+
+def cmd_purge(args):
+    from app.core import purge
+    db = _open_database()
+    started = time.perf_counter()
+    purged = purge.purge_deleted_tickets(db, grace_seconds=args.grace_seconds, batch_size=args.batch_size)
+    print(f"✅ Удалено заявок: {purged} за {time.perf_counter() - started:.1f} с")
+    return 0
+
+def cmd_sla(args):
+    from app.core import sla
+    from app.utils.formatters import format_date
+    db = _open_database()
+    updated = sla.fill_due_dates(db, recompute=args.recompute)
+    if updated:
+        print(f"✅ Сроки заполнены у заявок: {updated}")
+    raised = sla.escalate_priorities(db)
+    if raised:
+        print(f"✅ Повышен приоритет заявок: {raised}")
+    overdue = db.get_overdue_tickets(limit=args.limit)
+    if not overdue:
+        print("✅ Просроченных заявок нет")
+        return 0
+    print(f"⚠️ Просроченные заявки (первые {args.limit}):" if len(overdue) == args.limit
+          else f"⚠️ Просроченных заявок: {len(overdue)}")
+    for ticket in overdue:
+        print(f"  #{ticket['ticket_number']}  срок {format_date(ticket['sla_due'], 'datetime')}  "
+              f"{ticket['status']}  {ticket['master_name'] or 'без мастера'}  {ticket['title']}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Служебные команды системы учета заявок")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Выгрузить таблицу в CSV/JSONL")
+    export_parser.add_argument('table', choices=list(bulk_io.TABLES))
+    export_parser.add_argument('-o', '--output', default='-',
+                               help="Файл для выгрузки ('-' — stdout)")
+    export_parser.add_argument('--format', choices=bulk_io.FORMATS, default=None,
+                               help="Формат (по умолчанию по расширению файла, иначе jsonl)")
+    export_parser.add_argument('--batch-size', type=int, default=bulk_io.DEFAULT_BATCH_SIZE,
+                               help="Строк в одном запросе к базе")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser('import', help="Загрузить таблицу из CSV/JSONL")
+    import_parser.add_argument('table', choices=list(bulk_io.TABLES))
+    import_parser.add_argument('input', help="Файл для загрузки ('-' — stdin)")
+    import_parser.add_argument('--format', choices=bulk_io.FORMATS, default=None,
+                               help="Формат (по умолчанию по расширению файла, иначе jsonl)")
+    import_parser.add_argument('--batch-size', type=int, default=bulk_io.DEFAULT_BATCH_SIZE,
+                               help="Строк в одном пакете вставки")
+    import_parser.add_argument('--new-ids', action='store_true',
+                               help="Не сохранять id из файла, назначить новые")
+    import_parser.set_defaults(func=cmd_import)
+
+    stats_parser = subparsers.add_parser('query-stats', help="Сводка по SQL-запросам")
+    stats_parser.add_argument('--file', default=None,
+                              help="Файл со сводкой (по умолчанию QUERY_STATS_PATH)")
+    stats_parser.add_argument('--sort', default='total_ms',
+                              choices=['total_ms', 'calls', 'mean_ms', 'p95_ms', 'max_ms', 'rows'])
+    stats_parser.add_argument('--limit', type=int, default=20, help="Сколько запросов показать")
+    stats_parser.add_argument('--slow', type=int, default=0,
+                              help="Показать N самых медленных запросов из журнала")
+    stats_parser.add_argument('--json', action='store_true', help="Вывести сводку в JSON")
+    stats_parser.set_defaults(func=cmd_query_stats)
+
+    migrate_parser = subparsers.add_parser('migrate', help="Обновить схему базы до текущей версии")
+    migrate_parser.add_argument('--seed', action='store_true',
+                                help="Загрузить демо-данные, если база создается с нуля")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    seed_parser = subparsers.add_parser('seed', help="Загрузить тестовых пользователей и заявки")
+    seed_parser.add_argument('--force', action='store_true',
+                             help="Загрузить повторно, даже если отметка о загрузке уже есть")
+    seed_parser.set_defaults(func=cmd_seed)
+
+    retention_parser = subparsers.add_parser('retention', help="Перенести старые прочитанные уведомления в архив")
+    retention_parser.add_argument('--mode', choices=('table', 'file', 'delete'), default=None,
+                                  help="Куда переносить (по умолчанию NOTIFICATION_ARCHIVE_MODE)")
+    retention_parser.add_argument('--ttl-days', type=int, default=None,
+                                  help="Срок хранения прочитанных (по умолчанию NOTIFICATION_READ_TTL_DAYS)")
+    retention_parser.add_argument('--archive-ttl-days', type=int, default=None,
+                                  help="Срок хранения архива (по умолчанию NOTIFICATION_ARCHIVE_TTL_DAYS)")
+    retention_parser.set_defaults(func=cmd_retention)
+
+    purge_parser = subparsers.add_parser('purge', help="Удалить заявки, помеченные удаленными")
+    purge_parser.add_argument('--grace-seconds', type=int, default=None,
+                              help="Сколько хранить после пометки (по умолчанию TICKET_PURGE_GRACE_SECONDS)")
+    purge_parser.add_argument('--batch-size', type=int, default=None,
+                              help="Заявок в одной транзакции (по умолчанию TICKET_PURGE_BATCH_SIZE)")
+    purge_parser.set_defaults(func=cmd_purge)
+
+    sla_parser = subparsers.add_parser('sla', help="Заполнить сроки SLA, поднять приоритет по сроку и показать просроченные заявки")
+    sla_parser.add_argument('--recompute', action='store_true',
+                            help="Пересчитать сроки всех открытых заявок (после изменения календаря)")
+    sla_parser.add_argument('--limit', type=int, default=50, help="Сколько просроченных заявок показать")
+    sla_parser.set_defaults(func=cmd_sla)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
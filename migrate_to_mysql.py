@@ -1,188 +1,690 @@
-#!/usr/bin/env python3
-"""
-Скрипт миграции данных из SQLite в MySQL
-"""
-
-import sqlite3
-import mysql.connector
-from datetime import datetime
-import sys
-import os
-
-def get_mysql_config():
-    """Получает настройки MySQL из config.py или запрашивает у пользователя"""
-    try:
-        # Пробуем импортировать из config.py
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
-        import app.config as config
-        
-        # Проверяем есть ли настройки MySQL
-        if hasattr(config, 'MYSQL_HOST'):
-            return {
-                'host': config.MYSQL_HOST,
-                'port': config.MYSQL_PORT,
-                'user': config.MYSQL_USER,
-                'password': config.MYSQL_PASSWORD,
-                'database': config.MYSQL_DATABASE
-            }
-    except:
-        pass
-    
-    # Если настроек нет - запрашиваем у пользователя
-    print("🔧 Настройки MySQL не найдены в config.py")
-    print("📝 Введите данные для подключения к MySQL:")
-    
-    return {
-        'host': input("Хост [localhost]: ") or "localhost",
-        'port': int(input("Порт [3306]: ") or "3306"),
-        'user': input("Пользователь [root]: ") or "root",
-        'password': input("Пароль: "),
-        'database': input("База данных [repair_system]: ") or "repair_system"
-    }
-
-def migrate_data():
-    """Переносит данные из SQLite в MySQL"""
-    
-    print("=" * 50)
-    print("МИГРАЦИЯ ДАННЫХ ИЗ SQLITE В MYSQL")
-    print("=" * 50)
-    
-    # Получаем настройки MySQL
-    mysql_config = get_mysql_config()
-    
-    # Проверяем существование SQLite базы
-    if not os.path.exists('repair_system.db'):
-        print("❌ Файл repair_system.db не найден!")
-        return False
-    
-    # Подключение к SQLite
-    try:
-        sqlite_conn = sqlite3.connect('repair_system.db')
-        sqlite_cursor = sqlite_conn.cursor()
-        print("✅ Подключение к SQLite успешно")
-    except Exception as e:
-        print(f"❌ Ошибка подключения к SQLite: {e}")
-        return False
-    
-    # Подключение к MySQL
-    try:
-        mysql_conn = mysql.connector.connect(**mysql_config)
-        mysql_cursor = mysql_conn.cursor()
-        print("✅ Подключение к MySQL успешно")
-    except Exception as e:
-        print(f"❌ Ошибка подключения к MySQL: {e}")
-        sqlite_conn.close()
-        return False
-    
-    try:
-        # 1. Миграция пользователей
-        print("\n📋 Миграция пользователей...")
-        sqlite_cursor.execute("SELECT id, username, password, full_name, role, email, phone FROM users")
-        users = sqlite_cursor.fetchall()
-        
-        for user in users:
-            mysql_cursor.execute(
-                "INSERT IGNORE INTO users (id, username, password, full_name, role, email, phone) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                user
-            )
-        print(f"✅ Перенесено пользователей: {len(users)}")
-        
-        # 2. Миграция заявок
-        print("\n📋 Миграция заявок...")
-        sqlite_cursor.execute("SELECT id, ticket_number, title, description, status, created_date, client_id, assigned_master_id FROM tickets")
-        tickets = sqlite_cursor.fetchall()
-        
-        for ticket in tickets:
-            # Конвертируем дату если нужно
-            created_date = ticket[5]
-            if isinstance(created_date, str) and 'T' in created_date:
-                created_date = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
-            
-            mysql_cursor.execute(
-                "INSERT IGNORE INTO tickets (id, ticket_number, title, description, status, created_date, client_id, assigned_master_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
-                (*ticket[:5], created_date, *ticket[6:])
-            )
-        print(f"✅ Перенесено заявок: {len(tickets)}")
-        
-        # 3. Миграция комментариев
-        print("\n📋 Миграция комментариев...")
-        sqlite_cursor.execute("SELECT id, ticket_id, user_id, user_name, comment_text, created_date FROM comments")
-        comments = sqlite_cursor.fetchall()
-        
-        for comment in comments:
-            # Конвертируем дату если нужно
-            created_date = comment[5]
-            if isinstance(created_date, str) and 'T' in created_date:
-                created_date = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
-            
-            mysql_cursor.execute(
-                "INSERT IGNORE INTO comments (id, ticket_id, user_id, user_name, comment_text, created_date) VALUES (%s, %s, %s, %s, %s, %s)",
-                (*comment[:5], created_date)
-            )
-        print(f"✅ Перенесено комментариев: {len(comments)}")
-        
-        mysql_conn.commit()
-        
-        print("\n" + "=" * 50)
-        print("🎉 МИГРАЦИЯ УСПЕШНО ЗАВЕРШЕНА!")
-        print(f"📊 Статистика:")
-        print(f"   👥 Пользователи: {len(users)}")
-        print(f"   📝 Заявки: {len(tickets)}")
-        print(f"   💬 Комментарии: {len(comments)}")
-        print("=" * 50)
-        
-        # Сохраняем настройки в config.py
-        save_config_to_file(mysql_config)
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Ошибка при миграции: {e}")
-        mysql_conn.rollback()
-        return False
-    
-    finally:
-        sqlite_conn.close()
-        mysql_conn.close()
-
-def save_config_to_file(mysql_config):
-    """Сохраняет настройки MySQL в config.py"""
-    config_path = os.path.join('app', 'config.py')
-    
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Проверяем есть ли уже настройки MySQL
-        if 'MYSQL_HOST' not in content:
-            # Находим где добавить настройки (после DATABASE_PATH)
-            if 'DATABASE_PATH = ' in content:
-                insert_pos = content.find('DATABASE_PATH = ') + len('DATABASE_PATH = "repair_system.db"')
-                new_content = content[:insert_pos] + f'''
-
-# Настройки MySQL
-MYSQL_HOST = "{mysql_config['host']}"
-MYSQL_PORT = {mysql_config['port']}
-MYSQL_USER = "{mysql_config['user']}"
-MYSQL_PASSWORD = "{mysql_config['password']}"
-MYSQL_DATABASE = "{mysql_config['database']}"''' + content[insert_pos:]
-                
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                
-                print(f"✅ Настройки MySQL сохранены в {config_path}")
-        
-    except Exception as e:
-        print(f"⚠️ Не удалось сохранить настройки в config.py: {e}")
-
-if __name__ == "__main__":
-    success = migrate_data()
-    
-    if success:
-        print("\n🎯 Дальнейшие действия:")
-        print("1. Убедитесь, что в app/config.py установлено: DATABASE_TYPE = 'mysql'")
-        print("2. Запустите приложение: python run.py")
-        print("3. Проверьте работу всех функций")
-    else:
-        print("\n❌ Миграция не удалась. Проверьте настройки и попробуйте снова.")
-        sys.exit(1)
\ No newline at end of file
+#!/usr/bin/env python3
+"""
+Скрипт миграции данных из SQLite в MySQL
+
+Данные переносятся потоково: таблицы читаются порциями по первичному ключу,
+вставляются пакетами через executemany и фиксируются после каждой порции.
+Позиция каждой таблицы сохраняется в файл контрольной точки, поэтому
+прерванную миграцию можно продолжить с места остановки.
+
+С --workers N независимые таблицы и диапазоны id копируются параллельно,
+а --verify сверяет количество строк и контрольные суммы по диапазонам.
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import mysql.connector
+import time
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from app.core.bulk_io import refresh_comment_stats
+
+# Размер порции по умолчанию (строк на один executemany и один commit)
+DEFAULT_BATCH_SIZE = 5000
+
+# Файл контрольной точки для возобновления миграции
+DEFAULT_CHECKPOINT_PATH = '.migration_checkpoint.json'
+
+# Размер диапазона id для параллельного переноса и проверки контрольных сумм
+DEFAULT_RANGE_SIZE = 50000
+DEFAULT_VERIFY_CHUNK = 10000
+
+# Таблицы в порядке внешних ключей: сначала родительские, затем зависимые
+TABLES = [
+    {
+        'name': 'users',
+        'title': 'Пользователи',
+        'columns': ['id', 'username', 'password', 'full_name', 'role', 'email', 'phone'],
+        'date_columns': [],
+        'depends_on': []
+    },
+    {
+        'name': 'tickets',
+        'title': 'Заявки',
+        'columns': ['id', 'ticket_number', 'title', 'description', 'status', 'created_date',
+                    'client_id', 'assigned_master_id', 'priority', 'sla_due', 'deleted_at'],
+        # Помеченные удаленными заявки переносятся с пометкой: скрыты до purge,
+        # а ссылки на них из комментариев и уведомлений остаются корректными
+        'date_columns': ['created_date', 'sla_due', 'deleted_at'],
+        'depends_on': ['users']
+    },
+    {
+        'name': 'comments',
+        'title': 'Комментарии',
+        'columns': ['id', 'ticket_id', 'user_id', 'user_name', 'user_role', 'comment_text', 'created_date'],
+        'date_columns': ['created_date'],
+        'depends_on': ['tickets', 'users']
+    },
+    {
+        'name': 'notifications',
+        'title': 'Уведомления',
+        'columns': ['id', 'user_id', 'title', 'message', 'notification_type', 'is_read',
+                    'created_date', 'related_ticket_id'],
+        'date_columns': ['created_date'],
+        'depends_on': ['users', 'tickets']
+    }
+]
+
+def get_mysql_config():
+    """Получает настройки MySQL из config.py или запрашивает у пользователя"""
+    try:
+        # Пробуем импортировать из config.py
+        sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+        import app.config as config
+
+        # Проверяем есть ли настройки MySQL
+        if hasattr(config, 'MYSQL_HOST'):
+            return {
+                'host': config.MYSQL_HOST,
+                'port': config.MYSQL_PORT,
+                'user': config.MYSQL_USER,
+                'password': config.MYSQL_PASSWORD,
+                'database': config.MYSQL_DATABASE
+            }
+    except:
+        pass
+
+    # Если настроек нет - запрашиваем у пользователя
+    print("🔧 Настройки MySQL не найдены в config.py")
+    print("📝 Введите данные для подключения к MySQL:")
+
+    return {
+        'host': input("Хост [localhost]: ") or "localhost",
+        'port': int(input("Порт [3306]: ") or "3306"),
+        'user': input("Пользователь [root]: ") or "root",
+        'password': input("Пароль: "),
+        'database': input("База данных [repair_system]: ") or "repair_system"
+    }
+
+class MigrationCheckpoint:
+    """Хранит последний перенесенный id по каждой таблице"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.positions = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.positions = json.load(f)
+
+    def get(self, key: str, default: int = 0) -> int:
+        return self.positions.get(key, default)
+
+    def save(self, key: str, last_id: int):
+        """Атомарно записывает позицию (через временный файл)"""
+        with self._lock:
+            self.positions[key] = last_id
+            if not self.path:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.positions, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.positions = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def _convert_dates(row: tuple, date_indexes: list) -> tuple:
+    """Приводит ISO-даты SQLite к виду, который MySQL принимает без разбора в Python"""
+    if not date_indexes:
+        return row
+    row = list(row)
+    for index in date_indexes:
+        value = row[index]
+        if isinstance(value, str) and value.endswith('Z'):
+            row[index] = value[:-1]
+    return tuple(row)
+
+def _format_rate(rows: int, elapsed: float) -> str:
+    if elapsed <= 0:
+        return "—"
+    return f"{rows / elapsed:,.0f} строк/с".replace(',', ' ')
+
+def copy_range(table: dict, sqlite_conn, mysql_conn, start_after: int = 0, end_id: int = None,
+               batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None) -> int:
+    """
+    Переносит строки таблицы с id в диапазоне (start_after, end_id] порциями
+
+    Args:
+        table: Описание таблицы из TABLES
+        sqlite_conn: Соединение с SQLite (источник)
+        mysql_conn: Соединение с MySQL (приемник)
+        start_after: id, после которого начинается чтение
+        end_id: Последний id диапазона включительно (None - до конца таблицы)
+        batch_size: Размер порции
+        on_batch: Колбэк (количество строк, последний id), вызывается после commit
+
+    Returns:
+        int: Количество прочитанных строк
+    """
+    columns = table['columns']
+    column_list = ', '.join(columns)
+    date_indexes = [columns.index(c) for c in table['date_columns']]
+
+    select_sql = f"SELECT {column_list} FROM {table['name']} WHERE id > ?"
+    if end_id is not None:
+        select_sql += " AND id <= ?"
+    select_sql += " ORDER BY id LIMIT ?"
+
+    insert_sql = (
+        f"INSERT IGNORE INTO {table['name']} ({column_list}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+
+    sqlite_cursor = sqlite_conn.cursor()
+    mysql_cursor = mysql_conn.cursor()
+    last_id = start_after
+    copied = 0
+
+    while True:
+        params = (last_id, end_id, batch_size) if end_id is not None else (last_id, batch_size)
+        sqlite_cursor.execute(select_sql, params)
+        rows = sqlite_cursor.fetchall()
+        if not rows:
+            break
+
+        mysql_cursor.executemany(insert_sql, [_convert_dates(row, date_indexes) for row in rows])
+        mysql_conn.commit()
+
+        last_id = rows[-1][0]
+        copied += len(rows)
+        if on_batch:
+            on_batch(len(rows), last_id)
+
+        if len(rows) < batch_size:
+            break
+
+    mysql_cursor.close()
+    sqlite_cursor.close()
+    return copied
+
+def migrate_table(table: dict, sqlite_conn, mysql_conn, checkpoint: MigrationCheckpoint,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Переносит одну таблицу с продолжением от контрольной точки"""
+    start_after = checkpoint.get(table['name'])
+
+    cursor = sqlite_conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table['name']} WHERE id > ?", (start_after,))
+    remaining = cursor.fetchone()[0]
+    cursor.close()
+
+    print(f"\n📋 {table['title']}: к переносу {remaining}"
+          + (f" (продолжение после id={start_after})" if start_after else ""))
+
+    started = time.perf_counter()
+    progress = {'rows': 0}
+
+    def on_batch(rows: int, last_id: int):
+        checkpoint.save(table['name'], last_id)
+        progress['rows'] += rows
+        percent = progress['rows'] / remaining * 100 if remaining else 100.0
+        elapsed = time.perf_counter() - started
+        print(f"\r   ⏳ {progress['rows']}/{remaining} ({percent:.1f}%), "
+              f"{_format_rate(progress['rows'], elapsed)}", end='', flush=True)
+
+    copied = copy_range(table, sqlite_conn, mysql_conn, start_after,
+                        batch_size=batch_size, on_batch=on_batch)
+
+    elapsed = time.perf_counter() - started
+    if copied:
+        print()
+    print(f"✅ {table['title']}: перенесено {copied} за {elapsed:.1f} с ({_format_rate(copied, elapsed)})")
+    return copied
+
+def table_stages(tables: list = None) -> list:
+    """
+    Группирует таблицы в этапы по внешним ключам
+
+    Таблицы одного этапа не зависят друг от друга и могут переноситься
+    параллельно; каждый этап начинается после завершения предыдущего.
+    """
+    tables = tables or TABLES
+    levels = {}
+    for table in tables:
+        parents = [levels[name] for name in table['depends_on'] if name in levels]
+        levels[table['name']] = max(parents) + 1 if parents else 0
+
+    stages = [[] for _ in range(max(levels.values()) + 1)] if levels else []
+    for table in tables:
+        stages[levels[table['name']]].append(table)
+    return stages
+
+def _id_bounds(sqlite_conn, table_name: str):
+    cursor = sqlite_conn.cursor()
+    cursor.execute(f"SELECT MIN(id), MAX(id), COUNT(*) FROM {table_name}")
+    bounds = cursor.fetchone()
+    cursor.close()
+    return bounds
+
+def _split_ranges(min_id: int, max_id: int, range_size: int) -> list:
+    """Разбивает [min_id, max_id] на диапазоны вида (start_after, end_id]"""
+    if min_id is None:
+        return []
+    ranges = []
+    start_after = min_id - 1
+    while start_after < max_id:
+        end_id = min(start_after + range_size, max_id)
+        ranges.append((start_after, end_id))
+        start_after = end_id
+    return ranges
+
+class _WorkerConnections:
+    """Соединения с SQLite и MySQL, свои для каждого потока пула"""
+
+    def __init__(self, sqlite_path: str, mysql_config: dict):
+        self.sqlite_path = sqlite_path
+        self.mysql_config = mysql_config
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        if not hasattr(self._local, 'sqlite_conn'):
+            # Соединение используется только своим потоком, закрывается из основного
+            self._local.sqlite_conn = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._local.mysql_conn = mysql.connector.connect(**self.mysql_config)
+            self._local.mysql_conn.autocommit = False
+            with self._lock:
+                self._opened.append((self._local.sqlite_conn, self._local.mysql_conn))
+        return self._local.sqlite_conn, self._local.mysql_conn
+
+    def close_all(self):
+        with self._lock:
+            for sqlite_conn, mysql_conn in self._opened:
+                sqlite_conn.close()
+                mysql_conn.close()
+            self._opened = []
+
+def migrate_parallel(sqlite_path: str, mysql_config: dict, checkpoint: MigrationCheckpoint,
+                     workers: int, batch_size: int = DEFAULT_BATCH_SIZE,
+                     range_size: int = DEFAULT_RANGE_SIZE) -> dict:
+    """
+    Переносит таблицы параллельно пулом потоков
+
+    Таблицы без взаимных зависимостей и диапазоны id внутри одной таблицы
+    копируются одновременно, у каждого потока свои соединения. Этапы
+    выполняются строго по порядку внешних ключей.
+
+    Returns:
+        dict: Количество перенесенных строк по названию таблицы
+    """
+    connections = _WorkerConnections(sqlite_path, mysql_config)
+    source = sqlite3.connect(sqlite_path)
+    totals = {}
+    progress_lock = threading.Lock()
+
+    def copy_task(table: dict, start_after: int, end_id: int) -> int:
+        key = f"{table['name']}:{start_after}"
+        sqlite_conn, mysql_conn = connections.get()
+        resume_after = max(start_after, checkpoint.get(key, start_after))
+        return copy_range(table, sqlite_conn, mysql_conn, resume_after, end_id, batch_size,
+                          on_batch=lambda rows, last_id: checkpoint.save(key, last_id))
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for stage_number, stage in enumerate(table_stages(), start=1):
+                print(f"\n🚚 Этап {stage_number}: {', '.join(t['title'] for t in stage)}")
+                started = time.perf_counter()
+                futures = {}
+
+                for table in stage:
+                    min_id, max_id, count = _id_bounds(source, table['name'])
+                    totals[table['title']] = 0
+                    for start_after, end_id in _split_ranges(min_id, max_id, range_size):
+                        future = pool.submit(copy_task, table, start_after, end_id)
+                        futures[future] = table
+
+                for future in as_completed(futures):
+                    table = futures[future]
+                    copied = future.result()
+                    with progress_lock:
+                        totals[table['title']] += copied
+
+                elapsed = time.perf_counter() - started
+                for table in stage:
+                    copied = totals[table['title']]
+                    print(f"✅ {table['title']}: перенесено {copied} за {elapsed:.1f} с "
+                          f"({_format_rate(copied, elapsed)})")
+    finally:
+        source.close()
+        connections.close_all()
+
+    return totals
+
+def upgrade_source_schema(sqlite_path: str):
+    """
+    Доводит схему исходной SQLite-базы до текущей версии (bootstrap.ensure_schema)
+
+    TABLES читает столбцы, добавленные миграциями (priority, sla_due,
+    deleted_at, user_role), а в базе, созданной старой версией приложения,
+    их еще нет.
+    """
+    import app.config as config
+    from app.core import bootstrap
+    from app.core.database import Database
+
+    configured_path = config.DATABASE_PATH
+    config.DATABASE_PATH = sqlite_path
+    try:
+        before, after = bootstrap.ensure_schema(Database(initialize=False), seed=False)
+    finally:
+        config.DATABASE_PATH = configured_path
+    if before != after:
+        print(f"🔧 Схема {sqlite_path} обновлена: версия {before} -> {after}")
+
+def refresh_counters(mysql_conn):
+    """
+    Пересчитывает производные поля после переноса комментариев
+
+    comment_count заявок не копируется (строки заявок переносятся раньше
+    комментариев), а user_role старых комментариев может быть пустым.
+    """
+    cursor = mysql_conn.cursor()
+    try:
+        refresh_comment_stats(cursor)
+        mysql_conn.commit()
+    except Exception:
+        mysql_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _normalize_value(value, is_date: bool) -> str:
+    """Приводит значение к виду, одинаковому для SQLite и MySQL"""
+    if value is None:
+        return '\\N'
+    if is_date:
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+            except ValueError:
+                return value
+        # MySQL DATETIME хранит секунды и округляет дробную часть
+        if value.microsecond >= 500000:
+            value += timedelta(seconds=1)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+def _chunk_checksum(cursor, sql: str, params: tuple, date_flags: list):
+    """Возвращает (количество строк, sha256) для порции"""
+    digest = hashlib.sha256()
+    count = 0
+    cursor.execute(sql, params)
+    for row in cursor.fetchall():
+        digest.update('\x1f'.join(
+            _normalize_value(value, is_date) for value, is_date in zip(row, date_flags)
+        ).encode('utf-8'))
+        digest.update(b'\x1e')
+        count += 1
+    return count, digest.hexdigest()
+
+def verify_migration(sqlite_path: str, mysql_config: dict, workers: int = 1,
+                     chunk_size: int = DEFAULT_VERIFY_CHUNK) -> bool:
+    """
+    Сверяет SQLite и MySQL: количество строк и контрольные суммы по диапазонам id
+
+    Returns:
+        bool: True если все таблицы совпадают
+    """
+    print("\n" + "=" * 50)
+    print("🔍 ПРОВЕРКА ЦЕЛОСТНОСТИ")
+    print("=" * 50)
+
+    connections = _WorkerConnections(sqlite_path, mysql_config)
+    mismatches = []
+
+    def verify_chunk(table: dict, start_after: int, end_id: int):
+        sqlite_conn, mysql_conn = connections.get()
+        columns = ', '.join(table['columns'])
+        date_flags = [c in table['date_columns'] for c in table['columns']]
+        sql = f"SELECT {columns} FROM {table['name']} WHERE id > {{0}} AND id <= {{0}} ORDER BY id"
+
+        sqlite_cursor = sqlite_conn.cursor()
+        mysql_cursor = mysql_conn.cursor()
+        source = _chunk_checksum(sqlite_cursor, sql.format('?'), (start_after, end_id), date_flags)
+        target = _chunk_checksum(mysql_cursor, sql.format('%s'), (start_after, end_id), date_flags)
+        sqlite_cursor.close()
+        mysql_cursor.close()
+        mysql_conn.commit()  # завершаем транзакцию чтения, чтобы видеть свежие данные
+        return source, target
+
+    try:
+        sqlite_conn, mysql_conn = connections.get()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for table in TABLES:
+                min_id, max_id, source_count = _id_bounds(sqlite_conn, table['name'])
+                mysql_cursor = mysql_conn.cursor()
+                mysql_cursor.execute(f"SELECT COUNT(*) FROM {table['name']}")
+                target_count = mysql_cursor.fetchone()[0]
+                mysql_cursor.close()
+                mysql_conn.commit()
+
+                futures = {
+                    pool.submit(verify_chunk, table, start_after, end_id): (start_after, end_id)
+                    for start_after, end_id in _split_ranges(min_id, max_id, chunk_size)
+                }
+                bad_chunks = []
+                for future in as_completed(futures):
+                    (source_rows, source_sum), (target_rows, target_sum) = future.result()
+                    if source_sum != target_sum:
+                        start_after, end_id = futures[future]
+                        bad_chunks.append((start_after + 1, end_id, source_rows, target_rows))
+
+                if source_count == target_count and not bad_chunks:
+                    print(f"✅ {table['title']}: {source_count} строк, {len(futures)} порций совпадают")
+                    continue
+
+                print(f"❌ {table['title']}: SQLite {source_count}, MySQL {target_count}, "
+                      f"расхождений в порциях: {len(bad_chunks)}")
+                for first_id, last_id, source_rows, target_rows in sorted(bad_chunks)[:10]:
+                    print(f"   id {first_id}..{last_id}: SQLite {source_rows}, MySQL {target_rows}")
+                mismatches.append(table['name'])
+    finally:
+        connections.close_all()
+
+    if mismatches:
+        print(f"\n❌ Проверка не пройдена: {', '.join(mismatches)}")
+        return False
+
+    print("\n🎉 Данные в MySQL полностью совпадают с SQLite")
+    return True
+
+def migrate_data(sqlite_path: str = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 checkpoint_path: str = DEFAULT_CHECKPOINT_PATH, reset: bool = False,
+                 workers: int = 1, range_size: int = DEFAULT_RANGE_SIZE, verify: bool = False,
+                 verify_only: bool = False):
+    """Переносит данные из SQLite в MySQL"""
+
+    print("=" * 50)
+    print("МИГРАЦИЯ ДАННЫХ ИЗ SQLITE В MYSQL")
+    print("=" * 50)
+
+    if sqlite_path is None:
+        import app.config as config
+        sqlite_path = config.DATABASE_PATH
+
+    # Получаем настройки MySQL
+    mysql_config = get_mysql_config()
+
+    # Проверяем существование SQLite базы
+    if not os.path.exists(sqlite_path):
+        print(f"❌ Файл {sqlite_path} не найден!")
+        return False
+
+    try:
+        upgrade_source_schema(sqlite_path)
+    except Exception as e:
+        print(f"❌ Ошибка обновления схемы SQLite: {e}")
+        return False
+
+    if verify_only:
+        return verify_migration(sqlite_path, mysql_config, workers)
+
+    checkpoint = MigrationCheckpoint(checkpoint_path)
+    if reset:
+        checkpoint.clear()
+    elif checkpoint.positions:
+        print(f"♻️ Найдена контрольная точка {checkpoint_path}, миграция будет продолжена")
+
+    sqlite_conn = None
+    mysql_conn = None
+
+    if workers <= 1:
+        # Подключение к SQLite
+        try:
+            sqlite_conn = sqlite3.connect(sqlite_path)
+            print("✅ Подключение к SQLite успешно")
+        except Exception as e:
+            print(f"❌ Ошибка подключения к SQLite: {e}")
+            return False
+
+        # Подключение к MySQL
+        try:
+            mysql_conn = mysql.connector.connect(**mysql_config)
+            mysql_conn.autocommit = False
+            print("✅ Подключение к MySQL успешно")
+        except Exception as e:
+            print(f"❌ Ошибка подключения к MySQL: {e}")
+            sqlite_conn.close()
+            return False
+    else:
+        print(f"⚡ Параллельный режим: {workers} потоков, диапазоны по {range_size} id")
+
+    try:
+        started = time.perf_counter()
+
+        if workers <= 1:
+            totals = {}
+            for table in TABLES:
+                totals[table['title']] = migrate_table(table, sqlite_conn, mysql_conn, checkpoint, batch_size)
+        else:
+            totals = migrate_parallel(sqlite_path, mysql_config, checkpoint, workers, batch_size, range_size)
+
+        print("\n🔢 Пересчет счетчиков комментариев...")
+        if mysql_conn:
+            refresh_counters(mysql_conn)
+        else:
+            counters_conn = mysql.connector.connect(**mysql_config)
+            try:
+                refresh_counters(counters_conn)
+            finally:
+                counters_conn.close()
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(totals.values())
+
+        print("\n" + "=" * 50)
+        print("🎉 МИГРАЦИЯ УСПЕШНО ЗАВЕРШЕНА!")
+        print(f"📊 Статистика:")
+        for title, count in totals.items():
+            print(f"   {title}: {count}")
+        print(f"   ⏱️ Всего {total_rows} строк за {elapsed:.1f} с ({_format_rate(total_rows, elapsed)})")
+        print("=" * 50)
+
+        # Миграция завершена - контрольная точка больше не нужна
+        checkpoint.clear()
+
+        # Сохраняем настройки в config.py
+        save_config_to_file(mysql_config)
+
+    except Exception as e:
+        print(f"\n❌ Ошибка при миграции: {e}")
+        print(f"💾 Прогресс сохранен в {checkpoint_path}, повторный запуск продолжит перенос")
+        if mysql_conn:
+            mysql_conn.rollback()
+        return False
+
+    finally:
+        if sqlite_conn:
+            sqlite_conn.close()
+        if mysql_conn:
+            mysql_conn.close()
+
+    if verify:
+        return verify_migration(sqlite_path, mysql_config, workers)
+
+    return True
+
+def save_config_to_file(mysql_config):
+    """Сохраняет настройки MySQL в config.py"""
+    config_path = os.path.join('app', 'config.py')
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        # Проверяем есть ли уже настройки MySQL
+        if 'MYSQL_HOST' not in content:
+            # Находим где добавить настройки (после DATABASE_PATH)
+            if 'DATABASE_PATH = ' in content:
+                insert_pos = content.find('DATABASE_PATH = ') + len('DATABASE_PATH = "repair_system.db"')
+                new_content = content[:insert_pos] + f'''
+
+# Настройки MySQL
+MYSQL_HOST = "{mysql_config['host']}"
+MYSQL_PORT = {mysql_config['port']}
+MYSQL_USER = "{mysql_config['user']}"
+MYSQL_PASSWORD = "{mysql_config['password']}"
+MYSQL_DATABASE = "{mysql_config['database']}"''' + content[insert_pos:]
+
+                with open(config_path, 'w', encoding='utf-8') as f:
+                    f.write(new_content)
+
+                print(f"✅ Настройки MySQL сохранены в {config_path}")
+
+    except Exception as e:
+        print(f"⚠️ Не удалось сохранить настройки в config.py: {e}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Миграция данных из SQLite в MySQL")
+    parser.add_argument('--sqlite-path', default=None,
+                        help="Путь к файлу SQLite (по умолчанию config.DATABASE_PATH)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Строк в одной порции (по умолчанию {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH,
+                        help="Файл контрольной точки для возобновления")
+    parser.add_argument('--reset', action='store_true',
+                        help="Игнорировать контрольную точку и начать заново")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Количество параллельных потоков (1 - последовательный перенос)")
+    parser.add_argument('--range-size', type=int, default=DEFAULT_RANGE_SIZE,
+                        help="Размер диапазона id для одного потока")
+    parser.add_argument('--verify', action='store_true',
+                        help="После переноса сверить количество строк и контрольные суммы")
+    parser.add_argument('--verify-only', action='store_true',
+                        help="Только сверить уже перенесенные данные")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    success = migrate_data(
+        sqlite_path=args.sqlite_path,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        reset=args.reset,
+        workers=args.workers,
+        range_size=args.range_size,
+        verify=args.verify,
+        verify_only=args.verify_only
+    )
+
+    if success:
+        print("\n🎯 Дальнейшие действия:")
+        print("1. Убедитесь, что в app/config.py установлено: DATABASE_TYPE = 'mysql'")
+        print("2. Запустите приложение: python run.py")
+        print("3. Проверьте работу всех функций")
+    else:
+        print("\n❌ Миграция не удалась. Проверьте настройки и попробуйте снова.")
+        sys.exit(1)
@@ -1,11 +1,67 @@
 """
 Точка входа для запуска системы учета заявок на ремонт
+
+    python run.py                    # запуск приложения
+    python run.py --profile-imports  # отчет о времени импорта при холодном старте
 """
 
-import flet as ft
-from app.main import main
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+def profile_imports(module: str = "app.main", limit: int = 20) -> int:
+    """Запускает `python -X importtime -c "import <module>"` и печатает самые тяжелые импорты"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+
+    if result.returncode != 0 or not rows:
+        print(f"❌ Не удалось импортировать {module}:")
+        print(result.stderr[-2000:])
+        return 1
+
+    total_us = sum(self_us for self_us, _, _ in rows)
+    by_package = defaultdict(int)
+    for self_us, _, name in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    print(f"⏱️ Импорт {module}: {total_us / 1000:.1f} мс, модулей: {len(rows)}")
+    print("=" * 50)
+    print("По пакетам (собственное время):")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        print(f"  {self_us / 1000:>8.1f} мс  {package}")
+    print("=" * 50)
+    print("Самые тяжелые модули (с учетом вложенных импортов):")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda row: row[1], reverse=True)[:limit]:
+        print(f"  {cumulative_us / 1000:>8.1f} мс  (собственное {self_us / 1000:.1f})  {name}")
+
+    loaded = {name for _, _, name in rows}
+    for heavy in ("mysql.connector", "app.ui.views.dashboard.admin", "app.core.mysql_database"):
+        if heavy in loaded:
+            print(f"⚠️ {heavy} загружается при старте")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Система учета заявок на ремонт оборудования")
+    parser.add_argument("--profile-imports", action="store_true",
+                        help="Показать время импорта модулей при холодном старте и выйти")
+    parser.add_argument("--limit", type=int, default=20, help="Строк в отчете --profile-imports")
+    args = parser.parse_args(argv)
+
+    if args.profile_imports:
+        return profile_imports(limit=args.limit)
 
-if __name__ == "__main__":
     print("Запуск системы учета заявок на ремонт оборудования...")
     print("=" * 50)
     print("Доступные тестовые пользователи:")
@@ -14,14 +70,21 @@ if __name__ == "__main__":
     print("  Мастер: master1 / master123")
     print("  Клиент: client1 / client123")
     print("=" * 50)
-    
+
     try:
+        import flet as ft
+        from app.main import main as app_main
+
         # Запуск приложения
         ft.app(
-            target=main,
+            target=app_main,
             view=ft.AppView.FLET_APP,
             port=8550
         )
     except Exception as e:
         print(f"Ошибка при запуске: {e}")
         input("Нажмите Enter для выхода...")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())